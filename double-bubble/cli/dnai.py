@@ -63,8 +63,16 @@ def cmd_catalog(args):
 
 
 def cmd_script(args):
-    # Generic wrapper: run scripts/build_web.py with passthrough args
-    cmd = [sys.executable, "scripts/build_web.py"] + (args.args or [])
+    # Generic wrapper: run scripts/build_web.py with passthrough args;
+    # `dnai script -- analyze ...` runs the server-side double-bubble engine.
+    rest = list(args.args or [])
+    if rest and rest[0] == "--":
+        rest = rest[1:]
+    if rest and rest[0] == "analyze":
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, ["src", os.environ.get("PYTHONPATH")])))
+        subprocess.call([sys.executable, "-m", "app.analytics.double_bubble"] + rest[1:], env=env)
+        return
+    cmd = [sys.executable, "scripts/build_web.py"] + rest
     subprocess.call(cmd)
 
 
@@ -83,7 +91,7 @@ def main():
     sp = sub.add_parser("eval"); sp.set_defaults(func=cmd_eval)
     sp = sub.add_parser("deploy"); sp.set_defaults(func=cmd_deploy)
     sp = sub.add_parser("catalog"); sp.set_defaults(func=cmd_catalog)
-    sp = sub.add_parser("script", help="Run scripts/build_web.py; pass args after --")
+    sp = sub.add_parser("script", help="Run scripts/build_web.py (or 'analyze'); pass args after --")
     sp.add_argument('args', nargs=argparse.REMAINDER)
     sp.set_defaults(func=cmd_script)
 
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the analyzer's alternates search: the availability index in
+build_web.ENGINE_JS against the previous per-employee scan, under node.
+
+The synthetic workload is an hourly-grid style roster (one or two shifts per
+employee-day, some overtime call-backs). The legacy scan is timed on an evenly
+spaced sample of flagged shifts and extrapolated; the sampled counts are also
+checked against the index.
+
+Usage:
+  python scripts/bench_alternates.py [--employees 10000] [--days 365] [--json out.json]
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from build_web import ENGINE_JS  # noqa: E402
+
+
+# The O(flagged x employees x shifts) implementation this benchmark replaces.
+LEGACY_JS = r"""
+  function legacyBuildAvailabilityIndex(arr){
+    const byEmp = new Map();
+    for (const s of arr){
+      if (!byEmp.has(s.employee_id)) byEmp.set(s.employee_id, []);
+      byEmp.get(s.employee_id).push(s);
+    }
+    for (const [emp, list] of byEmp) list.sort((a,b)=> a.start - b.start);
+    return byEmp;
+  }
+
+  function legacyFindAlternates(flagShift, idxByEmp, availabilityCol){
+    const start = flagShift.start, end = flagShift.end;
+    const out = [];
+    for (const [emp, list] of idxByEmp.entries()){
+      if (emp === flagShift.employee_id) continue;
+      if (availabilityCol){
+        const v = (flagShift.raw?.[availabilityCol] ?? "").toString();
+        const candidateSample = (list[0]?.raw?.[availabilityCol] ?? "").toString();
+        if (v && candidateSample && v !== candidateSample) continue;
+      }
+      let busy = false;
+      for (const s of list){
+        if ((start < s.end) && (s.start < end)){ busy = true; break; }
+        if (s.start > end) break;
+      }
+      if (busy) continue;
+      let prevEnd = null;
+      for (const s of list){
+        if (s.end <= start) prevEnd = s.end; else break;
+      }
+      const restH = prevEnd ? hoursBetween(prevEnd, start) : Infinity;
+      if (restH >= params.restThreshold) out.push({employee_id: emp, restH});
+    }
+    return out;
+  }
+"""
+
+HARNESS_JS = r"""
+  var params = {restThreshold: CFG.rest, devThreshold: 1, baselineMode: "scheduled", baseRate: 100, dbMultiplier: 2,
+                dateStart: null, dateEnd: null, daysOfWeek: new Set(DEFAULT_DAYS), costCenters: new Set()};
+
+  function mulberry32(a){
+    return function(){
+      a |= 0; a = a + 0x6D2B79F5 | 0;
+      let t = Math.imul(a ^ a >>> 15, 1 | a);
+      t = t + Math.imul(t ^ t >>> 7, 61 | t) ^ t;
+      return ((t ^ t >>> 14) >>> 0) / 4294967296;
+    };
+  }
+
+  function syntheticStore(employees, days, seed){
+    const rand = mulberry32(seed);
+    const crews = ["A","B","C","D"];
+    const builder = createShiftColumnsBuilder(["crew"]);
+    for (let e=0; e<employees; e++){
+      const id = "E" + String(e).padStart(6, "0");
+      const raw = {crew: crews[e % crews.length]};
+      const usual = 5 + Math.floor(rand()*4);
+      for (let d=0; d<days; d++){
+        if (rand() < 0.25) continue;
+        const startH = usual + (rand() < 0.1 ? 2 : 0);
+        const len = 8 + Math.floor(rand()*3);
+        const st = new Date(2024, 0, 1 + d, startH, 0, 0);
+        const otFirst = rand() < 0.12;
+        builder.add(raw, id, st.getTime(), st.getTime() + len*36e5, otFirst ? "ot2" : "reg", "CC-1");
+        if (rand() < 0.08){
+          const cs = st.getTime() + (len + 2 + Math.floor(rand()*5))*36e5;
+          builder.add(raw, id, cs, cs + (2 + Math.floor(rand()*4))*36e5, "call-in", "CC-1");
+        }
+        if (CFG.zeroLength && rand() < 0.3){
+          // Zero-length rows on whole hours land exactly on call-in starts.
+          const zs = new Date(2024, 0, 1 + d, 13 + Math.floor(rand()*11), 0, 0).getTime();
+          builder.add(raw, id, zs, zs, "pto", "CC-1");
+        }
+      }
+    }
+    const cols = builder.columns();
+    const {meta, buf} = packShiftColumns(cols, shiftColumnsOrder(cols));
+    return decodePayload(meta, buf);
+  }
+
+  const now = () => performance.now();
+  let t = now();
+  const store = syntheticStore(CFG.employees, CFG.days, CFG.seed);
+  computeRestAndFlags(store);
+  const view = Int32Array.from({length: store.n}, (_, i)=> i);
+  const flagged = view.filter(i=> store.flags[i] === 1);
+  const generateMs = now() - t;
+
+  t = now();
+  const idx = buildAvailabilityIndex(store, view, CFG.availabilityCol);
+  const buildMs = now() - t;
+  t = now();
+  const counts = Array.from(flagged, i=> findAlternates(store, i, idx).count);
+  const queryMs = now() - t;
+
+  // The legacy scan runs on per-shift objects.
+  const crew = store.raw.columns[0];
+  const shifts = Array.from(view, i=> ({
+    employee_id: store.dicts.employee[store.employee[i]], start: new Date(store.start[i]), end: new Date(store.end[i]),
+    raw: {crew: crew.values[crew.codes[store.row[i]]]}
+  }));
+
+  const step = Math.max(1, Math.floor(flagged.length / Math.max(1, CFG.legacySample)));
+  const sampled = [];
+  for (let i=0; i<flagged.length && sampled.length<CFG.legacySample; i+=step) sampled.push(i);
+  t = now();
+  const legacyIdx = legacyBuildAvailabilityIndex(shifts);
+  const legacyBuildMs = now() - t;
+  t = now();
+  let mismatches = 0;
+  for (const i of sampled){
+    if (legacyFindAlternates(shifts[flagged[i]], legacyIdx, CFG.availabilityCol).length !== counts[i]) mismatches++;
+  }
+  const legacyQueryMs = now() - t;
+  const legacyPerFlag = sampled.length ? legacyQueryMs / sampled.length : 0;
+  const legacyTotal = legacyBuildMs + legacyPerFlag * flagged.length;
+  const indexTotal = buildMs + queryMs;
+  process.stdout.write(JSON.stringify({
+    employees: CFG.employees, days: CFG.days, shifts: shifts.length, flagged: flagged.length,
+    generate_ms: generateMs,
+    index_build_ms: buildMs, index_query_ms: queryMs, index_total_ms: indexTotal,
+    legacy_sampled: sampled.length, legacy_ms_per_flag: legacyPerFlag, legacy_est_total_ms: legacyTotal,
+    speedup: indexTotal ? legacyTotal / indexTotal : null, mismatches
+  }));
+"""
+
+
+def run(employees: int, days: int, rest: float, legacy_sample: int, availability_col: str, seed: int, heap_mb: int,
+        zero_length: bool = False) -> dict:
+    cfg = {"employees": employees, "days": days, "rest": rest, "legacySample": legacy_sample, "availabilityCol": availability_col,
+           "seed": seed, "zeroLength": zero_length}
+    script = ENGINE_JS + LEGACY_JS + f"\n  const CFG = {json.dumps(cfg)};\n" + HARNESS_JS
+    out = subprocess.run(
+        ["node", f"--max-old-space-size={heap_mb}", "-"],
+        input=script, check=True, capture_output=True, text=True, env={"TZ": "UTC", "PATH": "/usr/bin:/bin:/usr/local/bin"},
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--employees", type=int, default=10000)
+    ap.add_argument("--days", type=int, default=365)
+    ap.add_argument("--rest-threshold", type=float, default=8.0)
+    ap.add_argument("--legacy-sample", type=int, default=50, help="Flagged shifts to time with the legacy scan")
+    ap.add_argument("--availability-column", default="", help="e.g. crew")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--heap-mb", type=int, default=4096)
+    ap.add_argument("--json", help="Also write the result to this path")
+    args = ap.parse_args()
+    if shutil.which("node") is None:
+        print("node not found; skipping JS benchmark")
+        return
+    res = run(args.employees, args.days, args.rest_threshold, args.legacy_sample, args.availability_column, args.seed, args.heap_mb)
+    print(json.dumps(res, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(res, indent=2), encoding="utf-8")
+        print(f"wrote: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the hourly-grid expansion (app.analytics.hourly_grid.expand_hourly)
+on a synthetic (rows x 24) matrix, 10M rows by default.
+
+The grid looks like a timekeeping extract: one or two runs of full hours per
+row, some ending in a partial hour. Alongside the chunked expansion the script
+times the previous whole-matrix version (on --baseline-rows, since it holds
+several full-size temporaries) and the row-at-a-time loop the page uses (on
+--loop-rows, extrapolated), and checks both against the chunked output.
+
+Usage:
+  python scripts/bench_hourly.py [--rows 10000000] [--dtype float64] [--json out.json]
+"""
+import argparse
+import json
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+from app.analytics.hourly_grid import MS_PER_HOUR, expand_hourly  # noqa: E402
+
+MS_PER_DAY = 86_400_000
+
+
+def synthetic_grid(rows: int, dtype: str, seed: int, block: int = 1 << 20):
+    rng = np.random.default_rng(seed)
+    hours = np.zeros((rows, 24), dtype=dtype)
+    cols = np.arange(24)
+    for lo in range(0, rows, block):
+        n = min(block, rows - lo)
+        start = rng.integers(0, 21, n)[:, None]
+        length = rng.integers(1, 11, n)[:, None]
+        grid = (cols >= start) & (cols < start + length)
+        # A quarter of rows get a second run (a call-back) and 30% a partial last hour.
+        back = start + length + rng.integers(2, 6, n)[:, None]
+        grid |= (rng.random(n) < 0.25)[:, None] & (cols >= back) & (cols < back + 3)
+        out = hours[lo : lo + n]
+        out[grid] = 1
+        partial = (rng.random(n) < 0.3) & (start + length < 24)[:, 0]
+        out[np.flatnonzero(partial), (start + length)[partial, 0]] = rng.choice([0.25, 0.5, 0.75], int(partial.sum()))
+    day_ms = (20_000 + np.arange(rows, dtype=np.int64) % 365) * MS_PER_DAY
+    return hours, day_ms
+
+
+def expand_whole_matrix(hours, day_ms):
+    # The previous double_bubble._expand_hourly: one pass over the full matrix.
+    vals = np.where(np.isfinite(hours) & (hours > 0), np.minimum(hours, 1.0), 0.0)
+    pos = vals > 0
+    full = pos & (np.trunc(vals * MS_PER_HOUR) >= MS_PER_HOUR)
+    cont_prev = np.zeros_like(pos)
+    cont_prev[:, 1:] = pos[:, 1:] & full[:, :-1]
+    cont_next = np.zeros_like(pos)
+    cont_next[:, :-1] = full[:, :-1] & pos[:, 1:]
+    rows, h_start = np.nonzero(pos & ~cont_prev)
+    end_rows, h_end = np.nonzero(pos & ~cont_next)
+    start = day_ms[rows] + h_start.astype(np.int64) * MS_PER_HOUR
+    end = day_ms[end_rows] + h_end.astype(np.int64) * MS_PER_HOUR
+    end = end + np.trunc(vals[end_rows, h_end] * MS_PER_HOUR).astype(np.int64)
+    return rows, start, end
+
+
+def expand_row_loop(hours, day_ms):
+    # Row-at-a-time, as expandHourlyRow does per CSV row.
+    rows, starts, ends = [], [], []
+    for r in range(len(hours)):
+        row, day = hours[r].tolist(), int(day_ms[r])
+        cur = None
+        for h, v in enumerate(row):
+            if not (math.isfinite(v) and v > 0):
+                if cur:
+                    rows.append(r), starts.append(cur[0]), ends.append(cur[1])
+                    cur = None
+                continue
+            s = day + h * MS_PER_HOUR
+            e = s + math.trunc(min(v, 1.0) * MS_PER_HOUR)
+            if cur and cur[1] == s:
+                cur[1] = e
+            else:
+                if cur:
+                    rows.append(r), starts.append(cur[0]), ends.append(cur[1])
+                cur = [s, e]
+        if cur:
+            rows.append(r), starts.append(cur[0]), ends.append(cur[1])
+    return np.array(rows), np.array(starts), np.array(ends)
+
+
+def timed(fn, *args):
+    tracemalloc.start()
+    t = time.perf_counter()
+    out = fn(*args)
+    ms = (time.perf_counter() - t) * 1e3
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, ms, peak / 1e6
+
+
+def same(a, b) -> bool:
+    return all(np.array_equal(x, y) for x, y in zip(a, b))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000_000)
+    ap.add_argument("--dtype", choices=["float64", "float32"], default="float64")
+    ap.add_argument("--baseline-rows", type=int, default=1_000_000, help="Rows to time the whole-matrix version on")
+    ap.add_argument("--loop-rows", type=int, default=20_000, help="Rows to time the row-at-a-time loop on")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", help="Also write the result to this path")
+    args = ap.parse_args()
+
+    hours, day_ms = synthetic_grid(args.rows, args.dtype, args.seed)
+    (rows, start, end), ms, peak_mb = timed(expand_hourly, hours, day_ms)
+    res = {
+        "rows": args.rows, "dtype": args.dtype, "grid_mb": hours.nbytes / 1e6, "segments": int(len(rows)),
+        "chunked_ms": ms, "chunked_rows_per_s": args.rows / ms * 1e3, "chunked_peak_mb": peak_mb,
+    }
+
+    nb = min(args.baseline_rows, args.rows)
+    chunked_b = tuple(a[: np.searchsorted(rows, nb)] for a in (rows, start, end))
+    whole, ms, peak_mb = timed(expand_whole_matrix, hours[:nb], day_ms[:nb])
+    res.update({
+        "baseline_rows": nb, "whole_matrix_ms": ms, "whole_matrix_peak_mb": peak_mb,
+        "chunked_ms_at_baseline_rows": res["chunked_ms"] * nb / args.rows, "whole_matrix_matches": same(whole, chunked_b),
+    })
+
+    nl = min(args.loop_rows, args.rows)
+    chunked_l = tuple(a[: np.searchsorted(rows, nl)] for a in (rows, start, end))
+    loop, ms, _ = timed(expand_row_loop, hours[:nl], day_ms[:nl])
+    res.update({
+        "loop_rows": nl, "loop_ms": ms, "loop_est_total_ms": ms * args.rows / nl,
+        "speedup_vs_loop": ms * args.rows / nl / res["chunked_ms"], "loop_matches": same(loop, chunked_l),
+    })
+    print(json.dumps(res, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(res, indent=2), encoding="utf-8")
+        print(f"wrote: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
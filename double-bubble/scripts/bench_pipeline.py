@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Times each stage of the double-bubble pipeline on a synthetic roster
+(app.analytics.synthetic): the Python engine (app.analytics.double_bubble)
+and, when node is installed, the page engine (build_web.ENGINE_JS) on the
+same CSV.
+
+Stages follow the page's recomputeAll: CSV parse, normalize, rest/flags,
+filters, baseline, deviations, alternates (index build and queries), savings
+and the flagged CSV export. Each stage runs --repeat times and the fastest
+run is kept. Both engines must flag the same shifts.
+
+Results go to --json. With --history, every run is appended to a JSON-lines
+file. --check then compares the run with the last one recorded for the same
+workload and exits 1 when a stage is more than --tolerance slower, which is
+how a normalizeRows or findAlternates regression shows up before release.
+
+Usage:
+  python scripts/bench_pipeline.py [--employees 2000] [--days 90] [--ot-rate 0.12] [--cost-centers 8]
+                                   [--json out.json] [--history bench.jsonl --check]
+"""
+import argparse
+import json
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+sys.path.insert(0, str(ROOT / "scripts"))
+from app.analytics import double_bubble as db  # noqa: E402
+from app.analytics.synthetic import SyntheticConfig, write_synthetic  # noqa: E402
+from build_web import ENGINE_JS  # noqa: E402
+
+HARNESS_JS = r"""
+  var params = {restThreshold: CFG.rest, devThreshold: 1, baselineMode: "scheduled", baseRate: 100, dbMultiplier: 2,
+                dateStart: null, dateEnd: null, daysOfWeek: new Set(CFG.days.length ? CFG.days : DEFAULT_DAYS),
+                costCenters: new Set()};
+  const times = {};
+  function stage(name, fn){
+    let out, best = Infinity;
+    for (let r=0; r<CFG.repeat; r++){
+      const t = performance.now();
+      out = fn();
+      best = Math.min(best, performance.now() - t);
+    }
+    times[name] = best;
+    return out;
+  }
+  const text = require("fs").readFileSync(CFG.csv, "utf8");
+  const rows = stage("parse_csv", ()=> parseCSVbasic(text));
+  const store = stage("normalize_rows", ()=> normalizeRows(rows));
+  stage("rest_and_flags", ()=> computeRestAndFlags(store));
+  const view = stage("filters", ()=> filterView(store));
+  stage("baseline_index", ()=> (store.baselineIndex = buildBaselineIndex(store)));
+  const baseline = stage("baseline", ()=> perEmployeeBaseline(store, view));
+  stage("deviations", ()=> computeDeviations(store, view, baseline));
+  const idx = stage("alternates_index", ()=> buildAvailabilityIndex(store, view, CFG.availabilityCol));
+  const flagged = view.filter(i=> store.flags[i] === 1);
+  stage("alternates", ()=> annotateAlternates(store, flagged, idx));
+  stage("savings", ()=> estimateSavings(store, flagged));
+  const csv = stage("export", ()=> flaggedCsvText(store, flagged));
+  let withAlternates = 0;
+  for (const i of flagged) if (store.altCount[i] > 0) withAlternates++;
+  process.stdout.write(JSON.stringify({
+    stages: times, total_ms: Object.values(times).reduce((a, b)=> a + b, 0),
+    rows: rows.length, shifts: store.n, view: view.length, flagged: flagged.length,
+    with_alternates: withAlternates, export_bytes: csv.length
+  }));
+"""
+
+
+def best_of(repeat: int, fn, *args):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(*args)
+        best = min(best, (time.perf_counter() - t) * 1e3)
+    return out, best
+
+
+def run_python(csv_path: Path, params: db.Params, repeat: int) -> dict:
+    times = {}
+
+    def stage(name, fn, *args):
+        out, times[name] = best_of(repeat, fn, *args)
+        return out
+
+    raw = stage("read_csv", db.read_shifts_csv, str(csv_path))
+    base = stage("normalize_rows", db.normalize_rows, raw)
+    annotated = stage("rest_and_flags", db.compute_rest_and_flags, base, params.rest_threshold)
+
+    def filters(shifts):
+        shifts = db.apply_date_filter(shifts, params)
+        shifts = db.apply_day_of_week_filter(shifts, params)
+        return db.apply_cost_center_filter(shifts, params).reset_index(drop=True)
+
+    view = stage("filters", filters, annotated)
+    baseline = stage("baseline", db.per_employee_baseline, view, params.baseline_mode)
+    computed = stage("deviations", db.compute_deviations, view, baseline, params.dev_threshold)
+    index, queries = stage("alternates_index", db.alternate_queries, computed, raw, params)
+    alternates = stage("alternates", db.count_alternates, index, *queries, params.rest_threshold)
+    flagged = stage("savings", db.flagged_with_savings, computed, alternates, params)
+    csv = stage("export", db.flagged_csv_text, flagged)
+    return {
+        "stages": times, "total_ms": sum(times.values()),
+        "rows": len(raw), "shifts": len(base), "view": len(computed), "flagged": len(flagged),
+        "with_alternates": int((alternates > 0).sum()), "export_bytes": len(csv),
+    }
+
+
+def run_js(csv_path: Path, params: db.Params, repeat: int, heap_mb: int) -> dict:
+    cfg = {
+        "csv": str(csv_path), "rest": params.rest_threshold, "days": sorted(params.days_of_week or []),
+        "availabilityCol": params.availability_column, "repeat": repeat,
+    }
+    script = ENGINE_JS + f"\n  const CFG = {json.dumps(cfg)};\n" + HARNESS_JS
+    out = subprocess.run(
+        ["node", f"--max-old-space-size={heap_mb}", "-"],
+        input=script, check=True, capture_output=True, text=True, env={"TZ": "UTC", "PATH": "/usr/bin:/bin:/usr/local/bin"},
+    )
+    return json.loads(out.stdout)
+
+
+def git_revision() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def regressions(current: dict, previous: dict, tolerance: float, min_ms: float) -> list:
+    """``engine.stage`` entries more than ``tolerance`` slower than ``previous`` (ignoring stages under ``min_ms``)."""
+    found = []
+    for engine in ("python", "js"):
+        now, before = current.get(engine) or {}, previous.get(engine) or {}
+        for name, ms in (now.get("stages") or {}).items():
+            prev = (before.get("stages") or {}).get(name)
+            if prev is not None and max(ms, prev) >= min_ms and ms > prev * (1 + tolerance):
+                found.append(f"{engine}.{name}: {prev:.1f} -> {ms:.1f} ms ({ms / prev:.2f}x)")
+    return found
+
+
+def last_matching(history: Path, workload: dict):
+    if not history.exists():
+        return None
+    match = None
+    for line in history.read_text(encoding="utf-8").splitlines():
+        entry = json.loads(line) if line.strip() else None
+        if entry and entry.get("workload") == workload:
+            match = entry
+    return match
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    d = SyntheticConfig()
+    ap.add_argument("--employees", type=int, default=2000)
+    ap.add_argument("--days", type=int, default=90)
+    ap.add_argument("--ot-rate", type=float, default=d.ot_rate)
+    ap.add_argument("--cost-centers", type=int, default=8)
+    ap.add_argument("--seed", type=int, default=d.seed)
+    ap.add_argument("--days-of-week", default="1,2,3,4,5", help="View filter, 0=Sunday (empty = all days)")
+    ap.add_argument("--availability-column", default="crew")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-js", action="store_true", help="Skip the node run")
+    ap.add_argument("--heap-mb", type=int, default=4096)
+    ap.add_argument("--json", help="Also write the result to this path")
+    ap.add_argument("--history", help="Append the result to this JSON-lines file")
+    ap.add_argument("--check", action="store_true", help="Fail on regressions against the last --history entry")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown per stage (0.25 = 25%%)")
+    ap.add_argument("--min-ms", type=float, default=20.0, help="Ignore stages faster than this")
+    args = ap.parse_args()
+
+    config = SyntheticConfig(
+        employees=args.employees, days=args.days, ot_rate=args.ot_rate, cost_centers=args.cost_centers, seed=args.seed
+    )
+    days = frozenset(int(v) for v in args.days_of_week.split(",") if v.strip())
+    params = db.Params(days_of_week=days or None, availability_column=args.availability_column)
+    workload = {k: (str(v) if k == "start" else v) for k, v in asdict(config).items() if k != "crews"}
+    workload.update(days_of_week=sorted(days), availability_column=args.availability_column)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / "shifts.csv"
+        t = time.perf_counter()
+        write_synthetic(str(csv_path), config)
+        res = {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"), "revision": git_revision(),
+            "workload": workload, "generate_ms": (time.perf_counter() - t) * 1e3, "csv_mb": csv_path.stat().st_size / 1e6,
+            "runtime": {"python": platform.python_version()},
+        }
+        res["python"] = run_python(csv_path, params, args.repeat)
+        if not args.no_js and shutil.which("node"):
+            res["runtime"]["node"] = subprocess.run(["node", "--version"], capture_output=True, text=True).stdout.strip()
+            res["js"] = run_js(csv_path, params, args.repeat, args.heap_mb)
+            res["engines_agree"] = all(res["js"][k] == res["python"][k] for k in ("shifts", "view", "flagged", "with_alternates"))
+        elif not args.no_js:
+            print("node not found; skipping JS stages")
+
+    print(json.dumps(res, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(res, indent=2), encoding="utf-8")
+        print(f"wrote: {args.json}")
+    failed = []
+    if args.history:
+        history = Path(args.history)
+        previous = last_matching(history, workload) if args.check else None
+        if previous:
+            failed = regressions(res, previous, args.tolerance, args.min_ms)
+            print(f"compared with {previous.get('revision') or previous.get('timestamp')}: {len(failed)} regression(s)")
+        history.parent.mkdir(parents=True, exist_ok=True)
+        with history.open("a", encoding="utf-8") as fh:
+            fh.write(json.dumps(res, separators=(",", ":")) + "\n")
+        print(f"appended: {history}")
+    if res.get("engines_agree") is False:
+        failed.append("python and js engines disagree on shift/flagged counts")
+    for line in failed:
+        print(f"REGRESSION {line}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmarks the analyzer's memory footprint under node: retained JS heap plus
+ArrayBuffer bytes of a loaded data set in the columnar shift store
+(build_web.ENGINE_JS) against the previous per-segment objects, each carrying
+a copy of its source row.
+
+The workload is an hourly-grid CSV (one or two rows per employee-day, a few
+optional columns). Each representation is measured in its own node process:
+parse, normalize, drop the parsed rows, then run stages 1-6 (rest/flags,
+filters, baseline, deviations).
+
+Usage:
+  python scripts/bench_store.py [--employees 8000] [--days 28] [--json out.json]
+"""
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from build_web import ENGINE_JS  # noqa: E402
+
+
+# The object-per-segment normalization and stages this benchmark replaces.
+LEGACY_JS = r"""
+  function legacyExpandHourlyRow(row){
+    if (!isHourlyRow(row)) return null;
+    const emp = (row.employee_id ?? "").toString().trim();
+    const day = parseCalendarDate(row.calendar_date ?? "");
+    const typ = getShiftTypeFromRow(row);
+    const costCenter = getCostCenterFromRow(row);
+    if (!emp || !day || !typ || !costCenter) return [];
+    const baseRaw = {...row, cost_center: costCenter};
+    const segs = [];
+    let current = null;
+    for (const col of HOUR_COLUMNS){
+      const val = parseFloat(row[col]);
+      if (!val || !isFinite(val) || val <= 0){
+        if (current){ segs.push(current); current = null; }
+        continue;
+      }
+      const slotStart = new Date(day.getFullYear(), day.getMonth(), day.getDate(), parseInt(col, 10), 0, 0);
+      const slotEnd = new Date(slotStart.getTime() + Math.min(val, 1) * 36e5);
+      if (current && Math.abs(slotStart.getTime() - current.end.getTime()) < 1){
+        current.end = slotEnd;
+      } else {
+        if (current) segs.push(current);
+        current = {employee_id: emp, start: slotStart, end: slotEnd, shift_type: typ, cost_center: costCenter, raw: {...baseRaw}};
+      }
+    }
+    if (current) segs.push(current);
+    return segs;
+  }
+
+  function legacyNormalizeRows(rows){
+    const out = [];
+    for (const r of rows) out.push(...legacyExpandHourlyRow(r));
+    return out.sort((a,b)=> a.employee_id.localeCompare(b.employee_id) || a.start - b.start || a.end - b.end);
+  }
+
+  function legacyPrepareView(arr){
+    const prevByEmp = new Map();
+    for (const s of arr){
+      const prev = prevByEmp.get(s.employee_id) || null;
+      s.prev_end = prev ? prev.end : null;
+      s.rest_gap_h = prev ? hoursBetween(prev.end, s.start) : null;
+      s.double_bubble = s.rest_gap_h != null && isOvertimeType(prev.shift_type) && s.rest_gap_h < params.restThreshold;
+      prevByEmp.set(s.employee_id, s);
+    }
+    const byEmp = new Map();
+    for (const s of arr){
+      if (!byEmp.has(s.employee_id)) byEmp.set(s.employee_id, []);
+      byEmp.get(s.employee_id).push(s);
+    }
+    const baseline = new Map();
+    for (const [emp, list] of byEmp){
+      const pool = list.filter(x=> isScheduledType(x.shift_type));
+      const use = pool.length ? pool : list;
+      const smins = use.map(x=> minutesOfDay(x.start)).sort((a,b)=>a-b);
+      const emins = use.map(x=> minutesOfDay(x.end)).sort((a,b)=>a-b);
+      baseline.set(emp, {start_min: smins[smins.length >> 1], end_min: emins[emins.length >> 1]});
+    }
+    for (const s of arr){
+      const bl = baseline.get(s.employee_id);
+      s.dev_hours = Math.max(Math.abs(minutesOfDay(s.start) - bl.start_min), Math.abs(minutesOfDay(s.end) - bl.end_min)) / 60;
+      s.deviation = s.dev_hours > params.devThreshold;
+    }
+    return {arr, baseline};
+  }
+"""
+
+HARNESS_JS = r"""
+  var params = {restThreshold: 8, devThreshold: 1, baselineMode: "scheduled", baseRate: 100, dbMultiplier: 2,
+                dateStart: null, dateEnd: null, daysOfWeek: new Set(DEFAULT_DAYS), costCenters: new Set()};
+
+  function mulberry32(a){
+    return function(){
+      a |= 0; a = a + 0x6D2B79F5 | 0;
+      let t = Math.imul(a ^ a >>> 15, 1 | a);
+      t = t + Math.imul(t ^ t >>> 7, 61 | t) ^ t;
+      return ((t ^ t >>> 14) >>> 0) / 4294967296;
+    };
+  }
+
+  function syntheticCsv(employees, days, seed){
+    const rand = mulberry32(seed);
+    const lines = [["employee_id", "calendar_date", ...HOUR_COLUMNS, "shift_time", "cost_center", "crew", "district", "job_class"].join(",")];
+    const types = ["REG", "REG", "REG", "OT2", "OT1", "Call-in", "PTO"];
+    for (let e=0; e<employees; e++){
+      const id = "E" + String(e).padStart(6, "0");
+      const extra = ["ABCD"[e % 4], "District-" + (e % 17), "Class-" + (e % 5)].join(",");
+      for (let d=0; d<days; d++){
+        const date = new Date(2025, 0, 1 + d);
+        const mdy = pad(date.getMonth()+1) + "/" + pad(date.getDate()) + "/" + date.getFullYear();
+        const count = [0, 1, 1, 2][Math.floor(rand()*4)];
+        for (let k=0; k<count; k++){
+          const start = Math.floor(rand()*21), len = 1 + Math.floor(rand()*10);
+          const cells = HOUR_COLUMNS.map((_, h)=> h >= start && h < start + len ? "1" : "");
+          if (start + len < 24 && rand() < 0.3) cells[start + len] = "0.5";
+          lines.push([id, mdy, ...cells, types[Math.floor(rand()*types.length)], "CC-" + (e % 40), extra].join(","));
+        }
+      }
+    }
+    return lines.join("\n");
+  }
+
+  const retained = () => { gc(); gc(); const m = process.memoryUsage(); return m.heapUsed + m.arrayBuffers; };
+  const now = () => performance.now();
+  // Parsed rows and CSV text die with this frame.
+  function load(){
+    const rows = parseCSVbasic(syntheticCsv(CFG.employees, CFG.days, CFG.seed));
+    const t = now();
+    const data = CFG.mode === "store" ? normalizeRows(rows) : legacyNormalizeRows(rows);
+    return {data, rowCount: rows.length, normalizeMs: now() - t};
+  }
+
+  const base = retained();
+  const {data, rowCount, normalizeMs} = load();
+  const loaded = retained() - base;
+  const t = now();
+  const stages = CFG.mode === "store" ? prepareView(data, data) : legacyPrepareView(data);
+  const stagesMs = now() - t;
+  const analyzed = retained() - base;
+  process.stdout.write(JSON.stringify({
+    mode: CFG.mode, rows: rowCount, shifts: CFG.mode === "store" ? data.n : data.length,
+    loaded_mb: loaded / 1e6, analyzed_mb: analyzed / 1e6, normalize_ms: normalizeMs, stages_ms: stagesMs,
+    in_view: CFG.mode === "store" ? stages.length : stages.arr.length
+  }));
+"""
+
+
+def run(mode: str, employees: int, days: int, seed: int, heap_mb: int) -> dict:
+    cfg = {"mode": mode, "employees": employees, "days": days, "seed": seed}
+    script = ENGINE_JS + LEGACY_JS + f"\n  const CFG = {json.dumps(cfg)};\n" + HARNESS_JS
+    out = subprocess.run(
+        ["node", "--expose-gc", f"--max-old-space-size={heap_mb}", "-"],
+        input=script, check=True, capture_output=True, text=True, env={"TZ": "UTC", "PATH": "/usr/bin:/bin:/usr/local/bin"},
+    )
+    return json.loads(out.stdout)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--employees", type=int, default=8000)
+    ap.add_argument("--days", type=int, default=28)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--heap-mb", type=int, default=8192)
+    ap.add_argument("--json", help="Also write the result to this path")
+    args = ap.parse_args()
+    if shutil.which("node") is None:
+        print("node not found; skipping JS benchmark")
+        return
+    legacy = run("legacy", args.employees, args.days, args.seed, args.heap_mb)
+    store = run("store", args.employees, args.days, args.seed, args.heap_mb)
+    res = {
+        "legacy": legacy, "store": store,
+        "loaded_ratio": legacy["loaded_mb"] / store["loaded_mb"] if store["loaded_mb"] else None,
+        "analyzed_ratio": legacy["analyzed_mb"] / store["analyzed_mb"] if store["analyzed_mb"] else None,
+    }
+    print(json.dumps(res, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(res, indent=2), encoding="utf-8")
+        print(f"wrote: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
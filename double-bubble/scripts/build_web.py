@@ -4,9 +4,1735 @@ Builds the multi-employee Double Bubble Analyzer HTML to a target path.
 
 Usage:
   python scripts/build_web.py [--out web/double-bubble-analyzer-multi.html]
+  python scripts/build_web.py --data data/raw/shifts.csv [--payload-bin] [--rest-threshold 8] [--baseline-mode scheduled]
+  python scripts/build_web.py --data data/raw/shifts.parquet [--extra-columns crew]
+  python scripts/build_web.py [--no-minify] [--compress gzip,br]
+
+With --data the CSV (or Parquet/Arrow extract, read with column projection by
+app.analytics.arrow_io) is normalized, flagged and baselined at build time
+(app.analytics.payload) and embedded as a columnar payload, so the page skips
+client-side parsing. --payload-bin writes the columns to <out>.bin next to the
+HTML instead of inlining them as base64 (the page then has to be served over
+http rather than opened from disk).
+
+The page is self-contained (CSV parsing included, no CDN scripts) so it works
+on air-gapped machines. Its CSS and JS are minified unless --no-minify;
+--compress gzip,br also writes <out>.gz/<out>.br (and for the .bin) for
+servers that hand out precompressed files.
 """
 import argparse
+import gzip
+import json
+import re
+import sys
 from pathlib import Path
+from typing import List, Optional, Sequence
+
+
+# Pure pipeline functions (no DOM access). Inlined into the page and also
+# loadable headless (e.g. under node) for parity checks against app.analytics.
+ENGINE_JS = r"""  // ---------- Utilities ----------
+  const fmt2 = n => (Math.round(n*100)/100).toFixed(2);
+  const pad = (n) => n<10 ? "0"+n : ""+n;
+  const toLocalISO = (d) => d.getFullYear()+"-"+pad(d.getMonth()+1)+"-"+pad(d.getDate())+" "+pad(d.getHours())+":"+pad(d.getMinutes());
+  const parseMaybe = (s) => {
+    if (s instanceof Date) return s;
+    if (typeof s === "string") {
+      let t = s.trim();
+      if (!t) return null;
+      t = t.replace(/\//g, "-");
+      if (/^\d{4}-\d{2}-\d{2}$/.test(t)) t += " 00:00";
+      t = t.replace("T"," ");
+      const d = new Date(t);
+      if (isNaN(d)) return null;
+      return d;
+    }
+    return null;
+  };
+  const minutesOfDay = (d) => d.getHours()*60 + d.getMinutes() + d.getSeconds()/60;
+  const hoursBetween = (a,b) => (b - a) / 36e5;
+  const addDays = (d, n) => new Date(d.getFullYear(), d.getMonth(), d.getDate() + n, d.getHours(), d.getMinutes(), d.getSeconds());
+  // Epoch ms -> wall-clock ms (local fields read as UTC), with zone offsets cached per quarter hour.
+  const tzOffsetMs = new Map();
+  function wallClockMs(ms){
+    const q = Math.floor(ms / 9e5);
+    let off = tzOffsetMs.get(q);
+    if (off === undefined){ off = new Date(q * 9e5).getTimezoneOffset() * 6e4; tzOffsetMs.set(q, off); }
+    return ms - off;
+  }
+  const localDayNumber = (ms) => Math.floor(wallClockMs(ms) / 864e5);
+  const localMinutesOfDay = (ms) => { const w = wallClockMs(ms); return (w - Math.floor(w / 864e5) * 864e5) / 6e4; };
+  const dayOfWeek = (dayNumber) => ((dayNumber % 7) + 11) % 7;  // day 0 (1970-01-01) was a Thursday
+  const HOUR_COLUMNS = Array.from({length:24}, (_,i)=> pad(i));
+  const DEFAULT_DAYS = [0,1,2,3,4,5,6];
+  // Source columns the pipeline reads itself; any other column can be an availability filter.
+  const KNOWN_COLUMNS = new Set(["employee_id","start_datetime","end_datetime","shift_type","shift_time","SHIFT_TIME","shiftTime","cost_center","CostCenter","costCenter","COST_CENTER","Employee","Start","End","start","end","type","calendar_date","calendarDate","CalendarDate","date", ...HOUR_COLUMNS]);
+  const MONTH_NAMES = ["January","February","March","April","May","June","July","August","September","October","November","December"];
+  const DOW_LABELS = ["Sun","Mon","Tue","Wed","Thu","Fri","Sat"];
+  const SHIFT_TIME_ALIASES = {
+    "reg": "reg",
+    "regular": "reg",
+    "scheduled": "reg",
+    "chol": "chol",
+    "company holiday": "chol",
+    "ot2": "ot2",
+    "ot": "ot2",
+    "overtime 2x": "ot2",
+    "call-in": "call-in",
+    "callin": "call-in",
+    "ot1": "ot1",
+    "overtime 1.5x": "ot1",
+    "plve": "plve",
+    "unpaid leave": "plve",
+    "pto": "pto",
+    "paid time off": "pto"
+  };
+  const SHIFT_TIME_DESCRIPTIONS = {
+    "reg": "REG — regular time",
+    "chol": "CHOL — company holiday",
+    "ot2": "OT2 — overtime 2×",
+    "ot1": "OT1 — overtime 1.5×",
+    "plve": "PLVE — unpaid leave",
+    "pto": "PTO — paid time off",
+    "call-in": "Call-in"
+  };
+  const canonicalShiftType = (value) => {
+    const norm = (value ?? "").toString().trim().toLowerCase();
+    if (!norm) return "";
+    return SHIFT_TIME_ALIASES[norm] || norm;
+  };
+  const SHIFT_TIME_FIELDS = ["shift_time","shiftTime","SHIFT_TIME"];
+  const getShiftTypeFromRow = (row) => {
+    for (const key of SHIFT_TIME_FIELDS){
+      if (row && row[key] != null && row[key] !== "") return canonicalShiftType(row[key]);
+    }
+    return "";
+  };
+  const describeShiftType = (value) => SHIFT_TIME_DESCRIPTIONS[canonicalShiftType(value)] || (value ? value.toString() : "—");
+  const SCHEDULED_TYPES = new Set(["reg","regular","scheduled","chol"]);
+  const CALLIN_TYPES = new Set(["call-in","callin","ot2","ot1","ot"]);
+  const OVERTIME_TYPES = new Set(["ot1","ot2","call-in","callin","ot"]);
+  const isScheduledType = (value) => SCHEDULED_TYPES.has(canonicalShiftType(value));
+  const isCallInType = (value) => CALLIN_TYPES.has(canonicalShiftType(value));
+  const isOvertimeType = (value) => OVERTIME_TYPES.has(canonicalShiftType(value));
+  const TYPE_SCHEDULED = 1, TYPE_CALLIN = 2, TYPE_OVERTIME = 4;
+  // Type class bits per shift_type dictionary entry.
+  const shiftTypeFlags = (dict) => Uint8Array.from(dict, t=>
+    (isScheduledType(t) ? TYPE_SCHEDULED : 0) | (isCallInType(t) ? TYPE_CALLIN : 0) | (isOvertimeType(t) ? TYPE_OVERTIME : 0));
+  const COST_CENTER_FIELDS = ["cost_center","CostCenter","costCenter","COST_CENTER"];
+  const getCostCenterFromRow = (row) => {
+    for (const key of COST_CENTER_FIELDS){
+      if (row && row[key] != null && row[key] !== "") return row[key].toString().trim();
+    }
+    return "";
+  };
+
+  function parseCalendarDate(value){
+    if (value == null) return null;
+    const text = value.toString().trim();
+    if (!text) return null;
+    const slash = text.match(/^(\d{1,2})[\/-](\d{1,2})[\/-](\d{2,4})$/);
+    if (slash){
+      const mm = parseInt(slash[1], 10);
+      const dd = parseInt(slash[2], 10);
+      let yy = parseInt(slash[3], 10);
+      if (yy < 100) yy += 2000;
+      return new Date(yy, mm-1, dd);
+    }
+    const parsed = new Date(text);
+    if (isNaN(parsed)) return null;
+    return new Date(parsed.getFullYear(), parsed.getMonth(), parsed.getDate());
+  }
+
+  // ---------- Fast timestamp parsing ----------
+  // Columns are sniffed once for a fixed-position layout and then read digit by digit into
+  // wall-clock ms, without regexes or Date objects; parseMaybe/parseCalendarDate handle the
+  // values no layout fits. app.analytics.timestamps is the NumPy version.
+  const F_YEAR = 0, F_MONTH = 1, F_DAY = 2, F_HOUR = 3, F_MINUTE = 4, F_SECOND = 5, F_MILLI = 6, F_SEP = -1;
+  const layoutFields = new Int32Array(7);
+
+  // Digit run [i, j) of s: its end, or i when s[i] is not a digit.
+  function digitRunEnd(s, i){
+    while (i < s.length){ const c = s.charCodeAt(i); if (c < 48 || c > 57) break; i++; }
+    return i;
+  }
+
+  // Sniffs the fixed-position layout of a timestamp: YYYY-MM-DD or MM/DD/YYYY (one
+  // separator, "-" or "/"), optionally followed by " " or "T" and hh:mm[:ss[.sss]]. Month,
+  // day and hour may have one digit; with calendar=true the year may have two and no time
+  // is allowed. Returns an Int8Array of field kinds per character (F_SEP for separators),
+  // or null for anything else.
+  function sniffTimestampLayout(s, calendar=false){
+    const kinds = new Int8Array(s.length).fill(F_SEP);
+    const run = (i, kind, min, max)=>{
+      const j = digitRunEnd(s, i);
+      if (j - i < min || j - i > max) return -1;
+      kinds.fill(kind, i, j);
+      return j;
+    };
+    const a = digitRunEnd(s, 0);
+    let i;
+    const sep = s[a];
+    if (sep !== "-" && sep !== "/") return null;
+    if (a === 4 && !calendar){
+      kinds.fill(F_YEAR, 0, 4);
+      i = run(5, F_MONTH, 1, 2);
+      if (i < 0 || s[i] !== sep) return null;
+      i = run(i + 1, F_DAY, 1, 2);
+    } else if (a >= 1 && a <= 2){
+      kinds.fill(F_MONTH, 0, a);
+      i = run(a + 1, F_DAY, 1, 2);
+      if (i < 0 || s[i] !== sep) return null;
+      const y = digitRunEnd(s, i + 1);
+      if (!(y - i - 1 === 4 || (calendar && y - i - 1 === 2))) return null;
+      kinds.fill(F_YEAR, i + 1, y);
+      i = y;
+    } else return null;
+    if (i < 0) return null;
+    if (i === s.length) return kinds;
+    if (calendar || (s[i] !== " " && s[i] !== "T")) return null;
+    i = run(i + 1, F_HOUR, 1, 2);
+    if (i < 0 || s[i] !== ":") return null;
+    i = run(i + 1, F_MINUTE, 2, 2);
+    if (i >= 0 && i < s.length && s[i] === ":"){
+      i = run(i + 1, F_SECOND, 2, 2);
+      if (i >= 0 && i < s.length && s[i] === "."){
+        i = run(i + 1, F_MILLI, 3, 3);
+      }
+    }
+    return i === s.length ? kinds : null;
+  }
+
+  // Wall-clock ms (fields read as UTC) of s in layout, or NaN when s does not fit it. strict
+  // rejects out-of-range fields (the generic parser decides those); otherwise they roll
+  // over like new Date(y, m, d).
+  function readTimestampLayout(kinds, layout, s, strict){
+    const n = kinds.length;
+    if (s.length !== n) return NaN;
+    const f = layoutFields;
+    f.fill(0);
+    for (let i=0; i<n; i++){
+      const c = s.charCodeAt(i), k = kinds[i];
+      if (k === F_SEP){
+        if (c !== layout.charCodeAt(i)) return NaN;
+      } else {
+        const d = c - 48;
+        if (d < 0 || d > 9) return NaN;
+        f[k] = f[k] * 10 + d;
+      }
+    }
+    let year = f[F_YEAR];
+    if (year < 100){
+      if (strict) return NaN;
+      year += 2000;
+    }
+    // Like new Date(string): days up to 31 roll over, 24:00 is the next midnight.
+    if (strict && (f[F_MONTH] < 1 || f[F_MONTH] > 12 || f[F_DAY] < 1 || f[F_DAY] > 31 || f[F_MINUTE] > 59 || f[F_SECOND] > 59
+        || f[F_HOUR] > (f[F_MINUTE] || f[F_SECOND] || f[F_MILLI] ? 23 : 24))) return NaN;
+    return Date.UTC(year, f[F_MONTH] - 1, f[F_DAY], f[F_HOUR], f[F_MINUTE], f[F_SECOND], f[F_MILLI]);
+  }
+
+  // A column reader: keeps the layout of the last value it sniffed (a column's values nearly
+  // always share one) and sniffs again when a value does not fit. read() -> wall-clock ms or NaN.
+  function createTimestampReader(calendar=false){
+    let kinds = null, layout = "";
+    return function read(s){
+      if (kinds !== null){
+        const ms = readTimestampLayout(kinds, layout, s, !calendar);
+        if (ms === ms) return ms;
+      }
+      const sniffed = sniffTimestampLayout(s, calendar);
+      if (!sniffed) return NaN;
+      kinds = sniffed; layout = s;
+      return readTimestampLayout(kinds, layout, s, !calendar);
+    };
+  }
+
+  const START_TIMES = createTimestampReader(), END_TIMES = createTimestampReader(), CALENDAR_DATES = createTimestampReader(true);
+
+  // parseMaybe(value) as epoch ms (NaN when unparseable).
+  function parseTimestampMs(value, reader){
+    if (typeof value === "string"){
+      const wall = reader(value);
+      if (wall === wall) return naiveToEpochMs(wall);
+    }
+    const d = parseMaybe(value);
+    return d ? d.getTime() : NaN;
+  }
+
+  // parseCalendarDate(value) as wall-clock ms of that midnight (NaN when unparseable).
+  function parseCalendarDayMs(value, reader){
+    if (typeof value === "string"){
+      const wall = reader(value);
+      if (wall === wall) return wall;
+    }
+    const d = parseCalendarDate(value);
+    return d ? Date.UTC(d.getFullYear(), d.getMonth(), d.getDate()) : NaN;
+  }
+
+  function isHourlyRow(row){
+    if (!row) return false;
+    const dateVal = row.calendar_date ?? row.calendarDate ?? row.CalendarDate ?? row.date;
+    if (!dateVal) return false;
+    return HOUR_COLUMNS.some(col => Object.prototype.hasOwnProperty.call(row, col));
+  }
+
+  // Appends the merged hour runs of an hourly-grid row to out (a shift columns builder);
+  // returns false when the row is not in the hourly layout.
+  function expandHourlyRow(row, stats, out){
+    if (!isHourlyRow(row)) return false;
+    const emp = (row.employee_id ?? row.Employee ?? row.emp ?? "").toString().trim();
+    const dateRaw = row.calendar_date ?? row.calendarDate ?? row.CalendarDate ?? row.date ?? "";
+    const day = parseCalendarDayMs(dateRaw, CALENDAR_DATES);
+    const typ = getShiftTypeFromRow(row);
+    const costCenter = getCostCenterFromRow(row);
+    if (!emp || Number.isNaN(day)){
+      if (stats) stats.invalidRows = (stats.invalidRows || 0) + 1;
+      return true;
+    }
+    if (!typ){
+      if (stats) stats.missingShiftTime = (stats.missingShiftTime || 0) + 1;
+      return true;
+    }
+    if (!costCenter){
+      if (stats) stats.missingCostCenter = (stats.missingCostCenter || 0) + 1;
+      return true;
+    }
+    let curStart = NaN, curEnd = NaN;
+    for (const col of HOUR_COLUMNS){
+      if (!Object.prototype.hasOwnProperty.call(row, col)) continue;
+      const rawVal = row[col];
+      const val = typeof rawVal === "number" ? rawVal : parseFloat(rawVal);
+      if (!val || !isFinite(val) || val <= 0){
+        if (!Number.isNaN(curStart)){ out.add(row, emp, curStart, curEnd, typ, costCenter); curStart = NaN; }
+        continue;
+      }
+      const clamped = Math.min(Math.max(val, 0), 1);
+      const hourInt = parseInt(col, 10);
+      if (isNaN(hourInt)) continue;
+      const slotStart = naiveToEpochMs(day + hourInt * 36e5);
+      const slotEnd = slotStart + clamped * 36e5;
+      if (!Number.isNaN(curStart) && Math.abs(slotStart - curEnd) < 1){
+        curEnd = slotEnd;
+      } else {
+        if (!Number.isNaN(curStart)) out.add(row, emp, curStart, curEnd, typ, costCenter);
+        curStart = slotStart;
+        curEnd = slotEnd;
+      }
+    }
+    if (!Number.isNaN(curStart)) out.add(row, emp, curStart, curEnd, typ, costCenter);
+    return true;
+  }
+
+  // Incremental CSV tokenizer: push() text chunks in order, finish() at EOF. The first
+  // record is the header; onRow gets one {header: trimmed value} object per record.
+  // Whole lines without quotes or stray CRs are split natively; the rest (quoted fields,
+  // records cut by a chunk boundary) go through the character scanner.
+  function createCsvStreamParser(onRow){
+    let header = null, field = "", row = [], inQuotes = false, pendingQuote = false;
+    const emit = fields=>{
+      if (!header){
+        header = fields.map(h=> h.trim());
+        return;
+      }
+      const o = {};
+      for (let k=0; k<header.length; k++){
+        const v = fields[k];
+        o[header[k]] = v === undefined ? "" : (v.charCodeAt(0) <= 32 || v.charCodeAt(v.length - 1) <= 32) ? v.trim() : v;
+      }
+      onRow(o);
+    };
+    const endRecord = ()=>{
+      row.push(field);
+      emit(row);
+      row = []; field = "";
+    };
+    function push(text){
+      let i = 0;
+      const n = text.length;
+      if (pendingQuote){
+        // quote closed the previous chunk: '""' escape or end of quoted field
+        pendingQuote = false;
+        if (text[0] === '"'){ field += '"'; i = 1; } else inQuotes = false;
+      }
+      while (i < n){
+        if (!inQuotes && field === "" && row.length === 0){
+          const nl = text.indexOf("\n", i);
+          if (nl >= 0){
+            const end = text.charCodeAt(nl - 1) === 13 && nl > i ? nl - 1 : nl;
+            const line = text.slice(i, end);
+            if (line.indexOf('"') < 0 && line.indexOf("\r") < 0){
+              if (line !== "") emit(line.split(","));
+              i = nl + 1;
+              continue;
+            }
+          }
+        }
+        if (inQuotes){
+          const q = text.indexOf('"', i);
+          if (q < 0){ field += text.slice(i); return; }
+          field += text.slice(i, q);
+          if (q + 1 >= n){ pendingQuote = true; return; }
+          if (text[q+1] === '"'){ field += '"'; i = q + 2; } else { inQuotes = false; i = q + 1; }
+          continue;
+        }
+        let j = i;
+        while (j < n){
+          const c = text.charCodeAt(j);
+          if (c === 44 || c === 34 || c === 10 || c === 13) break;  // , " \n \r
+          j++;
+        }
+        if (j > i) field += text.slice(i, j);
+        if (j >= n) return;
+        const c = text[j];
+        if (c === '"') inQuotes = true;
+        else if (c === ','){ row.push(field); field = ""; }
+        else if (field !== "" || row.length > 0) endRecord();
+        i = j + 1;
+      }
+    }
+    function finish(){
+      pendingQuote = false; inQuotes = false;
+      if (field !== "" || row.length > 0) endRecord();
+    }
+    return {push, finish};
+  }
+
+  function parseCSVbasic(text){
+    const rows = [];
+    const parser = createCsvStreamParser(r=> rows.push(r));
+    parser.push(text);
+    parser.finish();
+    return rows;
+  }
+
+  // ---------- Transformations ----------
+  // Appends the segments for one source row to out, a createShiftColumnsBuilder() (unsorted).
+  function normalizeRow(r, stats, out){
+    if (expandHourlyRow(r, stats, out)) return;
+    const emp = (r.employee_id ?? r.Employee ?? r.emp ?? "").toString().trim();
+    const st = parseTimestampMs(r.start_datetime ?? r.start ?? r.start_time ?? r.Start ?? "", START_TIMES);
+    const en = parseTimestampMs(r.end_datetime ?? r.end ?? r.end_time ?? r.End ?? "", END_TIMES);
+    const typ = getShiftTypeFromRow(r);
+    const costCenter = getCostCenterFromRow(r);
+    if (!typ){
+      if (stats) stats.missingShiftTime = (stats.missingShiftTime || 0) + 1;
+      return;
+    }
+    if (!costCenter){
+      if (stats) stats.missingCostCenter = (stats.missingCostCenter || 0) + 1;
+      return;
+    }
+    if (!emp || Number.isNaN(st) || Number.isNaN(en)){
+      if (stats) stats.invalidRows = (stats.invalidRows || 0) + 1;
+      return;
+    }
+    out.add(r, emp, st, en < st ? addDays(new Date(en), 1).getTime() : en, typ, costCenter);
+  }
+
+  // Parsed CSV records -> shift store (see decodePayload), sorted by employee, start, end.
+  function normalizeRows(rows, stats=null){
+    const builder = createShiftColumnsBuilder(rows.length ? Object.keys(rows[0]).filter(k=> !KNOWN_COLUMNS.has(k)) : []);
+    for (const r of rows) normalizeRow(r, stats, builder);
+    const cols = builder.columns();
+    const {meta, buf} = packShiftColumns(cols, shiftColumnsOrder(cols));
+    meta.rows = rows.length;
+    if (stats) meta.stats = stats;
+    return decodePayload(meta, buf);
+  }
+
+  // Stage 1: rest gap before each shift (NaN for an employee's first) and the double-bubble
+  // flag, over the full history so the first in-range shift still gets prior context.
+  function computeRestAndFlags(store){
+    const {n, start, end, employee, shift_type, typeFlags, restGap, flags} = store;
+    const last = new Int32Array(store.dicts.employee.length).fill(-1);
+    for (let i=0; i<n; i++){
+      const e = employee[i], p = last[e];
+      if (p < 0){
+        restGap[i] = NaN;
+        flags[i] = 0;
+      } else {
+        const gap = hoursBetween(end[p], start[i]);
+        restGap[i] = gap;
+        flags[i] = (typeFlags[shift_type[p]] & TYPE_OVERTIME) && gap < params.restThreshold ? 1 : 0;
+      }
+      last[e] = i;
+    }
+  }
+
+  // Store indices ordered by (start, index): (start, index) pairs are packed into doubles,
+  // start in whole seconds when every start is one, and sorted natively. Fractional or too
+  // long spans fall back to a comparator sort.
+  function sortedByStart(start){
+    const n = start.length;
+    const out = new Int32Array(n);
+    let min = Infinity, max = -Infinity, unit = 1000;
+    for (let i=0; i<n; i++){
+      const s = start[i];
+      if (s < min) min = s;
+      if (s > max) max = s;
+      if (s % unit) unit = s % 1 ? 0 : 1;
+    }
+    const scale = 2 ** Math.ceil(Math.log2(n + 1));
+    if (!n || !unit || ((max - min) / unit + 1) * scale > 2 ** 53){
+      for (let i=0; i<n; i++) out[i] = i;
+      return out.sort((a,b)=> (start[a] - start[b]) || (a - b));
+    }
+    const keys = new Float64Array(n);
+    for (let i=0; i<n; i++) keys[i] = (start[i] - min) / unit * scale + i;
+    keys.sort();
+    for (let k=0; k<n; k++) out[k] = keys[k] % scale;
+    return out;
+  }
+
+  // Filter index, built once per store on the first date or cost center filter: store
+  // indices sorted by start (byStart/sortedStart), the same order split into per-cost-center
+  // posting lists (postings[offsets[c]..offsets[c+1]], starts in postingStart) and a
+  // day-of-week bit per shift.
+  function buildFilterIndex(store){
+    const {n, start, startDay, cost_center} = store;
+    const nCenters = store.dicts.cost_center.length;
+    const byStart = sortedByStart(start);
+    const offsets = new Int32Array(nCenters + 1);
+    for (let i=0; i<n; i++) offsets[cost_center[i] + 1]++;
+    for (let c=0; c<nCenters; c++) offsets[c + 1] += offsets[c];
+    const fill = offsets.slice(0, nCenters);
+    const sortedStart = new Float64Array(n), postings = new Int32Array(n), postingStart = new Float64Array(n);
+    for (let k=0; k<n; k++){
+      const i = byStart[k], p = fill[cost_center[i]]++;
+      sortedStart[k] = postingStart[p] = start[i];
+      postings[p] = i;
+    }
+    const dowBit = new Uint8Array(n);
+    for (let i=0; i<n; i++) dowBit[i] = 1 << dayOfWeek(startDay[i]);
+    return {byStart, sortedStart, offsets, postings, postingStart, dowBit};
+  }
+
+  // Stages 2-4: date, day-of-week and cost center filters; returns the store indices in view
+  // (ascending, i.e. store order). With a date range or cost centers set, the candidates are
+  // the [lo, hi] slice of each selected center's posting list (or of byStart), found by
+  // binary search; when they are few enough that sorting them back into store order beats a
+  // pass over the store, only they are visited.
+  function filterView(store){
+    const {dateStart, dateEnd, daysOfWeek: days, costCenters: centers} = params;
+    const lo = dateStart ? dateStart.getTime() : -Infinity;
+    const hi = dateEnd ? new Date(dateEnd.getFullYear(), dateEnd.getMonth(), dateEnd.getDate(), 23,59,59).getTime() : Infinity;
+    let dayMask = 127;
+    if (days && days.size > 0 && days.size !== DEFAULT_DAYS.length){
+      dayMask = 0;
+      for (const d of days) dayMask |= 1 << d;
+    }
+    const ccOk = centers && centers.size > 0 ? Uint8Array.from(store.dicts.cost_center, c=> c && centers.has(c) ? 1 : 0) : null;
+    const {n, start, startDay, cost_center} = store;
+    if (ccOk || lo > -Infinity || hi < Infinity){
+      const idx = store.filterIndex || (store.filterIndex = buildFilterIndex(store));
+      const slices = [];
+      let hits = 0;
+      const slice = (list, starts, from, to)=>{
+        const a = from + lowerBound(starts.subarray(from, to), lo);
+        const b = from + upperBound(starts.subarray(from, to), hi);
+        if (b > a){ slices.push(list, a, b); hits += b - a; }
+      };
+      if (ccOk){
+        for (let c=0; c<ccOk.length; c++) if (ccOk[c]) slice(idx.postings, idx.postingStart, idx.offsets[c], idx.offsets[c + 1]);
+      } else {
+        slice(idx.byStart, idx.sortedStart, 0, n);
+      }
+      if (hits * Math.log2(hits + 2) < n){
+        const out = new Int32Array(hits);
+        const dowBit = idx.dowBit;
+        let k = 0;
+        for (let s=0; s<slices.length; s+=3){
+          const list = slices[s];
+          for (let p=slices[s + 1], to=slices[s + 2]; p<to; p++){
+            const i = list[p];
+            if (dayMask & dowBit[i]) out[k++] = i;
+          }
+        }
+        return out.subarray(0, k).sort().slice();
+      }
+    }
+    const out = new Int32Array(n);
+    let k = 0;
+    for (let i=0; i<n; i++){
+      if (start[i] < lo || start[i] > hi) continue;
+      if (dayMask !== 127 && !(dayMask & (1 << dayOfWeek(startDay[i])))) continue;
+      if (ccOk && !ccOk[cost_center[i]]) continue;
+      out[k++] = i;
+    }
+    return k === n ? out : out.slice(0, k);
+  }
+
+  // ---------- Baselines ----------
+  // Each employee's shifts pre-ordered by start and by end minute of day, built once per
+  // store: a counting sort on the whole minute (1440 buckets), a stable pass by employee
+  // and an insertion pass for fractional minutes, which only tie within a bucket. The
+  // scheduled shifts get their own copy of both orders. A median is then the middle entry
+  // of the employee's list when all of it is in view, else a walk to the middle rank of
+  // the in-view entries, instead of a sort.
+  function buildBaselineIndex(store){
+    const {n, employee, shift_type, typeFlags, startMin, endMin} = store;
+    const nEmp = store.dicts.employee.length;
+    const offsets = new Int32Array(nEmp + 1), schedOffsets = new Int32Array(nEmp + 1);
+    for (let i=0; i<n; i++){
+      offsets[employee[i] + 1]++;
+      if (typeFlags[shift_type[i]] & TYPE_SCHEDULED) schedOffsets[employee[i] + 1]++;
+    }
+    for (let e=0; e<nEmp; e++){ offsets[e+1] += offsets[e]; schedOffsets[e+1] += schedOffsets[e]; }
+    const byMinute = (mins)=>{
+      const bucket = new Int32Array(1441);
+      for (let i=0; i<n; i++) bucket[Math.floor(mins[i]) + 1]++;
+      for (let m=0; m<1440; m++) bucket[m+1] += bucket[m];
+      const byMin = new Int32Array(n);
+      for (let i=0; i<n; i++) byMin[bucket[Math.floor(mins[i])]++] = i;
+      const fill = offsets.slice(0, nEmp), order = new Int32Array(n);
+      for (let k=0; k<n; k++){ const i = byMin[k]; order[fill[employee[i]]++] = i; }
+      for (let e=0; e<nEmp; e++){
+        for (let k=offsets[e]+1; k<offsets[e+1]; k++){
+          const i = order[k], v = mins[i];
+          let j = k - 1;
+          while (j >= offsets[e] && mins[order[j]] > v){ order[j+1] = order[j]; j--; }
+          order[j+1] = i;
+        }
+      }
+      const sched = new Int32Array(schedOffsets[nEmp]);
+      let m = 0;
+      for (let k=0; k<n; k++) if (typeFlags[shift_type[order[k]]] & TYPE_SCHEDULED) sched[m++] = order[k];
+      return {all: order, sched};
+    };
+    return {offsets, schedOffsets, start: byMinute(startMin), end: byMinute(endMin), stamp: new Uint32Array(n), epoch: 0};
+  }
+
+  // Median of mins over order[lo, hi) (ascending) restricted to the c entries stamped
+  // epoch; the mean of the two middle values for even c, as a sorted-array median.
+  function stampedMedian(order, lo, hi, mins, stamp, epoch, c){
+    const a = (c - 1) >> 1, b = c >> 1;
+    if (c === hi - lo) return (mins[order[lo + a]] + mins[order[lo + b]]) / 2;
+    let rank = 0, va = NaN;
+    for (let k=lo; k<hi; k++){
+      const i = order[k];
+      if (stamp[i] !== epoch) continue;
+      if (rank === a) va = mins[i];
+      if (rank === b) return (va + mins[i]) / 2;
+      rank++;
+    }
+    return NaN;
+  }
+
+  // Stage 5: median start/end minute per employee code (NaN when not in view). In
+  // "scheduled" mode only scheduled shifts count, unless an employee has none in view.
+  // prev (the last result for this store) limits the work to employees whose shifts
+  // in view changed.
+  function perEmployeeBaseline(store, view, prev=null){
+    const nEmp = store.dicts.employee.length;
+    const {employee, shift_type, typeFlags, startMin, endMin} = store;
+    const idx = store.baselineIndex || (store.baselineIndex = buildBaselineIndex(store));
+    const mode = params.baselineMode;
+    const stamp = idx.stamp, epoch = ++idx.epoch;
+    // Stamps from the previous call are still in place only if it was the last one.
+    const incremental = !!(prev && prev.epoch === epoch - 1 && prev.mode === mode);
+    const inView = new Int32Array(nEmp), schedInView = new Int32Array(nEmp);
+    const dirty = incremental ? new Uint8Array(nEmp) : null;
+    for (let k=0; k<view.length; k++){
+      const i = view[k], e = employee[i];
+      inView[e]++;
+      if (typeFlags[shift_type[i]] & TYPE_SCHEDULED) schedInView[e]++;
+      if (incremental && stamp[i] !== epoch - 1) dirty[e] = 1;
+      stamp[i] = epoch;
+    }
+    const start = incremental ? prev.start.slice() : new Float64Array(nEmp).fill(NaN);
+    const end = incremental ? prev.end.slice() : new Float64Array(nEmp).fill(NaN);
+    const {offsets, schedOffsets} = idx;
+    for (let e=0; e<nEmp; e++){
+      if (incremental && !dirty[e] && inView[e] === prev.inView[e]) continue;
+      if (!inView[e]){ start[e] = end[e] = NaN; continue; }
+      const sched = mode === "scheduled" && schedInView[e] > 0;
+      const [lo, hi, c, list] = sched ? [schedOffsets[e], schedOffsets[e+1], schedInView[e], "sched"] : [offsets[e], offsets[e+1], inView[e], "all"];
+      start[e] = stampedMedian(idx.start[list], lo, hi, startMin, stamp, epoch, c);
+      end[e] = stampedMedian(idx.end[list], lo, hi, endMin, stamp, epoch, c);
+    }
+    return {start, end, inView, epoch, mode};
+  }
+
+  // Stage 6: deviation from the employee's baseline, for the shifts in view.
+  function computeDeviations(store, view, baseline){
+    const {employee, startMin, endMin, devHours, deviation} = store;
+    for (let k=0; k<view.length; k++){
+      const i = view[k];
+      const bs = baseline.start[employee[i]], be = baseline.end[employee[i]];
+      if (Number.isNaN(bs) || Number.isNaN(be)){
+        devHours[i] = 0;
+        deviation[i] = 0;
+      } else {
+        const dev = Math.max(Math.abs(startMin[i] - bs) / 60, Math.abs(endMin[i] - be) / 60);
+        devHours[i] = dev;
+        deviation[i] = dev > params.devThreshold ? 1 : 0;
+      }
+    }
+  }
+
+  // Employee name -> code for a store (built once per store).
+  function storeEmployeeCodes(store){
+    if (!store.employeeCodes) store.employeeCodes = new Map(store.dicts.employee.map((e, c)=> [e, c]));
+    return store.employeeCodes;
+  }
+
+  // Mask over employee codes for a list of names.
+  function employeeMask(store, names){
+    const codes = storeEmployeeCodes(store);
+    const mask = new Uint8Array(store.dicts.employee.length);
+    for (const name of names){
+      const c = codes.get(name);
+      if (c !== undefined) mask[c] = 1;
+    }
+    return mask;
+  }
+
+  // ---------- Calendar cube ----------
+  // Day x employee bitmaps over the view: bit e of worked[(day - firstDay) * words + (e >>> 5)]
+  // is set when employee e has a shift starting that (local) day, and of flagged when one
+  // of them is a double bubble. Built once per recompute; the calendar then only counts
+  // bits for the selected employees.
+  function buildCalendarCube(store, view){
+    const {employee, startDay, flags} = store;
+    const words = (store.dicts.employee.length + 31) >>> 5;
+    let firstDay = Infinity, lastDay = -Infinity;
+    for (let k=0; k<view.length; k++){
+      const d = startDay[view[k]];
+      if (d < firstDay) firstDay = d;
+      if (d > lastDay) lastDay = d;
+    }
+    const days = view.length ? lastDay - firstDay + 1 : 0;
+    const worked = new Uint32Array(days * words), flagged = new Uint32Array(days * words);
+    for (let k=0; k<view.length; k++){
+      const i = view[k], e = employee[i];
+      const w = (startDay[i] - firstDay) * words + (e >>> 5), bit = 1 << (e & 31);
+      worked[w] |= bit;
+      if (flags[i]) flagged[w] |= bit;
+    }
+    return {firstDay: days ? firstDay : 0, days, words, worked, flagged};
+  }
+
+  const popcount32 = (x) => {
+    x -= (x >>> 1) & 0x55555555;
+    x = (x & 0x33333333) + ((x >>> 2) & 0x33333333);
+    return Math.imul((x + (x >>> 4)) & 0x0f0f0f0f, 0x01010101) >>> 24;
+  };
+
+  // Employee mask (employeeMask()) -> cube bitmap words, as [word index, bits] pairs.
+  function calendarSelection(cube, mask){
+    const bits = new Uint32Array(cube.words);
+    for (let e=0; e<mask.length; e++) if (mask[e]) bits[e >>> 5] |= 1 << (e & 31);
+    const sel = [];
+    for (let w=0; w<bits.length; w++) if (bits[w]) sel.push(w, bits[w]);
+    return sel;
+  }
+
+  // Per day from cube.firstDay: selected employees with a shift, and with a double bubble.
+  function calendarCounts(cube, sel){
+    const {days, words, worked, flagged} = cube;
+    const shifts = new Int32Array(days), doubles = new Int32Array(days);
+    for (let d=0; d<days; d++){
+      const row = d * words;
+      let a = 0, b = 0;
+      for (let s=0; s<sel.length; s+=2){
+        const w = row + sel[s], m = sel[s + 1];
+        if (worked[w] & m){
+          a += popcount32(worked[w] & m);
+          b += popcount32(flagged[w] & m);
+        }
+      }
+      shifts[d] = a;
+      doubles[d] = b;
+    }
+    return {firstDay: cube.firstDay, shifts, doubles};
+  }
+
+  // Months (UTC fields of the day numbers) holding at least one day with a shift.
+  function calendarMonths(counts){
+    const months = [];
+    let last = null;
+    for (let d=0; d<counts.shifts.length; d++){
+      if (!counts.shifts[d]) continue;
+      const date = new Date((counts.firstDay + d) * 864e5);
+      const year = date.getUTCFullYear(), month = date.getUTCMonth();
+      if (!last || last.year !== year || last.month !== month) months.push(last = {year, month});
+    }
+    return months;
+  }
+
+  // Store employee codes of the selected employees with a shift on day (a local day number).
+  function calendarDayEmployees(cube, sel, day){
+    const out = [];
+    const d = day - cube.firstDay;
+    if (d < 0 || d >= cube.days) return out;
+    for (let s=0; s<sel.length; s+=2){
+      let bits = cube.worked[d * cube.words + sel[s]] & sel[s + 1];
+      while (bits){
+        const low = bits & -bits;
+        out.push(sel[s] * 32 + 31 - Math.clz32(low));
+        bits ^= low;
+      }
+    }
+    return out;
+  }
+
+  // One shift as a plain object with its pipeline results. Only built for what is on
+  // screen (table rows, overlay rows, tooltips, calendar), never for the whole store.
+  function shiftRecord(store, i){
+    const gap = store.restGap[i];
+    const names = store.dicts.employee;
+    return {
+      index: i,
+      employee_id: names[store.employee[i]],
+      start: new Date(store.start[i]),
+      end: new Date(store.end[i]),
+      shift_type: store.dicts.shift_type[store.shift_type[i]],
+      cost_center: store.dicts.cost_center[store.cost_center[i]],
+      rest_gap_h: Number.isNaN(gap) ? null : gap,
+      double_bubble: store.flags[i] === 1,
+      dev_hours: store.devHours[i],
+      deviation: store.deviation[i] === 1,
+      altCount: store.altCount[i],
+      alternates: (store.altSample[i] || []).map(c=> names[c]),
+      estSavings: store.estSavings[i]
+    };
+  }
+
+  function splitCrossMidnightForViz(arr){
+    const segs = [];
+    for (const s of arr){
+      const startMin = minutesOfDay(s.start);
+      const endMin   = minutesOfDay(s.end);
+      const crosses  = s.end.toDateString() !== s.start.toDateString();
+      if (crosses){
+        segs.push({...s, vstart: startMin/60, vend: 24});
+        segs.push({...s, vstart: 0, vend: endMin/60});
+      } else {
+        segs.push({...s, vstart: startMin/60, vend: endMin/60});
+      }
+    }
+    return segs.filter(x=> x.vend > x.vstart);
+  }
+
+  // ---------- Overlay model ----------
+  // Stacked 0-24h rows in logical units; the canvas view and the SVG export both
+  // scale this box to their own width.
+  const OVERLAY = {W: 1000, padL: 220, padR: 30, padT: 18, padB: 30, rowH: 90, gap: 10, grid: "#2a2f3a"};
+  const overlayX = (h) => OVERLAY.padL + (h/24) * (OVERLAY.W - OVERLAY.padL - OVERLAY.padR);
+  const overlayRowTop = (i) => OVERLAY.padT + i*(OVERLAY.rowH + OVERLAY.gap);
+
+  // empIds: employee names to draw; view: store indices in view (runPipeline().view).
+  function buildOverlayModel(empIds, store, view, sortAsc=true){
+    const list = empIds.slice().sort((a,b)=> sortAsc ? a.localeCompare(b) : b.localeCompare(a));
+    const byRow = list.map(()=> []);
+    if (list.length){
+      const codes = storeEmployeeCodes(store);
+      const rowOf = new Int32Array(store.dicts.employee.length).fill(-1);
+      list.forEach((e, r)=>{ if (codes.has(e)) rowOf[codes.get(e)] = r; });
+      for (let k=0; k<view.length; k++){
+        const r = rowOf[store.employee[view[k]]];
+        if (r >= 0) byRow[r].push(shiftRecord(store, view[k]));
+      }
+    }
+    const rows = list.map((e, r)=> ({employee_id: e, segs: splitCrossMidnightForViz(byRow[r])}));
+    const N = rows.length;
+    const H = OVERLAY.padT + (N ? N*OVERLAY.rowH + (N-1)*OVERLAY.gap : 120) + OVERLAY.padB;
+    return {rows, H};
+  }
+
+  // Rows [first, last) that intersect logical y range [y0, y1).
+  function overlayRowRange(model, y0, y1){
+    const pitch = OVERLAY.rowH + OVERLAY.gap;
+    const first = Math.max(0, Math.floor((y0 - OVERLAY.padT) / pitch));
+    const last = Math.min(model.rows.length, Math.ceil((y1 - OVERLAY.padT) / pitch));
+    return [first, Math.max(first, last)];
+  }
+
+  function overlaySegmentRect(s, i){
+    const x0 = overlayX(s.vstart);
+    return {x: x0, y: overlayRowTop(i) + 8, w: Math.max(1, overlayX(s.vend) - x0), h: OVERLAY.rowH - 16};
+  }
+
+  // Segment under logical point (x, y); later segments are drawn on top, so they win.
+  function overlayHitTest(model, x, y){
+    const i = Math.floor((y - OVERLAY.padT) / (OVERLAY.rowH + OVERLAY.gap));
+    if (i < 0 || i >= model.rows.length) return null;
+    const segs = model.rows[i].segs;
+    for (let k=segs.length-1; k>=0; k--){
+      const r = overlaySegmentRect(segs[k], i);
+      if (x >= r.x && x <= r.x + r.w && y >= r.y && y <= r.y + r.h) return segs[k];
+    }
+    return null;
+  }
+
+  function overlaySegmentStyle(s){
+    const callin = isCallInType(s.shift_type);
+    return {
+      hatch: !!s.double_bubble,
+      stroke: s.deviation ? "#ffb648" : (callin ? "#a0a4ae" : null),
+      strokeWidth: (callin || s.deviation) ? 1.5 : 0,
+      dash: callin ? [4, 4] : []
+    };
+  }
+
+  const escapeXml = (v) => String(v).replace(/[&<>"]/g, c=> ({"&":"&amp;","<":"&lt;",">":"&gt;",'"':"&quot;"}[c]));
+
+  // Whole overlay (every row) as standalone SVG markup, for export.
+  function overlaySvgMarkup(model){
+    const {W, padL, padR, padT, padB, rowH, gap, grid} = OVERLAY;
+    const H = model.H;
+    const out = [`<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 ${W} ${H}" width="${W}" height="${H}">`,
+      `<defs><pattern id="hatch" patternUnits="userSpaceOnUse" width="8" height="8" patternTransform="rotate(45)">`,
+      `<rect width="8" height="8" fill="rgba(255,93,93,0.18)"/><line x1="0" y1="0" x2="0" y2="8" stroke="rgba(255,93,93,0.5)" stroke-width="2"/></pattern></defs>`];
+    for (let h=0; h<=24; h+=2){
+      const X = overlayX(h);
+      out.push(`<line x1="${X}" x2="${X}" y1="${padT}" y2="${H-padB}" stroke="${grid}" stroke-width="1" opacity="${h%6===0 ? 0.7 : 0.35}"/>`);
+      out.push(`<text x="${X}" y="${H-8}" text-anchor="middle" fill="#a0a4ae" font-size="12">${h}</text>`);
+    }
+    model.rows.forEach((row, i)=>{
+      const top = overlayRowTop(i);
+      out.push(`<text x="${padL-12}" y="${top + rowH/2}" text-anchor="end" dominant-baseline="middle" fill="#e7e9ee" font-size="13">${escapeXml(row.employee_id)}</text>`);
+      out.push(`<rect x="${padL}" y="${top+2}" width="${W-padL-padR}" height="${rowH-4}" fill="rgba(255,255,255,0.02)"/>`);
+      if (i > 0) out.push(`<line x1="${padL}" x2="${W-padR}" y1="${top-gap/2}" y2="${top-gap/2}" stroke="${grid}" stroke-width="1" opacity="0.6"/>`);
+      for (const s of row.segs){
+        const r = overlaySegmentRect(s, i), st = overlaySegmentStyle(s);
+        out.push(`<rect x="${r.x}" y="${r.y}" width="${r.w}" height="${r.h}" fill="${st.hatch ? "url(#hatch)" : "rgba(100,180,255,0.32)"}"`
+          + ` stroke="${st.stroke || "rgba(0,0,0,0)"}" stroke-width="${st.strokeWidth}"${st.dash.length ? ` stroke-dasharray="${st.dash.join(" ")}"` : ""}/>`);
+      }
+    });
+    out.push("</svg>");
+    return out.join("\n");
+  }
+
+  const ALT_SAMPLE = 6;
+
+  function lowerBound(sorted, value){
+    let lo = 0, hi = sorted.length;
+    while (lo < hi){
+      const mid = (lo + hi) >>> 1;
+      if (sorted[mid] < value) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  function upperBound(sorted, value){
+    let lo = 0, hi = sorted.length;
+    while (lo < hi){
+      const mid = (lo + hi) >>> 1;
+      if (sorted[mid] <= value) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+  }
+
+  // Shifts in view sorted by start (then end) in typed arrays. A flagged shift can only be
+  // blocked by shifts starting in [start - rest - maxDur, end) (up to start itself for a
+  // zero-length one), so each query is two binary searches plus a scan of that window
+  // instead of every employee's history. nextStart (the same employee's following shift)
+  // marks the last shift ending by t: a zero-length shift starting at t counts (0 h rest).
+  // Employees get index codes in view order; an employee's availability value is the
+  // one on the raw row of their first shift in view.
+  function buildAvailabilityIndex(store, view, availabilityCol){
+    const n = view.length;
+    const raw = availabilityCol ? store.raw.columns.find(x=> x.name === availabilityCol) || null : null;
+    const local = new Int32Array(store.dicts.employee.length).fill(-1);
+    const empCodes = [];
+    const sampleVals = [];
+    const code = new Int32Array(n);
+    for (let k=0; k<n; k++){
+      const i = view[k], e = store.employee[i];
+      let c = local[e];
+      if (c < 0){
+        c = local[e] = empCodes.length;
+        empCodes.push(e);
+        sampleVals.push(raw ? raw.values[raw.codes[store.row[i]]] : "");
+      }
+      code[k] = c;
+    }
+    const st = new Float64Array(n), en = new Float64Array(n);
+    for (let k=0; k<n; k++){ st[k] = store.start[view[k]]; en[k] = store.end[view[k]]; }
+    const order = new Uint32Array(n);
+    for (let i=0; i<n; i++) order[i] = i;
+    order.sort((a,b)=> (st[a] - st[b]) || (en[a] - en[b]) || (a - b));
+    const starts = new Float64Array(n), ends = new Float64Array(n), nextStart = new Float64Array(n);
+    const emp = new Int32Array(n);
+    let maxDur = 0;
+    for (let k=0; k<n; k++){
+      const i = order[k];
+      starts[k] = st[i];
+      ends[k] = en[i];
+      emp[k] = code[i];
+      nextStart[k] = (i+1 < n && code[i+1] === code[i]) ? st[i+1] : Infinity;
+      maxDur = Math.max(maxDur, en[i] - st[i]);
+    }
+    // Employees per availability value, in employee order ("" matches everyone).
+    const groups = new Map();
+    sampleVals.forEach((v, c)=>{
+      if (!groups.has(v)) groups.set(v, []);
+      groups.get(v).push(c);
+    });
+    return {starts, ends, nextStart, emp, maxDur, empCodes, local, sampleVals, groups, raw, mark: new Uint32Array(empCodes.length), epoch: 0};
+  }
+
+  // Alternates for store shift i: {count, sample} with sample the store employee codes of
+  // the first few free employees (in index order), for the table tooltip.
+  function findAlternates(store, i, idx){
+    const start = store.start[i], end = store.end[i];
+    const v = idx.raw ? idx.raw.values[idx.raw.codes[store.row[i]]] : "";
+    const compatible = (c)=> !v || !idx.sampleVals[c] || idx.sampleVals[c] === v;
+    const stamp = ++idx.epoch;
+    const mark = idx.mark;
+    let blocked = 0;
+    const lo = lowerBound(idx.starts, start - params.restThreshold*36e5 - idx.maxDur - 1);
+    const hi = lowerBound(idx.starts, Math.max(end, start + 1));
+    for (let k=lo; k<hi; k++){
+      const c = idx.emp[k];
+      if (mark[c] === stamp) continue;
+      const s = idx.starts[k], e = idx.ends[k];
+      const busy = e > start && s < end;
+      const shortRest = e <= start && idx.nextStart[k] >= start && hoursBetween(e, start) < params.restThreshold;
+      if (busy || shortRest){
+        mark[c] = stamp;
+        if (compatible(c)) blocked++;
+      }
+    }
+    const self = idx.local[store.employee[i]];
+    const pool = v ? [idx.groups.get(v) || [], idx.groups.get("") || []] : null;
+    const poolSize = pool ? pool[0].length + pool[1].length : idx.empCodes.length;
+    const selfFree = self >= 0 && compatible(self) && mark[self] !== stamp;
+    const count = poolSize - blocked - (selfFree ? 1 : 0);
+    const sample = [];
+    const take = (c)=>{
+      if (c !== self && mark[c] !== stamp) sample.push(idx.empCodes[c]);
+    };
+    if (!pool){
+      for (let c=0; c<idx.empCodes.length && sample.length<ALT_SAMPLE; c++) take(c);
+    } else {
+      const [a, b] = pool;
+      let p = 0, q = 0;
+      while ((p < a.length || q < b.length) && sample.length < ALT_SAMPLE){
+        if (q >= b.length || (p < a.length && a[p] < b[q])) take(a[p++]); else take(b[q++]);
+      }
+    }
+    return {count, sample};
+  }
+
+  // ---------- Shift store ----------
+  // Payload times may be wall-clock ms (UTC fields carry local time); rebuild local Dates.
+  function naiveMsToLocalDate(ms){
+    const u = new Date(ms);
+    const d = new Date(ms + u.getTimezoneOffset()*6e4);
+    if (d.getHours() === u.getUTCHours() && d.getMinutes() === u.getUTCMinutes()) return d;
+    return new Date(u.getUTCFullYear(), u.getUTCMonth(), u.getUTCDate(), u.getUTCHours(), u.getUTCMinutes(), u.getUTCSeconds());
+  }
+
+  // Wall-clock ms -> epoch ms, with the (wall-clock - epoch) difference cached per quarter hour.
+  const naiveOffsetMs = new Map();
+  function naiveToEpochMs(ms){
+    const q = Math.floor(ms / 9e5);
+    let off = naiveOffsetMs.get(q);
+    if (off === undefined){ off = q * 9e5 - naiveMsToLocalDate(q * 9e5).getTime(); naiveOffsetMs.set(q, off); }
+    return ms - off;
+  }
+
+  function decodeBase64(text){
+    const bin = atob(text);
+    const bytes = new Uint8Array(bin.length);
+    for (let i=0; i<bin.length; i++) bytes[i] = bin.charCodeAt(i);
+    return bytes.buffer;
+  }
+
+  // Payload (build_web.py --data, packShiftColumns) -> shift store. The store keeps one
+  // entry per shift in columns: start/end epoch ms, employee/shift_type/cost_center codes
+  // into dicts, and row, an index into the raw table, which holds each source row's
+  // optional columns once (dictionary-coded) for the availability filter. Local
+  // minute-of-day and day columns are derived once here; the pipeline stages fill the
+  // rest of the columns in place. Code columns are views on buf.
+  function decodePayload(meta, buf){
+    const ctors = {Float64Array, Int32Array, Uint8Array};
+    const cols = {};
+    for (const c of meta.columns) cols[c.name] = new ctors[c.dtype](buf, c.offset, c.length);
+    return shiftStoreFromColumns(meta, cols);
+  }
+
+  function shiftStoreFromColumns(meta, cols){
+    const n = meta.shifts;
+    const start = meta.clock === "epoch" ? cols.start : cols.start.map(naiveToEpochMs);
+    const end = meta.clock === "epoch" ? cols.end : cols.end.map(naiveToEpochMs);
+    const startMin = new Float64Array(n), endMin = new Float64Array(n), startDay = new Int32Array(n);
+    for (let i=0; i<n; i++){
+      startMin[i] = localMinutesOfDay(start[i]);
+      endMin[i] = localMinutesOfDay(end[i]);
+      startDay[i] = localDayNumber(start[i]);
+    }
+    const extraNames = Object.keys(meta.extras || {});
+    return Object.assign(newPipelineCache(), {
+      n, start, end, employee: cols.employee, shift_type: cols.shift_type, cost_center: cols.cost_center, row: cols.row,
+      raw: {columns: extraNames.map(name=> ({name, codes: cols["extra:"+name], values: meta.extras[name]}))},
+      dicts: meta.dicts, typeFlags: shiftTypeFlags(meta.dicts.shift_type),
+      startMin, endMin, startDay,
+      restGap: cols.rest_gap_h, flags: cols.double_bubble,
+      devHours: new Float64Array(n), deviation: new Uint8Array(n),
+      altCount: new Int32Array(n), altSample: new Array(n), estSavings: new Float64Array(n),
+      rows: meta.rows, stats: {...meta.stats}, optionalCols: extraNames,
+      restThreshold: meta.restThreshold, baselineMode: meta.baselineMode,
+      // The store doubles as its pipeline cache, seeded with the build-time stages.
+      flagsFor: meta.restThreshold,
+      baseline: {start: cols.baseline_start_min, end: cols.baseline_end_min},
+      baselineKey: meta.baselineMode == null ? null : "all|" + meta.baselineMode
+    });
+  }
+
+
+  // ---------- Arrow IPC payload ----------
+  // Reader for the Arrow IPC stream (or file) app.analytics.arrow_io writes: one schema,
+  // one dictionary batch per dictionary-encoded column, one uncompressed record batch of
+  // flat, null-free columns. Only the flatbuffer fields that layout uses are read; column
+  // data stays in buf as typed-array views.
+  const ARROW_HEADER = {SCHEMA: 1, DICTIONARY_BATCH: 2, RECORD_BATCH: 3};
+  const ARROW_TYPE = {INT: 2, FLOAT: 3, UTF8: 5};
+
+  function fbTable(view, pos){
+    const vt = pos - view.getInt32(pos, true);
+    const vtLen = view.getUint16(vt, true);
+    const at = (i)=>{ const o = 4 + 2*i; const off = o < vtLen ? view.getUint16(vt + o, true) : 0; return off ? pos + off : 0; };
+    const ref = (p)=> p + view.getUint32(p, true);
+    const vector = (i)=>{
+      const p = at(i);
+      if (!p) return {length: 0, pos: 0};
+      const v = ref(p);
+      return {length: view.getUint32(v, true), pos: v + 4};
+    };
+    return {
+      u8: (i, d=0)=>{ const p = at(i); return p ? view.getUint8(p) : d; },
+      i16: (i, d=0)=>{ const p = at(i); return p ? view.getInt16(p, true) : d; },
+      i32: (i, d=0)=>{ const p = at(i); return p ? view.getInt32(p, true) : d; },
+      i64: (i, d=0)=>{ const p = at(i); return p ? readInt64(view, p) : d; },
+      table: (i)=>{ const p = at(i); return p ? fbTable(view, ref(p)) : null; },
+      str: (i)=>{
+        const p = at(i);
+        if (!p) return "";
+        const s = ref(p);
+        return new TextDecoder().decode(new Uint8Array(view.buffer, view.byteOffset + s + 4, view.getUint32(s, true)));
+      },
+      tables: (i)=>{
+        const v = vector(i);
+        return Array.from({length: v.length}, (_, k)=> fbTable(view, ref(v.pos + 4*k)));
+      },
+      // Vector of 16-byte structs of two int64s (FieldNode, Buffer).
+      pairs: (i)=>{
+        const v = vector(i);
+        return Array.from({length: v.length}, (_, k)=> [readInt64(view, v.pos + 16*k), readInt64(view, v.pos + 16*k + 8)]);
+      }
+    };
+  }
+
+  function readInt64(view, p){
+    return view.getUint32(p, true) + view.getInt32(p + 4, true) * 4294967296;
+  }
+
+  function arrowColumnType(field){
+    const dict = field.table(4);
+    const type = dict ? dict.table(1) : field.table(3);
+    const typeId = dict ? ARROW_TYPE.INT : field.u8(2);
+    if (typeId === ARROW_TYPE.FLOAT){
+      if (type.i16(0) !== 2) throw new Error("Arrow payload: only float64 columns are supported");
+      return Float64Array;
+    }
+    if (typeId !== ARROW_TYPE.INT) throw new Error("Arrow payload: unsupported column type " + typeId);
+    const bits = type ? type.i32(0) : 32, signed = type ? type.u8(1) === 1 : true;
+    const ctor = {8: [Uint8Array, Int8Array], 16: [Uint16Array, Int16Array], 32: [Uint32Array, Int32Array]}[bits];
+    if (!ctor) throw new Error("Arrow payload: unsupported integer width " + bits);
+    return ctor[signed ? 1 : 0];
+  }
+
+  function arrowNodes(batch){
+    const nodes = batch.pairs(1);
+    if (batch.table(3)) throw new Error("Arrow payload: compressed batches are not supported");
+    if (nodes.some(([, nulls])=> nulls)) throw new Error("Arrow payload: null values are not supported");
+    return {nodes, buffers: batch.pairs(2)};
+  }
+
+  function arrowStrings(buf, body, batch){
+    const {nodes, buffers} = arrowNodes(batch);
+    const [[length]] = nodes;
+    const [, [offPos], [dataPos, dataLen]] = buffers;
+    const offsets = new Int32Array(buf, body + offPos, length + 1);
+    const bytes = new Uint8Array(buf, body + dataPos, dataLen);
+    const dec = new TextDecoder();
+    return Array.from({length}, (_, k)=> dec.decode(bytes.subarray(offsets[k], offsets[k+1])));
+  }
+
+  // Arrow IPC payload (app.analytics.arrow_io.build_arrow_payload) -> shift store.
+  function decodeArrowPayload(buf){
+    const view = new DataView(buf);
+    let pos = new TextDecoder().decode(new Uint8Array(buf, 0, Math.min(6, buf.byteLength))) === "ARROW1" ? 8 : 0;
+    let fields = null, meta = null, batch = null;
+    const dictionaries = new Map();
+    while (pos + 4 <= buf.byteLength){
+      let len = view.getInt32(pos, true);
+      pos += 4;
+      if (len === -1){ len = view.getInt32(pos, true); pos += 4; }
+      if (len <= 0) break;
+      const msg = fbTable(view, pos + view.getUint32(pos, true));
+      const header = msg.table(2), body = pos + len;
+      const kind = msg.u8(1);
+      if (kind === ARROW_HEADER.SCHEMA){
+        fields = header.tables(1);
+        for (const kv of header.tables(2)) if (kv.str(0) === "double_bubble") meta = JSON.parse(kv.str(1));
+      } else if (kind === ARROW_HEADER.DICTIONARY_BATCH){
+        if (header.u8(2)) throw new Error("Arrow payload: delta dictionaries are not supported");
+        dictionaries.set(header.i64(0), arrowStrings(buf, body, header.table(1)));
+      } else if (kind === ARROW_HEADER.RECORD_BATCH){
+        if (batch) throw new Error("Arrow payload: expected a single record batch");
+        batch = {header, body};
+      }
+      pos = body + msg.i64(3);
+    }
+    if (!fields || !batch) throw new Error("Arrow payload: missing schema or record batch");
+    if (!meta) throw new Error("Not a double-bubble Arrow payload (no double_bubble schema metadata)");
+    const {nodes, buffers} = arrowNodes(batch.header);
+    const cols = {};
+    const dicts = {}, extras = {};
+    fields.forEach((field, k)=>{
+      const name = field.str(0), ctor = arrowColumnType(field);
+      const [dataPos] = buffers[2*k + 1];
+      cols[name] = new ctor(buf, batch.body + dataPos, nodes[k][0]);
+      const dict = field.table(4);
+      if (!dict) return;
+      const values = dictionaries.get(dict.i64(0));
+      if (name.startsWith("extra:")) extras[name.slice(6)] = values; else dicts[name] = values;
+    });
+    const nanOrValue = (v)=> v == null ? NaN : v;
+    cols.baseline_start_min = Float64Array.from(meta.baseline.start, nanOrValue);
+    cols.baseline_end_min = Float64Array.from(meta.baseline.end, nanOrValue);
+    return shiftStoreFromColumns({...meta, dicts, extras}, cols);
+  }
+
+  // Uploaded/fetched Arrow payloads are recognized by extension or media type.
+  const isArrowPayload = (name, type="") => /\.arrows?$/i.test(name || "") || /vnd\.apache\.arrow/i.test(type || "");
+
+  // ---------- Pipeline ----------
+  // Memo for one shift store. Each stage keeps its last output and the key of the inputs
+  // it was computed from; a stage reruns only when its key changes, which also
+  // invalidates the stages below it. Stages write into the store's columns, so every
+  // entry holds a single key (the last one computed).
+  function newPipelineCache(){
+    return {
+      flagsFor: null,                       // rest threshold the restGap/flags columns reflect
+      viewSig: null, viewKey: null, view: null,
+      baselineKey: null, baseline: null,
+      devKey: null,
+      indexKey: null, index: null,
+      flaggedKey: null, flagged: null,
+      alternatesKey: null
+    };
+  }
+
+  // Clears every stage whose output lives in the store columns (they were written elsewhere).
+  function invalidatePipelineCache(cache){
+    cache.flagsFor = null;
+    cache.devKey = null;
+    cache.flaggedKey = null;
+    cache.alternatesKey = null;
+  }
+
+  const viewSignature = ()=> [
+    params.dateStart ? params.dateStart.getTime() : "", params.dateEnd ? params.dateEnd.getTime() : "",
+    Array.from(params.daysOfWeek || []).sort().join(","), Array.from(params.costCenters || []).sort().join("\u0001")
+  ].join("|");
+
+  // store: normalizeRows() / decodePayload() result; cache: newPipelineCache() or the store.
+  // Stages 1-6; returns the store indices in view, with flags and deviations set.
+  function prepareView(store, cache=newPipelineCache()){
+    // 1) Rest + flags
+    if (cache.flagsFor !== params.restThreshold){
+      computeRestAndFlags(store);
+      cache.flagsFor = params.restThreshold;
+      cache.flaggedKey = cache.alternatesKey = null;
+    }
+    // 2-4) Date, day-of-week and cost center filters (view)
+    const sig = viewSignature();
+    if (cache.viewSig !== sig){
+      const view = filterView(store);
+      cache.viewSig = sig;
+      // Filters only drop shifts, so an equal count is the unfiltered set.
+      cache.viewKey = view.length === store.n ? "all" : sig;
+      cache.view = view;
+    }
+    const view = cache.view;
+    // 5) Baseline
+    const baselineKey = cache.viewKey + "|" + params.baselineMode;
+    if (cache.baselineKey !== baselineKey){
+      cache.baseline = perEmployeeBaseline(store, view, cache.baseline);
+      cache.baselineKey = baselineKey;
+    }
+    // 6) Deviations
+    const devKey = baselineKey + "|" + params.devThreshold;
+    if (cache.devKey !== devKey){
+      computeDeviations(store, view, cache.baseline);
+      cache.devKey = devKey;
+    }
+    return view;
+  }
+
+  // Availability index and flagged indices for the view; returns {idx, flagged, alternatesKey}.
+  function alternatesInputs(store, view, availabilityCol, cache){
+    const indexKey = cache.viewKey + "|" + availabilityCol;
+    if (cache.indexKey !== indexKey){
+      cache.index = buildAvailabilityIndex(store, view, availabilityCol);
+      cache.indexKey = indexKey;
+    }
+    const flaggedKey = cache.viewKey + "|" + cache.flagsFor;
+    if (cache.flaggedKey !== flaggedKey){
+      cache.flagged = view.filter(i=> store.flags[i] === 1);
+      cache.flaggedKey = flaggedKey;
+    }
+    return {idx: cache.index, flagged: cache.flagged, alternatesKey: flaggedKey + "|" + availabilityCol};
+  }
+
+  function annotateAlternates(store, flagged, idx, from=0, to=flagged.length){
+    for (let k=from; k<to; k++){
+      const i = flagged[k];
+      const alts = findAlternates(store, i, idx);
+      store.altCount[i] = alts.count;
+      store.altSample[i] = alts.sample;
+    }
+  }
+
+  function estimateSavings(store, flagged){
+    const premium = params.baseRate * params.dbMultiplier;
+    const normal  = params.baseRate;
+    for (let k=0; k<flagged.length; k++){
+      const i = flagged[k];
+      const hours = Math.max(0, hoursBetween(store.start[i], store.end[i]));
+      store.estSavings[i] = store.altCount[i] > 0 ? (premium - normal) * hours : 0;
+    }
+  }
+
+  // Returns {view, flagged}: store indices in view and of its double-bubble shifts.
+  function runPipeline(store, availabilityCol, cache=newPipelineCache()){
+    const view = prepareView(store, cache);
+    // 7) Alternates for flagged shifts
+    const {idx, flagged, alternatesKey} = alternatesInputs(store, view, availabilityCol, cache);
+    if (cache.alternatesKey !== alternatesKey){
+      annotateAlternates(store, flagged, idx);
+      cache.alternatesKey = alternatesKey;
+    }
+    // 8) Savings (rates only)
+    estimateSavings(store, flagged);
+    return {view, flagged};
+  }
+
+  // ---------- Building and shipping stores ----------
+  // Shift stores are built and shipped to the recompute worker in the payload layout
+  // (decodePayload) with epoch-ms times; results come back as typed arrays of store indices.
+  // Growable shift columns with dictionary-coded strings. add() appends one segment of
+  // source row r; r's optional columns go into the raw table once, however many segments
+  // it yields.
+  function createShiftColumnsBuilder(extraNames){
+    const dict = ()=> ({codes: new Map(), values: []});
+    const codeOf = (d, v)=>{
+      let c = d.codes.get(v);
+      if (c === undefined){ c = d.values.length; d.codes.set(v, c); d.values.push(v); }
+      return c;
+    };
+    const emp = dict(), typ = dict(), cc = dict(), extras = extraNames.map(()=> dict());
+    let n = 0, cap = 1024, rawN = 0, rawCap = 1024, lastRow = null;
+    let start = new Float64Array(cap), end = new Float64Array(cap);
+    let empCodes = new Int32Array(cap), typeCodes = new Int32Array(cap), ccCodes = new Int32Array(cap), rowIdx = new Int32Array(cap);
+    let extraCodes = extraNames.map(()=> new Int32Array(rawCap));
+    const grown = (a, size)=>{ const b = new a.constructor(size); b.set(a); return b; };
+    return {
+      get length(){ return n; },
+      add(r, employee_id, startMs, endMs, shiftType, costCenter){
+        if (r !== lastRow){
+          if (rawN === rawCap){
+            rawCap *= 2;
+            extraCodes = extraCodes.map(a=> grown(a, rawCap));
+          }
+          for (let j=0; j<extraNames.length; j++) extraCodes[j][rawN] = codeOf(extras[j], (r[extraNames[j]] ?? "").toString());
+          lastRow = r;
+          rawN++;
+        }
+        if (n === cap){
+          cap *= 2;
+          start = grown(start, cap); end = grown(end, cap);
+          empCodes = grown(empCodes, cap); typeCodes = grown(typeCodes, cap); ccCodes = grown(ccCodes, cap); rowIdx = grown(rowIdx, cap);
+        }
+        start[n] = startMs;
+        end[n] = endMs;
+        empCodes[n] = codeOf(emp, employee_id);
+        typeCodes[n] = codeOf(typ, shiftType);
+        ccCodes[n] = codeOf(cc, costCenter);
+        rowIdx[n] = rawN - 1;
+        n++;
+      },
+      columns(){
+        return {
+          n, start: start.subarray(0, n), end: end.subarray(0, n), employee: empCodes.subarray(0, n),
+          shift_type: typeCodes.subarray(0, n), cost_center: ccCodes.subarray(0, n), row: rowIdx.subarray(0, n),
+          raw: {columns: extraNames.map((name, j)=> ({name, codes: extraCodes[j].subarray(0, rawN), values: extras[j].values}))},
+          dicts: {employee: emp.values, shift_type: typ.values, cost_center: cc.values}
+        };
+      }
+    };
+  }
+
+  // normalizeRows order (employee, start, end, input order) as a permutation of builder columns.
+  function shiftColumnsOrder(cols){
+    const names = cols.dicts.employee;
+    const byName = names.map((_, c)=> c).sort((a, b)=> names[a].localeCompare(names[b]));
+    const rank = new Int32Array(names.length);
+    byName.forEach((c, k)=>{ rank[c] = k > 0 && names[byName[k-1]].localeCompare(names[c]) === 0 ? rank[byName[k-1]] : k; });
+    const order = new Uint32Array(cols.n);
+    for (let i=0; i<cols.n; i++) order[i] = i;
+    const {start, end, employee} = cols;
+    return order.sort((a, b)=> (rank[employee[a]] - rank[employee[b]]) || (start[a] - start[b]) || (end[a] - end[b]) || (a - b));
+  }
+
+  // Packs builder columns or a store (permuted by order) into the payload layout read by
+  // decodePayload(). extra: optional {restGap, flags} per shift and {baselineStart,
+  // baselineEnd} per employee. Raw table columns are copied as they are.
+  function packShiftColumns(cols, order=null, extra={}){
+    const n = cols.n, nEmp = cols.dicts.employee.length;
+    const specs = [
+      ["start", Float64Array, n], ["end", Float64Array, n], ["employee", Int32Array, n],
+      ["shift_type", cols.dicts.shift_type.length < 256 ? Uint8Array : Int32Array, n],
+      ["cost_center", Int32Array, n], ["row", Int32Array, n], ["rest_gap_h", Float64Array, n], ["double_bubble", Uint8Array, n],
+      ["baseline_start_min", Float64Array, nEmp], ["baseline_end_min", Float64Array, nEmp],
+      ...cols.raw.columns.map(x=> ["extra:"+x.name, Int32Array, x.codes.length])
+    ];
+    let offset = 0;
+    const columns = specs.map(([name, Ctor, length])=>{
+      const spec = {name, dtype: Ctor.name, offset, length};
+      offset += Math.ceil(length * Ctor.BYTES_PER_ELEMENT / 8) * 8;
+      return spec;
+    });
+    const buf = new ArrayBuffer(offset);
+    const view = {};
+    columns.forEach((c, j)=>{ view[c.name] = new specs[j][1](buf, c.offset, c.length); });
+    const perShift = [
+      [view.start, cols.start], [view.end, cols.end], [view.employee, cols.employee], [view.shift_type, cols.shift_type],
+      [view.cost_center, cols.cost_center], [view.row, cols.row]
+    ];
+    if (extra.restGap) perShift.push([view.rest_gap_h, extra.restGap], [view.double_bubble, extra.flags]);
+    else view.rest_gap_h.fill(NaN);
+    for (const [dst, src] of perShift){
+      if (order) for (let i=0; i<n; i++) dst[i] = src[order[i]];
+      else dst.set(src);
+    }
+    for (const x of cols.raw.columns) view["extra:"+x.name].set(x.codes);
+    view.baseline_start_min.set(extra.baselineStart || new Float64Array(nEmp).fill(NaN));
+    view.baseline_end_min.set(extra.baselineEnd || new Float64Array(nEmp).fill(NaN));
+    const meta = {
+      version: 2, clock: "epoch", rows: n, shifts: n, stats: {},
+      // null: the rest/flag columns are not trusted and the first run recomputes them
+      restThreshold: null, baselineMode: null,
+      dicts: cols.dicts,
+      extras: Object.fromEntries(cols.raw.columns.map(x=> [x.name, x.values])),
+      columns
+    };
+    return {meta, buf};
+  }
+
+  // A store and its stage columns, for another thread's decodePayload().
+  function encodeShifts(store, cache=null){
+    // Only a baseline over the unfiltered set is worth shipping.
+    const fullBaseline = cache?.baselineKey?.startsWith("all|") ? cache.baseline : null;
+    const {meta, buf} = packShiftColumns(store, null, {
+      restGap: store.restGap, flags: store.flags, baselineStart: fullBaseline?.start, baselineEnd: fullBaseline?.end
+    });
+    meta.rows = store.rows;
+    meta.restThreshold = cache ? cache.flagsFor : null;
+    meta.baselineMode = fullBaseline ? cache.baselineKey.slice(4) : null;
+    return {meta, buf};
+  }
+
+  // Parses and normalizes CSV text chunks (async iterable of strings) without keeping the
+  // source rows: each record is expanded and appended to compact columns as it arrives.
+  // Resolves to {meta, buf} for decodePayload(); meta.stats counts skipped rows.
+  async function normalizeCsvStream(chunks, onProgress=null){
+    const stats = {missingShiftTime: 0, missingCostCenter: 0, invalidRows: 0};
+    let builder = null, rows = 0;
+    const parser = createCsvStreamParser(r=>{
+      if (!builder) builder = createShiftColumnsBuilder(Object.keys(r).filter(k=> !KNOWN_COLUMNS.has(k)));
+      rows++;
+      normalizeRow(r, stats, builder);
+    });
+    for await (const chunk of chunks){
+      parser.push(chunk);
+      if (onProgress) await onProgress({rows, shifts: builder ? builder.length : 0});
+    }
+    parser.finish();
+    const cols = (builder || createShiftColumnsBuilder([])).columns();
+    const {meta, buf} = packShiftColumns(cols, shiftColumnsOrder(cols));
+    meta.rows = rows;
+    meta.stats = stats;
+    return {meta, buf};
+  }
+
+  // A runPipeline() result as transferable typed arrays; the view's stage columns plus
+  // the flagged shifts' alternates (sample codes flattened with offsets).
+  function encodePipelineResult(store, out){
+    const {view, flagged} = out;
+    const n = view.length, m = flagged.length;
+    const res = {
+      view: view.slice(), restGap: new Float64Array(n), flags: new Uint8Array(n),
+      devHours: new Float64Array(n), deviation: new Uint8Array(n),
+      flagged: flagged.slice(), altCount: new Int32Array(m), estSavings: new Float64Array(m),
+      sampleOffsets: new Int32Array(m + 1), sampleEmp: null
+    };
+    for (let k=0; k<n; k++){
+      const i = view[k];
+      res.restGap[k] = store.restGap[i];
+      res.flags[k] = store.flags[i];
+      res.devHours[k] = store.devHours[i];
+      res.deviation[k] = store.deviation[i];
+    }
+    const sample = [];
+    for (let k=0; k<m; k++){
+      const i = flagged[k];
+      res.altCount[k] = store.altCount[i];
+      res.estSavings[k] = store.estSavings[i];
+      for (const c of store.altSample[i]) sample.push(c);
+      res.sampleOffsets[k + 1] = sample.length;
+    }
+    res.sampleEmp = Int32Array.from(sample);
+    return res;
+  }
+
+  const pipelineResultBuffers = (res)=> Object.values(res).map(a=> a.buffer);
+
+  // Writes a worker result into the caller's copy of the store; returns {view, flagged}.
+  function applyPipelineResult(store, res){
+    for (let k=0; k<res.view.length; k++){
+      const i = res.view[k];
+      store.restGap[i] = res.restGap[k];
+      store.flags[i] = res.flags[k];
+      store.devHours[i] = res.devHours[k];
+      store.deviation[i] = res.deviation[k];
+    }
+    for (let k=0; k<res.flagged.length; k++){
+      const i = res.flagged[k];
+      store.altCount[i] = res.altCount[k];
+      store.estSavings[i] = res.estSavings[k];
+      store.altSample[i] = Array.from(res.sampleEmp.subarray(res.sampleOffsets[k], res.sampleOffsets[k + 1]));
+    }
+    return {view: res.view, flagged: res.flagged};
+  }
+
+  // ---------- Dataset cache keys ----------
+  const CONTENT_HASH_BLOCK = 8 << 20;
+
+  const hexBytes = bytes=> Array.from(new Uint8Array(bytes), b=> b.toString(16).padStart(2, "0")).join("");
+
+  // SHA-256 (hex) of the concatenated SHA-256 digests of the blob's successive blocks, so a
+  // large upload is hashed without holding it in memory. null without WebCrypto.
+  async function blobContentHash(blob, blockSize=CONTENT_HASH_BLOCK){
+    const subtle = globalThis.crypto?.subtle;
+    if (!subtle) return null;
+    const blocks = Math.ceil(blob.size / blockSize);
+    const digests = new Uint8Array(32 * blocks);
+    for (let k=0; k<blocks; k++){
+      const bytes = await blob.slice(k * blockSize, (k + 1) * blockSize).arrayBuffer();
+      digests.set(new Uint8Array(await subtle.digest("SHA-256", bytes)), 32 * k);
+    }
+    return hexBytes(await subtle.digest("SHA-256", digests));
+  }
+
+  function datasetCacheKey(name, size, hash){
+    return `${hash}|${size}|${name}`;
+  }
+
+  // Keys to evict, least recently used first, so entries ({key, bytes, lastUsed}) plus
+  // incomingBytes fit in capBytes.
+  function datasetCacheEvictions(entries, incomingBytes, capBytes){
+    let total = incomingBytes;
+    for (const e of entries) total += e.bytes;
+    const out = [];
+    for (const e of entries.slice().sort((a, b)=> a.lastUsed - b.lastUsed)){
+      if (total <= capBytes) break;
+      out.push(e.key);
+      total -= e.bytes;
+    }
+    return out;
+  }
+
+  // flagged: store indices.
+  const FLAGGED_CSV_HEADER = ["employee_id","start_datetime","end_datetime","duration_hours","rest_gap_hours","double_bubble","shift_type","deviation_hours","alternates_available","est_savings"];
+
+  // Flagged CSV in pieces: the header, then "\n"-prefixed blocks of up to chunkRows lines,
+  // so an export never holds more than one block of text at a time.
+  function* flaggedCsvChunks(store, flagged, chunkRows=5000){
+    yield FLAGGED_CSV_HEADER.join(",");
+    for (let lo=0; lo<flagged.length; lo+=chunkRows){
+      const lines = [];
+      for (let k=lo, hi=Math.min(flagged.length, lo + chunkRows); k<hi; k++){
+        const i = flagged[k];
+        const gap = store.restGap[i];
+        lines.push([
+          store.dicts.employee[store.employee[i]],
+          toLocalISO(new Date(store.start[i])),
+          toLocalISO(new Date(store.end[i])),
+          fmt2(hoursBetween(store.start[i], store.end[i])),
+          Number.isNaN(gap) ? "" : fmt2(gap),
+          store.flags[i] ? "1" : "0",
+          store.dicts.shift_type[store.shift_type[i]] || "",
+          store.deviation[i] ? fmt2(store.devHours[i]) : "0",
+          store.altCount[i],
+          fmt2(store.estSavings[i])
+        ].map(v=> `"${String(v).replace(/"/g,'""')}"`).join(","));
+      }
+      yield "\n" + lines.join("\n");
+    }
+  }
+
+  function flaggedCsvText(store, flagged){
+    return Array.from(flaggedCsvChunks(store, flagged)).join("");
+  }
+
+  // ---------- Flagged table ----------
+  // Employee name order as a rank per dictionary code (built once per store).
+  function employeeNameRank(store){
+    if (!store.employeeRank){
+      const names = store.dicts.employee;
+      const order = Array.from(names, (_, c)=> c).sort((a,b)=> names[a] < names[b] ? -1 : names[a] > names[b] ? 1 : 0);
+      store.employeeRank = new Int32Array(names.length);
+      order.forEach((c, r)=>{ store.employeeRank[c] = r; });
+    }
+    return store.employeeRank;
+  }
+
+  // Numeric sort key per flagged-table column (data-sort) for store shift i.
+  const FLAGGED_SORT_KEYS = {
+    employee_id: (store, i)=> employeeNameRank(store)[store.employee[i]],
+    start: (store, i)=> store.start[i],
+    end: (store, i)=> store.end[i],
+    hours: (store, i)=> hoursBetween(store.start[i], store.end[i]),
+    rest_gap_h: (store, i)=> Number.isNaN(store.restGap[i]) ? 0 : store.restGap[i],
+    double_bubble: (store, i)=> store.flags[i],
+    callin: (store, i)=> store.typeFlags[store.shift_type[i]] & TYPE_CALLIN ? 1 : 0,
+    deviation: (store, i)=> store.deviation[i] ? store.devHours[i] : 0,
+    avail_count: (store, i)=> store.altCount[i],
+    est_savings: (store, i)=> store.estSavings[i]
+  };
+
+  const LITTLE_ENDIAN = new Uint8Array(new Uint32Array([1]).buffer)[0] === 1;
+
+  // One stable counting pass over the 11-bit digit of w at shift; false (nothing moved)
+  // when every key has the same digit.
+  function radixPass(w, shift, src, dst, count){
+    const m = src.length;
+    count.fill(0);
+    for (let k=0; k<m; k++) count[(w[k] >>> shift) & 2047]++;
+    if (count[(w[0] >>> shift) & 2047] === m) return false;
+    for (let b=0, sum=0; b<2048; b++){ const c = count[b]; count[b] = sum; sum += c; }
+    for (let k=0; k<m; k++){ const p = src[k]; dst[count[(w[p] >>> shift) & 2047]++] = p; }
+    return true;
+  }
+
+  // Positions 0..m-1 ordered by keys (a Float64Array without NaN), stable. Each double is
+  // mapped to an order-preserving pair of 32-bit words (all bits flipped for negatives,
+  // the sign bit for the rest, everything again for descending) and LSD-radix sorted.
+  function radixOrder(keys, asc=true){
+    const m = keys.length;
+    const words = new Uint32Array(keys.buffer, keys.byteOffset, 2 * m);
+    const lo = new Uint32Array(m), hi = new Uint32Array(m);
+    const L = LITTLE_ENDIAN ? 0 : 1, H = 1 - L;
+    for (let k=0; k<m; k++){
+      let h = words[2*k + H], l = words[2*k + L];
+      if (h & 0x80000000){ h = ~h; l = ~l; } else h ^= 0x80000000;
+      if (!asc){ h = ~h; l = ~l; }
+      hi[k] = h; lo[k] = l;
+    }
+    let src = new Uint32Array(m), dst = new Uint32Array(m);
+    for (let k=0; k<m; k++) src[k] = k;
+    if (!m) return src;
+    const count = new Uint32Array(2048);
+    for (const [w, shift] of [[lo, 0], [lo, 11], [lo, 22], [hi, 0], [hi, 11], [hi, 22]]){
+      if (radixPass(w, shift, src, dst, count)){ const t = src; src = dst; dst = t; }
+    }
+    return src;
+  }
+
+  // Store indices of flagged reordered by column key (stable; ties keep their order).
+  function sortFlagged(store, flagged, key, asc=true){
+    const keyOf = FLAGGED_SORT_KEYS[key] || FLAGGED_SORT_KEYS.employee_id;
+    const keys = new Float64Array(flagged.length);
+    for (let k=0; k<flagged.length; k++) keys[k] = keyOf(store, flagged[k]) + 0;  // -0 -> 0
+    return Int32Array.from(radixOrder(keys, asc), k=> flagged[k]);
+  }
+
+  function flaggedRowHtml(store, i){
+    const f = shiftRecord(store, i);
+    return `<tr>
+        <td>${f.employee_id}</td>
+        <td>${toLocalISO(f.start)}</td>
+        <td>${toLocalISO(f.end)}</td>
+        <td>${fmt2(hoursBetween(f.start, f.end))}</td>
+        <td>${f.rest_gap_h==null?'-':fmt2(f.rest_gap_h)}</td>
+        <td>${f.double_bubble?'<span class="pill bad">Yes</span>':'<span class="pill">No</span>'}</td>
+        <td>${isCallInType(f.shift_type)?'<span class="pill ok">Yes</span>':'<span class="pill">No</span>'}</td>
+        <td>${f.deviation?'<span class="pill warn">'+fmt2(f.dev_hours)+'h</span>':'<span class="pill">No</span>'}</td>
+        <td title="${f.alternates.join(", ")}">${f.altCount}</td>
+        <td class="right">${fmt2(f.estSavings)}</td>
+      </tr>`;
+  }
+"""
+
+
+# Recompute worker entry point; runs after ENGINE_JS in a Blob-URL worker. Runs are
+# cooperative: the worker yields between stages and alternates chunks so a newer
+# "run" message can supersede the one in progress.
+WORKER_JS = r"""
+  // ---------- Worker entry ----------
+  var params = {};
+  let workerStore = null;
+  let latestRun = 0;
+  const ALT_CHUNK = 2048;
+  const yieldChannel = new MessageChannel();
+  const yieldWaiters = [];
+  yieldChannel.port1.onmessage = ()=> yieldWaiters.shift()();
+  const yieldToInbox = ()=> new Promise(resolve=>{ yieldWaiters.push(resolve); yieldChannel.port2.postMessage(0); });
+
+  async function runInWorker(msg, post){
+    const superseded = async ()=>{ await yieldToInbox(); return msg.id !== latestRun; };
+    Object.assign(params, msg.params);
+    const store = workerStore;
+    const view = prepareView(store, store);
+    if (await superseded()) return;
+    const {idx, flagged, alternatesKey} = alternatesInputs(store, view, msg.availabilityCol, store);
+    if (store.alternatesKey !== alternatesKey){
+      store.alternatesKey = null;
+      for (let i=0; i<flagged.length; i+=ALT_CHUNK){
+        if (await superseded()) return;
+        annotateAlternates(store, flagged, idx, i, Math.min(flagged.length, i + ALT_CHUNK));
+      }
+      store.alternatesKey = alternatesKey;
+    }
+    estimateSavings(store, flagged);
+    const result = encodePipelineResult(store, {view, flagged});
+    post({type: "result", id: msg.id, result}, pipelineResultBuffers(result));
+  }
+
+  function handleWorkerMessage(msg, post){
+    if (msg.type === "load"){
+      workerStore = decodePayload(msg.meta, msg.buf);
+      latestRun = 0;
+      return Promise.resolve();
+    }
+    if (msg.type === "run"){
+      latestRun = msg.id;
+      return runInWorker(msg, post).catch(err=> post({type: "error", id: msg.id, message: String(err?.message || err)}));
+    }
+    return Promise.resolve();
+  }
+
+  if (typeof importScripts === "function"){
+    self.onmessage = (e)=> handleWorkerMessage(e.data, (m, transfer)=> self.postMessage(m, transfer));
+  }
+"""
 
 
 HTML = r"""<!DOCTYPE html>
@@ -76,6 +1802,9 @@ HTML = r"""<!DOCTYPE html>
   th, td{ padding:8px 10px; border-bottom:1px solid var(--grid); text-align:left; }
   th{ position: sticky; top: 0; background: #11141a; cursor:pointer; user-select:none; }
   tr:hover{ background:#131823; }
+  #flagTable td{ white-space:nowrap; }
+  #flagTable tr.flag-spacer td{ padding:0; border:0; }
+  #flagTable tr.flag-spacer:hover{ background:none; }
   .kbd{ background:#0a0d12; border:1px solid var(--grid); padding:2px 6px; border-radius:6px; font-family: ui-monospace, SFMono-Regular, Menlo, Consolas, "Liberation Mono", monospace; font-size:12px; }
   .note{ color:var(--muted); font-size:12px; }
   .pill{ padding:2px 8px; border-radius:999px; border:1px solid var(--grid); display:inline-block; font-size:12px; }
@@ -113,9 +1842,15 @@ HTML = r"""<!DOCTYPE html>
   .calendar-cell .badge{ margin-top:4px; display:inline-block; padding:2px 6px; border-radius:999px; font-size:11px; border:1px solid var(--grid); color:var(--muted); }
   .calendar-cell.has-db{ background:rgba(255,93,93,0.12); border-color:rgba(255,93,93,0.5); }
   .calendar-cell.has-db .badge{ border-color:rgba(255,93,93,0.4); color:var(--bad); }
+  .load-progress{ width:100%; height:6px; margin-top:8px; accent-color:var(--accent); }
   .overlay-header{ display:flex; justify-content:space-between; align-items:center; gap:12px; flex-wrap:wrap; }
   .overlay-header button{ padding:6px 10px; border-radius:8px; border:1px solid var(--grid); background:#0c0f14; color:var(--text); cursor:pointer; }
-  .overlay-scroll-area{ max-height:520px; overflow:auto; border:1px solid var(--grid); border-radius:12px; padding:8px 10px; background:rgba(15,17,21,0.75); }
+  .overlay-scroll-area{ max-height:520px; overflow:auto; border:1px solid var(--grid); border-radius:12px; background:rgba(15,17,21,0.75); }
+  .overlay-scroll-area canvas{ position:sticky; top:0; display:block; width:100%; }
+  .overlay-tooltip{
+    position:absolute; padding:8px 10px; background:#0b0e14; color:#e7e9ee; border:1px solid #2a2f3a; border-radius:8px;
+    pointer-events:none; font-size:12px; transform:translate(-50%, -110%); display:none; z-index:5;
+  }
 </style>
 </head>
 <body>
@@ -129,8 +1864,8 @@ HTML = r"""<!DOCTYPE html>
       <div class="controls">
         <div class="field wide">
           <label>Upload CSV (preferred hourly grid: <span class="kbd">employee_id,calendar_date,00..23[,shift_type,...]</span>; legacy <span class="kbd">start_datetime,end_datetime</span> rows still work)</label>
-          <input type="file" id="fileInput" accept=".csv" />
-          <div class="hint">Each row should be a single employee + date. Hour columns hold 0–1 hours for that slot (e.g., 0.5 = 30m). Legacy start/end rows or ISO timestamps remain supported. A <span class="kbd">shift_time</span> code (REG, CHOL, OT1, OT2, PLVE, PTO) is required.</div>
+          <input type="file" id="fileInput" accept=".csv,.arrow,.arrows" />
+          <div class="hint">Each row should be a single employee + date. Hour columns hold 0–1 hours for that slot (e.g., 0.5 = 30m). Legacy start/end rows or ISO timestamps remain supported. A <span class="kbd">shift_time</span> code (REG, CHOL, OT1, OT2, PLVE, PTO) is required. Precomputed Arrow payloads (<span class="kbd">.arrows</span>, from <span class="kbd">app.analytics.arrow_io</span>) load without CSV parsing.</div>
         </div>
         <div class="field wide">
           <label>CSV URL (optional)</label>
@@ -145,8 +1880,14 @@ HTML = r"""<!DOCTYPE html>
           <button id="loadSampleBtn">Load Demo Sample</button>
           <div class="hint">Synthetic data to showcase features.</div>
         </div>
+        <div class="field">
+          <label>&nbsp;</label>
+          <button id="clearCacheBtn">Clear cache</button>
+          <div class="hint" id="cacheInfo"></div>
+        </div>
       </div>
       <div class="spacer"></div>
+      <progress id="loadProgress" class="load-progress" hidden></progress>
       <div id="loadStatus" class="note"></div>
     </div>
 
@@ -250,13 +1991,16 @@ HTML = r"""<!DOCTYPE html>
           <div id="chartTitle" class="note">Select one or more employees to render.</div>
           <button id="sortOverlayBtn" type="button">Name ↑</button>
         </div>
-        <div class="overlay-scroll-area">
-          <svg id="overlayChart" preserveAspectRatio="xMidYMid meet"></svg>
+        <div class="overlay-scroll-area" id="overlayScroll">
+          <canvas id="overlayCanvas"></canvas>
+          <div id="overlaySpacer"></div>
         </div>
-        <div class="foot">Each row is an employee; each rectangle is a shift segment (cross‑midnight split). Hover for details. Use Save to export PNG.</div>
+        <div id="overlayTooltip" class="overlay-tooltip"></div>
+        <div class="foot">Each row is an employee; each rectangle is a shift segment (cross‑midnight split). Hover for details. Use Save to export PNG or SVG.</div>
         <div class="spacer"></div>
         <div class="row">
           <button id="savePngBtn">Save chart as PNG</button>
+          <button id="saveSvgBtn">Save chart as SVG</button>
         </div>
       </div>
 
@@ -277,7 +2021,7 @@ HTML = r"""<!DOCTYPE html>
         <button id="exportCsvBtn">Export flagged CSV</button>
       </div>
       <div class="spacer"></div>
-      <div style="max-height:420px; overflow:auto;">
+      <div id="flagTableWrap" style="max-height:420px; overflow:auto;">
         <table id="flagTable">
           <thead>
             <tr>
@@ -299,216 +2043,43 @@ HTML = r"""<!DOCTYPE html>
       <div class="foot">“Alternates Available” counts other employees who were off and would not be <span class="kbd">&lt; rest threshold</span> if they’d taken this shift (optionally constrained by the availability column).</div>
     </div>
 
-    <div class="spacer"></div>
-
-    <div class="card">
-      <h2>6) Calendar view (selected employees)</h2>
-      <div id="calendarHint" class="note">Select employees to visualize double-bubble days.</div>
-      <div id="calendarGrid" class="calendar-grid"></div>
-    </div>
-
-    <div class="spacer"></div>
-
-    <div class="card">
-      <h2>Assumptions & Notes</h2>
-      <ul class="note">
-        <li>Double‑bubble eligibility is attributed to the <em>current shift</em> only when its immediately prior shift was overtime (OT1/OT2/call-in) <em>and</em> the rest gap from that shift’s end to this shift’s start is below the threshold.</li>
-        <li>“Availability” for alternates: not on a concurrent shift and their rest gap before the flagged shift is ≥ threshold; optionally must match on the chosen column (crew/district/job_class).</li>
-        <li>“Normal shift” baseline: median start/end per employee. If “scheduled” has no coverage, falls back to all shifts.</li>
-        <li>Cost savings estimate assumes the flagged shift paid at <span class="kbd">base_rate × multiplier</span> could have been covered at <span class="kbd">base_rate</span>.</li>
-      </ul>
-    </div>
-  </main>
-
-  <script defer src="https://cdn.jsdelivr.net/npm/papaparse@5.4.1/papaparse.min.js"></script>
-  <script>
-  // ---------- Utilities ----------
-  const $ = sel => document.querySelector(sel);
-  const fmt2 = n => (Math.round(n*100)/100).toFixed(2);
-  const pad = (n) => n<10 ? "0"+n : ""+n;
-  const toLocalISO = (d) => d.getFullYear()+"-"+pad(d.getMonth()+1)+"-"+pad(d.getDate())+" "+pad(d.getHours())+":"+pad(d.getMinutes());
-  const parseMaybe = (s) => {
-    if (s instanceof Date) return s;
-    if (typeof s === "string") {
-      let t = s.trim();
-      if (!t) return null;
-      t = t.replace(/\//g, "-");
-      if (/^\d{4}-\d{2}-\d{2}$/.test(t)) t += " 00:00";
-      t = t.replace("T"," ");
-      const d = new Date(t);
-      if (isNaN(d)) return null;
-      return d;
-    }
-    return null;
-  };
-  const minutesOfDay = (d) => d.getHours()*60 + d.getMinutes() + d.getSeconds()/60;
-  const hoursBetween = (a,b) => (b - a) / 36e5;
-  const addDays = (d, n) => new Date(d.getFullYear(), d.getMonth(), d.getDate() + n, d.getHours(), d.getMinutes(), d.getSeconds());
-  const HOUR_COLUMNS = Array.from({length:24}, (_,i)=> pad(i));
-  const DEFAULT_DAYS = [0,1,2,3,4,5,6];
-  const MONTH_NAMES = ["January","February","March","April","May","June","July","August","September","October","November","December"];
-  const DOW_LABELS = ["Sun","Mon","Tue","Wed","Thu","Fri","Sat"];
-  const SHIFT_TIME_ALIASES = {
-    "reg": "reg",
-    "regular": "reg",
-    "scheduled": "reg",
-    "chol": "chol",
-    "company holiday": "chol",
-    "ot2": "ot2",
-    "ot": "ot2",
-    "overtime 2x": "ot2",
-    "call-in": "call-in",
-    "callin": "call-in",
-    "ot1": "ot1",
-    "overtime 1.5x": "ot1",
-    "plve": "plve",
-    "unpaid leave": "plve",
-    "pto": "pto",
-    "paid time off": "pto"
-  };
-  const SHIFT_TIME_DESCRIPTIONS = {
-    "reg": "REG — regular time",
-    "chol": "CHOL — company holiday",
-    "ot2": "OT2 — overtime 2×",
-    "ot1": "OT1 — overtime 1.5×",
-    "plve": "PLVE — unpaid leave",
-    "pto": "PTO — paid time off",
-    "call-in": "Call-in"
-  };
-  const canonicalShiftType = (value) => {
-    const norm = (value ?? "").toString().trim().toLowerCase();
-    if (!norm) return "";
-    return SHIFT_TIME_ALIASES[norm] || norm;
-  };
-  const SHIFT_TIME_FIELDS = ["shift_time","shiftTime","SHIFT_TIME"];
-  const getShiftTypeFromRow = (row) => {
-    for (const key of SHIFT_TIME_FIELDS){
-      if (row && row[key] != null && row[key] !== "") return canonicalShiftType(row[key]);
-    }
-    return "";
-  };
-  const describeShiftType = (value) => SHIFT_TIME_DESCRIPTIONS[canonicalShiftType(value)] || (value ? value.toString() : "—");
-  const SCHEDULED_TYPES = new Set(["reg","regular","scheduled","chol"]);
-  const CALLIN_TYPES = new Set(["call-in","callin","ot2","ot1","ot"]);
-  const OVERTIME_TYPES = new Set(["ot1","ot2","call-in","callin","ot"]);
-  const isScheduledType = (value) => SCHEDULED_TYPES.has(canonicalShiftType(value));
-  const isCallInType = (value) => CALLIN_TYPES.has(canonicalShiftType(value));
-  const isOvertimeType = (value) => OVERTIME_TYPES.has(canonicalShiftType(value));
-  const COST_CENTER_FIELDS = ["cost_center","CostCenter","costCenter","COST_CENTER"];
-  const getCostCenterFromRow = (row) => {
-    for (const key of COST_CENTER_FIELDS){
-      if (row && row[key] != null && row[key] !== "") return row[key].toString().trim();
-    }
-    return "";
-  };
-
-  function parseCalendarDate(value){
-    if (value == null) return null;
-    const text = value.toString().trim();
-    if (!text) return null;
-    const slash = text.match(/^(\d{1,2})[\/-](\d{1,2})[\/-](\d{2,4})$/);
-    if (slash){
-      const mm = parseInt(slash[1], 10);
-      const dd = parseInt(slash[2], 10);
-      let yy = parseInt(slash[3], 10);
-      if (yy < 100) yy += 2000;
-      return new Date(yy, mm-1, dd);
-    }
-    const parsed = new Date(text);
-    if (isNaN(parsed)) return null;
-    return new Date(parsed.getFullYear(), parsed.getMonth(), parsed.getDate());
-  }
-
-  function isHourlyRow(row){
-    if (!row) return false;
-    const dateVal = row.calendar_date ?? row.calendarDate ?? row.CalendarDate ?? row.date;
-    if (!dateVal) return false;
-    return HOUR_COLUMNS.some(col => Object.prototype.hasOwnProperty.call(row, col));
-  }
+    <div class="spacer"></div>
 
-  function expandHourlyRow(row, stats){
-    if (!isHourlyRow(row)) return null;
-    const emp = (row.employee_id ?? row.Employee ?? row.emp ?? "").toString().trim();
-    const dateRaw = row.calendar_date ?? row.calendarDate ?? row.CalendarDate ?? row.date ?? "";
-    const day = parseCalendarDate(dateRaw);
-    const typ = getShiftTypeFromRow(row);
-    const costCenter = getCostCenterFromRow(row);
-    if (!emp || !day) return [];
-    if (!typ){
-      if (stats) stats.missingShiftTime = (stats.missingShiftTime || 0) + 1;
-      return [];
-    }
-    if (!costCenter){
-      if (stats) stats.missingCostCenter = (stats.missingCostCenter || 0) + 1;
-      return [];
-    }
-    const baseRaw = {...row, cost_center: costCenter};
-    const segs = [];
-    let current = null;
-    for (const col of HOUR_COLUMNS){
-      if (!Object.prototype.hasOwnProperty.call(row, col)) continue;
-      const rawVal = row[col];
-      const val = typeof rawVal === "number" ? rawVal : parseFloat(rawVal);
-      if (!val || !isFinite(val) || val <= 0){
-        if (current){ segs.push(current); current = null; }
-        continue;
-      }
-      const clamped = Math.min(Math.max(val, 0), 1);
-      const hourInt = parseInt(col, 10);
-      if (isNaN(hourInt)) continue;
-      const slotStart = new Date(day.getFullYear(), day.getMonth(), day.getDate(), hourInt, 0, 0);
-      const slotEnd = new Date(slotStart.getTime() + clamped * 36e5);
-      if (current && Math.abs(slotStart.getTime() - current.end.getTime()) < 1){
-        current.end = slotEnd;
-      } else {
-        if (current) segs.push(current);
-        current = {
-          employee_id: emp,
-          start: slotStart,
-          end: slotEnd,
-          shift_type: typ,
-          cost_center: costCenter,
-          raw: {...baseRaw}
-        };
-      }
-    }
-    if (current) segs.push(current);
-    return segs;
-  }
+    <div class="card">
+      <h2>6) Calendar view (selected employees)</h2>
+      <div id="calendarHint" class="note">Select employees to visualize double-bubble days.</div>
+      <div id="calendarGrid" class="calendar-grid"></div>
+    </div>
 
-  function parseCSVbasic(text){
-    const rows = [];
-    let i=0, field="", row=[], inQuotes=false;
-    while(i < text.length){
-      const c = text[i];
-      if (inQuotes){
-        if (c === '"'){
-          if (text[i+1] === '"'){ field+='"'; i++; }
-          else inQuotes=false;
-        } else field += c;
-      } else {
-        if (c === '"'){ inQuotes=true; }
-        else if (c === ','){ row.push(field); field=""; }
-        else if (c === '\n' || c === '\r'){
-          if (field !== "" || row.length>0){ row.push(field); rows.push(row); row=[]; field=""; }
-          if (c === '\r' && text[i+1] === '\n') i++;
-        } else field += c;
-      }
-      i++;
-    }
-    if (field !== "" || row.length>0){ row.push(field); rows.push(row); }
-    const header = rows.shift() || [];
-    return rows.map(r => {
-      const o={};
-      header.forEach((h,idx)=>{ o[h.trim()] = (r[idx] ?? "").trim(); });
-      return o;
-    });
-  }
+    <div class="spacer"></div>
+
+    <div class="card">
+      <h2>Assumptions & Notes</h2>
+      <ul class="note">
+        <li>Double‑bubble eligibility is attributed to the <em>current shift</em> only when its immediately prior shift was overtime (OT1/OT2/call-in) <em>and</em> the rest gap from that shift’s end to this shift’s start is below the threshold.</li>
+        <li>“Availability” for alternates: not on a concurrent shift and their rest gap before the flagged shift is ≥ threshold; optionally must match on the chosen column (crew/district/job_class).</li>
+        <li>“Normal shift” baseline: median start/end per employee. If “scheduled” has no coverage, falls back to all shifts.</li>
+        <li>Cost savings estimate assumes the flagged shift paid at <span class="kbd">base_rate × multiplier</span> could have been covered at <span class="kbd">base_rate</span>.</li>
+      </ul>
+    </div>
+  </main>
+
+__PAYLOAD__
+  <script id="dbEngine">
+__ENGINE_JS__
+  </script>
+  <script>
+  // The recompute worker runs the inline engine above followed by this entry point.
+  const WORKER_SRC = __WORKER_SRC__;
+
+  const $ = sel => document.querySelector(sel);
 
   // ---------- Core state ----------
   let rawRows = [];
-  let shifts = [];
-let flaggedShifts = [];
+  let shiftStore = null;    // loaded data set; doubles as its pipeline cache
+  let shiftView = new Int32Array(0);
+  let calendarCube = null, calendarSel = null;  // buildCalendarCube() of the view; selection words on screen
+let flaggedIdx = new Int32Array(0);
 let employees = [];
 let optionalCols = [];
 let employeeCostCenters = new Map();
@@ -528,205 +2099,157 @@ let overlaySortAsc = true;
   };
 
   // ---------- Loading ----------
-  async function loadFromFile(file){
-    const text = await file.text();
-    return parseCSV(text);
-  }
-  async function loadFromUrl(url){
-    const res = await fetch(url);
-    if (!res.ok) throw new Error("Fetch failed: " + res.status);
-    const text = await res.text();
-    return parseCSV(text);
-  }
-  function parseCSV(text){
-    let rows;
-    if (window.Papa){
-      const out = Papa.parse(text, {header:true, dynamicTyping:false, skipEmptyLines:true});
-      rows = out.data;
-    } else {
-      rows = parseCSVbasic(text);
+  // Decoded text chunks from a byte stream; onBytes sees each chunk's encoded size.
+  async function* streamTextChunks(stream, onBytes){
+    const reader = stream.getReader();
+    const decoder = new TextDecoder();
+    for (;;){
+      const {done, value} = await reader.read();
+      if (done) break;
+      onBytes(value.byteLength);
+      yield decoder.decode(value, {stream: true});
     }
-    return rows;
+    const tail = decoder.decode();
+    if (tail) yield tail;
   }
 
-  // ---------- Transformations ----------
-  function normalizeRows(rows, stats=null){
-    const out = [];
-    for (const r of rows){
-      const hourly = expandHourlyRow(r, stats);
-      if (hourly){
-        out.push(...hourly);
-        continue;
-      }
-      const emp = (r.employee_id ?? r.Employee ?? r.emp ?? "").toString().trim();
-      const st = parseMaybe(r.start_datetime ?? r.start ?? r.start_time ?? r.Start ?? "");
-      const en = parseMaybe(r.end_datetime ?? r.end ?? r.end_time ?? r.End ?? "");
-      const typ = getShiftTypeFromRow(r);
-      const costCenter = getCostCenterFromRow(r);
-      if (!typ){
-        if (stats) stats.missingShiftTime = (stats.missingShiftTime || 0) + 1;
-        continue;
-      }
-      if (!costCenter){
-        if (stats) stats.missingCostCenter = (stats.missingCostCenter || 0) + 1;
-        continue;
-      }
-      if (!emp || !st || !en) continue;
-      if (en < st){
-        const en2 = addDays(en, 1);
-        out.push({employee_id: emp, start: st, end: en2, shift_type: typ, cost_center: costCenter, raw:{...r, cost_center: costCenter}});
-      } else {
-        out.push({employee_id: emp, start: st, end: en, shift_type: typ, cost_center: costCenter, raw:{...r, cost_center: costCenter}});
-      }
-      // copy optional keys for availability matching
-      for (const k of Object.keys(r)){
-        if (!(k in out[out.length-1].raw)) out[out.length-1].raw[k] = r[k];
-      }
+  // Streams CSV bytes through normalizeCsvStream with a progress bar; totalBytes may be 0
+  // (unknown). Resolves to {meta, buf}.
+  async function loadCsvStream(stream, totalBytes){
+    const progress = document.querySelector("#loadProgress");
+    const status = document.querySelector("#loadStatus");
+    let bytes = 0, lastPaint = 0;
+    progress.hidden = false;
+    if (totalBytes){ progress.max = totalBytes; progress.value = 0; } else progress.removeAttribute("value");
+    try{
+      const {meta, buf} = await normalizeCsvStream(streamTextChunks(stream, n=>{ bytes += n; }), async ({rows, shifts: count})=>{
+        const now = performance.now();
+        if (now - lastPaint < 100) return;
+        lastPaint = now;
+        if (totalBytes) progress.value = bytes;
+        const pct = totalBytes ? ` ${Math.floor(100 * bytes / totalBytes)}%` : "";
+        status.textContent = `Parsing CSV…${pct} (${rows.toLocaleString()} rows → ${count.toLocaleString()} shifts)`;
+        await new Promise(resolve=> setTimeout(resolve, 0));  // let the progress bar paint
+      });
+      return {meta, buf};
+    } finally {
+      progress.hidden = true;
     }
-    return out.sort((a,b)=> a.employee_id.localeCompare(b.employee_id) || a.start - b.start || a.end - b.end);
-  }
-
-  function applyDateFilter(arr){
-    let {dateStart, dateEnd} = params;
-    if (!dateStart && !dateEnd) return arr;
-    return arr.filter(s=>{
-      const d = s.start;
-      if (dateStart && d < dateStart) return false;
-      if (dateEnd){
-        const endDay = new Date(dateEnd.getFullYear(), dateEnd.getMonth(), dateEnd.getDate(), 23,59,59);
-        if (d > endDay) return false;
-      }
-      return true;
-    });
-  }
-
-  function applyDayOfWeekFilter(arr){
-    const days = params.daysOfWeek;
-    if (!days || days.size === 0 || days.size === DEFAULT_DAYS.length) return arr;
-    return arr.filter(s=> days.has(s.start.getDay()));
   }
 
-  function applyCostCenterFilter(arr){
-    const centers = params.costCenters;
-    if (!centers || centers.size === 0) return arr;
-    return arr.filter(s=> s.cost_center && centers.has(s.cost_center));
+  // CSV uploads come from the dataset cache when the same file (name, size, content) was
+  // parsed before; otherwise the parsed columns are cached before the pipeline writes to them.
+  async function loadFromFile(file){
+    if (isArrowPayload(file.name, file.type)) return decodeArrowPayload(await file.arrayBuffer());
+    const hash = await blobContentHash(file).catch(err=>{ console.warn("Content hash failed:", err); return null; });
+    const key = hash && datasetCacheKey(file.name, file.size, hash);
+    const hit = key && await datasetCacheGet(key);
+    if (hit) return Object.assign(decodePayload(hit.meta, hit.buf), {fromCache: true});
+    const {meta, buf} = await loadCsvStream(file.stream(), file.size);
+    if (key) await datasetCachePut(key, file, meta, buf);
+    return decodePayload(meta, buf);
   }
-
-  function computeRestAndFlags(arr){
-    const list = arr.slice();
-    let prevByEmp = new Map();
-    for (const s of list){
-      const key = s.employee_id;
-      const prev = prevByEmp.get(key) || null;
-      s.prev_end = prev ? prev.end : null;
-      s.rest_gap_h = prev ? hoursBetween(prev.end, s.start) : null;
-      const prevWasOT = prev ? isOvertimeType(prev.shift_type) : false;
-      s.double_bubble = (s.rest_gap_h != null) ? (prevWasOT && s.rest_gap_h < params.restThreshold) : false;
-      prevByEmp.set(key, s);
+  async function loadFromUrl(url){
+    const res = await fetch(url);
+    if (!res.ok) throw new Error("Fetch failed: " + res.status);
+    if (isArrowPayload(new URL(url, location.href).pathname, res.headers.get("content-type"))) return decodeArrowPayload(await res.arrayBuffer());
+    if (!res.body){
+      const {meta, buf} = await loadCsvStream(new Blob([await res.text()]).stream(), 0);
+      return decodePayload(meta, buf);
     }
-    return list;
+    // Content-Length is the encoded size; skip the percentage when the body is compressed.
+    const total = res.headers.get("content-encoding") ? 0 : parseInt(res.headers.get("content-length") || "0", 10);
+    const {meta, buf} = await loadCsvStream(res.body, total);
+    return decodePayload(meta, buf);
   }
 
-  function perEmployeeBaseline(arr){
-    const byEmp = new Map();
-    for (const s of arr){
-      if (!byEmp.has(s.employee_id)) byEmp.set(s.employee_id, []);
-      byEmp.get(s.employee_id).push(s);
-    }
-    const baseline = new Map();
-    for (const [emp, list] of byEmp){
-      const pool = (params.baselineMode === "scheduled")
-        ? list.filter(x=> isScheduledType(x.shift_type))
-        : list.slice();
-      const use = pool.length ? pool : list;
-      const smins = use.map(x=> minutesOfDay(x.start)).sort((a,b)=>a-b);
-      const emins = use.map(x=> minutesOfDay(x.end)).sort((a,b)=>a-b);
-      const med = (arr)=> arr.length? (arr.length%2? arr[(arr.length-1)/2] : (arr[arr.length/2-1]+arr[arr.length/2])/2) : null;
-      baseline.set(emp, {start_min: med(smins), end_min: med(emins)});
-    }
-    return baseline;
+  // ---------- Dataset cache (IndexedDB) ----------
+  // Normalized uploads ({meta, buf}) under datasetCacheKey(); "entries" holds the small
+  // {key, name, size, bytes, lastUsed} records the LRU works from, "payloads" the columns.
+  const DATASET_CACHE_DB = "double-bubble-datasets";
+  const DATASET_CACHE_MAX_BYTES = 512 * 1024 * 1024;
+  let datasetCacheDb = null;
+
+  function idbRequest(req){
+    return new Promise((resolve, reject)=>{
+      req.onsuccess = ()=> resolve(req.result);
+      req.onerror = ()=> reject(req.error);
+    });
   }
 
-  function computeDeviations(arr, baseline){
-    for (const s of arr){
-      const bl = baseline.get(s.employee_id);
-      if (!bl || bl.start_min==null || bl.end_min==null){
-        s.deviation = false;
-        s.dev_hours = 0;
-      } else {
-        const dStart = Math.abs(minutesOfDay(s.start) - bl.start_min) / 60;
-        const dEnd   = Math.abs(minutesOfDay(s.end) - bl.end_min) / 60;
-        const dev = Math.max(dStart, dEnd);
-        s.dev_hours = dev;
-        s.deviation = dev > params.devThreshold;
-      }
+  // Resolves to null where IndexedDB is unavailable (or blocked, e.g. private windows).
+  function openDatasetCache(){
+    if (!datasetCacheDb){
+      if (!window.indexedDB) return Promise.resolve(null);
+      const req = indexedDB.open(DATASET_CACHE_DB, 1);
+      req.onupgradeneeded = ()=>{
+        req.result.createObjectStore("entries", {keyPath: "key"});
+        req.result.createObjectStore("payloads");
+      };
+      datasetCacheDb = idbRequest(req).catch(err=>{ console.warn("Dataset cache unavailable:", err); return null; });
     }
-    return arr;
+    return datasetCacheDb;
   }
 
-  function splitCrossMidnightForViz(arr){
-    const segs = [];
-    for (const s of arr){
-      const startMin = minutesOfDay(s.start);
-      const endMin   = minutesOfDay(s.end);
-      const crosses  = s.end.toDateString() !== s.start.toDateString();
-      if (crosses){
-        segs.push({...s, vstart: startMin/60, vend: 24});
-        segs.push({...s, vstart: 0, vend: endMin/60});
-      } else {
-        segs.push({...s, vstart: startMin/60, vend: endMin/60});
-      }
+  async function datasetCacheGet(key){
+    try{
+      const db = await openDatasetCache();
+      if (!db) return null;
+      const payload = await idbRequest(db.transaction("payloads").objectStore("payloads").get(key));
+      if (!payload) return null;
+      const entries = db.transaction("entries", "readwrite").objectStore("entries");
+      const touch = entries.get(key);
+      touch.onsuccess = ()=>{ if (touch.result) entries.put({...touch.result, lastUsed: Date.now()}); };
+      return payload;
+    }catch(err){
+      console.warn("Dataset cache read failed:", err);
+      return null;
     }
-    return segs.filter(x=> x.vend > x.vstart);
   }
 
-  function buildAvailabilityIndex(arr){
-    const byEmp = new Map();
-    for (const s of arr){
-      if (!byEmp.has(s.employee_id)) byEmp.set(s.employee_id, []);
-      byEmp.get(s.employee_id).push(s);
-    }
-    for (const [emp, list] of byEmp){
-      list.sort((a,b)=> a.start - b.start);
-      let prevEnd = null;
-      for (const x of list){
-        x._prevEndForEmp = prevEnd;
-        prevEnd = x.end;
+  // Stores a copy of meta/buf (cloned when put() is called, so the caller may decode and
+  // mutate buf right after this resolves) and evicts least recently used data sets.
+  async function datasetCachePut(key, file, meta, buf){
+    try{
+      const db = await openDatasetCache();
+      if (!db || buf.byteLength > DATASET_CACHE_MAX_BYTES) return;
+      const all = await idbRequest(db.transaction("entries").objectStore("entries").getAll());
+      const evict = datasetCacheEvictions(all.filter(e=> e.key !== key), buf.byteLength, DATASET_CACHE_MAX_BYTES);
+      const tx = db.transaction(["entries", "payloads"], "readwrite");
+      for (const k of evict){
+        tx.objectStore("entries").delete(k);
+        tx.objectStore("payloads").delete(k);
       }
+      tx.objectStore("entries").put({key, name: file.name, size: file.size, bytes: buf.byteLength, lastUsed: Date.now()});
+      tx.objectStore("payloads").put({meta, buf}, key);
+      tx.oncomplete = ()=> refreshDatasetCacheInfo();
+      tx.onerror = tx.onabort = ()=> console.warn("Dataset cache write failed:", tx.error);
+    }catch(err){
+      console.warn("Dataset cache write failed:", err);
     }
-    return byEmp;
   }
 
-  function overlaps(aStart, aEnd, bStart, bEnd){
-    return (aStart < bEnd) && (bStart < aEnd);
+  async function clearDatasetCache(){
+    const db = await openDatasetCache();
+    if (!db) return;
+    const tx = db.transaction(["entries", "payloads"], "readwrite");
+    tx.objectStore("entries").clear();
+    tx.objectStore("payloads").clear();
+    await new Promise((resolve, reject)=>{ tx.oncomplete = resolve; tx.onerror = tx.onabort = ()=> reject(tx.error); });
   }
 
-  function findAlternates(flagShift, idxByEmp, availabilityCol){
-    const start = flagShift.start, end = flagShift.end;
-    const out = [];
-    for (const [emp, list] of idxByEmp.entries()){
-      if (emp === flagShift.employee_id) continue;
-      if (availabilityCol){
-        const v = (flagShift.raw?.[availabilityCol] ?? "").toString();
-        const candidateSample = (list[0]?.raw?.[availabilityCol] ?? "").toString();
-        if (v && candidateSample && v !== candidateSample) continue;
-      }
-      let busy = false;
-      for (const s of list){
-        if (overlaps(start, end, s.start, s.end)){ busy = true; break; }
-        if (s.start > end) break;
-      }
-      if (busy) continue;
-      let prevEnd = null;
-      for (const s of list){
-        if (s.end <= start) prevEnd = s.end; else break;
-      }
-      const restH = prevEnd ? hoursBetween(prevEnd, start) : Infinity;
-      if (restH >= params.restThreshold){
-        out.push({employee_id: emp, restH});
-      }
+  async function refreshDatasetCacheInfo(){
+    const el = document.querySelector("#cacheInfo");
+    const db = await openDatasetCache().catch(()=> null);
+    if (!db){
+      el.textContent = "Parsed-file cache unavailable in this browser.";
+      return;
     }
-    return out;
+    const all = await idbRequest(db.transaction("entries").objectStore("entries").getAll());
+    const mb = all.reduce((t, e)=> t + e.bytes, 0) / 1048576;
+    el.textContent = all.length
+      ? `${all.length} parsed file${all.length > 1 ? "s" : ""} cached (${fmt2(mb)} MB of ${DATASET_CACHE_MAX_BYTES / 1048576} MB); reopening one skips parsing.`
+      : "No parsed files cached yet.";
   }
 
   // ---------- Visualization (multi-rows) ----------
@@ -776,169 +2299,157 @@ let overlaySortAsc = true;
     }
   }
 
+  // Only the rows inside the scroll viewport are drawn; the spacer below the sticky
+  // canvas gives the scroll area the full chart height.
+  let overlayModel = null;
+  let overlayFrame = 0;
+  let overlayHatch = null;
+
   function renderOverlayForEmployees(empIds){
-    const inputList = Array.isArray(empIds) ? empIds : [];
-    const svg = document.getElementById("overlayChart");
-    const list = inputList.slice().sort((a,b)=> overlaySortAsc ? a.localeCompare(b) : b.localeCompare(a));
-    const N = list.length;
-    const W = 1000;
-    const padL=220, padR=30, padT=18, padB=30;
-    const rowH = 90;           // height per employee row
-    const gap = 10;            // vertical gap between rows
-    const H = padT + (N? (N*rowH + (N-1)*gap) : 120) + padB;
-
-    svg.setAttribute("viewBox", `0 0 ${W} ${H}`);
-    svg.style.height = Math.max(220, H) + "px";
-    svg.setAttribute("data-height", Math.max(220, H));
-    svg.innerHTML = "";
-
-    const g = document.createElementNS("http://www.w3.org/2000/svg","g");
-    svg.appendChild(g);
-
-    const x = (h) => padL + (h/24) * (W - padL - padR);
-    const yRowTop = (i) => padT + i*(rowH + gap);
-    const yRowBot = (i) => yRowTop(i) + rowH;
-
-    // axis grid across all rows
-    const axis = document.createElementNS("http://www.w3.org/2000/svg","g");
-    axis.setAttribute("class","axis");
-    for (let h=0; h<=24; h+=2){
-      const X = x(h);
-      const ln = document.createElementNS("http://www.w3.org/2000/svg","line");
-      ln.setAttribute("x1", X); ln.setAttribute("x2", X);
-      ln.setAttribute("y1", padT); ln.setAttribute("y2", H-padB);
-      ln.setAttribute("stroke", getComputedStyle(svg).getPropertyValue("--grid") || "#2a2f3a");
-      ln.setAttribute("stroke-width", "1");
-      ln.setAttribute("opacity", h%6===0 ? "0.7" : "0.35");
-      axis.appendChild(ln);
-
-      const tx = document.createElementNS("http://www.w3.org/2000/svg","text");
-      tx.setAttribute("x", X); tx.setAttribute("y", H-8);
-      tx.setAttribute("text-anchor","middle");
-      tx.setAttribute("fill", "#a0a4ae");
-      tx.setAttribute("font-size","12");
-      tx.textContent = h.toString();
-      axis.appendChild(tx);
-    }
-    g.appendChild(axis);
-
-    // rows
-    const defs = document.createElementNS("http://www.w3.org/2000/svg","defs");
-    defs.innerHTML = `
-      <pattern id="hatch" patternUnits="userSpaceOnUse" width="8" height="8" patternTransform="rotate(45)">
-        <rect width="8" height="8" fill="rgba(255,93,93,0.18)"></rect>
-        <line x1="0" y1="0" x2="0" y2="8" stroke="rgba(255,93,93,0.5)" stroke-width="2"></line>
-      </pattern>
-    `;
-    g.appendChild(defs);
+    overlayModel = buildOverlayModel(shiftStore && Array.isArray(empIds) ? empIds : [], shiftStore, shiftView, overlaySortAsc);
+    sizeOverlayCanvas();
+    drawOverlay();
+    const N = overlayModel.rows.length;
+    document.querySelector("#chartTitle").textContent = N ? `${N} employee${N>1?'s':''} selected` : "Select one or more employees to render.";
+  }
 
-    const tooltip = document.createElement("div");
-    Object.assign(tooltip.style, {
-      position:"absolute", padding:"8px 10px", background:"#0b0e14", color:"#e7e9ee",
-      border:"1px solid #2a2f3a", borderRadius:"8px", pointerEvents:"none", fontSize:"12px",
-      transform:"translate(-50%, -110%)", display:"none", zIndex:5
-    });
-    const container = svg.parentElement;
-    if (container){
-      const existing = container.querySelector(".overlay-tooltip");
-      if (existing) existing.remove();
-      tooltip.className = "overlay-tooltip";
-      container.appendChild(tooltip);
-    }
-
-    function showTip(evt, text){
-      tooltip.innerHTML = text;
-      tooltip.style.display = "block";
-      const rect = svg.getBoundingClientRect();
-      tooltip.style.left = (evt.clientX - rect.left) + "px";
-      tooltip.style.top  = (evt.clientY - rect.top) + "px";
-    }
-    function hideTip(){ tooltip.style.display="none"; }
-
-    list.forEach((empId, idx) => {
-      const top = yRowTop(idx), bot = yRowBot(idx);
-      const label = document.createElementNS("http://www.w3.org/2000/svg","text");
-      label.setAttribute("x", padL - 12);
-      label.setAttribute("y", top + rowH/2);
-      label.setAttribute("text-anchor","end");
-      label.setAttribute("dominant-baseline","middle");
-      label.setAttribute("fill", "#e7e9ee");
-      label.setAttribute("font-size","13");
-      label.textContent = empId;
-      g.appendChild(label);
-
-      const bg = document.createElementNS("http://www.w3.org/2000/svg","rect");
-      bg.setAttribute("x", padL); bg.setAttribute("y", top+2);
-      bg.setAttribute("width", W - padL - padR); bg.setAttribute("height", rowH - 4);
-      bg.setAttribute("fill", "rgba(255,255,255,0.02)");
-      g.appendChild(bg);
-
-      if (idx>0){
-        const sep = document.createElementNS("http://www.w3.org/2000/svg","line");
-        sep.setAttribute("x1", padL); sep.setAttribute("x2", W - padR);
-        sep.setAttribute("y1", top - gap/2); sep.setAttribute("y2", top - gap/2);
-        sep.setAttribute("stroke", getComputedStyle(svg).getPropertyValue("--grid") || "#2a2f3a");
-        sep.setAttribute("stroke-width", "1");
-        sep.setAttribute("opacity", "0.6");
-        g.appendChild(sep);
+  const overlayScale = () => document.querySelector("#overlayScroll").clientWidth / OVERLAY.W;
+
+  function sizeOverlayCanvas(){
+    const scroller = document.querySelector("#overlayScroll");
+    const canvas = document.querySelector("#overlayCanvas");
+    const maxView = (parseFloat(getComputedStyle(scroller).maxHeight) || 520) - (scroller.offsetHeight - scroller.clientHeight);
+    const totalH = Math.max(220, overlayModel.H * overlayScale());
+    const viewH = Math.min(totalH, maxView);
+    const dpr = window.devicePixelRatio || 1;
+    canvas.style.height = viewH + "px";
+    canvas.width = Math.round(scroller.clientWidth * dpr);
+    canvas.height = Math.round(viewH * dpr);
+    document.querySelector("#overlaySpacer").style.height = (totalH - viewH) + "px";
+  }
+
+  function overlayHatchPattern(ctx){
+    if (overlayHatch) return overlayHatch;
+    const tile = document.createElement("canvas");
+    tile.width = tile.height = 8;
+    const t = tile.getContext("2d");
+    t.fillStyle = "rgba(255,93,93,0.18)"; t.fillRect(0, 0, 8, 8);
+    t.strokeStyle = "rgba(255,93,93,0.5)"; t.lineWidth = 2;
+    t.beginPath();
+    t.moveTo(-2, 2); t.lineTo(2, -2); t.moveTo(0, 8); t.lineTo(8, 0); t.moveTo(6, 10); t.lineTo(10, 6);
+    t.stroke();
+    overlayHatch = ctx.createPattern(tile, "repeat");
+    return overlayHatch;
+  }
+
+  function drawOverlay(){
+    overlayFrame = 0;
+    if (!overlayModel) return;
+    const {W, padL, padR, padT, padB, rowH, gap, grid} = OVERLAY;
+    const canvas = document.querySelector("#overlayCanvas");
+    const ctx = canvas.getContext("2d");
+    const k = (window.devicePixelRatio || 1) * overlayScale();
+    const top = document.querySelector("#overlayScroll").scrollTop / overlayScale();
+    const viewH = canvas.height / k;
+    const H = overlayModel.H;
+    ctx.setTransform(1, 0, 0, 1, 0, 0);
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+    ctx.setTransform(k, 0, 0, k, 0, -top * k);
+
+    // grid lines across the visible rows
+    ctx.strokeStyle = grid; ctx.lineWidth = 1;
+    for (let h=0; h<=24; h+=2){
+      ctx.globalAlpha = h%6===0 ? 0.7 : 0.35;
+      ctx.beginPath(); ctx.moveTo(overlayX(h), Math.max(padT, top)); ctx.lineTo(overlayX(h), Math.min(H - padB, top + viewH)); ctx.stroke();
+    }
+    ctx.globalAlpha = 1;
+
+    const [first, last] = overlayRowRange(overlayModel, top, top + viewH);
+    ctx.textBaseline = "middle";
+    for (let i=first; i<last; i++){
+      const row = overlayModel.rows[i];
+      const rowTop = overlayRowTop(i);
+      ctx.fillStyle = "#e7e9ee"; ctx.font = "13px system-ui, sans-serif"; ctx.textAlign = "end";
+      ctx.fillText(row.employee_id, padL - 12, rowTop + rowH/2);
+      ctx.fillStyle = "rgba(255,255,255,0.02)";
+      ctx.fillRect(padL, rowTop + 2, W - padL - padR, rowH - 4);
+      if (i > 0){
+        ctx.globalAlpha = 0.6; ctx.strokeStyle = grid; ctx.lineWidth = 1;
+        ctx.beginPath(); ctx.moveTo(padL, rowTop - gap/2); ctx.lineTo(W - padR, rowTop - gap/2); ctx.stroke();
+        ctx.globalAlpha = 1;
       }
+      for (const seg of row.segs){
+        const r = overlaySegmentRect(seg, i), st = overlaySegmentStyle(seg);
+        ctx.fillStyle = st.hatch ? overlayHatchPattern(ctx) : "rgba(100,180,255,0.32)";
+        ctx.fillRect(r.x, r.y, r.w, r.h);
+        if (st.stroke){
+          ctx.strokeStyle = st.stroke; ctx.lineWidth = st.strokeWidth; ctx.setLineDash(st.dash);
+          ctx.strokeRect(r.x, r.y, r.w, r.h);
+          ctx.setLineDash([]);
+        }
+      }
+    }
+
+    // hour labels stay pinned to the bottom of the viewport
+    const labelY = Math.min(H, top + viewH) - 8;
+    ctx.fillStyle = "#a0a4ae"; ctx.font = "12px system-ui, sans-serif"; ctx.textAlign = "center"; ctx.textBaseline = "alphabetic";
+    for (let h=0; h<=24; h+=2) ctx.fillText(h.toString(), overlayX(h), labelY);
+  }
+
+  const scheduleOverlayDraw = () => { if (!overlayFrame) overlayFrame = requestAnimationFrame(drawOverlay); };
 
-      const empShifts = shifts.filter(s=> s.employee_id===empId);
-      const segs = splitCrossMidnightForViz(empShifts);
-
-      for (const s of segs){
-        const X = x(s.vstart), Wd = x(s.vend) - x(s.vstart);
-        const r = document.createElementNS("http://www.w3.org/2000/svg","rect");
-        r.setAttribute("x", X); r.setAttribute("y", top + 8);
-        r.setAttribute("width", Math.max(1, Wd)); r.setAttribute("height", rowH - 16);
-        r.setAttribute("fill", "rgba(100,180,255,0.32)");
-        const isCallin = isCallInType(s.shift_type);
-        r.setAttribute("stroke", s.deviation ? "#ffb648" : (isCallin ? "#a0a4ae" : "rgba(0,0,0,0)"));
-        r.setAttribute("stroke-width", isCallin ? "1.5" : (s.deviation ? "1.5":"0"));
-        r.setAttribute("stroke-dasharray", isCallin ? "4 4" : (s.deviation ? "0" : "0"));
-        if (s.double_bubble) r.setAttribute("fill", "url(#hatch)");
-
-        const durH = hoursBetween(s.start, s.end);
-        const callin = isCallin;
-        const shiftLabel = describeShiftType(s.shift_type);
-        const tip = `
-          <div><strong>${s.employee_id}</strong></div>
-          <div>${shiftLabel}</div>
+  function overlayTipHtml(s){
+    const durH = hoursBetween(s.start, s.end);
+    const callin = isCallInType(s.shift_type);
+    const shiftLabel = describeShiftType(s.shift_type);
+    return `
+          <div><strong>${escapeXml(s.employee_id)}</strong></div>
+          <div>${escapeXml(shiftLabel)}</div>
           <div>${toLocalISO(s.start)} → ${toLocalISO(s.end)} (${fmt2(durH)}h)</div>
           <div>Call-in: <span class="${callin?'pill ok':'pill'}">${callin?'Yes':'No'}</span> &nbsp; Double-bubble: <span class="${s.double_bubble?'pill bad':'pill'}">${s.double_bubble?'Yes':'No'}</span></div>
           <div>Rest before: ${s.rest_gap_h==null?'-':fmt2(s.rest_gap_h)+'h'} &nbsp; Deviation: ${s.deviation?fmt2(s.dev_hours)+'h':'No'}</div>
         `;
-        r.addEventListener("mousemove", (e)=> showTip(e, tip));
-        r.addEventListener("mouseleave", hideTip);
-        g.appendChild(r);
-      }
-    });
+  }
 
-    document.querySelector("#chartTitle").textContent = N ? `${N} employee${N>1?'s':''} selected` : "Select one or more employees to render.";
+  function onOverlayHover(evt){
+    const tooltip = document.querySelector("#overlayTooltip");
+    const canvas = document.querySelector("#overlayCanvas");
+    const rect = canvas.getBoundingClientRect();
+    const scale = overlayScale();
+    const hit = overlayModel && overlayHitTest(overlayModel, (evt.clientX - rect.left) / scale,
+      (evt.clientY - rect.top + document.querySelector("#overlayScroll").scrollTop) / scale);
+    if (!hit){ tooltip.style.display = "none"; return; }
+    const cardRect = tooltip.parentElement.getBoundingClientRect();
+    tooltip.innerHTML = overlayTipHtml(hit);
+    tooltip.style.display = "block";
+    tooltip.style.left = (evt.clientX - cardRect.left) + "px";
+    tooltip.style.top  = (evt.clientY - cardRect.top) + "px";
   }
 
   function renderSummary(){
-    const byEmp = {};
-    for (const s of shifts){
-      const emp = s.employee_id;
-      if (!byEmp[emp]) byEmp[emp] = {total:0, db:0, near:0, minRest:Infinity, medRest:null, rests:[]};
-      byEmp[emp].total++;
-      if (s.double_bubble) byEmp[emp].db++;
-      if (s.rest_gap_h!=null){
-        byEmp[emp].rests.push(s.rest_gap_h);
-        byEmp[emp].minRest = Math.min(byEmp[emp].minRest, s.rest_gap_h);
-        if (s.rest_gap_h >= params.restThreshold-1 && s.rest_gap_h < params.restThreshold) byEmp[emp].near++;
+    const byEmp = new Map();
+    const {employee, flags, restGap} = shiftStore || {};
+    for (let k=0; k<shiftView.length; k++){
+      const i = shiftView[k], gap = restGap[i];
+      let v = byEmp.get(employee[i]);
+      if (!v) byEmp.set(employee[i], v = {total:0, db:0, near:0, minRest:Infinity, medRest:null, rests:[]});
+      v.total++;
+      if (flags[i]) v.db++;
+      if (!Number.isNaN(gap)){
+        v.rests.push(gap);
+        v.minRest = Math.min(v.minRest, gap);
+        if (gap >= params.restThreshold-1 && gap < params.restThreshold) v.near++;
       }
     }
     const chips = document.querySelector("#summaryChips"); chips.innerHTML = "";
     const list = document.querySelector("#summaryList"); list.innerHTML = "";
-    if (!Object.keys(byEmp).length){ list.innerHTML = '<div class="note">No data in current range.</div>'; return; }
+    if (!byEmp.size){ list.innerHTML = '<div class="note">No data in current range.</div>'; return; }
 
-    const arr = Object.entries(byEmp).map(([emp, v])=>{
+    const arr = Array.from(byEmp, ([code, v])=>{
       v.rests.sort((a,b)=>a-b);
       const med = v.rests.length ? (v.rests.length%2? v.rests[(v.rests.length-1)/2] : (v.rests[v.rests.length/2-1]+v.rests[v.rests.length/2])/2) : null;
       v.medRest = med;
-      return {employee_id: emp, total:v.total, db:v.db, near:v.near, minRest:v.minRest, medRest:v.medRest, rate: v.total? v.db/v.total : 0};
+      return {employee_id: shiftStore.dicts.employee[code], total:v.total, db:v.db, near:v.near, minRest:v.minRest, medRest:v.medRest, rate: v.total? v.db/v.total : 0};
     }).sort((a,b)=> b.db - a.db || b.rate - a.rate);
 
     const top = arr.slice(0,5);
@@ -958,52 +2469,84 @@ let overlaySortAsc = true;
     list.appendChild(ul);
   }
 
+  // The flagged table only holds the rows in (or near) the scroll viewport, between two
+  // spacer rows sized to the rest; flagRows is the full, sorted list of store indices.
+  const FLAG_ROW_OVERSCAN = 20;
+  let flagRows = new Int32Array(0), flagSort = null, flagRowHeight = 0, flagWindow = "", flagScrollQueued = false;
+
+  function flagNoteRow(html){
+    return `<tr><td colspan="10"><div class="note">${html}</div></td></tr>`;
+  }
+
   function renderFlagTable(){
     const tbody = document.querySelector("#flagTable tbody");
-    tbody.innerHTML = "";
     const selected = getSelectedEmployees();
-    const selectedSet = new Set(selected);
-    if (!selected.length){
+    flagWindow = "";
+    if (!selected.length || !shiftStore){
+      flagRows = new Int32Array(0);
       document.querySelector("#flagCount").textContent = "0";
-      const tr = document.createElement("tr");
-      const td = document.createElement("td");
-      td.colSpan = 10;
-      td.innerHTML = '<div class="note">Select one or more employees to see flagged incidents.</div>';
-      tr.appendChild(td);
-      tbody.appendChild(tr);
+      tbody.innerHTML = flagNoteRow("Select one or more employees to see flagged incidents.");
       return;
     }
-    const filtered = flaggedShifts.filter(f=> selectedSet.has(f.employee_id));
+    const filtered = selectedFlagged(selected);
+    flagRows = flagSort ? sortFlagged(shiftStore, filtered, flagSort.key, flagSort.asc) : filtered;
     document.querySelector("#flagCount").textContent = filtered.length;
     if (!filtered.length){
-      const tr = document.createElement("tr");
-      const td = document.createElement("td");
-      td.colSpan = 10;
-      td.innerHTML = '<div class="note">No double-bubble incidents for the selected employees.</div>';
-      tr.appendChild(td);
-      tbody.appendChild(tr);
+      tbody.innerHTML = flagNoteRow("No double-bubble incidents for the selected employees.");
       return;
     }
-    for (const f of filtered){
-      const tr = document.createElement("tr");
-      const dur = hoursBetween(f.start, f.end);
-      const availNames = f._alternates?.slice(0,6).map(a=>a.employee_id).join(", ");
-      const savings = f._estSavings ?? 0;
-      tr.innerHTML = `
-        <td>${f.employee_id}</td>
-        <td>${toLocalISO(f.start)}</td>
-        <td>${toLocalISO(f.end)}</td>
-        <td>${fmt2(dur)}</td>
-        <td>${f.rest_gap_h==null?'-':fmt2(f.rest_gap_h)}</td>
-        <td>${f.double_bubble?'<span class="pill bad">Yes</span>':'<span class="pill">No</span>'}</td>
-        <td>${isCallInType(f.shift_type)?'<span class="pill ok">Yes</span>':'<span class="pill">No</span>'}</td>
-        <td>${f.deviation?'<span class="pill warn">'+fmt2(f.dev_hours)+'h</span>':'<span class="pill">No</span>'}</td>
-        <td title="${availNames||''}">${f._alternates?.length||0}</td>
-        <td class="right">${fmt2(savings)}</td>
-      `;
-      tbody.appendChild(tr);
+    initFlagTable();
+    renderFlagRows();
+  }
+
+  function renderFlagRows(){
+    const wrap = document.querySelector("#flagTableWrap");
+    const tbody = document.querySelector("#flagTable tbody");
+    const n = flagRows.length;
+    if (!n) return;
+    const rowH = flagRowHeight || 36;
+    // A shorter list than before leaves scrollTop past the end until the browser clamps it.
+    const top = Math.min(wrap.scrollTop, Math.max(0, n * rowH - wrap.clientHeight));
+    const first = Math.max(0, Math.floor(top / rowH) - FLAG_ROW_OVERSCAN);
+    const last = Math.min(n, Math.ceil((top + wrap.clientHeight) / rowH) + FLAG_ROW_OVERSCAN);
+    const key = first + ":" + last;
+    if (key === flagWindow) return;
+    flagWindow = key;
+    const html = [];
+    if (first > 0) html.push(`<tr class="flag-spacer" style="height:${first * rowH}px"><td colspan="10"></td></tr>`);
+    for (let k=first; k<last; k++) html.push(flaggedRowHtml(shiftStore, flagRows[k]));
+    if (last < n) html.push(`<tr class="flag-spacer" style="height:${(n - last) * rowH}px"><td colspan="10"></td></tr>`);
+    tbody.innerHTML = html.join("");
+    if (!flagRowHeight){
+      const row = tbody.querySelector("tr:not(.flag-spacer)");
+      if (row && row.offsetHeight){
+        flagRowHeight = row.offsetHeight;
+        flagWindow = "";
+        renderFlagRows();
+      }
     }
-    makeTableSortable("flagTable");
+  }
+
+  // Header clicks sort flagRows by typed keys; scrolling re-renders the row window.
+  function initFlagTable(){
+    const table = document.getElementById("flagTable");
+    if (table.dataset.sortableInit === "1") return;
+    table.dataset.sortableInit = "1";
+    table.querySelectorAll("th").forEach(th=>{
+      th.addEventListener("click", ()=>{
+        const key = th.dataset.sort;
+        if (!key || !shiftStore) return;
+        flagSort = flagSort && flagSort.key === key ? {key, asc: !flagSort.asc} : {key, asc: true};
+        flagRows = sortFlagged(shiftStore, flagRows, key, flagSort.asc);
+        flagWindow = "";
+        renderFlagRows();
+      });
+    });
+    document.querySelector("#flagTableWrap").addEventListener("scroll", ()=>{
+      if (flagScrollQueued) return;
+      flagScrollQueued = true;
+      requestAnimationFrame(()=>{ flagScrollQueued = false; renderFlagRows(); });
+    });
   }
 
   function renderCalendarView(){
@@ -1011,158 +2554,95 @@ let overlaySortAsc = true;
     const hint = document.querySelector("#calendarHint");
     if (!container || !hint) return;
     container.innerHTML = "";
+    calendarSel = null;
     const selected = getSelectedEmployees();
-    if (!selected.length){
+    if (!selected.length || !shiftStore || !calendarCube){
       hint.textContent = "Select employees to visualize double-bubble days.";
       return;
     }
-    const selectedSet = new Set(selected);
-    const relevant = shifts.filter(s=> selectedSet.has(s.employee_id));
-    if (!relevant.length){
+    const sel = calendarSelection(calendarCube, employeeMask(shiftStore, selected));
+    const counts = calendarCounts(calendarCube, sel);
+    const months = calendarMonths(counts);
+    if (!months.length){
       hint.textContent = "No shifts in range for the selected employees.";
       return;
     }
     hint.textContent = "Highlighted days show double-bubble events for the selected employees.";
-    const months = buildCalendarData(relevant);
-    if (!months.length){
-      container.innerHTML = '<div class="note">No calendar data to display.</div>';
-      return;
+    calendarSel = sel;
+    container.innerHTML = months.map(m=> `<div class="calendar-month">${buildMonthTable(m, counts)}</div>`).join("");
+    if (!container.dataset.tipInit){
+      container.dataset.tipInit = "1";
+      container.addEventListener("mouseover", onCalendarHover);
     }
-    months.forEach(monthData=>{
-      const monthEl = document.createElement("div");
-      monthEl.className = "calendar-month";
-      monthEl.innerHTML = buildMonthTable(monthData);
-      container.appendChild(monthEl);
-    });
   }
 
-  function buildCalendarData(list){
-    const byMonth = new Map();
-    for (const s of list){
-      if (!s.start) continue;
-      const year = s.start.getFullYear();
-      const month = s.start.getMonth();
-      const day = s.start.getDate();
-      const key = `${year}-${month}`;
-      if (!byMonth.has(key)) byMonth.set(key, {year, month, days:new Map()});
-      const monthEntry = byMonth.get(key);
-      if (!monthEntry.days.has(day)){
-        monthEntry.days.set(day, {double:false, employees:new Set(), dbEmployees:new Set(), shifts:[]});
-      }
-      const info = monthEntry.days.get(day);
-      info.employees.add(s.employee_id);
-      if (s.double_bubble){
-        info.double = true;
-        info.dbEmployees.add(s.employee_id);
-      }
-      info.shifts.push(s);
-    }
-    return Array.from(byMonth.values()).sort((a,b)=> (a.year - b.year) || (a.month - b.month));
+  // Employee names are only listed for the cell under the pointer.
+  function onCalendarHover(evt){
+    const cell = evt.target.closest("td[data-day]");
+    if (!cell || cell.title || !calendarSel || !calendarCube) return;
+    const names = calendarDayEmployees(calendarCube, calendarSel, Number(cell.dataset.day)).map(c=> shiftStore.dicts.employee[c]);
+    cell.title = `Employees: ${names.join(", ")}`;
   }
 
-  function buildMonthTable(data){
-    const firstDow = new Date(data.year, data.month, 1).getDay();
-    const daysInMonth = new Date(data.year, data.month+1, 0).getDate();
-    const header = DOW_LABELS.map(d=> `<th>${d}</th>`).join("");
-    let rows = "";
+  function buildMonthTable(m, counts){
+    const first = Date.UTC(m.year, m.month, 1) / 864e5;
+    const firstDow = dayOfWeek(first);
+    const daysInMonth = new Date(Date.UTC(m.year, m.month + 1, 0)).getUTCDate();
+    const out = [`<div class="calendar-month-title">${MONTH_NAMES[m.month]} ${m.year}</div><table><thead><tr>`];
+    for (const d of DOW_LABELS) out.push(`<th>${d}</th>`);
+    out.push("</tr></thead><tbody>");
     let day = 1;
     for (let week=0; week<6 && day <= daysInMonth; week++){
-      let row = "<tr>";
+      out.push("<tr>");
       for (let dow=0; dow<7; dow++){
         if ((week===0 && dow < firstDow) || day > daysInMonth){
-          row += '<td class="calendar-cell empty"></td>';
+          out.push('<td class="calendar-cell empty"></td>');
+          continue;
+        }
+        const dayNum = first + day - 1, k = dayNum - counts.firstDay;
+        const shifts = k >= 0 && k < counts.shifts.length ? counts.shifts[k] : 0;
+        const doubles = shifts ? counts.doubles[k] : 0;
+        if (!shifts){
+          out.push(`<td class="calendar-cell"><div class="day-num">${day}</div></td>`);
+        } else if (doubles){
+          out.push(`<td class="calendar-cell has-db" data-day="${dayNum}"><div class="day-num">${day}</div><div class="badge db">${doubles} DB</div></td>`);
         } else {
-          const info = data.days.get(day);
-          const classes = ["calendar-cell"];
-          if (info && info.double) classes.push("has-db");
-          let badge = "";
-          if (info){
-            badge = info.double
-              ? `<div class="badge db">${info.dbEmployees.size} DB</div>`
-              : `<div class="badge">${info.employees.size} shift${info.employees.size>1?"s":""}</div>`;
-          }
-          const tooltip = info ? `Employees: ${Array.from(info.employees).join(", ")}` : "";
-          const safeTitle = tooltip.replace(/"/g, "&quot;");
-          row += `<td class="${classes.join(" ")}"${tooltip?` title="${safeTitle}"`:""}><div class="day-num">${day}</div>${badge}</td>`;
-          day++;
+          out.push(`<td class="calendar-cell" data-day="${dayNum}"><div class="day-num">${day}</div><div class="badge">${shifts} shift${shifts>1?"s":""}</div></td>`);
         }
+        day++;
       }
-      row += "</tr>";
-      rows += row;
+      out.push("</tr>");
     }
-    return `
-      <div class="calendar-month-title">${MONTH_NAMES[data.month]} ${data.year}</div>
-      <table>
-        <thead><tr>${header}</tr></thead>
-        <tbody>${rows}</tbody>
-      </table>
-    `;
+    out.push("</tbody></table>");
+    return out.join("");
   }
 
-  function makeTableSortable(tableId){
-    const table = document.getElementById(tableId);
-    if (!table || table.dataset.sortableInit === "1") return;
-    table.dataset.sortableInit = "1";
-    const ths = table.querySelectorAll("th");
-    let sortKey = null, asc = true;
-    ths.forEach(th => {
-      th.addEventListener("click", ()=>{
-        const key = th.dataset.sort;
-        if (!key) return;
-        if (sortKey === key) asc = !asc; else { sortKey = key; asc = true; }
-        const rows = Array.from(table.querySelectorAll("tbody tr"));
-        rows.sort((a,b)=>{
-          const av = val(a, key), bv = val(b, key);
-          if (av < bv) return asc? -1 : 1;
-          if (av > bv) return asc? 1 : -1;
-          return 0;
-        });
-        const tb = table.querySelector("tbody");
-        rows.forEach(r=>tb.appendChild(r));
-      });
-    });
-    function val(tr, key){
-      const tds = tr.children;
-      switch(key){
-        case "employee_id": return tds[0].innerText;
-        case "start": return tds[1].innerText;
-        case "end": return tds[2].innerText;
-        case "hours": return parseFloat(tds[3].innerText)||0;
-        case "rest_gap_h": return parseFloat(tds[4].innerText)||0;
-        case "double_bubble": return tds[5].innerText.includes("Yes")?1:0;
-        case "callin": return tds[6].innerText.includes("Yes")?1:0;
-        case "deviation": return tds[7].innerText.includes("No")?0:parseFloat(tds[7].innerText)||0;
-        case "avail_count": return parseInt(tds[8].innerText)||0;
-        case "est_savings": return parseFloat(tds[9].innerText)||0;
-        default: return tds[0].innerText;
-      }
-    }
+  // Flagged store indices for the selected employee names.
+  function selectedFlagged(selected){
+    const mask = employeeMask(shiftStore, selected);
+    return flaggedIdx.filter(i=> mask[shiftStore.employee[i]]);
   }
 
-  function exportFlaggedCSV(flagged){
-    const header = ["employee_id","start_datetime","end_datetime","duration_hours","rest_gap_hours","double_bubble","shift_type","deviation_hours","alternates_available","est_savings"];
-    const lines = [header.join(",")];
-    for (const f of flagged){
-      const dur = hoursBetween(f.start, f.end);
-      const line = [
-        f.employee_id,
-        toLocalISO(f.start),
-        toLocalISO(f.end),
-        fmt2(dur),
-        f.rest_gap_h==null? "": fmt2(f.rest_gap_h),
-        f.double_bubble? "1":"0",
-        f.shift_type||"",
-        f.deviation? fmt2(f.dev_hours) : "0",
-        (f._alternates?.length||0),
-        fmt2(f._estSavings||0)
-      ].map(v=> `"${String(v).replace(/"/g,'""')}"`).join(",");
-      lines.push(line);
-    }
-    const blob = new Blob([lines.join("\n")], {type:"text/csv;charset=utf-8;"});
-    const url = URL.createObjectURL(blob);
-    const a = document.createElement("a");
-    a.href = url; a.download = "double_bubble_flagged.csv"; a.click();
-    URL.revokeObjectURL(url);
+  // Writes the CSV chunk by chunk: straight to disk where the File System Access API is
+  // available, else as a Blob of the chunks (never one concatenated string).
+  async function exportFlaggedCSV(flagged){
+    const filename = "double_bubble_flagged.csv";
+    if (window.showSaveFilePicker){
+      let handle;
+      try {
+        handle = await window.showSaveFilePicker({suggestedName: filename, types: [{description: "CSV", accept: {"text/csv": [".csv"]}}]});
+      } catch (err){
+        if (err && err.name === "AbortError") return;
+        handle = null;
+      }
+      if (handle){
+        const writable = await handle.createWritable();
+        for (const chunk of flaggedCsvChunks(shiftStore, flagged)) await writable.write(chunk);
+        await writable.close();
+        return;
+      }
+    }
+    downloadBlob(new Blob(Array.from(flaggedCsvChunks(shiftStore, flagged)), {type:"text/csv;charset=utf-8;"}), filename);
   }
 
   function initDayOfWeekPicker(){
@@ -1188,25 +2668,27 @@ let overlaySortAsc = true;
     });
   }
 
-  function saveSvgAsPng(svgId){
-    const svg = document.getElementById(svgId);
-    const xml = new XMLSerializer().serializeToString(svg);
+  const MAX_CANVAS_SIDE = 32000;
+
+  function downloadBlob(blob, filename){
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement("a");
+    a.href = url; a.download = filename; a.click();
+    URL.revokeObjectURL(url);
+  }
+
+  function saveSvgAsPng(xml, viewWidth, viewHeight){
     const svg64 = btoa(unescape(encodeURIComponent(xml)));
-    const height = parseInt(svg.getAttribute("data-height")) || 260;
-    const width = 1200;
+    // Browsers cap canvas dimensions; very tall selections export at a smaller scale.
+    const width = Math.min(1200, Math.floor(MAX_CANVAS_SIDE * viewWidth / viewHeight));
     const img = new Image();
     img.onload = function(){
       const canvas = document.createElement("canvas");
-      canvas.width = width; canvas.height = height * (width / (svg.viewBox.baseVal.width || 1000));
+      canvas.width = width; canvas.height = Math.round(viewHeight * (width / viewWidth));
       const ctx = canvas.getContext("2d");
       ctx.fillStyle = "#0f1115"; ctx.fillRect(0,0,canvas.width, canvas.height);
       ctx.drawImage(img, 0, 0, canvas.width, canvas.height);
-      canvas.toBlob(function(blob){
-        const url = URL.createObjectURL(blob);
-        const a = document.createElement("a");
-        a.href = url; a.download = "overlay_chart.png"; a.click();
-        URL.revokeObjectURL(url);
-      });
+      canvas.toBlob(function(blob){ downloadBlob(blob, "overlay_chart.png"); });
     };
     img.src = "data:image/svg+xml;base64,"+svg64;
   }
@@ -1215,9 +2697,11 @@ let overlaySortAsc = true;
   function formatLoadStatus(prefix, info){
     const missingShift = info?.stats?.missingShiftTime || 0;
     const missingCost = info?.stats?.missingCostCenter || 0;
+    const invalid = info?.stats?.invalidRows || 0;
     const parts = [];
     if (missingShift) parts.push(`${missingShift} row${missingShift===1?"":"s"} missing shift_time`);
     if (missingCost) parts.push(`${missingCost} row${missingCost===1?"":"s"} missing cost_center`);
+    if (invalid) parts.push(`${invalid} row${invalid===1?"":"s"} without a usable employee, date or time`);
     if (parts.length) return `${prefix} Skipped ${parts.join("; ")}.`;
     return prefix;
   }
@@ -1227,22 +2711,31 @@ let overlaySortAsc = true;
     if (!f) return;
     try{
       document.querySelector("#loadStatus").textContent = "Parsing CSV…";
-      rawRows = await loadFromFile(f);
-      const info = afterLoad();
-      document.querySelector("#loadStatus").textContent = formatLoadStatus(`Loaded ${rawRows.length} rows from file.`, info);
+      const data = await loadFromFile(f);
+      useDataset(data);
+      const source = data.fromCache ? "from cache (parsing skipped)" : "from file";
+      document.querySelector("#loadStatus").textContent = formatLoadStatus(`Loaded ${data.rows.toLocaleString()} rows (${data.n.toLocaleString()} shifts) ${source}.`, data);
     }catch(err){
       console.error(err);
       document.querySelector("#loadStatus").textContent = "Error loading file: " + err.message;
     }
   });
+  document.querySelector("#clearCacheBtn").addEventListener("click", async ()=>{
+    try{
+      await clearDatasetCache();
+    }catch(err){
+      console.error(err);
+    }
+    refreshDatasetCacheInfo();
+  });
   document.querySelector("#fetchBtn").addEventListener("click", async ()=>{
     const url = document.querySelector("#csvUrl").value.trim();
     if (!url) return;
     try{
       document.querySelector("#loadStatus").textContent = "Fetching CSV…";
-      rawRows = await loadFromUrl(url);
-      const info = afterLoad();
-      document.querySelector("#loadStatus").textContent = formatLoadStatus(`Loaded ${rawRows.length} rows from URL.`, info);
+      const data = await loadFromUrl(url);
+      useDataset(data);
+      document.querySelector("#loadStatus").textContent = formatLoadStatus(`Loaded ${data.rows.toLocaleString()} rows (${data.n.toLocaleString()} shifts) from URL.`, data);
     }catch(err){
       console.error(err);
       document.querySelector("#loadStatus").textContent = "Error fetching: " + err.message;
@@ -1356,7 +2849,7 @@ let overlaySortAsc = true;
       cells.push(row.job_class);
       lines.push(cells.join(","));
     });
-    rawRows = parseCSV(lines.join("\n"));
+    rawRows = parseCSVbasic(lines.join("\n"));
     const info = afterLoad();
     document.querySelector("#loadStatus").textContent = formatLoadStatus(`Loaded demo sample (${rawRows.length} rows; hourly grid).`, info);
   });
@@ -1374,15 +2867,30 @@ let overlaySortAsc = true;
       alert("Select at least one employee before exporting flagged incidents.");
       return;
     }
-    const selectedSet = new Set(selected);
-    const flagged = flaggedShifts.filter(s=> selectedSet.has(s.employee_id));
+    const flagged = shiftStore ? selectedFlagged(selected) : [];
     if (!flagged.length){
       alert("No flagged incidents for the selected employees.");
       return;
     }
-    exportFlaggedCSV(flagged);
+    exportFlaggedCSV(flagged).catch(err=>{
+      console.error(err);
+      alert("Export failed: " + err.message);
+    });
+  });
+  document.querySelector("#savePngBtn").addEventListener("click", ()=>{
+    if (overlayModel) saveSvgAsPng(overlaySvgMarkup(overlayModel), OVERLAY.W, overlayModel.H);
+  });
+  document.querySelector("#saveSvgBtn").addEventListener("click", ()=>{
+    if (overlayModel) downloadBlob(new Blob([overlaySvgMarkup(overlayModel)], {type: "image/svg+xml"}), "overlay_chart.svg");
+  });
+  document.querySelector("#overlayScroll").addEventListener("scroll", scheduleOverlayDraw, {passive: true});
+  document.querySelector("#overlayCanvas").addEventListener("mousemove", onOverlayHover);
+  document.querySelector("#overlayCanvas").addEventListener("mouseleave", ()=>{ document.querySelector("#overlayTooltip").style.display = "none"; });
+  window.addEventListener("resize", ()=>{
+    if (!overlayModel) return;
+    sizeOverlayCanvas();
+    scheduleOverlayDraw();
   });
-  document.querySelector("#savePngBtn").addEventListener("click", ()=> saveSvgAsPng("overlayChart"));
   document.querySelector("#selectAllEmpBtn").addEventListener("click", ()=> {
     const sel = document.querySelector("#employeeSelect");
     Array.from(sel.options).forEach(o=> o.selected = true);
@@ -1425,19 +2933,24 @@ let overlaySortAsc = true;
 
   function afterLoad(){
     const stats = {missingShiftTime:0, missingCostCenter:0};
-    const normalized = normalizeRows(rawRows, stats);
+    shiftStore = normalizeRows(rawRows, stats);
+    calendarCube = null;
     // optional columns for availability filter
-    const sample = rawRows[0] || {};
-    const known = new Set(["employee_id","start_datetime","end_datetime","shift_type","shift_time","SHIFT_TIME","shiftTime","cost_center","CostCenter","costCenter","COST_CENTER","Employee","Start","End","start","end","type","calendar_date","calendarDate","CalendarDate","date"]);
-    HOUR_COLUMNS.forEach(col=> known.add(col));
-    optionalCols = Object.keys(sample).filter(k=> !known.has(k));
+    optionalCols = shiftStore.optionalCols;
+    populateControls(shiftStore);
+    startPipelineWorker();
+    recomputeAll();
+    return {stats, normalizedCount: shiftStore.n};
+  }
+
+  // Select options and default date range for a freshly loaded data set.
+  function populateControls(store){
     const selAvail = document.querySelector("#availabilityColumn"); selAvail.innerHTML = '<option value="">(none)</option>';
     optionalCols.forEach(c=>{
       const opt = document.createElement("option"); opt.value=c; opt.textContent=c; selAvail.appendChild(opt);
     });
     // employees list
-    const empSet = new Set(normalized.map(s=> s.employee_id));
-    employees = Array.from(empSet).filter(Boolean).sort();
+    employees = store.dicts.employee.filter(Boolean).sort();
     const empSel = document.querySelector("#employeeSelect"); empSel.innerHTML = "";
     employees.forEach(e=>{
       const opt = document.createElement("option"); opt.value=e; opt.textContent=e; empSel.appendChild(opt);
@@ -1448,14 +2961,23 @@ let overlaySortAsc = true;
     employeeCostCenters = new Map();
     costCenterEmployees = new Map();
     const ccSet = new Set();
-    normalized.forEach(s=>{
-      if (!s.cost_center) return;
-      ccSet.add(s.cost_center);
-      if (!employeeCostCenters.has(s.employee_id)) employeeCostCenters.set(s.employee_id, new Set());
-      employeeCostCenters.get(s.employee_id).add(s.cost_center);
-      if (!costCenterEmployees.has(s.cost_center)) costCenterEmployees.set(s.cost_center, new Set());
-      costCenterEmployees.get(s.cost_center).add(s.employee_id);
-    });
+    const nCC = store.dicts.cost_center.length;
+    const seen = new Set();
+    let minStart = Infinity, maxStart = -Infinity;
+    for (let i=0; i<store.n; i++){
+      minStart = Math.min(minStart, store.start[i]);
+      maxStart = Math.max(maxStart, store.start[i]);
+      const pair = store.employee[i] * nCC + store.cost_center[i];
+      if (seen.has(pair)) continue;
+      seen.add(pair);
+      const emp = store.dicts.employee[store.employee[i]], cc = store.dicts.cost_center[store.cost_center[i]];
+      if (!cc) continue;
+      ccSet.add(cc);
+      if (!employeeCostCenters.has(emp)) employeeCostCenters.set(emp, new Set());
+      employeeCostCenters.get(emp).add(cc);
+      if (!costCenterEmployees.has(cc)) costCenterEmployees.set(cc, new Set());
+      costCenterEmployees.get(cc).add(emp);
+    }
     costCenters = Array.from(ccSet).sort();
     const ccSelect = document.querySelector("#costCenterSelect");
     if (ccSelect){
@@ -1469,17 +2991,40 @@ let overlaySortAsc = true;
     updateEmployeeFilterByCostCenter(true);
 
     // default date range from data
-    const dates = normalized.map(s=> s.start).filter(Boolean).sort((a,b)=>a-b);
-    if (dates.length){
-      const s = dates[0], e = dates[dates.length-1];
-      document.querySelector("#dateStart").value = s.toISOString().slice(0,10);
-      document.querySelector("#dateEnd").value   = e.toISOString().slice(0,10);
+    if (store.n){
+      document.querySelector("#dateStart").value = new Date(minStart).toISOString().slice(0,10);
+      document.querySelector("#dateEnd").value   = new Date(maxStart).toISOString().slice(0,10);
     } else {
       document.querySelector("#dateStart").value = "";
       document.querySelector("#dateEnd").value = "";
     }
+  }
+
+  // Switch the page to a decodePayload() data set (embedded, streamed or worker-encoded).
+  function useDataset(data){
+    rawRows = [];
+    shiftStore = data;
+    calendarCube = null;
+    optionalCols = data.optionalCols;
+    populateControls(shiftStore);
+    startPipelineWorker();
     recomputeAll();
-    return {stats, normalizedCount: normalized.length};
+  }
+
+  async function loadEmbeddedPayload(){
+    const metaEl = document.querySelector("#dbPayload");
+    if (!metaEl) return null;
+    const meta = JSON.parse(metaEl.textContent);
+    const dataEl = document.querySelector("#dbPayloadData");
+    let buf;
+    if (dataEl){
+      buf = decodeBase64(dataEl.textContent.trim());
+    } else {
+      const res = await fetch(meta.bin);
+      if (!res.ok) throw new Error(`HTTP ${res.status} for ${meta.bin}`);
+      buf = await res.arrayBuffer();
+    }
+    return decodePayload(meta, buf);
   }
 
   function pullParams(){
@@ -1499,41 +3044,82 @@ let overlaySortAsc = true;
     params.costCenters = new Set(ccChosen);
   }
 
+  // ---------- Recompute worker ----------
+  // One worker per loaded data set; falls back to the main thread if workers are unavailable.
+  let pipelineWorker = null;
+  let pipelineWorkerUrl = null;
+  let runSeq = 0;
+
+  function stopPipelineWorker(){
+    if (pipelineWorker) pipelineWorker.terminate();
+    if (pipelineWorkerUrl) URL.revokeObjectURL(pipelineWorkerUrl);
+    pipelineWorker = null; pipelineWorkerUrl = null;
+    setRecomputeBusy(false);
+  }
+
+  function startPipelineWorker(){
+    stopPipelineWorker();
+    if (typeof Worker === "undefined") return;
+    try{
+      const engineSrc = document.getElementById("dbEngine").textContent;
+      pipelineWorkerUrl = URL.createObjectURL(new Blob([engineSrc, "\n", WORKER_SRC], {type: "text/javascript"}));
+      pipelineWorker = new Worker(pipelineWorkerUrl);
+    }catch(err){
+      console.warn("Recompute worker unavailable; running on the main thread.", err);
+      stopPipelineWorker();
+      return;
+    }
+    pipelineWorker.onmessage = onWorkerMessage;
+    pipelineWorker.onerror = (e)=>{
+      console.error("Recompute worker failed; running on the main thread.", e);
+      fallBackToMainThread();
+    };
+    const {meta, buf} = encodeShifts(shiftStore, shiftStore);
+    pipelineWorker.postMessage({type: "load", meta, buf}, [buf]);
+  }
+
+  function fallBackToMainThread(){
+    stopPipelineWorker();
+    // Worker results were written into the store columns behind the cache's back.
+    if (shiftStore) invalidatePipelineCache(shiftStore);
+    recomputeAll();
+  }
+
+  function onWorkerMessage(e){
+    const msg = e.data;
+    if (msg.id !== runSeq) return;  // superseded by a newer recompute
+    if (msg.type === "error"){
+      console.error("Recompute worker error:", msg.message);
+      fallBackToMainThread();
+      return;
+    }
+    setRecomputeBusy(false);
+    renderResults(applyPipelineResult(shiftStore, msg.result));
+  }
+
+  function setRecomputeBusy(busy){
+    const btn = document.querySelector("#applyBtn");
+    btn.textContent = busy ? "Recomputing…" : "Apply / Recompute";
+    btn.setAttribute("aria-busy", busy ? "true" : "false");
+  }
+
   function recomputeAll(){
+    if (!shiftStore) return;
     pullParams();
     const availabilityCol = document.querySelector("#availabilityColumn").value || "";
 
-    // 1) Normalize
-    const base = normalizeRows(rawRows);
-    // 2) Rest + flags (use full history so first in-range shift still gets prior context)
-    const annotated = computeRestAndFlags(base);
-    // 3) Date filter (view)
-    const ranged = applyDateFilter(annotated);
-    // 4) Day-of-week filter
-    const dowFiltered = applyDayOfWeekFilter(ranged);
-    // 5) Cost center filter
-    const ccFiltered = applyCostCenterFilter(dowFiltered);
-    let computed = ccFiltered;
-    // 6) Baseline
-    const bl = perEmployeeBaseline(computed);
-    // 7) Deviations
-    computed = computeDeviations(computed, bl);
-    // 8) Save global
-    shifts = computed;
-
-    // 9) Alternates for flagged shifts
-    const idx = buildAvailabilityIndex(computed);
-    const flagged = computed.filter(s=> s.double_bubble);
-    for (const s of flagged){
-      const alts = findAlternates(s, idx, availabilityCol);
-      s._alternates = alts;
-      const hours = Math.max(0, hoursBetween(s.start, s.end));
-      const premium = params.baseRate * params.dbMultiplier;
-      const normal  = params.baseRate;
-      s._estSavings = alts.length>0 ? (premium - normal) * hours : 0;
-    }
-
-    flaggedShifts = flagged;
+    if (pipelineWorker){
+      setRecomputeBusy(true);
+      pipelineWorker.postMessage({type: "run", id: ++runSeq, params, availabilityCol});
+      return;
+    }
+    renderResults(runPipeline(shiftStore, availabilityCol, shiftStore));
+  }
+
+  function renderResults(out){
+    shiftView = out.view;
+    flaggedIdx = out.flagged;
+    calendarCube = buildCalendarCube(shiftStore, shiftView);
 
     // Render
     renderOverlayForEmployees(getSelectedEmployees());
@@ -1546,20 +3132,258 @@ let overlaySortAsc = true;
 
   // Init
   document.querySelector("#loadStatus").textContent = "Awaiting CSV… Upload a file or paste a URL.";
+  refreshDatasetCacheInfo().catch(err=> console.warn(err));
+  if (document.querySelector("#dbPayload")){
+    document.querySelector("#loadStatus").textContent = "Loading embedded analysis…";
+    loadEmbeddedPayload().then(payload=>{
+      document.querySelector("#restThreshold").value = payload.restThreshold;
+      document.querySelector("#baselineMode").value = payload.baselineMode;
+      useDataset(payload);
+      document.querySelector("#loadStatus").textContent = formatLoadStatus(`Loaded precomputed analysis (${payload.rows} rows, ${payload.n} shifts).`, payload);
+    }).catch(err=>{
+      console.error(err);
+      document.querySelector("#loadStatus").textContent = "Error loading embedded data: " + err.message;
+    });
+  }
   </script>
 </body>
 </html>
 """
 
 
+_JS_WORD = re.compile(r"[\w$\\\u0080-\uffff]")
+_JS_SPECIAL = re.compile(r"[\s/'\"`{}]")
+# A newline after one of these never ends a statement (no ASI), so it can go.
+_JS_JOIN_AFTER = frozenset("{;,([")
+_JS_REGEX_KEYWORDS = frozenset(
+    ["return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "instanceof", "yield", "await"]
+)
+
+
+def _js_string_end(src: str, i: int, quote: str) -> int:
+    j = i + 1
+    while src[j] != quote:
+        j += 2 if src[j] == "\\" else 1
+    return j + 1
+
+
+def _js_template_end(src: str, i: int) -> tuple:
+    """End of the template chunk starting at i (after ` or }): (index, opens_substitution)."""
+    j = i + 1
+    while True:
+        c = src[j]
+        if c == "\\":
+            j += 2
+        elif c == "`":
+            return j + 1, False
+        elif c == "$" and src[j + 1] == "{":
+            return j + 2, True
+        else:
+            j += 1
+
+
+def _js_regex_end(src: str, i: int) -> int:
+    j, in_class = i + 1, False
+    while True:
+        c = src[j]
+        if c == "\\":
+            j += 2
+            continue
+        if c == "[":
+            in_class = True
+        elif c == "]":
+            in_class = False
+        elif c == "/" and not in_class:
+            j += 1
+            break
+        j += 1
+    while j < len(src) and _JS_WORD.match(src[j]):
+        j += 1
+    return j
+
+
+def minify_js(src: str) -> str:
+    """Drop comments, indentation and blank lines and collapse whitespace outside literals.
+
+    Strings, template literals (including multi-line ones) and regex literals
+    are copied verbatim. Line breaks are kept wherever removing one could
+    change automatic semicolon insertion, so no renaming or reordering: the
+    output runs exactly like the input.
+    """
+    out: list = []
+    last = ""  # last character written
+    gap = ""  # whitespace skipped since then: "", " " or "\n"
+    depth = 0  # open braces
+    substitutions: list = []  # brace depth at each open template ${
+    i, n = 0, len(src)
+
+    def write(text: str) -> None:
+        nonlocal last, gap
+        if gap and out:
+            a, b = last, text[0]
+            if gap == "\n" and a not in _JS_JOIN_AFTER:
+                out.append("\n")
+            elif (_JS_WORD.match(a) and _JS_WORD.match(b)) or (a in "+-" and b in "+-") or (a in "/*" and b in "/*") or (a.isdigit() and b == "."):
+                out.append(" ")
+        out.append(text)
+        last, gap = text[-1], ""
+
+    def regex_allowed() -> bool:
+        # After a value ("x /", "f() /", "a[0] /") a slash divides; elsewhere it starts a regex.
+        if last in (")", "]"):
+            return False
+        if last and _JS_WORD.match(last):
+            word = re.search(r"[\w$]*$", "".join(out[-4:])).group()
+            return word in _JS_REGEX_KEYWORDS
+        return True
+
+    while i < n:
+        c = src[i]
+        if c.isspace():
+            gap = "\n" if c == "\n" or gap == "\n" else " "
+            i += 1
+        elif c == "/" and src.startswith("//", i):
+            end = src.find("\n", i)
+            i = n if end < 0 else end
+        elif c == "/" and src.startswith("/*", i):
+            i = src.index("*/", i) + 2
+            gap = gap or " "
+        elif c == "/" and regex_allowed():
+            j = _js_regex_end(src, i)
+            write(src[i:j])
+            i = j
+        elif c in "'\"":
+            j = _js_string_end(src, i, c)
+            write(src[i:j])
+            i = j
+        elif c == "`" or (c == "}" and substitutions and substitutions[-1] == depth - 1):
+            if c == "}":
+                substitutions.pop()
+                depth -= 1
+            j, opens = _js_template_end(src, i)
+            if opens:
+                substitutions.append(depth)
+                depth += 1
+            write(src[i:j])
+            i = j
+        elif c in "{}":
+            depth += 1 if c == "{" else -1
+            write(c)
+            i += 1
+        else:
+            m = _JS_SPECIAL.search(src, i + 1)
+            j = m.start() if m else n
+            write(src[i:j])
+            i = j
+    return "".join(out)
+
+
+def minify_css(src: str) -> str:
+    """Drop comments and collapse whitespace (spaces before ':' stay: they separate selectors)."""
+    src = re.sub(r"/\*.*?\*/", "", src, flags=re.S)
+    src = re.sub(r"\s+", " ", src)
+    src = re.sub(r"\s*([{};,>])\s*", r"\1", src)
+    src = re.sub(r":\s+", ":", src)
+    return src.replace(";}", "}").strip()
+
+
+def minify_html(page: str) -> str:
+    """Minify the <style> and inline <script> blocks and strip markup indentation."""
+    parts = re.split(r"(<style>.*?</style>|<script>.*?</script>)", page, flags=re.S)
+    for k, part in enumerate(parts):
+        if part.startswith("<style>"):
+            parts[k] = "<style>" + minify_css(part[7:-8]) + "</style>"
+        elif part.startswith("<script>"):
+            parts[k] = "<script>" + minify_js(part[8:-9]) + "</script>"
+        else:
+            parts[k] = re.sub(r"[ \t]*\n\s*", "\n", part)
+    return "".join(parts)
+
+
+def render_html(payload_html: str = "", minify: bool = False) -> str:
+    engine, page, worker = ENGINE_JS, HTML, WORKER_JS
+    if minify:
+        engine, page, worker = minify_js(ENGINE_JS), minify_html(HTML), minify_js(WORKER_JS)
+    worker_src = json.dumps(worker).replace("</", "<\\/")
+    return (
+        page.replace("__ENGINE_JS__", engine)
+        .replace("__WORKER_SRC__", worker_src)
+        .replace("__PAYLOAD__\n", payload_html)
+    )
+
+
+def build_payload_html(
+    csv_path: str, rest_threshold: float, baseline_mode: str, bin_path: Optional[Path] = None, extra_columns: Sequence[str] = ()
+) -> str:
+    """Precompute the analysis for csv_path; returns the <script> tags to embed.
+
+    csv_path may also be a Parquet file/directory or Arrow IPC file, read with
+    column projection (extra_columns keeps optional columns for the
+    availability filter). With bin_path the column buffer is written there and the page fetches it by
+    its file name (relative to the HTML).
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+    from app.analytics.arrow_io import read_shifts
+    from app.analytics.double_bubble import Params
+    from app.analytics.payload import build_payload, header_json, payload_base64
+
+    header, buf = build_payload(read_shifts(csv_path, extra_columns), Params(rest_threshold=rest_threshold, baseline_mode=baseline_mode))
+    if bin_path is not None:
+        bin_path.write_bytes(buf)
+        header["bin"] = bin_path.name
+        return f'  <script id="dbPayload" type="application/json">{header_json(header)}</script>\n'
+    return (
+        f'  <script id="dbPayload" type="application/json">{header_json(header)}</script>\n'
+        f'  <script id="dbPayloadData" type="application/octet-stream">{payload_base64(buf)}</script>\n'
+    )
+
+
+def write_compressed(path: Path, encodings: Sequence[str]) -> List[Path]:
+    """Write precompressed copies of path (<path>.gz, <path>.br) for a static server to hand out."""
+    data = path.read_bytes()
+    written = []
+    for encoding in encodings:
+        if encoding == "gzip":
+            target, body = path.with_name(path.name + ".gz"), gzip.compress(data, compresslevel=9, mtime=0)
+        elif encoding == "br":
+            try:
+                import brotli
+            except ImportError as exc:  # pragma: no cover
+                raise RuntimeError("brotli not installed. Add 'brotli' to dependencies or use --compress gzip.") from exc
+            target, body = path.with_name(path.name + ".br"), brotli.compress(data, quality=11)
+        else:
+            raise ValueError(f"unknown encoding {encoding!r} (expected gzip or br)")
+        target.write_bytes(body)
+        written.append(target)
+    return written
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--out", default="web/double-bubble-analyzer-multi.html")
+    ap.add_argument("--data", help="Shifts CSV, Parquet or Arrow file to analyze at build time and embed in the page")
+    ap.add_argument("--extra-columns", default="", help="Optional Parquet/Arrow columns to keep for the availability filter (comma-separated)")
+    ap.add_argument("--payload-bin", action="store_true", help="Write the payload to <out>.bin instead of inlining base64")
+    ap.add_argument("--rest-threshold", type=float, default=8.0, help="Rest threshold (hours) for the embedded flags")
+    ap.add_argument("--baseline-mode", choices=["scheduled", "all"], default="scheduled")
+    ap.add_argument("--no-minify", action="store_true", help="Keep the page's CSS/JS as written (for debugging)")
+    ap.add_argument("--compress", default="", help="Also write precompressed copies: gzip, br or gzip,br")
     args = ap.parse_args()
+    encodings = [e.strip() for e in args.compress.split(",") if e.strip()]
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
-    out.write_text(HTML, encoding="utf-8")
+    payload_html, bin_path = "", None
+    if args.data:
+        bin_path = out.with_name(out.name + ".bin") if args.payload_bin else None
+        extra = [c.strip() for c in args.extra_columns.split(",") if c.strip()]
+        payload_html = build_payload_html(args.data, args.rest_threshold, args.baseline_mode, bin_path, extra)
+        if bin_path is not None:
+            print(f"wrote: {bin_path}")
+    out.write_text(render_html(payload_html, minify=not args.no_minify), encoding="utf-8")
     print(f"wrote: {out}")
+    for path in [out] + ([bin_path] if bin_path is not None else []):
+        for target in write_compressed(path, encodings):
+            print(f"wrote: {target}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+# Double-bubble analytics: server-side mirror of the analyzer page pipeline
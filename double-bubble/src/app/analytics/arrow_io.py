@@ -0,0 +1,162 @@
+"""Parquet / Arrow IPC input and Arrow IPC payloads for the double-bubble pipeline.
+
+Warehouse extracts (Athena CTAS / UNLOAD output) arrive as Parquet files or
+hive-partitioned directories. ``read_shifts`` reads them with column
+projection, so only the fields ``normalize_rows`` looks at (plus any
+requested optional columns) are decoded, and returns the same text frame
+``read_shifts_csv`` produces: hour columns as floats, everything else as
+strings with nulls as "".
+
+``build_arrow_payload`` writes the build-time analysis (payload.py) as an
+Arrow IPC stream the page loads directly (decodeArrowPayload in
+build_web.ENGINE_JS): one record batch of per-shift columns, the
+employee/shift_type/cost_center and ``extra:<col>`` columns
+dictionary-encoded, and the payload header (stats, thresholds, baselines)
+as JSON in the schema metadata under ``double_bubble``.
+
+Usage:
+  python -m app.analytics.arrow_io --input data/raw/shifts.parquet --out data/interim/shifts.arrows [--extra-columns crew]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .double_bubble import (
+    COST_CENTER_FIELDS,
+    DATE_FIELDS,
+    EMPLOYEE_FIELDS,
+    END_FIELDS,
+    HOUR_COLUMNS,
+    SHIFT_TIME_FIELDS,
+    START_FIELDS,
+    Params,
+    read_shifts_csv,
+)
+from .payload import payload_columns
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+except Exception:  # pragma: no cover
+    pa = None  # type: ignore
+
+PARQUET_SUFFIXES = frozenset({".parquet", ".pq"})
+ARROW_SUFFIXES = frozenset({".arrow", ".arrows", ".feather", ".ipc"})
+
+# Every field normalize_rows reads, in the order the page documents them.
+SHIFT_FIELDS = EMPLOYEE_FIELDS + DATE_FIELDS + HOUR_COLUMNS + SHIFT_TIME_FIELDS + COST_CENTER_FIELDS + START_FIELDS + END_FIELDS
+
+# Header keys carried in the Arrow schema metadata (dicts/extras travel as Arrow dictionaries).
+_META_KEYS = ("version", "rows", "shifts", "restThreshold", "baselineMode", "stats")
+_DICT_COLUMNS = ("employee", "shift_type", "cost_center")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("pyarrow not installed. Add 'pyarrow' to dependencies.")
+
+
+def projected_columns(names: Iterable[str], extra_columns: Iterable[str] = ()) -> List[str]:
+    """Columns of ``names`` the pipeline reads: the known shift fields plus ``extra_columns``."""
+    present = set(names)
+    wanted = list(SHIFT_FIELDS) + [c for c in extra_columns if c not in SHIFT_FIELDS]
+    return [c for c in wanted if c in present]
+
+
+def frame_from_table(table: "pa.Table") -> pd.DataFrame:
+    """Arrow table -> the text frame ``normalize_rows`` expects (see ``read_shifts_csv``)."""
+    data = {}
+    for name, col in zip(table.column_names, table.columns):
+        t = col.type
+        if name in HOUR_COLUMNS and (pa.types.is_integer(t) or pa.types.is_floating(t) or pa.types.is_decimal(t)):
+            data[name] = col.cast(pa.float64()).to_numpy()
+        else:
+            data[name] = pc.fill_null(col.cast(pa.string()), "").to_numpy(zero_copy_only=False)
+    return pd.DataFrame(data, columns=table.column_names)
+
+
+def read_shifts_table(path: str, extra_columns: Iterable[str] = (), fmt: str = "parquet") -> pd.DataFrame:
+    """Read a Parquet file/directory (``fmt="parquet"``) or Arrow IPC file (``fmt="ipc"``) with projection."""
+    _require_pyarrow()
+    dataset = ds.dataset(path, format=fmt, partitioning="hive" if fmt == "parquet" else None)
+    columns = projected_columns(dataset.schema.names, extra_columns)
+    return frame_from_table(dataset.to_table(columns=columns))
+
+
+def read_shifts(path: str, extra_columns: Iterable[str] = ()) -> pd.DataFrame:
+    """Read shifts from CSV, Parquet (file or partitioned directory) or Arrow IPC.
+
+    CSV is read whole, as the page does; ``extra_columns`` only widens the
+    Parquet/Arrow projection.
+    """
+    p = Path(path)
+    suffix = p.suffix.lower()
+    if suffix in PARQUET_SUFFIXES or p.is_dir():
+        return read_shifts_table(path, extra_columns, "parquet")
+    if suffix in ARROW_SUFFIXES:
+        return read_shifts_table(path, extra_columns, "ipc")
+    return read_shifts_csv(path)
+
+
+def _nan_to_none(values: np.ndarray) -> list:
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def build_arrow_payload(raw: pd.DataFrame, params: Optional[Params] = None) -> bytes:
+    """Analysis payload for ``raw`` as Arrow IPC stream bytes.
+
+    Same columns as ``payload.build_payload`` except that optional columns are
+    stored per shift (``row`` is then the shift index), since a record batch
+    holds columns of one length.
+    """
+    _require_pyarrow()
+    header, columns = payload_columns(raw, params)
+    row = columns.pop("row")
+    baseline = {"start": _nan_to_none(columns.pop("baseline_start_min")), "end": _nan_to_none(columns.pop("baseline_end_min"))}
+    names, arrays = [], []
+    for name, arr in columns.items():
+        if name in _DICT_COLUMNS:
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(arr), pa.array(header["dicts"][name], pa.string())))
+        elif name.startswith("extra:"):
+            values = header["extras"][name[len("extra:"):]]
+            arrays.append(pa.DictionaryArray.from_arrays(pa.array(arr[row]), pa.array(values, pa.string())))
+        else:
+            arrays.append(pa.array(arr))
+        names.append(name)
+    names.append("row")
+    arrays.append(pa.array(np.arange(header["shifts"], dtype=np.int32)))
+    meta = {k: header[k] for k in _META_KEYS}
+    meta["baseline"] = baseline
+    batch = pa.record_batch(arrays, names=names).replace_schema_metadata({"double_bubble": json.dumps(meta, separators=(",", ":"))})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description="Write a double-bubble Arrow IPC payload for the analyzer page")
+    ap.add_argument("--input", required=True, help="Shifts CSV, Parquet file/directory or Arrow IPC file")
+    ap.add_argument("--out", default="data/interim/double_bubble.arrows")
+    ap.add_argument("--extra-columns", default="", help="Comma-separated optional columns to keep (e.g. crew)")
+    ap.add_argument("--rest-threshold", type=float, default=8.0)
+    ap.add_argument("--baseline-mode", choices=["scheduled", "all"], default="scheduled")
+    args = ap.parse_args(argv)
+    extra = [c.strip() for c in args.extra_columns.split(",") if c.strip()]
+    raw = read_shifts(args.input, extra)
+    data = build_arrow_payload(raw, Params(rest_threshold=args.rest_threshold, baseline_mode=args.baseline_mode))
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(data)
+    print(f"wrote: {out} ({len(raw)} rows, {len(data)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
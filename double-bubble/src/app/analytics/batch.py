@@ -0,0 +1,152 @@
+"""Multi-process double-bubble analysis for batch jobs (the nightly flagged export).
+
+Work is split across a ProcessPoolExecutor in one of two ways:
+
+``employee`` (default)
+    Same result as ``double_bubble.analyze``. Normalized shifts are cut into
+    contiguous employee ranges and workers run rest/flags, filters, baselines
+    and deviations per range, all of which are per-employee. The alternates
+    search needs every employee in view, so the parent builds one
+    availability index and workers count alternates for slices of the
+    flagged shifts against it.
+
+``cost-center``
+    One analysis per cost center, as if that center alone were selected in
+    the page: rest gaps still span all of an employee's shifts, baselines and
+    alternates only see the center's shifts.
+
+Either way the flagged shifts merge into one table in single-run order.
+
+Usage:
+  python -m app.analytics.double_bubble --input data/raw/shifts.parquet --workers 16 [--partition cost-center]
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .double_bubble import (
+    AnalysisResult,
+    Params,
+    _availability_values,
+    _employee_codes,
+    alternate_queries,
+    compute_rest_and_flags,
+    compute_view,
+    count_alternates,
+    find_alternates,
+    flagged_with_savings,
+    normalize_rows,
+)
+
+PARTITIONS = ("employee", "cost-center")
+
+# Tasks per worker: uneven ranges (busy employees, large centers) even out across the pool.
+CHUNKS_PER_WORKER = 4
+
+# Set in each worker by the pool initializer: the availability index and flagged-shift queries.
+_WORKER: Dict[str, object] = {}
+
+
+def _pool_map(workers: int, fn: Callable, *iterables: Iterable, initializer=None, initargs=()) -> list:
+    if workers <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        return list(map(fn, *iterables))
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        return list(pool.map(fn, *iterables))
+
+
+def employee_ranges(shifts: pd.DataFrame, parts: int) -> List[Tuple[int, int]]:
+    """Split employee-sorted ``shifts`` into about ``parts`` row ranges that never cut an employee."""
+    n = len(shifts)
+    if n == 0:
+        return []
+    codes = _employee_codes(shifts)
+    firsts = np.r_[np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]), n]
+    cuts = firsts[np.searchsorted(firsts, np.linspace(0, n, parts + 1)[1:-1])]
+    edges = np.unique(np.r_[0, cuts, n])
+    return [(int(lo), int(hi)) for lo, hi in zip(edges[:-1], edges[1:])]
+
+
+def _employee_stages(chunk: pd.DataFrame, params: Params) -> pd.DataFrame:
+    return compute_view(compute_rest_and_flags(chunk, params.rest_threshold), params)
+
+
+def _init_alternates(index, queries, rest_threshold: float) -> None:
+    _WORKER.update(index=index, queries=queries, rest_threshold=rest_threshold)
+
+
+def _alternates_slice(lo: int, hi: int) -> np.ndarray:
+    queries = [q[lo:hi] for q in _WORKER["queries"]]
+    return count_alternates(_WORKER["index"], *queries, _WORKER["rest_threshold"])
+
+
+def _analyze_by_employee(raw: pd.DataFrame, params: Params, workers: int, stats: Dict[str, int]) -> AnalysisResult:
+    base = normalize_rows(raw, stats)
+    chunks = [base.iloc[lo:hi] for lo, hi in employee_ranges(base, workers * CHUNKS_PER_WORKER)]
+    parts = _pool_map(workers, _employee_stages, chunks, [params] * len(chunks))
+    computed = pd.concat(parts, ignore_index=True) if parts else _employee_stages(base, params)
+    index, queries = alternate_queries(computed, raw, params)
+    edges = np.linspace(0, len(queries[0]), workers * CHUNKS_PER_WORKER + 1).astype(np.int64)
+    counts = _pool_map(
+        workers, _alternates_slice, edges[:-1], edges[1:],
+        initializer=_init_alternates, initargs=(index, queries, params.rest_threshold),
+    )
+    alternates = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+    return AnalysisResult(shifts=computed, flagged=flagged_with_savings(computed, alternates, params), stats=stats)
+
+
+def _cost_center_task(shifts: pd.DataFrame, values: np.ndarray, params: Params) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    # ``values`` is the availability value per shift; rows are renumbered to index it.
+    source_row = shifts["row"].to_numpy()
+    local = shifts.assign(row=np.arange(len(shifts)))
+    column = params.availability_column
+    raw = pd.DataFrame({column: values}) if column else pd.DataFrame(index=range(len(shifts)))
+    computed = compute_view(local, params)
+    flagged = flagged_with_savings(computed, find_alternates(computed, raw, params), params)
+    computed["row"] = source_row[computed["row"].to_numpy()]
+    flagged["row"] = source_row[flagged["row"].to_numpy()]
+    return computed, flagged
+
+
+def _analyze_by_cost_center(raw: pd.DataFrame, params: Params, workers: int, stats: Dict[str, int]) -> AnalysisResult:
+    annotated = compute_rest_and_flags(normalize_rows(raw, stats), params.rest_threshold)
+    annotated["_pos"] = np.arange(len(annotated))
+    values = _availability_values(raw, annotated["row"].to_numpy(), params.availability_column)
+    cc = annotated["cost_center"].to_numpy()
+    centers = sorted(set(cc) & set(params.cost_centers) if params.cost_centers else set(cc))
+    tasks = []
+    for center in centers:
+        m = cc == center
+        tasks.append((annotated[m], values[m], replace(params, cost_centers=frozenset([center]))))
+    if not tasks:
+        tasks.append((annotated.iloc[:0], values[:0], params))
+    # Largest centers first so the long tasks start early.
+    tasks.sort(key=lambda t: -len(t[0]))
+    results = _pool_map(workers, _cost_center_task, *zip(*tasks))
+
+    def merged(frames: List[pd.DataFrame]) -> pd.DataFrame:
+        out = pd.concat(frames, ignore_index=True).sort_values("_pos", kind="stable")
+        return out.drop(columns="_pos").reset_index(drop=True)
+
+    return AnalysisResult(shifts=merged([c for c, _ in results]), flagged=merged([f for _, f in results]), stats=stats)
+
+
+def analyze_parallel(
+    raw: pd.DataFrame, params: Optional[Params] = None, workers: Optional[int] = None, partition: str = "employee"
+) -> AnalysisResult:
+    """``double_bubble.analyze`` across ``workers`` processes (default: all cores)."""
+    if partition not in PARTITIONS:
+        raise ValueError(f"partition must be one of {PARTITIONS}, got {partition!r}")
+    params = params or Params()
+    workers = workers or os.cpu_count() or 1
+    stats: Dict[str, int] = {}
+    if partition == "cost-center":
+        return _analyze_by_cost_center(raw, params, workers, stats)
+    return _analyze_by_employee(raw, params, workers, stats)
@@ -0,0 +1,721 @@
+"""Double-bubble analytics over columnar shift data.
+
+Server-side mirror of the analyzer page pipeline in scripts/build_web.py
+(normalizeRows -> computeRestAndFlags -> filters -> perEmployeeBaseline ->
+computeDeviations -> findAlternates). Shifts are held as a DataFrame of NumPy
+columns with ``start``/``end`` as int64 epoch milliseconds of the naive
+wall-clock time, which is what the page renders.
+
+Durations and rest gaps are wall-clock differences. The page measures them
+in the browser's local zone, so the two agree for UTC or fixed-offset zones.
+In a zone with daylight saving time, shifts, rest gaps and baselines that
+span a clock change can differ by the hour.
+
+Usage:
+  python -m app.analytics.double_bubble --csv data/raw/shifts.csv --out data/interim/flagged.csv
+  python -m app.analytics.double_bubble --input data/raw/shifts.parquet --out data/interim/flagged.csv
+  python -m app.analytics.double_bubble --input data/raw/shifts.parquet --workers 16 [--partition cost-center]
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import unicodedata
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .hourly_grid import expand_hourly
+from .timestamps import civil_ms, parse_layouts
+
+MS_PER_HOUR = 3_600_000
+MS_PER_DAY = 86_400_000
+
+HOUR_COLUMNS = [f"{h:02d}" for h in range(24)]
+EMPLOYEE_FIELDS = ["employee_id", "Employee", "emp"]
+DATE_FIELDS = ["calendar_date", "calendarDate", "CalendarDate", "date"]
+START_FIELDS = ["start_datetime", "start", "start_time", "Start"]
+END_FIELDS = ["end_datetime", "end", "end_time", "End"]
+SHIFT_TIME_FIELDS = ["shift_time", "shiftTime", "SHIFT_TIME"]
+COST_CENTER_FIELDS = ["cost_center", "CostCenter", "costCenter", "COST_CENTER"]
+
+SHIFT_TIME_ALIASES = {
+    "reg": "reg",
+    "regular": "reg",
+    "scheduled": "reg",
+    "chol": "chol",
+    "company holiday": "chol",
+    "ot2": "ot2",
+    "ot": "ot2",
+    "overtime 2x": "ot2",
+    "call-in": "call-in",
+    "callin": "call-in",
+    "ot1": "ot1",
+    "overtime 1.5x": "ot1",
+    "plve": "plve",
+    "unpaid leave": "plve",
+    "pto": "pto",
+    "paid time off": "pto",
+}
+SCHEDULED_TYPES = frozenset({"reg", "regular", "scheduled", "chol"})
+OVERTIME_TYPES = frozenset({"ot1", "ot2", "call-in", "callin", "ot"})
+
+FLAGGED_COLUMNS = [
+    "employee_id",
+    "start_datetime",
+    "end_datetime",
+    "duration_hours",
+    "rest_gap_hours",
+    "double_bubble",
+    "shift_type",
+    "deviation_hours",
+    "alternates_available",
+    "est_savings",
+]
+
+SHIFT_COLUMNS = ["employee_id", "start", "end", "shift_type", "cost_center", "row"]
+
+_NAT = np.iinfo(np.int64).min
+_SLASH_DATE = r"^(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})$"
+# ASCII punctuation and symbols in ICU root collation order; all sort before digits and letters.
+_PUNCTUATION_ORDER = " _-,;:!?.'\"()[]{}@*/\\&#%`^+<=>|~$"
+# Date and hour of a generic-path stamp, for the rollovers pandas rejects.
+_ROLLOVER_STAMP = r"^(\d{4})-(\d{1,2})-(\d{1,2}) (\d{1,2})(:\d{2}(?::\d{2}(?:\.\d+)?)?)(.*)$"
+
+
+@dataclass
+class Params:
+    """Analyzer parameters (the page's ``params`` object)."""
+
+    rest_threshold: float = 8.0
+    dev_threshold: float = 1.0
+    baseline_mode: str = "scheduled"
+    base_rate: float = 100.0
+    db_multiplier: float = 2.0
+    date_start: Optional[date] = None
+    date_end: Optional[date] = None
+    days_of_week: Optional[FrozenSet[int]] = None  # 0=Sunday, as Date.getDay()
+    cost_centers: Optional[FrozenSet[str]] = None
+    availability_column: str = ""
+
+
+@dataclass
+class AnalysisResult:
+    shifts: pd.DataFrame
+    flagged: pd.DataFrame
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+def canonical_shift_type(value: str) -> str:
+    norm = value.strip().lower()
+    return SHIFT_TIME_ALIASES.get(norm, norm)
+
+
+def _map_unique(values: pd.Series, fn: Callable[[str], str]) -> np.ndarray:
+    # Apply ``fn`` once per distinct value; payroll columns are low-cardinality.
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    mapped = np.array([fn(str(u)) for u in uniques] + [""], dtype=object)
+    return mapped[codes]
+
+
+def _parse_unique(values: pd.Series, parser: Callable[[pd.Series], np.ndarray]) -> np.ndarray:
+    # Dates and hour fractions repeat heavily across rows; parse each once.
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return parser(pd.Series(uniques, dtype=object))[codes]
+
+
+def _to_float(values: pd.Series) -> np.ndarray:
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _text(raw: pd.DataFrame, name: str) -> pd.Series:
+    return raw[name].fillna("").astype(str)
+
+
+def _first_present(raw: pd.DataFrame, fields: List[str]) -> Optional[pd.Series]:
+    # Mirrors ``row.a ?? row.b ?? ...``: the first column that exists wins.
+    for name in fields:
+        if name in raw.columns:
+            return _text(raw, name)
+    return None
+
+
+def _first_nonempty(raw: pd.DataFrame, fields: List[str], fn: Callable[[str], str]) -> np.ndarray:
+    out = np.full(len(raw), "", dtype=object)
+    for name in fields:
+        if name not in raw.columns:
+            continue
+        vals = _text(raw, name).to_numpy(dtype=object)
+        take = (out == "") & (vals != "")
+        out[take] = vals[take]
+    return _map_unique(pd.Series(out), fn)
+
+
+def _naive_ms(values: pd.Series) -> np.ndarray:
+    parsed = pd.to_datetime(values, errors="coerce", format="mixed", utc=True).dt.tz_localize(None)
+    ms = parsed.to_numpy(dtype="datetime64[ms]").astype(np.int64)
+    return np.where(parsed.isna().to_numpy(), _NAT, ms)
+
+
+def collation_key(text: str) -> tuple:
+    """Sort key approximating the page's ``localeCompare`` (ICU root collation).
+
+    Base characters decide first (punctuation < digits < letters, ignoring
+    case and accents), then accents, then case with lowercase first, so
+    ``a3 < Ä4 < A6 < b1 < B2 < é5``. Matches ICU for ASCII and accented Latin
+    IDs; other scripts sort after Latin by code point.
+    """
+    primary, accents, case = [], [], []
+    for ch in unicodedata.normalize("NFD", text):
+        if unicodedata.combining(ch):
+            if accents:
+                accents[-1] += (ord(ch),)
+            continue
+        low = ch.lower()
+        rank = _PUNCTUATION_ORDER.find(low)
+        if rank >= 0 or low.isspace():
+            primary.append((0, max(rank, 0)))
+        elif low.isdigit():
+            primary.append((2, unicodedata.digit(low, 0)))
+        elif low.isalpha():
+            primary.append((3, ord(low)))
+        else:
+            primary.append((1, ord(low)))
+        accents.append(())
+        case.append(low != ch)
+    return tuple(primary), tuple(accents), tuple(case)
+
+
+def _collation_codes(values: np.ndarray) -> np.ndarray:
+    # Rank of each value in collation_key order; values comparing equal share a rank,
+    # as in the page's shiftColumnsOrder.
+    codes, uniques = pd.factorize(values)
+    keys = [collation_key(str(u)) for u in uniques]
+    rank = np.empty(len(keys), dtype=np.int64)
+    prev = None
+    for k, c in enumerate(sorted(range(len(keys)), key=keys.__getitem__)):
+        rank[c] = rank[prev] if prev is not None and keys[prev] == keys[c] else k
+        prev = c
+    return rank[codes]
+
+
+def _roll_over(values: pd.Series) -> pd.Series:
+    """Rewrite ``Y-M-D h:mm...`` stamps whose day runs past the month end
+    (up to 31) or whose time is ``24:00`` to the date ``new Date(string)``
+    gives: ``02-30`` is March 2, ``24:00`` the next midnight.
+    """
+    parts = values.str.extract(_ROLLOVER_STAMP)
+    hit = np.flatnonzero(parts[0].notna().to_numpy())
+    parts = parts.iloc[hit]
+    y, m, d, h = (parts[k].astype(np.int64).to_numpy() for k in range(4))
+    midnight = parts[4].str.fullmatch(r"[:.0]*").to_numpy()
+    ok = (m >= 1) & (m <= 12) & (d >= 1) & (d <= 31) & ((h <= 23) | ((h == 24) & midnight))
+    out = values.copy()
+    if ok.any():
+        day = civil_ms(y[ok], m[ok], d[ok]) + np.where(h[ok] == 24, MS_PER_DAY, 0)
+        date = np.datetime_as_string(day.astype("datetime64[ms]"), unit="D").astype(object)
+        hour = np.char.zfill((h[ok] % 24).astype(str), 2).astype(object)
+        out.iloc[hit[ok]] = date + " " + hour + parts[4].to_numpy(dtype=object)[ok] + parts[5].to_numpy(dtype=object)[ok]
+    return out
+
+
+def parse_calendar_dates(values: pd.Series) -> np.ndarray:
+    """Vectorized ``parseCalendarDate``: midnight epoch ms, or ``_NAT``."""
+    text = values.fillna("").astype(str).str.strip()
+    out, done = parse_layouts(text.to_numpy(dtype=object), calendar=True)
+    rest = ~done & (text != "").to_numpy()
+    parts = text[rest].str.extract(_SLASH_DATE)
+    slash = np.flatnonzero(rest)[parts[0].notna().to_numpy()]
+    if len(slash):
+        parts = parts.dropna()
+        mm = parts[0].astype(np.int64).to_numpy()
+        dd = parts[1].astype(np.int64).to_numpy()
+        yy = parts[2].astype(np.int64).to_numpy()
+        yy = np.where(yy < 100, yy + 2000, yy)
+        out[slash] = civil_ms(yy, mm, dd)
+        rest[slash] = False
+    if rest.any():
+        ms = _naive_ms(text[rest])
+        ok = ms != _NAT
+        ms[ok] = ms[ok] - ms[ok] % MS_PER_DAY
+        out[rest] = ms
+    return out
+
+
+def parse_datetimes(values: pd.Series) -> np.ndarray:
+    """Vectorized ``parseMaybe``: epoch ms, or ``_NAT``."""
+    text = values.fillna("").astype(str).str.strip()
+    out, done = parse_layouts(text.to_numpy(dtype=object))
+    rest = ~done & (text != "").to_numpy()
+    if rest.any():
+        generic = text[rest].str.replace("/", "-", regex=False)
+        date_only = generic.str.fullmatch(r"\d{4}-\d{2}-\d{2}")
+        generic = generic.where(~date_only, generic + " 00:00").str.replace("T", " ", n=1, regex=False)
+        ms = _naive_ms(generic)
+        retry = ms == _NAT
+        if retry.any():
+            ms[retry] = _naive_ms(_roll_over(generic[retry]))
+        out[rest] = ms
+    return out
+
+
+def normalize_rows(raw: pd.DataFrame, stats: Optional[Dict[str, int]] = None) -> pd.DataFrame:
+    """Normalize hourly-grid and legacy start/end rows into sorted shifts.
+
+    Returns one row per contiguous segment with ``SHIFT_COLUMNS``; ``row`` is
+    the positional index of the source row in ``raw``.
+    """
+    n = len(raw)
+    emp_col = _first_present(raw, EMPLOYEE_FIELDS)
+    emp = _map_unique(emp_col, str.strip) if emp_col is not None else np.full(n, "", dtype=object)
+    typ = _first_nonempty(raw, SHIFT_TIME_FIELDS, canonical_shift_type)
+    cc = _first_nonempty(raw, COST_CENTER_FIELDS, str.strip)
+
+    date_col = _first_present(raw, DATE_FIELDS)
+    hour_cols = [c for c in HOUR_COLUMNS if c in raw.columns]
+    if date_col is not None and hour_cols:
+        hourly = (date_col != "").to_numpy()
+    else:
+        hourly = np.zeros(n, dtype=bool)
+
+    has_emp = emp != ""
+    has_typ = typ != ""
+    has_cc = cc != ""
+
+    # Hourly rows: employee/date checked before shift_time/cost_center.
+    h_idx = np.flatnonzero(hourly)
+    day = _parse_unique(date_col.iloc[h_idx], parse_calendar_dates) if len(h_idx) else np.empty(0, dtype=np.int64)
+    h_ok = has_emp[h_idx] & (day != _NAT)
+    h_missing_typ = h_ok & ~has_typ[h_idx]
+    h_missing_cc = h_ok & has_typ[h_idx] & ~has_cc[h_idx]
+    keep = h_ok & has_typ[h_idx] & has_cc[h_idx]
+    h_idx, day = h_idx[keep], day[keep]
+    matrix = np.zeros((len(h_idx), 24), dtype=np.float64)
+    for col in hour_cols:
+        matrix[:, int(col)] = _parse_unique(raw[col].iloc[h_idx], _to_float)
+    seg_rows, h_start, h_end = expand_hourly(matrix, day)
+    h_row = h_idx[seg_rows]
+
+    # Legacy rows: shift_time/cost_center checked before employee/start/end.
+    l_idx = np.flatnonzero(~hourly)
+    l_missing_typ = ~has_typ[l_idx]
+    l_missing_cc = has_typ[l_idx] & ~has_cc[l_idx]
+    l_checked = l_idx[has_typ[l_idx] & has_cc[l_idx]]
+    l_idx = l_checked[has_emp[l_checked]]
+    start_col = _first_present(raw, START_FIELDS)
+    end_col = _first_present(raw, END_FIELDS)
+    if len(l_idx) and start_col is not None and end_col is not None:
+        l_start = _parse_unique(start_col.iloc[l_idx], parse_datetimes)
+        l_end = _parse_unique(end_col.iloc[l_idx], parse_datetimes)
+        ok = (l_start != _NAT) & (l_end != _NAT)
+        l_idx, l_start, l_end = l_idx[ok], l_start[ok], l_end[ok]
+        l_end = np.where(l_end < l_start, l_end + MS_PER_DAY, l_end)
+    else:
+        l_idx = np.empty(0, dtype=np.int64)
+        l_start = l_end = np.empty(0, dtype=np.int64)
+
+    if stats is not None:
+        stats["missing_shift_time"] = stats.get("missing_shift_time", 0) + int(h_missing_typ.sum() + l_missing_typ.sum())
+        stats["missing_cost_center"] = stats.get("missing_cost_center", 0) + int(h_missing_cc.sum() + l_missing_cc.sum())
+        # No employee or no readable date/start/end (the page's invalidRows).
+        invalid = int((~h_ok).sum()) + len(l_checked) - len(l_idx)
+        stats["invalid_rows"] = stats.get("invalid_rows", 0) + invalid
+
+    row = np.concatenate([h_row, l_idx]).astype(np.int64)
+    start = np.concatenate([h_start, l_start]).astype(np.int64)
+    end = np.concatenate([h_end, l_end]).astype(np.int64)
+    # Source order (row, then segment) is the final tie-break of the page's stable sort.
+    seq = np.lexsort((start, row))
+    row, start, end = row[seq], start[seq], end[seq]
+    emp_codes = _collation_codes(emp[row])
+    order = np.lexsort((end, start, emp_codes))
+    row = row[order]
+    return pd.DataFrame(
+        {
+            "employee_id": emp[row],
+            "start": start[order],
+            "end": end[order],
+            "shift_type": typ[row],
+            "cost_center": cc[row],
+            "row": row,
+        }
+    )
+
+
+def _employee_codes(shifts: pd.DataFrame) -> np.ndarray:
+    codes, _ = pd.factorize(shifts["employee_id"].to_numpy(), sort=False)
+    return codes
+
+
+def compute_rest_and_flags(shifts: pd.DataFrame, rest_threshold: float) -> pd.DataFrame:
+    """Rest gap to the employee's previous shift and the double-bubble flag."""
+    out = shifts.copy()
+    codes = _employee_codes(out)
+    start = out["start"].to_numpy()
+    end = out["end"].to_numpy()
+    same = np.zeros(len(out), dtype=bool)
+    same[1:] = codes[1:] == codes[:-1]
+    gap = np.full(len(out), np.nan)
+    gap[1:] = (start[1:] - end[:-1]) / MS_PER_HOUR
+    gap[~same] = np.nan
+    prev_ot = np.zeros(len(out), dtype=bool)
+    prev_ot[1:] = out["shift_type"].isin(OVERTIME_TYPES).to_numpy()[:-1]
+    with np.errstate(invalid="ignore"):
+        out["rest_gap_h"] = gap
+        out["double_bubble"] = same & prev_ot & (gap < rest_threshold)
+    return out
+
+
+def day_of_week(ms: np.ndarray) -> np.ndarray:
+    """``Date.getDay()`` for epoch ms (0=Sunday); 1970-01-01 was a Thursday."""
+    return (ms // MS_PER_DAY + 4) % 7
+
+
+def _date_ms(d: date) -> int:
+    return (d - date(1970, 1, 1)).days * MS_PER_DAY
+
+
+def apply_date_filter(shifts: pd.DataFrame, params: Params) -> pd.DataFrame:
+    if params.date_start is None and params.date_end is None:
+        return shifts
+    start = shifts["start"].to_numpy()
+    mask = np.ones(len(shifts), dtype=bool)
+    if params.date_start is not None:
+        mask &= start >= _date_ms(params.date_start)
+    if params.date_end is not None:
+        mask &= start <= _date_ms(params.date_end) + MS_PER_DAY - 1000
+    return shifts[mask]
+
+
+def apply_day_of_week_filter(shifts: pd.DataFrame, params: Params) -> pd.DataFrame:
+    days = params.days_of_week
+    if not days or len(days) == 7:
+        return shifts
+    return shifts[np.isin(day_of_week(shifts["start"].to_numpy()), list(days))]
+
+
+def apply_cost_center_filter(shifts: pd.DataFrame, params: Params) -> pd.DataFrame:
+    centers = params.cost_centers
+    if not centers:
+        return shifts
+    return shifts[shifts["cost_center"].isin(centers).to_numpy()]
+
+
+def minutes_of_day(ms: np.ndarray) -> np.ndarray:
+    # Whole seconds only, like getHours()*60 + getMinutes() + getSeconds()/60.
+    return (ms % MS_PER_DAY // 1000) / 60.0
+
+
+def per_employee_baseline(shifts: pd.DataFrame, mode: str = "scheduled") -> pd.DataFrame:
+    """Median start/end minute-of-day per employee.
+
+    In ``scheduled`` mode only REG/CHOL shifts count, falling back to all of
+    an employee's shifts when they have none.
+    """
+    frame = pd.DataFrame(
+        {
+            "employee_id": shifts["employee_id"].to_numpy(),
+            "start_min": minutes_of_day(shifts["start"].to_numpy()),
+            "end_min": minutes_of_day(shifts["end"].to_numpy()),
+        }
+    )
+    if mode == "scheduled":
+        sched = shifts["shift_type"].isin(SCHEDULED_TYPES).to_numpy()
+        has_sched = pd.Series(sched).groupby(frame["employee_id"]).transform("any").to_numpy()
+        frame = frame[sched | ~has_sched]
+    return frame.groupby("employee_id", sort=False)[["start_min", "end_min"]].median()
+
+
+def compute_deviations(shifts: pd.DataFrame, baseline: pd.DataFrame, dev_threshold: float) -> pd.DataFrame:
+    out = shifts.copy()
+    bl = baseline.reindex(out["employee_id"].to_numpy())
+    d_start = np.abs(minutes_of_day(out["start"].to_numpy()) - bl["start_min"].to_numpy()) / 60
+    d_end = np.abs(minutes_of_day(out["end"].to_numpy()) - bl["end_min"].to_numpy()) / 60
+    dev = np.nan_to_num(np.maximum(d_start, d_end), nan=0.0)
+    out["dev_hours"] = dev
+    out["deviation"] = dev > dev_threshold
+    return out
+
+
+@dataclass
+class AvailabilityIndex:
+    """Start-sorted shift arrays for windowed availability queries.
+
+    Built once per recompute. ``next_start`` holds the start of the same
+    employee's following shift, so "last shift ending by t" is a mask test
+    instead of a per-employee scan.
+    """
+
+    start: np.ndarray
+    end: np.ndarray
+    emp: np.ndarray
+    next_start: np.ndarray
+    max_duration: int
+    sample: np.ndarray  # availability value code per employee
+    empty_code: int
+    pool_size: np.ndarray  # compatible employees per availability value code
+
+    @property
+    def n_employees(self) -> int:
+        return len(self.sample)
+
+
+def build_availability_index(shifts: pd.DataFrame, sample: np.ndarray, empty_code: int, n_values: int) -> AvailabilityIndex:
+    """Index the (filtered) shifts; ``sample`` is each employee's value code."""
+    codes = _employee_codes(shifts)
+    start = shifts["start"].to_numpy()
+    end = shifts["end"].to_numpy()
+    nxt = np.full(len(shifts), np.iinfo(np.int64).max, dtype=np.int64)
+    if len(shifts) > 1:
+        same = codes[1:] == codes[:-1]
+        nxt[:-1] = np.where(same, start[1:], nxt[:-1])
+    # Per employee this is the page's start-sorted list order.
+    order = np.lexsort((np.arange(len(shifts)), end, start))
+    counts = np.bincount(sample, minlength=n_values)
+    pool_size = counts + counts[empty_code]
+    pool_size[empty_code] = len(sample)
+    return AvailabilityIndex(
+        start=start[order],
+        end=end[order],
+        emp=codes[order],
+        next_start=nxt[order],
+        max_duration=int((end - start).max()) if len(shifts) else 0,
+        sample=sample,
+        empty_code=empty_code,
+        pool_size=pool_size,
+    )
+
+
+def count_alternates(
+    index: AvailabilityIndex,
+    flag_start: np.ndarray,
+    flag_end: np.ndarray,
+    flag_emp: np.ndarray,
+    flag_value: np.ndarray,
+    rest_threshold: float,
+) -> np.ndarray:
+    """Number of other employees free during each flagged shift.
+
+    Free means no overlapping shift and at least ``rest_threshold`` hours
+    since the end of their last shift ending by its start, a zero-length one
+    starting right there included (same rule as the page's findAlternates). ``flag_value`` is the flagged row's availability
+    value code; employees match when either side is empty or both agree.
+    Only shifts inside ``[start - rest - max_duration, max(end, start + 1))``
+    can disqualify anyone, so each query is a window slice rather than a scan
+    of everyone.
+    """
+    counts = np.zeros(len(flag_start), dtype=np.int64)
+    mark = np.zeros(index.n_employees, dtype=bool)
+    empty = index.empty_code
+    lookback = int(np.ceil(rest_threshold * MS_PER_HOUR)) + index.max_duration + 1
+    los = np.searchsorted(index.start, flag_start - lookback, "left")
+    his = np.searchsorted(index.start, np.maximum(flag_end, flag_start + 1), "left")
+    for i in range(len(flag_start)):
+        lo, hi = los[i], his[i]
+        f_start = flag_start[i]
+        s = index.start[lo:hi]
+        e = index.end[lo:hi]
+        busy = (e > f_start) & (s < flag_end[i])
+        last_pre = (e <= f_start) & (index.next_start[lo:hi] >= f_start)
+        short_rest = last_pre & ((f_start - e) / MS_PER_HOUR < rest_threshold)
+        hit = index.emp[lo:hi][busy | short_rest]
+        mark[hit] = True
+        excluded = np.flatnonzero(mark)
+        mark[hit] = False
+        value = flag_value[i]
+        me = flag_emp[i]
+        if value == empty:
+            n_excluded = len(excluded)
+            me_in_pool = True
+        else:
+            sample = index.sample[excluded]
+            n_excluded = int(np.count_nonzero((sample == value) | (sample == empty)))
+            me_in_pool = index.sample[me] in (value, empty)
+        me_free = me_in_pool and not np.any(excluded == me)
+        counts[i] = index.pool_size[value] - n_excluded - int(me_free)
+    return counts
+
+
+def _availability_values(raw: pd.DataFrame, rows: np.ndarray, column: str) -> np.ndarray:
+    if not column or column not in raw.columns:
+        return np.full(len(rows), "", dtype=object)
+    return _text(raw, column).to_numpy(dtype=object)[rows]
+
+
+def alternate_queries(shifts: pd.DataFrame, raw: pd.DataFrame, params: Params):
+    """Availability index over ``shifts`` and the ``count_alternates`` arguments for its flagged shifts.
+
+    An employee's availability value is taken from the source row of their
+    earliest shift, as the page's buildAvailabilityIndex does. Returns
+    ``(index, (flag_start, flag_end, flag_emp, flag_value))``.
+    """
+    codes = _employee_codes(shifts)
+    values = _availability_values(raw, shifts["row"].to_numpy(), params.availability_column)
+    value_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    uniques = list(uniques)
+    empty_code = uniques.index("") if "" in uniques else len(uniques)
+    first = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, dtype=np.int64)
+    index = build_availability_index(shifts, value_codes[first], empty_code, len(uniques) + 1)
+    flagged = shifts["double_bubble"].to_numpy()
+    queries = (shifts["start"].to_numpy()[flagged], shifts["end"].to_numpy()[flagged], codes[flagged], value_codes[flagged])
+    return index, queries
+
+
+def find_alternates(shifts: pd.DataFrame, raw: pd.DataFrame, params: Params) -> np.ndarray:
+    """Alternates count for every double-bubble shift in ``shifts``."""
+    index, queries = alternate_queries(shifts, raw, params)
+    return count_alternates(index, *queries, params.rest_threshold)
+
+
+def compute_view(annotated: pd.DataFrame, params: Params) -> pd.DataFrame:
+    """Filters, baseline and deviations (the page's stages 2-6) over ``compute_rest_and_flags`` output."""
+    computed = apply_date_filter(annotated, params)
+    computed = apply_day_of_week_filter(computed, params)
+    computed = apply_cost_center_filter(computed, params).reset_index(drop=True)
+    baseline = per_employee_baseline(computed, params.baseline_mode)
+    return compute_deviations(computed, baseline, params.dev_threshold)
+
+
+def flagged_with_savings(computed: pd.DataFrame, alternates: np.ndarray, params: Params) -> pd.DataFrame:
+    """The double-bubble shifts of ``computed`` with alternates and estimated savings."""
+    flagged = computed[computed["double_bubble"].to_numpy()].copy()
+    flagged["alternates"] = alternates
+    hours = np.maximum(0, (flagged["end"] - flagged["start"]).to_numpy() / MS_PER_HOUR)
+    premium = params.base_rate * params.db_multiplier
+    flagged["est_savings"] = np.where(flagged["alternates"].to_numpy() > 0, (premium - params.base_rate) * hours, 0.0)
+    return flagged.reset_index(drop=True)
+
+
+def analyze(raw: pd.DataFrame, params: Optional[Params] = None) -> AnalysisResult:
+    """Run the full pipeline (the page's recomputeAll) over raw CSV rows."""
+    params = params or Params()
+    stats: Dict[str, int] = {}
+    base = normalize_rows(raw, stats)
+    computed = compute_view(compute_rest_and_flags(base, params.rest_threshold), params)
+    flagged = flagged_with_savings(computed, find_alternates(computed, raw, params), params)
+    return AnalysisResult(shifts=computed, flagged=flagged, stats=stats)
+
+
+def fmt2(values: np.ndarray) -> np.ndarray:
+    """``(Math.round(n*100)/100).toFixed(2)`` element-wise."""
+    rounded = np.floor(np.asarray(values, dtype=np.float64) * 100 + 0.5) / 100 + 0.0
+    return np.array([f"{v:.2f}" for v in rounded], dtype=object)
+
+
+def local_iso(ms: np.ndarray) -> np.ndarray:
+    """``toLocalISO``: ``YYYY-MM-DD HH:MM``."""
+    text = np.datetime_as_string(np.asarray(ms, dtype=np.int64).astype("datetime64[ms]"), unit="m")
+    return pd.Series(text, dtype=object).str.replace("T", " ", regex=False).to_numpy(dtype=object)
+
+
+def flagged_table(flagged: pd.DataFrame) -> pd.DataFrame:
+    """Flagged shifts in the page's exportFlaggedCSV schema."""
+    start = flagged["start"].to_numpy()
+    end = flagged["end"].to_numpy()
+    rest = flagged["rest_gap_h"].to_numpy()
+    rest_txt = fmt2(np.nan_to_num(rest))
+    rest_txt[np.isnan(rest)] = ""
+    dev_txt = fmt2(flagged["dev_hours"].to_numpy())
+    dev_txt[~flagged["deviation"].to_numpy()] = "0"
+    return pd.DataFrame(
+        {
+            "employee_id": flagged["employee_id"].to_numpy(),
+            "start_datetime": local_iso(start),
+            "end_datetime": local_iso(end),
+            "duration_hours": fmt2((end - start) / MS_PER_HOUR),
+            "rest_gap_hours": rest_txt,
+            "double_bubble": np.where(flagged["double_bubble"].to_numpy(), "1", "0"),
+            "shift_type": flagged["shift_type"].to_numpy(),
+            "deviation_hours": dev_txt,
+            "alternates_available": flagged["alternates"].to_numpy(),
+            "est_savings": fmt2(flagged["est_savings"].to_numpy()),
+        },
+        columns=FLAGGED_COLUMNS,
+    )
+
+
+def flagged_csv_text(flagged: pd.DataFrame) -> str:
+    # Header unquoted, every value quoted, as exportFlaggedCSV writes it.
+    buf = io.StringIO()
+    buf.write(",".join(FLAGGED_COLUMNS) + "\n")
+    flagged_table(flagged).to_csv(buf, index=False, header=False, quoting=csv.QUOTE_ALL, lineterminator="\n")
+    return buf.getvalue()
+
+
+def read_shifts_csv(path: str) -> pd.DataFrame:
+    """Read a shifts CSV as text columns, like Papa.parse(header:true)."""
+    return pd.read_csv(path, dtype=str, keep_default_na=False, skip_blank_lines=True)
+
+
+def _parse_set(text: Optional[str], cast=str):
+    if not text:
+        return None
+    return frozenset(cast(v.strip()) for v in text.split(",") if v.strip())
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(description="Double-bubble analysis over a shifts CSV or Parquet/Arrow extract")
+    ap.add_argument(
+        "--input", "--csv", dest="input", required=True,
+        help="Hourly-grid or legacy start/end shifts: CSV, Parquet file/directory or Arrow IPC file",
+    )
+    ap.add_argument("--out", default="data/interim/double_bubble_flagged.csv")
+    ap.add_argument("--rest-threshold", type=float, default=8.0)
+    ap.add_argument("--dev-threshold", type=float, default=1.0)
+    ap.add_argument("--baseline-mode", choices=["scheduled", "all"], default="scheduled")
+    ap.add_argument("--base-rate", type=float, default=100.0)
+    ap.add_argument("--db-multiplier", type=float, default=2.0)
+    ap.add_argument("--date-start", type=date.fromisoformat)
+    ap.add_argument("--date-end", type=date.fromisoformat)
+    ap.add_argument("--days", help="Comma-separated days of week, 0=Sunday")
+    ap.add_argument("--cost-centers", help="Comma-separated cost centers (default: all)")
+    ap.add_argument("--availability-column", default="")
+    ap.add_argument("--workers", type=int, default=1, help="Worker processes (0 = all cores); see app.analytics.batch")
+    ap.add_argument(
+        "--partition", choices=["employee", "cost-center"], default="employee",
+        help="Split by employee (same result as one process) or analyze each cost center on its own",
+    )
+    return ap
+
+
+def params_from_args(args: argparse.Namespace) -> Params:
+    return Params(
+        rest_threshold=args.rest_threshold,
+        dev_threshold=args.dev_threshold,
+        baseline_mode=args.baseline_mode,
+        base_rate=args.base_rate,
+        db_multiplier=args.db_multiplier,
+        date_start=args.date_start,
+        date_end=args.date_end,
+        days_of_week=_parse_set(args.days, int),
+        cost_centers=_parse_set(args.cost_centers),
+        availability_column=args.availability_column,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .arrow_io import read_shifts
+
+    args = build_arg_parser().parse_args(argv)
+    params = params_from_args(args)
+    raw = read_shifts(args.input, [params.availability_column] if params.availability_column else [])
+    if args.workers == 1 and args.partition == "employee":
+        result = analyze(raw, params)
+    else:
+        from .batch import analyze_parallel
+
+        result = analyze_parallel(raw, params, workers=args.workers or None, partition=args.partition)
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(flagged_csv_text(result.flagged), encoding="utf-8")
+    skipped = ", ".join(f"{k}={v}" for k, v in result.stats.items() if v)
+    print(f"wrote: {out} ({len(result.flagged)} flagged of {len(result.shifts)} shifts{'; skipped ' + skipped if skipped else ''})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Vectorized hourly-grid expansion: wide ``00..23`` hour columns -> shift intervals.
+
+NumPy version of the page's expandHourlyRow for a (rows x 24) matrix of hours
+worked per slot. Non-zero slots are run-length merged into intervals; a slot
+continues the previous one only when the previous slot was a full hour
+(``slotStart == current.end`` on the page), and each interval's last slot is
+clamped to one hour. Used by double_bubble.normalize_rows (and so by
+build_web.py --data) and by batch jobs that already hold the grid as a
+matrix.
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+import numpy as np
+
+MS_PER_HOUR = 3_600_000
+SLOTS = 24
+
+# Rows per block: bounds the boolean temporaries (a few x rows x 24 bytes) on large grids.
+DEFAULT_CHUNK_ROWS = 1 << 16
+
+
+def _expand_block(hours: np.ndarray, day_ms: np.ndarray, offset: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # NaN and inf never count; ``full`` is ``trunc(min(v, 1) * 1h) >= 1h`` without the clamped copy.
+    pos = np.isfinite(hours)
+    pos &= hours > 0
+    full = pos & (np.multiply(hours, MS_PER_HOUR, dtype=np.float64) >= MS_PER_HOUR)
+    starts = pos.copy()
+    starts[:, 1:] &= ~full[:, :-1]
+    ends = pos
+    ends[:, :-1] &= ~(full[:, :-1] & pos[:, 1:])
+    rows, h_start = np.nonzero(starts)
+    del starts
+    end_rows, h_end = np.nonzero(ends)
+    # Row-major order pairs the k-th start with the k-th end.
+    day = day_ms[rows].astype(np.int64)
+    start = day + h_start.astype(np.int64) * MS_PER_HOUR
+    last = np.minimum(hours[end_rows, h_end].astype(np.float64), 1.0)
+    end = day_ms[end_rows].astype(np.int64) + h_end.astype(np.int64) * MS_PER_HOUR + np.trunc(last * MS_PER_HOUR).astype(np.int64)
+    return rows.astype(np.int64) + offset, start, end
+
+
+def expand_hourly(
+    hours: np.ndarray, day_ms: np.ndarray, chunk_rows: int = DEFAULT_CHUNK_ROWS
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Merge contiguous non-zero hour slots into ``(row_idx, start, end)`` arrays.
+
+    ``hours`` is (rows x 24) float (float32 is fine), ``day_ms`` the midnight
+    of each row in ms. Intervals come out ordered by row, then start.
+    """
+    hours = np.asarray(hours)
+    if hours.ndim != 2 or hours.shape[1] != SLOTS:
+        raise ValueError(f"expected a (rows x {SLOTS}) hour matrix, got shape {hours.shape}")
+    day_ms = np.asarray(day_ms)
+    if len(day_ms) != len(hours):
+        raise ValueError(f"day_ms has {len(day_ms)} entries for {len(hours)} rows")
+    n = len(hours)
+    if n <= chunk_rows:
+        return _expand_block(hours, day_ms, 0)
+    parts = [_expand_block(hours[i : i + chunk_rows], day_ms[i : i + chunk_rows], i) for i in range(0, n, chunk_rows)]
+    return tuple(np.concatenate(p) for p in zip(*parts))  # type: ignore[return-value]
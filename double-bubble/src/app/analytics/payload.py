@@ -0,0 +1,130 @@
+"""Columnar analysis payload embedded into the analyzer page.
+
+build_web.py --data runs normalization, rest/flag computation and baselines
+here at build time; the page decodes the typed-array columns directly
+instead of parsing and normalizing CSV text. Layout: one little-endian
+buffer of 8-byte aligned columns plus a JSON header that lists
+``{name, dtype, offset, length}`` per column and the dictionaries the
+integer codes point into. Per-shift columns carry a ``row`` index into the
+raw table: the ``extra:<col>`` columns, one entry per source row that
+produced shifts.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .double_bubble import (
+    HOUR_COLUMNS,
+    Params,
+    _text,
+    compute_rest_and_flags,
+    normalize_rows,
+    per_employee_baseline,
+)
+
+PAYLOAD_VERSION = 2
+
+# Columns the page never offers as an availability filter (KNOWN_COLUMNS in build_web.ENGINE_JS).
+KNOWN_COLUMNS = frozenset(
+    [
+        "employee_id", "start_datetime", "end_datetime", "shift_type", "shift_time", "SHIFT_TIME", "shiftTime",
+        "cost_center", "CostCenter", "costCenter", "COST_CENTER", "Employee", "Start", "End", "start", "end",
+        "type", "calendar_date", "calendarDate", "CalendarDate", "date",
+    ]
+    + HOUR_COLUMNS
+)
+
+_DTYPES = {
+    "float64": ("<f8", "Float64Array"),
+    "int32": ("<i4", "Int32Array"),
+    "uint8": ("u1", "Uint8Array"),
+}
+
+
+def optional_columns(raw: pd.DataFrame) -> List[str]:
+    return [c for c in raw.columns if c not in KNOWN_COLUMNS]
+
+
+def _dictionary(values: np.ndarray) -> Tuple[np.ndarray, List[str]]:
+    codes, uniques = pd.factorize(values, sort=True, use_na_sentinel=False)
+    return codes.astype(np.int32), [str(u) for u in uniques]
+
+
+def encode_columns(columns: Dict[str, np.ndarray]) -> Tuple[List[dict], bytes]:
+    """Pack arrays into one buffer; returns (column specs, buffer)."""
+    specs, chunks, offset = [], [], 0
+    for name, arr in columns.items():
+        np_dtype, js_type = _DTYPES[str(arr.dtype)]
+        data = np.ascontiguousarray(arr, dtype=np_dtype).tobytes()
+        specs.append({"name": name, "dtype": js_type, "offset": offset, "length": int(len(arr))})
+        pad = (-len(data)) % 8
+        chunks.append(data + b"\0" * pad)
+        offset += len(data) + pad
+    return specs, b"".join(chunks)
+
+
+def payload_columns(raw: pd.DataFrame, params: Optional[Params] = None) -> Tuple[dict, Dict[str, np.ndarray]]:
+    """Normalize, flag and baseline ``raw``; returns (header without ``columns``, arrays)."""
+    params = params or Params()
+    stats: Dict[str, int] = {}
+    shifts = compute_rest_and_flags(normalize_rows(raw, stats), params.rest_threshold)
+    baseline = per_employee_baseline(shifts, params.baseline_mode)
+
+    emp_codes, employees = _dictionary(shifts["employee_id"].to_numpy())
+    type_codes, types = _dictionary(shifts["shift_type"].to_numpy())
+    cc_codes, centers = _dictionary(shifts["cost_center"].to_numpy())
+    bl = baseline.reindex(employees)
+    raw_rows, row_codes = np.unique(shifts["row"].to_numpy(), return_inverse=True)
+    columns = {
+        "start": shifts["start"].to_numpy().astype(np.float64),
+        "end": shifts["end"].to_numpy().astype(np.float64),
+        "employee": emp_codes,
+        "shift_type": type_codes.astype(np.uint8) if len(types) < 256 else type_codes,
+        "cost_center": cc_codes,
+        "row": row_codes.astype(np.int32),
+        "rest_gap_h": shifts["rest_gap_h"].to_numpy(dtype=np.float64),
+        "double_bubble": shifts["double_bubble"].to_numpy().astype(np.uint8),
+        "baseline_start_min": bl["start_min"].to_numpy(dtype=np.float64),
+        "baseline_end_min": bl["end_min"].to_numpy(dtype=np.float64),
+    }
+    extras = {}
+    for col in optional_columns(raw):
+        codes, values = _dictionary(_text(raw, col).to_numpy(dtype=object)[raw_rows])
+        columns[f"extra:{col}"] = codes
+        extras[col] = values
+    header = {
+        "version": PAYLOAD_VERSION,
+        "rows": int(len(raw)),
+        "shifts": int(len(shifts)),
+        "restThreshold": params.rest_threshold,
+        "baselineMode": params.baseline_mode,
+        "stats": {
+            "missingShiftTime": stats.get("missing_shift_time", 0),
+            "missingCostCenter": stats.get("missing_cost_center", 0),
+            "invalidRows": stats.get("invalid_rows", 0),
+        },
+        "dicts": {"employee": employees, "shift_type": types, "cost_center": centers},
+        "extras": extras,
+    }
+    return header, columns
+
+
+def build_payload(raw: pd.DataFrame, params: Optional[Params] = None) -> Tuple[dict, bytes]:
+    """Normalize, flag and baseline ``raw``; returns (header, column buffer)."""
+    header, columns = payload_columns(raw, params)
+    header["columns"], buf = encode_columns(columns)
+    return header, buf
+
+
+def header_json(header: dict) -> str:
+    # Safe inside <script type="application/json">.
+    return json.dumps(header, separators=(",", ":")).replace("</", "<\\/")
+
+
+def payload_base64(buf: bytes) -> str:
+    return base64.b64encode(buf).decode("ascii")
@@ -0,0 +1,211 @@
+"""What-if sweeps over rest threshold, deviation threshold, base rate and multiplier.
+
+Each scenario in the page is a full recompute (recomputeAll). Here the
+pipeline runs once with every overtime-followed shift as a candidate, and
+the grid is answered from sorted arrays:
+
+* a candidate is flagged at threshold ``T`` when its rest gap ``g < T``;
+* it has an alternate at ``T`` when some compatible, free employee has
+  rested at least ``T`` hours, i.e. ``T <= R`` where ``R`` is the longest
+  such rest (``max_alternate_rest``, computed once up to the largest ``T``);
+* flagged shifts with an alternate are then ``g < T`` minus
+  ``max(g, R) < T``, and their hours come from prefix sums in the same two
+  orders, so savings (``base_rate * (multiplier - 1) * hours``) for any
+  rate and multiplier are a multiply.
+
+Results match ``double_bubble.analyze`` per scenario (flagged count,
+alternates > 0 count, summed ``est_savings``, deviation count).
+
+Usage:
+  python -m app.analytics.scenarios --input data/raw/shifts.csv --rest 6,7,8,9,10 --base-rates 80,100 --multipliers 1.5,2
+"""
+from __future__ import annotations
+
+import itertools
+from dataclasses import replace
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .double_bubble import (
+    MS_PER_HOUR,
+    AvailabilityIndex,
+    Params,
+    alternate_queries,
+    compute_rest_and_flags,
+    compute_view,
+    normalize_rows,
+)
+
+SCENARIO_COLUMNS = [
+    "rest_threshold",
+    "dev_threshold",
+    "base_rate",
+    "db_multiplier",
+    "flagged",
+    "with_alternates",
+    "alternates_coverage",
+    "flagged_hours",
+    "est_savings",
+    "deviations",
+]
+
+
+def max_alternate_rest(
+    index: AvailabilityIndex,
+    flag_start: np.ndarray,
+    flag_end: np.ndarray,
+    flag_emp: np.ndarray,
+    flag_value: np.ndarray,
+    cap_hours: float,
+) -> np.ndarray:
+    """Longest rest (hours) of any free, compatible other employee at each shift.
+
+    ``count_alternates(..., T) > 0`` exactly when the result is ``>= T``, for
+    ``T <= cap_hours``. Employees with no shift in the ``cap_hours`` lookback
+    window have rested longer than the cap and give ``inf``; ``-inf`` means
+    nobody is free.
+    """
+    out = np.full(len(flag_start), -np.inf)
+    mark = np.zeros(index.n_employees, dtype=bool)
+    empty = index.empty_code
+    lookback = int(np.ceil(cap_hours * MS_PER_HOUR)) + index.max_duration + 1
+    los = np.searchsorted(index.start, flag_start - lookback, "left")
+    his = np.searchsorted(index.start, np.maximum(flag_end, flag_start + 1), "left")
+    for i in range(len(flag_start)):
+        lo, hi = los[i], his[i]
+        f_start = flag_start[i]
+        value, me = flag_value[i], flag_emp[i]
+        emp = index.emp[lo:hi]
+        e = index.end[lo:hi]
+        in_window = np.unique(emp)
+        later = e > f_start
+        mark[emp[later & (index.start[lo:hi] < flag_end[i])]] = True
+        mark[me] = True
+        # Unmarked later shifts start exactly at a zero-length flagged shift and
+        # put no bound on rest.
+        last_pre = ~later & (index.next_start[lo:hi] >= f_start)
+        cand = (last_pre | later) & ~mark[emp]
+        if value != empty:
+            sample = index.sample[emp[cand]]
+            cand[cand] = (sample == value) | (sample == empty)
+            window_sample = index.sample[in_window]
+            n_window = int(np.count_nonzero((window_sample == value) | (window_sample == empty)))
+            me_in_pool = index.sample[me] in (value, empty)
+        else:
+            n_window = len(in_window)
+            me_in_pool = True
+        me_outside = me_in_pool and not np.any(in_window == me)
+        mark[emp] = False
+        mark[me] = False
+        if index.pool_size[value] - n_window - int(me_outside) > 0:
+            out[i] = np.inf
+        elif cand.any():
+            # A zero-length shift at f_start and its predecessor both pass the
+            # last-shift test; the shorter rest decides.
+            rest = np.where(later[cand], np.inf, (f_start - e[cand]) / MS_PER_HOUR)
+            who = emp[cand]
+            order = np.lexsort((rest, who))
+            first = np.r_[True, who[order][1:] != who[order][:-1]]
+            out[i] = rest[order][first].max()
+    return out
+
+
+def _count_below(sorted_values: np.ndarray, cum_hours: np.ndarray, thresholds: np.ndarray):
+    k = np.searchsorted(sorted_values, thresholds, "left")
+    return k, cum_hours[k]
+
+
+def sweep(
+    raw: pd.DataFrame,
+    rest_thresholds: Sequence[float],
+    base_rates: Sequence[float] = (100.0,),
+    db_multipliers: Sequence[float] = (2.0,),
+    dev_thresholds: Optional[Sequence[float]] = None,
+    params: Optional[Params] = None,
+) -> pd.DataFrame:
+    """One row per (rest, dev, base rate, multiplier) scenario, in ``SCENARIO_COLUMNS``.
+
+    ``params`` supplies the filters, baseline mode and availability column;
+    ``dev_thresholds`` defaults to ``params.dev_threshold``.
+    """
+    params = params or Params()
+    rest = np.asarray(sorted(set(float(t) for t in rest_thresholds)), dtype=np.float64)
+    devs = [params.dev_threshold] if dev_thresholds is None else sorted(set(float(d) for d in dev_thresholds))
+    if not len(rest):
+        raise ValueError("at least one rest threshold is required")
+
+    # Every shift after an overtime shift is flagged at an infinite threshold.
+    candidates = compute_view(compute_rest_and_flags(normalize_rows(raw), np.inf), params)
+    index, queries = alternate_queries(candidates, raw, replace(params, rest_threshold=float(rest[-1])))
+    best_rest = max_alternate_rest(index, *queries, float(rest[-1]))
+    flagged = candidates[candidates["double_bubble"].to_numpy()]
+    gap = flagged["rest_gap_h"].to_numpy(dtype=np.float64)
+    hours = np.maximum(0, (flagged["end"] - flagged["start"]).to_numpy() / MS_PER_HOUR)
+
+    by_gap = np.argsort(gap, kind="stable")
+    n_flagged, flagged_hours = _count_below(gap[by_gap], np.r_[0.0, np.cumsum(hours[by_gap])], rest)
+    uncovered_key = np.maximum(gap, best_rest)
+    by_key = np.argsort(uncovered_key, kind="stable")
+    n_uncovered, uncovered_hours = _count_below(uncovered_key[by_key], np.r_[0.0, np.cumsum(hours[by_key])], rest)
+    covered = n_flagged - n_uncovered
+    covered_hours = flagged_hours - uncovered_hours
+
+    dev_sorted = np.sort(candidates["dev_hours"].to_numpy(dtype=np.float64))
+    deviations = {d: len(dev_sorted) - int(np.searchsorted(dev_sorted, d, "right")) for d in devs}
+
+    records = []
+    for (k, t), d, rate, mult in itertools.product(enumerate(rest), devs, base_rates, db_multipliers):
+        records.append(
+            {
+                "rest_threshold": float(t),
+                "dev_threshold": d,
+                "base_rate": float(rate),
+                "db_multiplier": float(mult),
+                "flagged": int(n_flagged[k]),
+                "with_alternates": int(covered[k]),
+                "alternates_coverage": covered[k] / n_flagged[k] if n_flagged[k] else 0.0,
+                "flagged_hours": float(flagged_hours[k]),
+                "est_savings": (rate * mult - rate) * float(covered_hours[k]),
+                "deviations": deviations[d],
+            }
+        )
+    return pd.DataFrame(records, columns=SCENARIO_COLUMNS)
+
+
+def _floats(text: str) -> List[float]:
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .arrow_io import read_shifts
+    from .double_bubble import build_arg_parser, params_from_args
+
+    ap = build_arg_parser()
+    ap.description = "Double-bubble savings sweep over a grid of scenarios"
+    ap.set_defaults(out="data/interim/double_bubble_scenarios.csv")
+    ap.add_argument("--rest", default="6,7,8,9,10", help="Comma-separated rest thresholds (hours)")
+    ap.add_argument("--dev", help="Comma-separated deviation thresholds (default: --dev-threshold)")
+    ap.add_argument("--base-rates", help="Comma-separated base rates (default: --base-rate)")
+    ap.add_argument("--multipliers", help="Comma-separated double-bubble multipliers (default: --db-multiplier)")
+    args = ap.parse_args(argv)
+    params = params_from_args(args)
+    raw = read_shifts(args.input, [params.availability_column] if params.availability_column else [])
+    table = sweep(
+        raw,
+        _floats(args.rest),
+        _floats(args.base_rates) if args.base_rates else [params.base_rate],
+        _floats(args.multipliers) if args.multipliers else [params.db_multiplier],
+        _floats(args.dev) if args.dev else None,
+        params,
+    )
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    table.to_csv(out, index=False)
+    print(f"wrote: {out} ({len(table)} scenarios)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+"""Synthetic hourly-grid rosters for benchmarks and scale tests.
+
+Each employee has a usual start hour and home cost center and works about
+five days in seven. A worked day is one grid row (``00..23`` hours worked per
+slot, sometimes ending in a partial hour) typed REG, OT1/OT2 (``ot_rate``),
+CHOL or PTO. Some overtime days get a call-in a few hours after the shift,
+which is what the analyzer flags as a double bubble. A few rows are charged
+to another cost center. The ``crew`` column is there for the availability
+filter.
+
+Rows are generated in employee blocks, each from its own seed, so a large
+roster can be streamed to CSV or Parquet without holding it all in memory.
+The same config and seed always give the same rows.
+
+Usage:
+  python -m app.analytics.synthetic --employees 2000 --days 90 --ot-rate 0.12 --cost-centers 8 --out data/raw/synthetic.parquet
+"""
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .double_bubble import HOUR_COLUMNS
+
+COLUMNS = ["employee_id", "calendar_date", *HOUR_COLUMNS, "shift_time", "cost_center", "crew"]
+
+# Employees per generated block (about 0.5M grid rows at 90 days).
+DEFAULT_BLOCK_EMPLOYEES = 5000
+
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    employees: int = 500
+    days: int = 28
+    ot_rate: float = 0.12  # share of worked days that are overtime
+    cost_centers: int = 4
+    callback_rate: float = 0.35  # share of overtime days followed by a call-in
+    work_rate: float = 5 / 7
+    start: date = date(2025, 1, 5)
+    crews: Tuple[str, ...] = ("A", "B", "C", "")
+    seed: int = 1
+
+
+def _block(config: SyntheticConfig, first: int, count: int) -> pd.DataFrame:
+    rng = np.random.default_rng([config.seed, first])
+    days = config.days
+    usual = rng.integers(4, 12, count)
+    home = rng.integers(0, max(1, config.cost_centers), count)
+    crew = np.asarray(config.crews, dtype=object)[rng.integers(0, len(config.crews), count)]
+
+    emp, day = np.nonzero(rng.random((count, days)) < config.work_rate)
+    n = len(emp)
+    start = np.clip(usual[emp] + rng.choice([-1, 0, 0, 0, 1, 2], n), 0, 23)
+    length = np.minimum(rng.integers(8, 11, n), 24 - start)
+    kind = rng.random(n)
+    ot = kind < config.ot_rate
+    shift_time = np.where(ot, np.where(rng.random(n) < 0.5, "OT1", "OT2"), "REG").astype(object)
+    shift_time[~ot & (kind > 0.97)] = "CHOL"
+    shift_time[~ot & (kind > 0.95) & (kind <= 0.97)] = "PTO"
+    partial = np.where((rng.random(n) < 0.2) & (start + length < 24), rng.choice([0.25, 0.5, 0.75], n), 0.0)
+
+    # Call-ins: same day, 2-6 hours after the overtime shift's last slot.
+    cb_start = start + length + (partial > 0) + rng.integers(2, 7, n)
+    cb_length = rng.integers(2, 5, n)
+    cb = ot & (rng.random(n) < config.callback_rate) & (cb_start + cb_length <= 24)
+
+    emp = np.r_[emp, emp[cb]]
+    day = np.r_[day, day[cb]]
+    start = np.r_[start, cb_start[cb]]
+    length = np.r_[length, cb_length[cb]]
+    partial = np.r_[partial, np.zeros(int(cb.sum()))]
+    shift_time = np.r_[shift_time, np.full(int(cb.sum()), "Call-in", dtype=object)]
+    order = np.lexsort((start, day, emp))
+    emp, day, start, length, partial, shift_time = (a[order] for a in (emp, day, start, length, partial, shift_time))
+    n = len(emp)
+
+    center = home[emp]
+    floats = rng.random(n) < 0.05
+    center[floats] = rng.integers(0, max(1, config.cost_centers), int(floats.sum()))
+    slots = np.arange(24)
+    hours = np.where((slots >= start[:, None]) & (slots < (start + length)[:, None]), 1.0, np.nan)
+    tail = np.flatnonzero(partial > 0)
+    hours[tail, (start + length)[tail]] = partial[tail]
+
+    dates = pd.date_range(config.start, periods=days, freq="D").strftime("%m/%d/%Y").to_numpy(dtype=object)
+    frame = pd.DataFrame(hours, columns=HOUR_COLUMNS)
+    frame.insert(0, "employee_id", np.char.mod("E%06d", emp + first).astype(object))
+    frame.insert(1, "calendar_date", dates[day])
+    frame["shift_time"] = shift_time
+    frame["cost_center"] = np.char.mod("CC-%d", center + 1).astype(object)
+    frame["crew"] = crew[emp]
+    return frame[COLUMNS]
+
+
+def synthetic_hourly_frames(
+    config: SyntheticConfig = SyntheticConfig(), block_employees: int = DEFAULT_BLOCK_EMPLOYEES
+) -> Iterator[pd.DataFrame]:
+    """Roster rows (``COLUMNS``; empty hour slots are NaN) in employee blocks."""
+    for first in range(0, config.employees, block_employees):
+        yield _block(config, first, min(block_employees, config.employees - first))
+
+
+def synthetic_hourly_frame(config: SyntheticConfig = SyntheticConfig()) -> pd.DataFrame:
+    """The whole roster as one frame."""
+    frames = list(synthetic_hourly_frames(config))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+
+
+def write_synthetic(path: str, config: SyntheticConfig = SyntheticConfig(), block_employees: int = DEFAULT_BLOCK_EMPLOYEES) -> int:
+    """Stream the roster to ``path`` (Parquet for .parquet/.pq, else CSV); returns the row count."""
+    out = Path(path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    rows = 0
+    if out.suffix.lower() in (".parquet", ".pq"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except Exception:  # pragma: no cover
+            raise RuntimeError("pyarrow not installed. Add 'pyarrow' to dependencies.")
+        writer = None
+        try:
+            for frame in synthetic_hourly_frames(config, block_employees):
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                writer = writer or pq.ParquetWriter(out, table.schema)
+                writer.write_table(table)
+                rows += len(frame)
+        finally:
+            if writer is not None:
+                writer.close()
+        return rows
+    with out.open("w", encoding="utf-8", newline="") as fh:
+        for k, frame in enumerate(synthetic_hourly_frames(config, block_employees)):
+            frame.to_csv(fh, index=False, header=k == 0, lineterminator="\n")
+            rows += len(frame)
+    return rows
+
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    d = SyntheticConfig()
+    ap = argparse.ArgumentParser(description="Write a synthetic hourly-grid roster (CSV or Parquet)")
+    ap.add_argument("--out", default="data/raw/synthetic_shifts.csv", help=".csv or .parquet")
+    ap.add_argument("--employees", type=int, default=d.employees)
+    ap.add_argument("--days", type=int, default=d.days)
+    ap.add_argument("--ot-rate", type=float, default=d.ot_rate)
+    ap.add_argument("--cost-centers", type=int, default=d.cost_centers)
+    ap.add_argument("--callback-rate", type=float, default=d.callback_rate)
+    ap.add_argument("--start", type=date.fromisoformat, default=d.start)
+    ap.add_argument("--seed", type=int, default=d.seed)
+    return ap
+
+
+def config_from_args(args: argparse.Namespace) -> SyntheticConfig:
+    return SyntheticConfig(
+        employees=args.employees,
+        days=args.days,
+        ot_rate=args.ot_rate,
+        cost_centers=args.cost_centers,
+        callback_rate=args.callback_rate,
+        start=args.start,
+        seed=args.seed,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_arg_parser().parse_args(argv)
+    rows = write_synthetic(args.out, config_from_args(args))
+    print(f"wrote: {args.out} ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
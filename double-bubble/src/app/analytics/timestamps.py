@@ -0,0 +1,158 @@
+"""Fixed-position timestamp parsing shared with the analyzer page.
+
+NumPy version of the page's sniffTimestampLayout/readTimestampLayout. Each
+column is sniffed once: the first value's shape (``YYYY-MM-DD`` or
+``MM/DD/YYYY`` with one ``-``/``/`` separator, optionally followed by ``" "``
+or ``"T"`` and ``hh:mm[:ss[.sss]]``; month, day and hour may have one digit)
+becomes a layout of field kinds per character. Every value of the same length
+is then checked and read digit by digit in one vectorized pass, without
+regexes or datetime objects. Values that do not fit are sniffed again, up to
+``max_layouts`` shapes per column. What is left (zones, month names, ...) is
+for the caller's generic parser.
+
+``strict`` (timestamps) follows V8's ``new Date(string)``: days 1-31 roll over
+past the end of the month (``02-30`` is March 2), ``24:00`` (zero minutes,
+seconds and millis) is midnight of the next day, and other out-of-range fields
+and two-digit years go to the generic parser. ``calendar`` layouts (hourly-grid dates: ``M/D/YY`` or
+``M/D/YYYY``, no time) add 2000 to two-digit years and roll over out-of-range
+fields the way ``new Date(y, m - 1, d)`` does.
+"""
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np
+
+MS_PER_DAY = 86_400_000
+
+YEAR, MONTH, DAY, HOUR, MINUTE, SECOND, MILLI = range(7)
+SEP = -1
+_FIELD_MS = {HOUR: 3_600_000, MINUTE: 60_000, SECOND: 1_000, MILLI: 1}
+
+NAT = np.iinfo(np.int64).min
+
+# Distinct shapes tried per column before the rest goes to the generic parser (one-digit
+# month, day and hour alone give up to 8 shapes per format).
+DEFAULT_MAX_LAYOUTS = 16
+
+
+def civil_ms(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """Midnight ms of (year, month, day), rolling over out-of-range parts like ``new Date(y, m-1, d)``."""
+    months = (year - 1970) * 12 + (month - 1)
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + (day - 1)
+    return days * MS_PER_DAY
+
+
+def _digit_run_end(s: str, i: int) -> int:
+    while i < len(s) and "0" <= s[i] <= "9":
+        i += 1
+    return i
+
+
+def sniff_layout(s: str, calendar: bool = False) -> Optional[np.ndarray]:
+    """Field kind per character of ``s`` (``SEP`` for separators), or None if no layout fits."""
+    kinds = np.full(len(s), SEP, dtype=np.int8)
+
+    def run(i: int, kind: int, low: int, high: int) -> int:
+        j = _digit_run_end(s, i)
+        if not low <= j - i <= high:
+            return -1
+        kinds[i:j] = kind
+        return j
+
+    a = _digit_run_end(s, 0)
+    sep = s[a] if a < len(s) else ""
+    if sep not in ("-", "/"):
+        return None
+    if a == 4 and not calendar:
+        kinds[:4] = YEAR
+        i = run(5, MONTH, 1, 2)
+        if i < 0 or s[i : i + 1] != sep:
+            return None
+        i = run(i + 1, DAY, 1, 2)
+    elif 1 <= a <= 2:
+        kinds[:a] = MONTH
+        i = run(a + 1, DAY, 1, 2)
+        if i < 0 or s[i : i + 1] != sep:
+            return None
+        y = _digit_run_end(s, i + 1)
+        if not (y - i - 1 == 4 or (calendar and y - i - 1 == 2)):
+            return None
+        kinds[i + 1 : y] = YEAR
+        i = y
+    else:
+        return None
+    if i < 0:
+        return None
+    if i == len(s):
+        return kinds
+    if calendar or s[i] not in (" ", "T"):
+        return None
+    i = run(i + 1, HOUR, 1, 2)
+    if i < 0 or s[i : i + 1] != ":":
+        return None
+    i = run(i + 1, MINUTE, 2, 2)
+    if i >= 0 and s[i : i + 1] == ":":
+        i = run(i + 1, SECOND, 2, 2)
+        if i >= 0 and s[i : i + 1] == ".":
+            i = run(i + 1, MILLI, 3, 3)
+    return kinds if i == len(s) else None
+
+
+def read_layout(values: np.ndarray, kinds: np.ndarray, layout: str, strict: bool = True) -> np.ndarray:
+    """Wall-clock ms of each string in ``values`` read with ``kinds`` (from ``sniff_layout(layout)``); ``NAT`` where it does not fit."""
+    n = len(kinds)
+    out = np.full(len(values), NAT, dtype=np.int64)
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    idx = np.flatnonzero(lengths == n)
+    if not len(idx) or not n:
+        return out
+    chars = np.asarray(values[idx].astype(f"U{n}")).view(np.uint32).reshape(len(idx), n)
+    seps = np.flatnonzero(kinds == SEP)
+    ok = (chars[:, seps] == np.array([ord(layout[p]) for p in seps], dtype=np.uint32)).all(axis=1)
+    digits = chars.astype(np.int64) - 48
+    field = np.zeros((7, len(idx)), dtype=np.int64)
+    for kind in range(7):
+        for p in np.flatnonzero(kinds == kind):
+            d = digits[:, p]
+            ok &= (d >= 0) & (d <= 9)
+            field[kind] = field[kind] * 10 + d
+    year, month, day = field[YEAR], field[MONTH], field[DAY]
+    if strict:
+        ok &= (year >= 100) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+        ok &= (field[MINUTE] <= 59) & (field[SECOND] <= 59)
+        midnight = (field[MINUTE] == 0) & (field[SECOND] == 0) & (field[MILLI] == 0)
+        ok &= (field[HOUR] <= 23) | ((field[HOUR] == 24) & midnight)
+    else:
+        year = np.where(year < 100, year + 2000, year)
+    ms = civil_ms(np.where(ok, year, 1970), np.where(ok, month, 1), np.where(ok, day, 1))
+    for kind, unit in _FIELD_MS.items():
+        ms += field[kind] * unit
+    out[idx[ok]] = ms[ok]
+    return out
+
+
+def parse_layouts(
+    values: np.ndarray, calendar: bool = False, max_layouts: int = DEFAULT_MAX_LAYOUTS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Wall-clock ms of the stripped strings in ``values`` and a mask of those read here.
+
+    Unmasked entries (``NAT``) did not fit a layout and need the generic parser.
+    """
+    values = np.asarray(values, dtype=object)
+    out = np.full(len(values), NAT, dtype=np.int64)
+    pending = np.flatnonzero(values != "")
+    for _ in range(max_layouts):
+        if not len(pending):
+            break
+        layout = values[pending[0]]
+        kinds = sniff_layout(layout, calendar)
+        if kinds is None:
+            pending = pending[1:]
+            continue
+        ms = read_layout(values[pending], kinds, layout, strict=not calendar)
+        read = ms != NAT
+        out[pending[read]] = ms[read]
+        # The sniffed value itself can still be rejected (strict ranges); drop it either way.
+        pending = pending[~read & (pending != pending[0])]
+    return out, out != NAT
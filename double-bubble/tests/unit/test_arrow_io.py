@@ -0,0 +1,72 @@
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.analytics import double_bubble as db
+from test_double_bubble import HOURS, load_build_web, synthetic_hourly_csv
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+
+def warehouse_table(raw: pd.DataFrame) -> "pa.Table":
+    # Typed like an Athena extract: numeric hours, real dates, nulls for blanks, unused wide columns.
+    frame = raw.replace("", None)
+    for h in HOURS:
+        frame[h] = pd.to_numeric(frame[h])
+    frame["calendar_date"] = pd.to_datetime(frame["calendar_date"], format="%m/%d/%Y").dt.date
+    frame["notes"] = "free text"
+    frame["badge_no"] = range(len(frame))
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def test_parquet_reads_projected_columns_with_csv_results(tmp_path: Path):
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    raw = db.read_shifts_csv(str(csv_path))
+    pq.write_table(warehouse_table(raw), tmp_path / "shifts.parquet")
+
+    from app.analytics import arrow_io
+
+    projected = arrow_io.read_shifts(str(tmp_path / "shifts.parquet"), ["crew"])
+    assert list(projected.columns) == ["employee_id", "calendar_date", *HOURS, "shift_time", "cost_center", "crew"]
+    assert arrow_io.read_shifts(str(csv_path)).equals(raw)
+    params = db.Params(availability_column="crew")
+    expected = db.flagged_csv_text(db.analyze(raw, params).flagged)
+    assert db.flagged_csv_text(db.analyze(projected, params).flagged) == expected
+
+    # Hive-partitioned directory, as Athena writes it.
+    part = warehouse_table(raw).append_column("cc", pa.array(raw["cost_center"].replace("", "none")))
+    pq.write_to_dataset(part, tmp_path / "warehouse", partition_cols=["cc"])
+    from_dir = arrow_io.read_shifts(str(tmp_path / "warehouse"), ["crew"])
+    assert sorted(db.flagged_csv_text(db.analyze(from_dir, params).flagged).splitlines()) == sorted(expected.splitlines())
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+@pytest.mark.parametrize("availability_column,rest_threshold", [("", 8), ("crew", 6)])
+def test_page_decodes_arrow_payload_to_same_flags(tmp_path: Path, availability_column: str, rest_threshold: float):
+    from app.analytics import arrow_io
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    raw = db.read_shifts_csv(str(csv_path))
+    (tmp_path / "shifts.arrows").write_bytes(arrow_io.build_arrow_payload(raw))
+
+    script = load_build_web().ENGINE_JS + (
+        f"\nvar params = {{restThreshold:{rest_threshold}, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2,"
+        " dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()};\n"
+        f"const bytes = require('fs').readFileSync({json.dumps(str(tmp_path / 'shifts.arrows'))});\n"
+        "const store = decodeArrowPayload(bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength));\n"
+        f"process.stdout.write(flaggedCsvText(store, runPipeline(store, {json.dumps(availability_column)}, store).flagged));\n"
+    )
+    env = dict(os.environ, TZ="UTC")
+    out = subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout
+
+    result = db.analyze(raw, db.Params(rest_threshold=rest_threshold, availability_column=availability_column))
+    assert len(result.flagged) > 0
+    assert db.flagged_csv_text(result.flagged).rstrip("\n") == out
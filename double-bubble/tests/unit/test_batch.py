@@ -0,0 +1,44 @@
+from dataclasses import replace
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.analytics import batch
+from app.analytics import double_bubble as db
+from test_double_bubble import synthetic_hourly_csv
+
+
+@pytest.fixture
+def raw(tmp_path: Path) -> pd.DataFrame:
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=60)
+    return db.read_shifts_csv(str(csv_path))
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_employee_partition_matches_single_process(raw: pd.DataFrame, workers: int):
+    params = db.Params(availability_column="crew", days_of_week=frozenset([1, 2, 3, 4, 5]))
+    expected = db.analyze(raw, params)
+    result = batch.analyze_parallel(raw, params, workers=workers)
+    assert len(result.flagged) > 0
+    assert db.flagged_csv_text(result.flagged) == db.flagged_csv_text(expected.flagged)
+    assert result.shifts["dev_hours"].tolist() == expected.shifts["dev_hours"].tolist()
+    assert result.stats == expected.stats
+
+
+def test_cost_center_partition_merges_per_center_runs(raw: pd.DataFrame):
+    params = db.Params(availability_column="crew", cost_centers=frozenset(["CC-1", "CC-3"]))
+    result = batch.analyze_parallel(raw, params, workers=2, partition="cost-center")
+    per_center = [db.analyze(raw, replace(params, cost_centers=frozenset([cc]))).flagged for cc in ("CC-1", "CC-3")]
+    expected = pd.concat(per_center).sort_values(["employee_id", "start", "end"], kind="stable")
+    assert set(result.flagged["cost_center"]) == {"CC-1", "CC-3"}
+    assert db.flagged_csv_text(result.flagged) == db.flagged_csv_text(expected)
+
+
+def test_employee_ranges_never_split_an_employee(raw: pd.DataFrame):
+    shifts = db.normalize_rows(raw)
+    ranges = batch.employee_ranges(shifts, 7)
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(shifts)
+    emp = shifts["employee_id"].to_numpy()
+    assert all(emp[lo - 1] != emp[lo] for lo, _ in ranges[1:])
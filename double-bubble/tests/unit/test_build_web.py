@@ -1,6 +1,15 @@
+import gzip
+import hashlib
+import json
+import os
 from pathlib import Path
+import re
+import shutil
 import subprocess
 import sys
+import xml.etree.ElementTree as ET
+
+import pytest
 
 
 def test_build_web_generates_html(tmp_path: Path):
@@ -10,3 +19,544 @@ def test_build_web_generates_html(tmp_path: Path):
     text = out.read_text(encoding="utf-8")
     assert "PSE Double Bubble Analyzer — Multi" in text
 
+
+def test_build_web_page_is_self_contained_minified_and_precompressed(tmp_path: Path):
+    root = Path(__file__).resolve().parents[2]
+    out, plain = tmp_path / "page.html", tmp_path / "plain.html"
+    subprocess.check_call([sys.executable, "scripts/build_web.py", "--out", str(out), "--compress", "gzip"], cwd=str(root))
+    subprocess.check_call([sys.executable, "scripts/build_web.py", "--out", str(plain), "--no-minify"], cwd=str(root))
+    text = out.read_text(encoding="utf-8")
+    # No CDN or other remote scripts: the page has to work on air-gapped machines.
+    assert "<script src=" not in text and " src=\"http" not in text and "Papa" not in text
+    assert "function parseCSVbasic(" in text and "// ---------- Utilities" not in text
+    assert len(text) < 0.8 * plain.stat().st_size
+    assert gzip.decompress((tmp_path / "page.html.gz").read_bytes()).decode("utf-8") == text
+
+
+def test_minify_js_keeps_literals_and_statement_breaks():
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    import build_web
+
+    src = (
+        "  // comment\n"
+        "  const a = 1 /* inline */ + +b, re = /[/\"]\\s+/g;\n"
+        "  const t = `line 1\n    line ${a ? `x ${ {k: 1}.k }` : \"}\"} // not a comment`;\n"
+        "  let c = a\n  ++b\n  return x / 2 / y\n"
+    )
+    assert build_web.minify_js(src) == (
+        "const a=1+ +b,re=/[/\"]\\s+/g;"
+        "const t=`line 1\n    line ${a?`x ${{k:1}.k}`:\"}\"} // not a comment`;"
+        "let c=a\n++b\nreturn x/2/y"
+    )
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_minified_engine_runs_like_source(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    harness = f"\nvar params = {{restThreshold:8, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2, dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()}};\nconst CSV = {json.dumps(str(csv_path))};\n"
+    env = dict(os.environ, TZ="UTC")
+    outputs = []
+    for engine in (build_web.ENGINE_JS, build_web.minify_js(build_web.ENGINE_JS)):
+        run = [subprocess.run(["node", "-e", engine + harness + js], check=True, capture_output=True, text=True, env=env).stdout for js in (STREAMING_JS, OVERLAY_JS)]
+        outputs.append(run)
+    assert outputs[0] == outputs[1]
+    assert json.loads(outputs[1][0])["same"]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_availability_index_matches_legacy_scan():
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    import bench_alternates
+
+    # zero_length adds 0 h shifts that start exactly on flagged call-ins.
+    for zero_length in (False, True):
+        res = bench_alternates.run(employees=120, days=30, rest=8.0, legacy_sample=400, availability_col="crew", seed=3,
+                                   heap_mb=512, zero_length=zero_length)
+        assert res["flagged"] > 0 and res["legacy_sampled"] > 0
+        assert res["mismatches"] == 0
+
+
+def test_build_web_embeds_precomputed_payload(tmp_path: Path):
+    root = Path(__file__).resolve().parents[2]
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=5)
+    out = tmp_path / "inline.html"
+    subprocess.check_call([sys.executable, "scripts/build_web.py", "--out", str(out), "--data", str(csv_path)], cwd=str(root))
+    text = out.read_text(encoding="utf-8")
+    assert '<script id="dbPayload" type="application/json">' in text and 'id="dbPayloadData"' in text
+    assert "__PAYLOAD__" not in text
+
+    out = tmp_path / "split.html"
+    subprocess.check_call([sys.executable, "scripts/build_web.py", "--out", str(out), "--data", str(csv_path), "--payload-bin"], cwd=str(root))
+    text = out.read_text(encoding="utf-8")
+    assert '"bin":"split.html.bin"' in text and 'id="dbPayloadData"' not in text
+    assert (tmp_path / "split.html.bin").stat().st_size > 0
+
+
+WORKER_HARNESS_JS = r"""
+const P = (rest, days) => ({restThreshold: rest, devThreshold: 1, baselineMode: "scheduled", baseRate: 100, dbMultiplier: 2,
+                            dateStart: null, dateEnd: null, daysOfWeek: new Set(days), costCenters: new Set()});
+const rows = parseCSVbasic(require("fs").readFileSync(CSV, "utf8"));
+const mainStore = normalizeRows(rows);
+const {meta, buf} = encodeShifts(mainStore, null);
+const posted = [];
+const post = (m) => posted.push(m);
+handleWorkerMessage({type: "load", meta, buf}, post);
+// The second run supersedes the first before it reaches the alternates stage.
+Promise.all([
+  handleWorkerMessage({type: "run", id: 1, params: P(8, DEFAULT_DAYS), availabilityCol: ""}, post),
+  handleWorkerMessage({type: "run", id: 2, params: P(6, [1,2,3,4,5]), availabilityCol: "crew"}, post),
+]).then(() => {
+  const viaWorker = flaggedCsvText(mainStore, applyPipelineResult(mainStore, posted[0].result).flagged);
+  Object.assign(params, P(6, [1,2,3,4,5]));
+  const fresh = normalizeRows(rows);
+  const direct = flaggedCsvText(fresh, runPipeline(fresh, "crew").flagged);
+  process.stdout.write(JSON.stringify({ids: posted.map(m => m.id), same: viaWorker === direct, lines: direct.split("\n").length}));
+  process.exit(0);
+});
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_worker_results_match_main_thread_pipeline(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    # The worker source as the minified page assembles it: inline engine text + WORKER_SRC.
+    page = build_web.render_html(minify=True)
+    engine = re.search(r'<script id="dbEngine">(.*?)</script>', page, re.S).group(1)
+    worker = json.loads(re.search(r'const WORKER_SRC=("(?:[^"\\]|\\.)*")', page).group(1))
+    assert page.count(build_web.minify_js(build_web.ENGINE_JS)) == 1
+    script = engine + "\n" + worker + f"\nconst CSV = {json.dumps(str(csv_path))};\n" + WORKER_HARNESS_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["ids"] == [2]
+    assert out["same"] and out["lines"] > 1
+
+
+CACHED_PIPELINE_JS = r"""
+const base = (p) => Object.assign({restThreshold: 8, devThreshold: 1, baselineMode: "scheduled", baseRate: 100, dbMultiplier: 2,
+                                   dateStart: null, dateEnd: null, daysOfWeek: new Set(DEFAULT_DAYS), costCenters: new Set()}, p);
+const steps = [
+  [{}, ""],
+  [{daysOfWeek: new Set([1,2,3,4,5])}, ""],
+  [{daysOfWeek: new Set([1,2,3,4,5]), costCenters: new Set(["CC-1","CC-2"])}, ""],
+  [{daysOfWeek: new Set([1,2,3,4,5]), costCenters: new Set(["CC-1","CC-2"])}, "crew"],
+  [{restThreshold: 6, dateStart: new Date(2025,1,5), dateEnd: new Date(2025,1,20)}, "crew"],
+  [{restThreshold: 6, devThreshold: 0.5, baseRate: 80, baselineMode: "all"}, "crew"],
+  [{restThreshold: 6, devThreshold: 2, baseRate: 80, baselineMode: "all"}, "crew"],
+  [{}, ""],
+];
+const snapshot = (store, out) => flaggedCsvText(store, out.flagged) + "#"
+  + Array.from(out.view, i => store.devHours[i].toFixed(6) + (store.deviation[i] ? "d" : "")).join(",");
+const rows = parseCSVbasic(require("fs").readFileSync(CSV, "utf8"));
+const shared = normalizeRows(rows);
+const cache = newPipelineCache();
+const mismatched = [];
+steps.forEach(([p, col], i) => {
+  params = base(p);
+  const cached = snapshot(shared, runPipeline(shared, col, cache));
+  const store = normalizeRows(rows);
+  const fresh = snapshot(store, runPipeline(store, col));
+  if (cached !== fresh) mismatched.push(i);
+});
+process.stdout.write(JSON.stringify({mismatched}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_cached_pipeline_matches_fresh_runs_across_param_changes(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    script = build_web.ENGINE_JS + f"\nvar params = {{}};\nconst CSV = {json.dumps(str(csv_path))};\n" + CACHED_PIPELINE_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["mismatched"] == []
+
+
+BASELINE_JS = r"""
+// The sort-per-employee baseline the indexed one replaced.
+function sortedBaseline(store, view){
+  const median = (a) => a.length % 2 ? a[(a.length-1)/2] : (a[a.length/2-1] + a[a.length/2]) / 2;
+  const byEmp = new Map();
+  for (const i of view){
+    const e = store.employee[i];
+    if (!byEmp.has(e)) byEmp.set(e, []);
+    byEmp.get(e).push(i);
+  }
+  const nEmp = store.dicts.employee.length;
+  const start = new Float64Array(nEmp).fill(NaN), end = new Float64Array(nEmp).fill(NaN);
+  for (const [e, list] of byEmp){
+    const sched = list.filter(i => store.typeFlags[store.shift_type[i]] & TYPE_SCHEDULED);
+    const use = params.baselineMode === "scheduled" && sched.length ? sched : list;
+    start[e] = median(Float64Array.from(use, i => store.startMin[i]).sort());
+    end[e] = median(Float64Array.from(use, i => store.endMin[i]).sort());
+  }
+  return {start, end};
+}
+const base = (p) => Object.assign({baselineMode: "scheduled", dateStart: null, dateEnd: null, daysOfWeek: new Set(DEFAULT_DAYS), costCenters: new Set()}, p);
+const steps = [
+  {}, {daysOfWeek: new Set([1,2,3,4,5])}, {daysOfWeek: new Set([1,2,3,4,5]), costCenters: new Set(["CC-1"])},
+  {costCenters: new Set(["CC-1"])}, {baselineMode: "all", costCenters: new Set(["CC-1"])},
+  {dateStart: new Date(2025,1,5), dateEnd: new Date(2025,1,20)}, {}
+];
+const store = normalizeRows(parseCSVbasic(require("fs").readFileSync(CSV, "utf8")));
+const same = (a, b) => a.length === b.length && a.every((v, k) => Object.is(v, b[k]));
+const mismatched = [];
+let prev = null;
+steps.forEach((p, k) => {
+  params = base(p);
+  const view = filterView(store);
+  const got = perEmployeeBaseline(store, view, prev);
+  const want = sortedBaseline(store, view);
+  if (!same(got.start, want.start) || !same(got.end, want.end)) mismatched.push(k);
+  prev = got;
+});
+process.stdout.write(JSON.stringify({mismatched, fractional: Array.from(store.endMin).filter(m => m % 1).length}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_indexed_baseline_matches_sorted_medians_across_filter_changes(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import HOURS, synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    # Fractional-minute ends (0.33h = 19.8 min) tie inside one minute bucket.
+    odd = [",".join([f"E{e:03d}", f"02/{d:02d}/2025", *["1" if h == "07" else "0.33" if h == "08" else "" for h in HOURS], "REG", "CC-1", "A"])
+           for e in range(6) for d in (3, 4, 10)]
+    csv_path.write_text(csv_path.read_text(encoding="utf-8") + "\n" + "\n".join(odd), encoding="utf-8")
+    script = build_web.ENGINE_JS + f"\nvar params = {{}};\nconst CSV = {json.dumps(str(csv_path))};\n" + BASELINE_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["fractional"] > 0
+    assert out["mismatched"] == []
+
+OVERLAY_JS = r"""
+const rows = parseCSVbasic(require("fs").readFileSync(CSV, "utf8"));
+const store = normalizeRows(rows);
+const out = runPipeline(store, "");
+const emps = Array.from(new Set(Array.from(out.view, i => store.dicts.employee[store.employee[i]])));
+const model = buildOverlayModel(emps, store, out.view, false);
+const row = 3, seg = model.rows[row].segs[0];
+const r = overlaySegmentRect(seg, row);
+const cx = r.x + r.w/2, cy = r.y + r.h/2;
+// Later segments draw on top, so the hit is the last one covering the point.
+const topmost = model.rows[row].segs.filter(s => { const q = overlaySegmentRect(s, row); return q.x <= cx && cx <= q.x + q.w; }).pop();
+process.stdout.write(JSON.stringify({
+  employees: emps.length,
+  order: model.rows.map(x => x.employee_id),
+  segs: model.rows.reduce((n, x) => n + x.segs.length, 0),
+  hit: overlayHitTest(model, cx, cy) === topmost,
+  gapMiss: overlayHitTest(model, r.x + 1, overlayRowTop(row) + OVERLAY.rowH + OVERLAY.gap/2),
+  range: overlayRowRange(model, overlayRowTop(10) + 5, overlayRowTop(12) + 5),
+  svg: overlaySvgMarkup(model),
+}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_overlay_model_hit_testing_and_svg_export(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    script = build_web.ENGINE_JS + f"\nvar params = {{restThreshold:8, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2, dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()}};\nconst CSV = {json.dumps(str(csv_path))};\n" + OVERLAY_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["order"] == sorted(out["order"], reverse=True)
+    assert out["hit"] is True and out["gapMiss"] is None
+    assert out["range"] == [10, 13]
+
+    svg = ET.fromstring(out["svg"])
+    ns = "{http://www.w3.org/2000/svg}"
+    # one pattern tile, one background per row, one rect per segment
+    assert len(svg.findall(f".//{ns}rect")) == 1 + out["employees"] + out["segs"]
+    assert [t.text for t in svg.findall(f"{ns}text")][13:] == out["order"]
+
+
+STREAMING_JS = r"""
+const fs = require("fs");
+const text = fs.readFileSync(CSV, "utf8");
+async function* chunked(str, size){ for (let i=0; i<str.length; i+=size) yield str.slice(i, i+size); }
+const Q3 = '"'.repeat(3);
+const tricky = 'a, "b,1" ,c\r\n"x""y",2,"line\nbreak"\r\n\r\n"",,' + Q3 + 'q' + Q3 + '\n';
+(async () => {
+  const tokens = [];
+  const parser = createCsvStreamParser(r => tokens.push(r));
+  for await (const c of chunked(tricky, 1)) parser.push(c);
+  parser.finish();
+
+  const stats = {};
+  const directStore = normalizeRows(parseCSVbasic(text), stats);
+  const direct = runPipeline(directStore, "crew");
+  const progress = [];
+  const {meta, buf} = await normalizeCsvStream(chunked(text, 997), p => { progress.push(p.rows); });
+  const data = decodePayload(meta, buf);
+  const streamed = runPipeline(data, "crew", data);
+  process.stdout.write(JSON.stringify({
+    tokensSame: JSON.stringify(tokens) === JSON.stringify(parseCSVbasic(tricky)), tokens,
+    same: flaggedCsvText(data, streamed.flagged) === flaggedCsvText(directStore, direct.flagged), flagged: direct.flagged.length,
+    shifts: [data.n, directStore.n], stats: [meta.stats, stats], rows: meta.rows,
+    optional: data.optionalCols, monotonic: progress.every((v, i) => i === 0 || v >= progress[i-1]),
+  }));
+})();
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_streamed_csv_normalizes_like_whole_file_parse(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    script = build_web.ENGINE_JS + f"\nvar params = {{restThreshold:8, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2, dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()}};\nconst CSV = {json.dumps(str(csv_path))};\n" + STREAMING_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    # Quotes, escaped quotes, embedded newlines and CRLF split across 1-char chunks.
+    assert out["tokensSame"]
+    assert out["tokens"] == [{"a": "x\"y", "b,1": "2", "c": "line\nbreak"}, {"a": "", "b,1": "", "c": "\"q\""}]
+    assert out["same"] and out["flagged"] > 0
+    assert out["shifts"][0] == out["shifts"][1]
+    assert out["stats"][0] == {"missingShiftTime": out["stats"][1]["missingShiftTime"], "missingCostCenter": out["stats"][1]["missingCostCenter"], "invalidRows": 0}
+    assert out["optional"] == ["crew"] and out["rows"] > out["stats"][0]["missingShiftTime"]
+    assert out["monotonic"]
+
+
+FILTER_JS = r"""
+// The single-pass filter the indexed one falls back to.
+function scanView(store){
+  const {dateStart, dateEnd, daysOfWeek: days, costCenters: centers} = params;
+  const lo = dateStart ? dateStart.getTime() : -Infinity;
+  const hi = dateEnd ? new Date(dateEnd.getFullYear(), dateEnd.getMonth(), dateEnd.getDate(), 23,59,59).getTime() : Infinity;
+  const out = [];
+  for (let i=0; i<store.n; i++){
+    const d = new Date(store.start[i]);
+    if (store.start[i] < lo || store.start[i] > hi) continue;
+    if (days.size && !days.has(d.getDay())) continue;
+    if (centers.size && !centers.has(store.dicts.cost_center[store.cost_center[i]])) continue;
+    out.push(i);
+  }
+  return out;
+}
+const store = normalizeRows(parseCSVbasic(require("fs").readFileSync(CSV, "utf8")));
+const base = (p) => Object.assign({dateStart: null, dateEnd: null, daysOfWeek: new Set(DEFAULT_DAYS), costCenters: new Set()}, p);
+const steps = [
+  {}, {daysOfWeek: new Set([1,2,3,4,5])}, {costCenters: new Set(["CC-2"])}, {costCenters: new Set(["CC-1", "CC-3", "nope"])},
+  {dateStart: new Date(2025,1,10), dateEnd: new Date(2025,1,10)},
+  {dateStart: new Date(2025,1,10), dateEnd: new Date(2025,1,12), costCenters: new Set(["CC-2"])},
+  {dateStart: new Date(2025,1,14), dateEnd: new Date(2025,1,16), costCenters: new Set(["CC-1", "CC-3"]), daysOfWeek: new Set([0,6])},
+  {dateStart: new Date(2025,1,20)}, {dateEnd: new Date(2025,1,3)}, {dateStart: new Date(2026,0,1)},
+  {dateStart: new Date(2025,1,1), dateEnd: new Date(2025,1,28), costCenters: new Set(["CC-1"]), daysOfWeek: new Set([3])}
+];
+const mismatched = [];
+const sizes = [];
+steps.forEach((p, k) => {
+  params = base(p);
+  const got = Array.from(filterView(store)), want = scanView(store);
+  if (got.length !== want.length || got.some((v, j) => v !== want[j])) mismatched.push(k);
+  sizes.push(got.length);
+});
+process.stdout.write(JSON.stringify({mismatched, sizes, n: store.n, indexed: !!store.filterIndex}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_indexed_filters_match_linear_scan(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    script = build_web.ENGINE_JS + f"\nvar params = {{}};\nconst CSV = {json.dumps(str(csv_path))};\n" + FILTER_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["indexed"]
+    assert out["mismatched"] == []
+    # Narrow windows come off the index; the empty and full views are covered too.
+    assert 0 < out["sizes"][5] < out["n"] / 20
+    assert out["sizes"][0] == out["n"] and out["sizes"][9] == 0
+
+
+CALENDAR_JS = r"""
+// The per-render Map-of-Sets aggregation the cube replaced.
+function legacyCalendarData(list){
+  const byMonth = new Map();
+  for (const s of list){
+    const key = `${s.start.getFullYear()}-${s.start.getMonth()}`;
+    if (!byMonth.has(key)) byMonth.set(key, {year: s.start.getFullYear(), month: s.start.getMonth(), days: new Map()});
+    const days = byMonth.get(key).days;
+    if (!days.has(s.start.getDate())) days.set(s.start.getDate(), {employees: new Set(), dbEmployees: new Set()});
+    const info = days.get(s.start.getDate());
+    info.employees.add(s.employee_id);
+    if (s.double_bubble) info.dbEmployees.add(s.employee_id);
+  }
+  return Array.from(byMonth.values()).sort((a,b)=> (a.year - b.year) || (a.month - b.month));
+}
+const store = normalizeRows(parseCSVbasic(require("fs").readFileSync(CSV, "utf8")));
+const out = runPipeline(store, "");
+const cube = buildCalendarCube(store, out.view);
+const employees = store.dicts.employee;
+const mismatched = [];
+[employees.slice(0, 1), employees.filter((_, c)=> c % 3 === 0), employees, []].forEach((names, k) => {
+  const mask = employeeMask(store, names);
+  const sel = calendarSelection(cube, mask);
+  const counts = calendarCounts(cube, sel);
+  const legacy = legacyCalendarData(Array.from(out.view.filter(i=> mask[store.employee[i]]), i=> shiftRecord(store, i)));
+  const got = [];
+  for (let d=0; d<counts.shifts.length; d++){
+    if (!counts.shifts[d]) continue;
+    const date = new Date((counts.firstDay + d) * 864e5);
+    const names = calendarDayEmployees(cube, sel, counts.firstDay + d).map(c=> employees[c]).sort().join(",");
+    got.push([date.getUTCFullYear(), date.getUTCMonth(), date.getUTCDate(), counts.shifts[d], counts.doubles[d], names].join("|"));
+  }
+  const want = [];
+  for (const m of legacy){
+    for (const [day, info] of Array.from(m.days).sort((a,b)=> a[0] - b[0])){
+      want.push([m.year, m.month, day, info.employees.size, info.dbEmployees.size, Array.from(info.employees).sort().join(",")].join("|"));
+    }
+  }
+  const months = calendarMonths(counts).map(m=> m.year + "-" + m.month).join();
+  if (got.join("\n") !== want.join("\n") || months !== legacy.map(m=> m.year + "-" + m.month).join()) mismatched.push(k);
+});
+process.stdout.write(JSON.stringify({mismatched, days: cube.days, doubles: Array.from(calendarCounts(cube, calendarSelection(cube, employeeMask(store, employees))).doubles).reduce((a, b)=> a + b, 0)}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_calendar_cube_counts_match_per_render_aggregation(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=70)
+    script = build_web.ENGINE_JS + f"\nvar params = {{restThreshold:8, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2, dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()}};\nconst CSV = {json.dumps(str(csv_path))};\n" + CALENDAR_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["days"] >= 28 and out["doubles"] > 0
+    assert out["mismatched"] == []
+
+
+FLAG_TABLE_JS = r"""
+// Cell values as the DOM sort used to read them (innerText of each <td>).
+function legacyValues(html){
+  const tds = Array.from(html.matchAll(/<td[^>]*>([\s\S]*?)<\/td>/g), m=> m[1].replace(/<[^>]+>/g, "").trim());
+  return {
+    employee_id: tds[0], start: tds[1], end: tds[2], hours: parseFloat(tds[3])||0, rest_gap_h: parseFloat(tds[4])||0,
+    double_bubble: tds[5].includes("Yes")?1:0, callin: tds[6].includes("Yes")?1:0,
+    deviation: tds[7].includes("No")?0:parseFloat(tds[7])||0, avail_count: parseInt(tds[8])||0, est_savings: parseFloat(tds[9])||0
+  };
+}
+const store = normalizeRows(parseCSVbasic(require("fs").readFileSync(CSV, "utf8")));
+const flagged = runPipeline(store, "crew").flagged;
+const values = new Map(Array.from(flagged, i=> [i, legacyValues(flaggedRowHtml(store, i))]));
+const unordered = [];
+for (const key of Object.keys(FLAGGED_SORT_KEYS)){
+  for (const asc of [true, false]){
+    const rows = sortFlagged(store, flagged, key, asc);
+    const sameSet = rows.length === flagged.length && Array.from(rows).sort((a,b)=> a-b).every((v, k)=> v === flagged[k]);
+    let ordered = sameSet;
+    for (let k=1; k<rows.length && ordered; k++){
+      const a = values.get(rows[k-1])[key], b = values.get(rows[k])[key];
+      if (asc ? a > b : a < b) ordered = false;
+    }
+    if (!ordered) unordered.push(key + (asc ? "+" : "-"));
+  }
+}
+// Equal keys keep their incoming order.
+const byFlag = sortFlagged(store, flagged, "double_bubble", false);
+const stable = byFlag.every((v, k)=> v === flagged[k]);
+const text = flaggedCsvText(store, flagged);
+const chunked = Array.from(flaggedCsvChunks(store, flagged, 7)).join("");
+const big = Int32Array.from({length: 100000}, (_, k)=> flagged[k % flagged.length]);
+let t = performance.now();
+sortFlagged(store, big, "est_savings", false);
+const sortMs = performance.now() - t;
+process.stdout.write(JSON.stringify({unordered, stable, sameCsv: text === chunked, flagged: flagged.length, sortMs,
+  lines: text.split("\n").length, chunks: Array.from(flaggedCsvChunks(store, flagged, 7)).length}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_flagged_table_typed_sort_and_chunked_export(tmp_path: Path):
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import build_web
+    from test_double_bubble import synthetic_hourly_csv
+
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=60)
+    script = build_web.ENGINE_JS + f"\nvar params = {{restThreshold:8, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2, dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()}};\nconst CSV = {json.dumps(str(csv_path))};\n" + FLAG_TABLE_JS
+    env = dict(os.environ, TZ="UTC")
+    out = json.loads(subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["flagged"] > 20
+    assert out["unordered"] == []
+    assert out["stable"]
+    assert out["sameCsv"] and out["lines"] == out["flagged"] + 1
+    assert out["chunks"] == 1 + -(-out["flagged"] // 7)
+
+
+DATASET_CACHE_JS = r"""
+(async () => {
+  const text = "employee_id,calendar_date\n" + "E1,01/02/2025\n".repeat(700);
+  const blob = new Blob([text]);
+  const entries = [
+    {key: "a", bytes: 40, lastUsed: 3}, {key: "b", bytes: 30, lastUsed: 1}, {key: "c", bytes: 20, lastUsed: 2},
+  ];
+  process.stdout.write(JSON.stringify({
+    size: blob.size,
+    hash: await blobContentHash(blob, 1000),
+    sameAcrossBlobs: await blobContentHash(new Blob([text.slice(0, 5), text.slice(5)]), 1000) === await blobContentHash(blob, 1000),
+    changed: await blobContentHash(new Blob([text.replace("E1,01/02", "E1,01/03")]), 1000),
+    key: datasetCacheKey("shifts.csv", blob.size, "ab"),
+    evictions: [100, 90, 60, 20, 0].map(cap => datasetCacheEvictions(entries, 10, cap)),
+  }));
+})();
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_dataset_cache_key_hashes_blocks_and_lru_evictions():
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2] / "scripts"))
+    import build_web
+
+    out = json.loads(subprocess.run(["node", "-e", build_web.ENGINE_JS + DATASET_CACHE_JS], check=True, capture_output=True, text=True).stdout)
+    data = ("employee_id,calendar_date\n" + "E1,01/02/2025\n" * 700).encode()
+    blocks = b"".join(hashlib.sha256(data[k : k + 1000]).digest() for k in range(0, len(data), 1000))
+    assert out["size"] == len(data)
+    assert out["hash"] == hashlib.sha256(blocks).hexdigest()
+    assert out["sameAcrossBlobs"] and out["changed"] != out["hash"]
+    assert out["key"] == f"ab|{len(data)}|shifts.csv"
+    # Least recently used first (b, then c, then a) until the incoming 10 bytes fit.
+    assert out["evictions"] == [[], ["b"], ["b", "c"], ["b", "c", "a"], ["b", "c", "a"]]
@@ -0,0 +1,211 @@
+import importlib.util
+import json
+import os
+import random
+import shutil
+import subprocess
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.analytics import double_bubble as db
+
+ROOT = Path(__file__).resolve().parents[2]
+HOURS = [f"{h:02d}" for h in range(24)]
+
+
+def load_build_web():
+    spec = importlib.util.spec_from_file_location("build_web", str(ROOT / "scripts" / "build_web.py"))
+    mod = importlib.util.module_from_spec(spec)
+    assert spec and spec.loader
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def hourly_frame(rows):
+    records = []
+    for emp, day, shift_time, cost_center, hours, crew in rows:
+        rec = {"employee_id": emp, "calendar_date": day, "shift_time": shift_time, "cost_center": cost_center, "crew": crew}
+        rec.update({h: str(hours.get(h, "")) for h in HOURS})
+        records.append(rec)
+    return pd.DataFrame(records, columns=["employee_id", "calendar_date", *HOURS, "shift_time", "cost_center", "crew"])
+
+
+def legacy_frame(rows):
+    return pd.DataFrame(rows, columns=["employee_id", "start_datetime", "end_datetime", "shift_time", "cost_center", "crew"])
+
+
+def test_hourly_rows_merge_full_hours_and_split_after_partial_hour():
+    raw = hourly_frame(
+        [
+            ("E1", "08/12/2025", "REG", "CC-1", {"06": 1, "07": 1, "08": 0.5, "09": 1, "21": 1, "22": 0.25}, "A"),
+        ]
+    )
+    shifts = db.normalize_rows(raw)
+    assert list(db.local_iso(shifts["start"].to_numpy())) == ["2025-08-12 06:00", "2025-08-12 09:00", "2025-08-12 21:00"]
+    assert list(db.local_iso(shifts["end"].to_numpy())) == ["2025-08-12 08:30", "2025-08-12 10:00", "2025-08-12 22:15"]
+
+
+def test_rows_missing_shift_time_or_cost_center_are_counted_and_skipped():
+    raw = legacy_frame(
+        [
+            ("E1", "2025-08-11 07:00", "2025-08-11 15:00", "", "CC-1", "A"),
+            ("E1", "2025-08-12 07:00", "2025-08-12 15:00", "REG", "", "A"),
+            ("E1", "2025-08-13 22:00", "2025-08-13 06:00", "OT2", "CC-1", "A"),
+            ("E1", "2025-08-14 22:00", "2025-08-14 24:30", "OT2", "CC-1", "A"),
+            ("", "2025-08-15 22:00", "2025-08-15 23:00", "OT2", "CC-1", "A"),
+        ]
+    )
+    stats = {}
+    shifts = db.normalize_rows(raw, stats)
+    assert stats == {"missing_shift_time": 1, "missing_cost_center": 1, "invalid_rows": 2}
+    # End before start rolls over to the next day.
+    assert list(db.local_iso(shifts["end"].to_numpy())) == ["2025-08-14 06:00"]
+
+
+def test_double_bubble_flags_alternates_and_savings():
+    raw = legacy_frame(
+        [
+            ("E1", "2025-08-11 08:00", "2025-08-11 16:00", "OT2", "CC-1", "A"),
+            ("E1", "2025-08-11 20:00", "2025-08-12 04:00", "REG", "CC-1", "A"),
+            ("E2", "2025-08-10 06:00", "2025-08-10 14:00", "REG", "CC-1", "A"),
+            ("E3", "2025-08-11 22:00", "2025-08-12 06:00", "REG", "CC-1", "A"),
+            ("E4", "2025-08-11 07:00", "2025-08-11 15:00", "REG", "CC-1", "A"),
+            ("E5", "2025-08-09 07:00", "2025-08-09 15:00", "REG", "CC-2", "B"),
+        ]
+    )
+    result = db.analyze(raw, db.Params(rest_threshold=8, base_rate=100, db_multiplier=2))
+    flagged = db.flagged_table(result.flagged)
+    assert len(flagged) == 1
+    row = flagged.iloc[0]
+    assert row["employee_id"] == "E1"
+    assert row["rest_gap_hours"] == "4.00"
+    # E2 and E5 are free and rested; E3 overlaps; E4 ended 5h before.
+    assert row["alternates_available"] == 2
+    assert row["est_savings"] == "800.00"
+
+    crew = db.analyze(raw, db.Params(availability_column="crew"))
+    assert db.flagged_table(crew.flagged).iloc[0]["alternates_available"] == 1
+
+
+def test_zero_length_shift_at_flagged_start_counts_as_last_shift():
+    raw = legacy_frame(
+        [
+            ("E1", "2025-08-11 08:00", "2025-08-11 16:00", "OT2", "CC-1", "A"),
+            ("E1", "2025-08-11 20:00", "2025-08-12 04:00", "REG", "CC-1", "A"),
+            ("E2", "2025-08-10 06:00", "2025-08-10 14:00", "REG", "CC-1", "A"),
+            ("E2", "2025-08-11 20:00", "2025-08-11 20:00", "PTO", "CC-1", "A"),
+            ("E5", "2025-08-09 07:00", "2025-08-09 15:00", "REG", "CC-2", "B"),
+        ]
+    )
+    result = db.analyze(raw, db.Params(rest_threshold=8))
+    # E2's 0 h shift ends right at the flagged start: no rest, so only E5 is free.
+    assert db.flagged_table(result.flagged).iloc[0]["alternates_available"] == 1
+
+
+def synthetic_hourly_csv(path: Path, employees: int = 40, seed: int = 7, ids=None) -> None:
+    rng = random.Random(seed)
+    ids = ids or [f"E{e:03d}" for e in range(employees)]
+    lines = [",".join(["employee_id", "calendar_date", *HOURS, "shift_time", "cost_center", "crew"])]
+    for e in range(employees):
+        crew = rng.choice(["A", "B", ""])
+        for d in range(1, 29):
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                start, length = rng.randint(0, 20), rng.randint(1, 10)
+                hours = {HOURS[h]: 1 for h in range(start, min(24, start + length))}
+                if rng.random() < 0.3:
+                    hours[HOURS[min(23, start + length)]] = rng.choice([0.25, 0.5, 0.75])
+                shift_time = rng.choice(["REG", "REG", "OT2", "OT1", "Call-in", "PTO", "chol", ""])
+                cost_center = rng.choice(["CC-1", "CC-2", "CC-3"]) if rng.random() > 0.02 else ""
+                cells = [ids[e], f"02/{d:02d}/2025", *[str(hours.get(h, "")) for h in HOURS], shift_time, cost_center, crew]
+                lines.append(",".join(cells))
+    path.write_text("\n".join(lines), encoding="utf-8")
+
+
+def run_engine_js(csv_path: Path, availability_column: str, tz: str = "UTC") -> str:
+    engine = load_build_web().ENGINE_JS
+    script = engine + (
+        "\nvar params = {restThreshold:8, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2,"
+        " dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()};\n"
+        f"const rows = parseCSVbasic(require('fs').readFileSync({json.dumps(str(csv_path))}, 'utf8'));\n"
+        "const store = normalizeRows(rows);\n"
+        f"process.stdout.write(flaggedCsvText(store, runPipeline(store, {json.dumps(availability_column)}).flagged));\n"
+    )
+    env = dict(os.environ, TZ=tz)
+    return subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+@pytest.mark.parametrize("availability_column", ["", "crew"])
+@pytest.mark.parametrize("tz", ["UTC", "America/Chicago", "Europe/Berlin"])
+def test_matches_page_engine_output(tmp_path: Path, availability_column: str, tz: str):
+    # February 2025 has no clock change in either DST zone.
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    expected = run_engine_js(csv_path, availability_column, tz)
+    result = db.analyze(db.read_shifts_csv(str(csv_path)), db.Params(availability_column=availability_column))
+    assert len(result.flagged) > 0
+    assert db.flagged_csv_text(result.flagged).rstrip("\n") == expected
+
+
+MIXED_IDS = ["A6", "B2", "a3", "b1", "Ä4", "é5", "e5", "E5", "E-7", "E_7", "E 7", "E10", "e9", "#1", "Ñ0", "n0"]
+
+
+def test_employees_sort_like_locale_compare():
+    assert sorted(MIXED_IDS[:6], key=db.collation_key) == ["a3", "Ä4", "A6", "b1", "B2", "é5"]
+    raw = legacy_frame([(e, "2025-08-11 07:00", "2025-08-11 15:00", "REG", "CC-1", "") for e in MIXED_IDS])
+    assert list(db.normalize_rows(raw)["employee_id"]) == [
+        "#1", "a3", "Ä4", "A6", "b1", "B2", "E 7", "E_7", "E-7", "E10", "e5", "E5", "é5", "e9", "n0", "Ñ0",
+    ]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_mixed_case_and_accented_ids_match_page_engine_output(tmp_path: Path):
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=len(MIXED_IDS), ids=MIXED_IDS)
+    expected = run_engine_js(csv_path, "")
+    result = db.analyze(db.read_shifts_csv(str(csv_path)), db.Params())
+    assert result.flagged["employee_id"].nunique() > 5
+    assert db.flagged_csv_text(result.flagged).rstrip("\n") == expected
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_rest_gap_across_dst_change_is_wall_clock(tmp_path: Path):
+    # 8 wall-clock hours over the 2025-03-09 spring-forward are 7 elapsed hours in Chicago.
+    csv_path = tmp_path / "shifts.csv"
+    csv_path.write_text(
+        "employee_id,start_datetime,end_datetime,shift_time,cost_center\n"
+        "E1,2025-03-08 18:00,2025-03-08 22:00,OT2,CC-1\n"
+        "E1,2025-03-09 06:00,2025-03-09 14:00,REG,CC-1\n",
+        encoding="utf-8",
+    )
+    result = db.analyze(db.read_shifts_csv(str(csv_path)), db.Params())
+    assert len(result.flagged) == 0
+    assert db.flagged_csv_text(result.flagged).rstrip("\n") == run_engine_js(csv_path, "", "Europe/Berlin")
+    page = run_engine_js(csv_path, "", "America/Chicago").splitlines()
+    assert len(page) == 2 and '"7.00"' in page[1]
+
+
+ROLLOVER_CSV = """employee_id,start_datetime,end_datetime,shift_time,cost_center
+E1,2025-03-01 16:00,2025-03-01 24:00,OT2,CC-1
+E1,2025-03-02 04:00,2025-03-02 12:00,REG,CC-1
+E2,2025-02-29 08:00,2025-02-29 16:00,REG,CC-1
+E3,2025-02-28T14:00:00Z,2025-02-29T18:00:00.00Z,REG,CC-1
+E4,2025-02-28 16:00,2025-02-28T24:00:00Z,REG,CC-1
+E5,2025-03-01 22:00,2025-03-01 24:30,REG,CC-1
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+def test_rollover_stamps_match_page_engine_output(tmp_path: Path):
+    # 24:00 is the next midnight and Feb 29/30 run into March, on the fast path and the generic one.
+    csv_path = tmp_path / "shifts.csv"
+    csv_path.write_text(ROLLOVER_CSV, encoding="utf-8")
+    expected = run_engine_js(csv_path, "")
+    result = db.analyze(db.read_shifts_csv(str(csv_path)), db.Params())
+    table = db.flagged_table(result.flagged)
+    # E2, E3 and E4 (read by the generic parser) rested 12, 10 and 28 h; E5 is dropped.
+    assert list(table[["employee_id", "alternates_available", "est_savings"]].itertuples(index=False, name=None)) == [("E1", 3, "800.00")]
+    assert result.stats["invalid_rows"] == 1
+    assert db.flagged_csv_text(result.flagged).rstrip("\n") == expected
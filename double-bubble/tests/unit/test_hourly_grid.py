@@ -0,0 +1,51 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.analytics.hourly_grid import MS_PER_HOUR, expand_hourly
+
+
+def expand_rows_reference(hours, day_ms):
+    # Row-at-a-time port of the page's expandHourlyRow.
+    out = []
+    for r, (row, day) in enumerate(zip(hours, day_ms)):
+        current = None
+        for h, v in enumerate(row):
+            if not (math.isfinite(v) and v > 0):
+                if current:
+                    out.append(current)
+                    current = None
+                continue
+            slot_start = int(day) + h * MS_PER_HOUR
+            slot_end = slot_start + math.trunc(min(float(v), 1.0) * MS_PER_HOUR)
+            if current and abs(slot_start - current[2]) < 1:
+                current[2] = slot_end
+            else:
+                if current:
+                    out.append(current)
+                current = [r, slot_start, slot_end]
+        if current:
+            out.append(current)
+    return out
+
+
+@pytest.mark.parametrize("dtype,chunk_rows", [(np.float64, 1 << 16), (np.float64, 7), (np.float32, 64)])
+def test_matches_row_at_a_time_expansion(dtype, chunk_rows):
+    rng = np.random.default_rng(3)
+    choices = np.array([0, 0, 0, 1, 1, 1, 0.25, 0.5, 0.75, 2.0, -1, np.nan, np.inf], dtype=dtype)
+    hours = rng.choice(choices, size=(500, 24))
+    day_ms = (np.arange(500, dtype=np.int64) // 3 + 20_000) * 86_400_000
+    rows, start, end = expand_hourly(hours, day_ms, chunk_rows=chunk_rows)
+    assert [list(t) for t in zip(rows.tolist(), start.tolist(), end.tolist())] == expand_rows_reference(hours, day_ms)
+
+
+def test_partial_hour_ends_a_run_and_rejects_bad_shapes():
+    hours = np.zeros((1, 24))
+    hours[0, [6, 7, 8, 9, 23]] = [1, 0.5, 1, 1.5, 1]
+    rows, start, end = expand_hourly(hours, np.array([0]))
+    assert (start // 60_000).tolist() == [360, 480, 1380]
+    assert (end // 60_000).tolist() == [450, 600, 1440]
+    assert rows.tolist() == [0, 0, 0]
+    with pytest.raises(ValueError):
+        expand_hourly(np.zeros((2, 23)), np.zeros(2))
@@ -0,0 +1,79 @@
+import base64
+import json
+import os
+import shutil
+import subprocess
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.analytics import double_bubble as db
+from app.analytics import payload as pl
+from test_double_bubble import load_build_web, synthetic_hourly_csv
+
+
+def decode_columns(header, buf):
+    dtypes = {"Float64Array": "<f8", "Int32Array": "<i4", "Uint8Array": "u1"}
+    return {c["name"]: np.frombuffer(buf, dtype=dtypes[c["dtype"]], count=c["length"], offset=c["offset"]) for c in header["columns"]}
+
+
+def test_payload_columns_round_trip(tmp_path: Path):
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=12)
+    raw = db.read_shifts_csv(str(csv_path))
+    header, buf = pl.build_payload(raw)
+    cols = decode_columns(header, buf)
+
+    stats = {}
+    shifts = db.compute_rest_and_flags(db.normalize_rows(raw, stats), 8.0)
+    assert header["shifts"] == len(shifts) and header["rows"] == len(raw)
+    assert header["stats"] == {
+        "missingShiftTime": stats["missing_shift_time"],
+        "missingCostCenter": stats["missing_cost_center"],
+        "invalidRows": stats["invalid_rows"],
+    }
+    assert np.array_equal(cols["start"], shifts["start"].to_numpy().astype(np.float64))
+    assert [header["dicts"]["employee"][c] for c in cols["employee"]] == list(shifts["employee_id"])
+    assert int(cols["double_bubble"].sum()) == int(shifts["double_bubble"].sum())
+    assert header["extras"].keys() == {"crew"}
+    # Each shift's row points at its source row's optional values in the raw table.
+    crew = [header["extras"]["crew"][c] for c in cols["extra:crew"][cols["row"]]]
+    assert crew == list(db._text(raw, "crew").to_numpy(dtype=object)[shifts["row"].to_numpy()])
+    assert len(cols["extra:crew"]) == len(np.unique(shifts["row"]))
+    assert all(c["offset"] % 8 == 0 for c in header["columns"])
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+@pytest.mark.parametrize("availability_column,rest_threshold", [("", 8), ("crew", 8), ("crew", 6)])
+def test_page_decodes_payload_to_same_flags(tmp_path: Path, availability_column: str, rest_threshold: float):
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path)
+    raw = db.read_shifts_csv(str(csv_path))
+    header, buf = pl.build_payload(raw)
+    (tmp_path / "payload.bin").write_bytes(buf)
+
+    # A different threshold in the page must recompute flags rather than reuse the embedded ones.
+    script = load_build_web().ENGINE_JS + (
+        f"\nvar params = {{restThreshold:{rest_threshold}, devThreshold:1, baselineMode:'scheduled', baseRate:100, dbMultiplier:2,"
+        " dateStart:null, dateEnd:null, daysOfWeek:new Set(DEFAULT_DAYS), costCenters:new Set()};\n"
+        f"const meta = JSON.parse({json.dumps(pl.header_json(header))});\n"
+        f"const bytes = require('fs').readFileSync({json.dumps(str(tmp_path / 'payload.bin'))});\n"
+        "const buf = bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength);\n"
+        "const payload = decodePayload(meta, buf);\n"
+        f"process.stdout.write(flaggedCsvText(payload, runPipeline(payload, {json.dumps(availability_column)}, payload).flagged));\n"
+    )
+    env = dict(os.environ, TZ="UTC")
+    out = subprocess.run(["node", "-e", script], check=True, capture_output=True, text=True, env=env).stdout
+
+    result = db.analyze(raw, db.Params(rest_threshold=rest_threshold, availability_column=availability_column))
+    assert len(result.flagged) > 0
+    assert db.flagged_csv_text(result.flagged).rstrip("\n") == out
+
+
+def test_base64_payload_decodes_to_buffer(tmp_path: Path):
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=3)
+    header, buf = pl.build_payload(db.read_shifts_csv(str(csv_path)))
+    assert base64.b64decode(pl.payload_base64(buf)) == buf
+    assert "</" not in pl.header_json({"x": "</script>"})
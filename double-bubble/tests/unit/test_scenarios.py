@@ -0,0 +1,85 @@
+from dataclasses import replace
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analytics import double_bubble as db
+from app.analytics import scenarios
+from test_double_bubble import legacy_frame, synthetic_hourly_csv
+
+REST = [4, 8, 10.5, 16, 30, 72]
+
+
+@pytest.fixture
+def raw(tmp_path: Path) -> pd.DataFrame:
+    csv_path = tmp_path / "shifts.csv"
+    synthetic_hourly_csv(csv_path, employees=12, seed=3)
+    return db.read_shifts_csv(str(csv_path))
+
+
+@pytest.mark.parametrize(
+    "params",
+    [db.Params(), db.Params(availability_column="crew", days_of_week=frozenset([1, 2, 3, 4, 5]), baseline_mode="all")],
+)
+def test_sweep_matches_analyze_per_scenario(raw: pd.DataFrame, params: db.Params):
+    table = scenarios.sweep(raw, REST, base_rates=[80, 100], db_multipliers=[1.5, 2], dev_thresholds=[0.5, 2], params=params)
+    assert list(table.columns) == scenarios.SCENARIO_COLUMNS
+    assert len(table) == len(REST) * 2 * 2 * 2
+    for row in table.itertuples(index=False):
+        scenario = replace(
+            params, rest_threshold=row.rest_threshold, dev_threshold=row.dev_threshold,
+            base_rate=row.base_rate, db_multiplier=row.db_multiplier,
+        )
+        result = db.analyze(raw, scenario)
+        flagged = result.flagged
+        assert row.flagged == len(flagged)
+        assert row.with_alternates == int((flagged["alternates"] > 0).sum())
+        assert row.est_savings == pytest.approx(flagged["est_savings"].sum())
+        assert row.deviations == int(result.shifts["deviation"].sum())
+    # The grid is only a useful check if coverage actually varies with the threshold.
+    assert table["flagged"].nunique() > 2
+    assert (table["with_alternates"] < table["flagged"]).any()
+
+
+def test_max_alternate_rest_brackets_alternates_counts(raw: pd.DataFrame):
+    params = db.Params(availability_column="crew")
+    computed = db.compute_view(db.compute_rest_and_flags(db.normalize_rows(raw), np.inf), params)
+    index, queries = db.alternate_queries(computed, raw, params)
+    best = scenarios.max_alternate_rest(index, *queries, 24.0)
+    for t in (1.0, 8.0, 12.5, 24.0):
+        np.testing.assert_array_equal(db.count_alternates(index, *queries, t) > 0, best >= t)
+
+
+def test_max_alternate_rest_with_zero_length_shifts():
+    raw = legacy_frame(
+        [
+            ("E1", "2025-08-11 08:00", "2025-08-11 16:00", "OT2", "CC-1", "A"),
+            ("E1", "2025-08-11 20:00", "2025-08-12 04:00", "OT2", "CC-1", "A"),
+            ("E1", "2025-08-12 06:00", "2025-08-12 06:00", "PTO", "CC-1", "A"),
+            ("E2", "2025-08-11 04:00", "2025-08-11 08:00", "REG", "CC-1", "A"),
+            ("E2", "2025-08-11 20:00", "2025-08-11 20:00", "PTO", "CC-1", "A"),
+            ("E3", "2025-08-11 06:00", "2025-08-11 10:00", "REG", "CC-1", "A"),
+            ("E3", "2025-08-12 06:00", "2025-08-12 12:00", "REG", "CC-1", "A"),
+            ("E4", "2025-08-11 09:00", "2025-08-11 15:00", "REG", "CC-1", "A"),
+        ]
+    )
+    params = db.Params()
+    computed = db.compute_view(db.compute_rest_and_flags(db.normalize_rows(raw), np.inf), params)
+    index, queries = db.alternate_queries(computed, raw, params)
+    assert (queries[0] == queries[1]).any()
+    best = scenarios.max_alternate_rest(index, *queries, 24.0)
+    # E2's 0 h shift at 20:00 leaves no rest; E3's shift starting at the 0 h flagged 06:00 is not in the way.
+    np.testing.assert_array_equal(best, [10.0, 20.0])
+    for t in (1.0, 8.0, 12.5, 15.0, 24.0):
+        np.testing.assert_array_equal(db.count_alternates(index, *queries, t) > 0, best >= t)
+
+
+def test_sweep_cli_writes_scenario_table(raw: pd.DataFrame, tmp_path: Path):
+    src, out = tmp_path / "in.csv", tmp_path / "sweep.csv"
+    raw.to_csv(src, index=False)
+    scenarios.main(["--input", str(src), "--out", str(out), "--rest", "6,8", "--multipliers", "1.5,2,2.5"])
+    table = pd.read_csv(out)
+    assert len(table) == 6
+    assert set(table["base_rate"]) == {100.0}
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from app.analytics import double_bubble as db
+from app.analytics import synthetic
+from app.analytics.arrow_io import read_shifts
+
+CONFIG = synthetic.SyntheticConfig(employees=30, days=21, ot_rate=0.2, cost_centers=3, seed=5)
+
+
+def test_roster_is_deterministic_across_block_sizes():
+    whole = synthetic.synthetic_hourly_frame(CONFIG)
+    blocks = pd.concat(synthetic.synthetic_hourly_frames(CONFIG, block_employees=7), ignore_index=True)
+    assert list(whole.columns) == synthetic.COLUMNS
+    assert whole["employee_id"].nunique() == 30
+    assert set(whole["cost_center"]) == {"CC-1", "CC-2", "CC-3"}
+    assert whole.equals(synthetic.synthetic_hourly_frame(CONFIG))
+    # Blocks are seeded by their first employee, so only same-size blocks line up row for row.
+    assert blocks["employee_id"].nunique() == 30
+    assert not synthetic.synthetic_hourly_frame(synthetic.SyntheticConfig(employees=30, seed=6)).equals(whole)
+
+
+def test_overtime_rate_and_grid_shape():
+    frame = synthetic.synthetic_hourly_frame(synthetic.SyntheticConfig(employees=200, days=28, ot_rate=0.3))
+    worked = frame[frame["shift_time"] != "Call-in"]
+    ot = worked["shift_time"].isin(["OT1", "OT2"]).mean()
+    assert ot == pytest.approx(0.3, abs=0.03)
+    hours = frame[db.HOUR_COLUMNS].to_numpy()
+    assert ((hours > 0) | pd.isna(hours)).all()
+    assert (pd.DataFrame(hours).notna().sum(axis=1) > 0).all()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_written_roster_flags_double_bubbles(tmp_path: Path, suffix: str):
+    path = tmp_path / f"roster{suffix}"
+    rows = synthetic.write_synthetic(str(path), CONFIG, block_employees=8)
+    raw = read_shifts(str(path), ["crew"])
+    assert len(raw) == rows == sum(len(f) for f in synthetic.synthetic_hourly_frames(CONFIG, block_employees=8))
+    result = db.analyze(raw, db.Params(availability_column="crew"))
+    assert len(result.shifts) == rows
+    assert len(result.flagged) > 0
+    # Call-ins right after an overtime shift are the planted double bubbles.
+    assert "call-in" in set(result.flagged["shift_type"])
@@ -0,0 +1,145 @@
+import json
+import os
+import shutil
+import subprocess
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.analytics import double_bubble as db
+from app.analytics.timestamps import NAT, parse_layouts, sniff_layout
+from test_double_bubble import load_build_web
+
+# (value, wall-clock result or None, read by the fixed-position fast path). Both engines must agree.
+TIMESTAMP_CASES = [
+    ("2025-08-11", "2025-08-11T00:00", True),
+    ("2025-08-11 07:00", "2025-08-11T07:00", True),
+    ("2025-08-11T07:00", "2025-08-11T07:00", True),
+    ("2025-08-11 07:00:30", "2025-08-11T07:00:30", True),
+    ("2025-08-11T07:00:30.250", "2025-08-11T07:00:30.250", True),
+    ("2025/08/11 07:05", "2025-08-11T07:05", True),
+    ("2025-8-1 7:00", "2025-08-01T07:00", True),
+    ("2024-02-29 12:00", "2024-02-29T12:00", True),
+    ("08/11/2025", "2025-08-11T00:00", True),
+    ("8/1/2025 7:05", "2025-08-01T07:05", True),
+    ("08-11-2025 23:59:59", "2025-08-11T23:59:59", True),
+    ("12/31/1999 23:59:59.999", "1999-12-31T23:59:59.999", True),
+    # Rolled over like new Date(): 24:00 is the next midnight, days up to 31 run into the next month.
+    ("2025-03-01 24:00", "2025-03-02T00:00", True),
+    ("12/31/2025 24:00:00", "2026-01-01T00:00", True),
+    ("2025-02-30", "2025-03-02T00:00", True),
+    ("2/30/2025 24:00", "2025-03-03T00:00", True),
+    ("2025-04-31T07:00", "2025-05-01T07:00", True),
+    # Left to the generic parser: zones, names, mixed separators, odd precision, bad fields.
+    ("2025-08-11T07:00:00Z", "2025-08-11T07:00", False),
+    ("2025-08-11 07:00:00+02:00", "2025-08-11T05:00", False),
+    ("Aug 11 2025 07:00", "2025-08-11T07:00", False),
+    ("2025-08/11", "2025-08-11T00:00", False),
+    ("2025-08-11 07:00:30.25", "2025-08-11T07:00:30.250", False),
+    ("1/2/25", "2025-01-02T00:00", False),
+    ("2025-03-01T24:00:00Z", "2025-03-02T00:00", False),
+    ("2025-02-30 10:00:00+02:00", "2025-03-02T08:00", False),
+    ("2025-13-01", None, False),
+    ("2025-08-11 07:60", None, False),
+    ("2025-03-01 24:30", None, False),
+    ("2025-02-32", None, False),
+    ("garbage", None, False),
+    ("", None, False),
+]
+
+CALENDAR_CASES = [
+    ("08/11/2025", "2025-08-11", True),
+    ("8/1/2025", "2025-08-01", True),
+    ("8-1-2025", "2025-08-01", True),
+    ("1/2/25", "2025-01-02", True),
+    ("2/29/2024", "2024-02-29", True),
+    # Out-of-range parts roll over like new Date(y, m - 1, d).
+    ("13/01/2025", "2026-01-01", True),
+    ("0/5/2025", "2024-12-05", True),
+    ("02/30/25", "2025-03-02", True),
+    ("1/2/025", "2025-01-02", False),
+    ("2025-08-11", "2025-08-11", False),
+    ("Aug 11 2025", "2025-08-11", False),
+    ("x", None, False),
+    ("", None, False),
+]
+
+
+def wall_ms(text):
+    return None if text is None else int(np.datetime64(text, "ms").astype(np.int64))
+
+
+def fast_flags(values, calendar=False):
+    # One value per column, so every value gets its own sniff.
+    return [bool(parse_layouts(np.array([v], dtype=object), calendar)[1][0]) for v in values]
+
+
+def test_python_parsers_match_matrix():
+    values = [c[0] for c in TIMESTAMP_CASES]
+    got = [None if ms == NAT else int(ms) for ms in db.parse_datetimes(pd.Series(values))]
+    assert got == [wall_ms(c[1]) for c in TIMESTAMP_CASES]
+    assert fast_flags(values) == [c[2] for c in TIMESTAMP_CASES]
+
+    values = [c[0] for c in CALENDAR_CASES]
+    got = [None if ms == NAT else int(ms) for ms in db.parse_calendar_dates(pd.Series(values))]
+    assert got == [wall_ms(c[1]) for c in CALENDAR_CASES]
+    assert fast_flags(values, calendar=True) == [c[2] for c in CALENDAR_CASES]
+
+
+def test_layouts_match_generic_parser_on_mixed_columns():
+    rng = np.random.default_rng(5)
+    ms = np.datetime64("2023-01-01T00:00", "ms") + rng.integers(0, 3 * 365 * 86_400, 3000).astype("timedelta64[s]")
+    stamps = pd.Series(ms)
+    formats = ["%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M", "%Y-%m-%dT%H:%M", "%-m/%-d/%Y %-H:%M", "%Y/%m/%d"]
+    text = pd.concat([stamps.dt.strftime(f) for f in formats], ignore_index=True).sample(frac=1, random_state=1)
+    values = text.to_numpy(dtype=object)
+    fast, done = parse_layouts(values)
+    assert done.all()
+    generic = text.str.replace("/", "-", regex=False)
+    generic = generic.where(~generic.str.fullmatch(r"\d{4}-\d{2}-\d{2}"), generic + " 00:00")
+    assert (fast == db._naive_ms(generic.str.replace("T", " ", regex=False))).all()
+    # Unfit values are left for the generic parser, fit ones are still read.
+    values[:3] = ["Aug 11 2025", "2025-08-11T07:00Z", "soon"]
+    fast, done = parse_layouts(values)
+    assert not done[:3].any() and done[3:].all()
+    assert sniff_layout("2025-08-11 7:00").tolist() == [0] * 4 + [-1, 1, 1, -1, 2, 2, -1, 3, -1, 4, 4]
+
+
+PAGE_JS = r"""
+const slowT = v => { const d = parseMaybe(v); return d ? d.getTime() : null; };
+const slowC = v => { const d = parseCalendarDate(v); return d ? Date.UTC(d.getFullYear(), d.getMonth(), d.getDate()) : null; };
+const num = x => Number.isNaN(x) ? null : x;
+const reader = createTimestampReader();
+// Every quarter hour across both DST changes, through one warm reader, against new Date().
+let dstMismatches = 0;
+for (const [from, to] of [[Date.UTC(2025, 2, 8), Date.UTC(2025, 2, 10)], [Date.UTC(2025, 10, 1), Date.UTC(2025, 10, 3)]]){
+  for (let t = from; t < to; t += 9e5){
+    const s = new Date(t).toISOString().slice(0, 16).replace("T", " ");
+    if (parseTimestampMs(s, reader) !== slowT(s)) dstMismatches++;
+  }
+}
+process.stdout.write(JSON.stringify({
+  t: T.map(v => [num(parseTimestampMs(v, createTimestampReader())), slowT(v), !Number.isNaN(createTimestampReader()(v))]),
+  c: C.map(v => [num(parseCalendarDayMs(v, createTimestampReader(true))), slowC(v), !Number.isNaN(createTimestampReader(true)(v))]),
+  dstMismatches,
+}));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="node not installed")
+@pytest.mark.parametrize("tz", ["UTC", "America/New_York"])
+def test_page_parsers_match_matrix(tz):
+    build_web = load_build_web()
+    cases = f"\nconst T = {json.dumps([c[0] for c in TIMESTAMP_CASES])}, C = {json.dumps([c[0] for c in CALENDAR_CASES])};\n"
+    env = dict(os.environ, TZ=tz)
+    out = json.loads(subprocess.run(["node", "-e", build_web.ENGINE_JS + cases + PAGE_JS], check=True, capture_output=True, text=True, env=env).stdout)
+    assert out["dstMismatches"] == 0
+    for (value, expected, fast), (ms, generic, js_fast) in zip(TIMESTAMP_CASES, out["t"]):
+        assert (value, ms, js_fast) == (value, generic, fast)
+        if tz == "UTC":
+            assert (value, ms) == (value, wall_ms(expected))
+    for (value, expected, fast), (ms, generic, js_fast) in zip(CALENDAR_CASES, out["c"]):
+        assert (value, ms, js_fast) == (value, generic, fast)
+        if tz == "UTC":
+            assert (value, ms) == (value, wall_ms(expected))
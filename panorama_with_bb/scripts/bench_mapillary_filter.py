@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Times the Mapillary candidate filter: the per-item loop fetch_mapillary_full
+used to run (loop_filter below) against filter_mapillary, on synthetic Graph
+API items scattered around a target. Both must keep the same images.
+
+Usage:
+  python scripts/bench_mapillary_filter.py [--items 1000 5000 50000] [--years 2021,2023] [--repeat 5]
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from panorama_with_bb import bbox_from_circle, calculate_bearing, filter_mapillary  # noqa: E402
+
+LAT, LON = 47.6062, -122.3321
+
+
+def synthetic_items(n: int, radius_m: float = 300.0, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    min_lat, max_lat, min_lon, max_lon = bbox_from_circle(LAT, LON, radius_m)
+    lats = rng.uniform(min_lat, max_lat, n)
+    lons = rng.uniform(min_lon, max_lon, n)
+    captured = rng.integers(1_420_070_400_000, 1_735_689_600_000, n)  # 2015 .. 2025
+    headings = rng.uniform(0, 360, n)
+    items = []
+    for i in range(n):
+        item = {
+            "id": str(1_000_000 + i),
+            "thumb_original_url": f"https://example.invalid/{i}.jpg",
+            "captured_at": int(captured[i]),
+            "computed_compass_angle": float(headings[i]),
+            "computed_geometry": {"type": "Point", "coordinates": [float(lons[i]), float(lats[i])]},
+        }
+        if i % 3:
+            item["compass_angle"] = float(headings[i])
+        items.append(item)
+    return items
+
+
+def loop_filter(items, lat, lon, years=None, fov_deg=90.0):
+    """The per-item filter from fetch_mapillary_full before it was vectorized."""
+    half_fov = fov_deg / 2.0
+    picks = []
+    for img in items:
+        ts = img.get("captured_at")
+        try:
+            date_str = datetime.utcfromtimestamp(int(ts)/1000).strftime("%Y%m%d")
+        except:  # noqa: E722
+            date_str = "nodate"
+        year = date_str[:4]
+        if years and year not in years:
+            continue
+        coords = img.get("computed_geometry", {}).get("coordinates")
+        if not coords:
+            continue
+        cam_lon, cam_lat = coords
+        target_bearing = calculate_bearing(cam_lat, cam_lon, lat, lon)
+        exif = img.get("compass_angle")
+        comp = img.get("computed_compass_angle")
+        cam_heading = exif if exif is not None else comp
+        if cam_heading is None:
+            continue
+        diff = abs((cam_heading - target_bearing + 180) % 360 - 180)
+        if diff > half_fov:
+            continue
+        if not img.get("id") or not img.get("thumb_original_url"):
+            continue
+        rel = (target_bearing - cam_heading + 360) % 360
+        if rel > 180:
+            rel -= 360
+        picks.append((img, date_str, cam_heading, rel/fov_deg + 0.5))
+    return picks
+
+
+def best_of(repeat: int, fn, *args):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        out = fn(*args)
+        best = min(best, (time.perf_counter() - t) * 1e3)
+    return out, best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, nargs="+", default=[1000, 5000, 50000])
+    ap.add_argument("--years", default=None, help="Comma-separated years to keep")
+    ap.add_argument("--fov", type=float, default=90.0)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+    years = set(y.strip() for y in args.years.split(",")) if args.years else None
+
+    rows = []
+    for n in args.items:
+        items = synthetic_items(n)
+        slow, loop_ms = best_of(args.repeat, loop_filter, items, LAT, LON, years, args.fov)
+        fast, numpy_ms = best_of(args.repeat, filter_mapillary, items, LAT, LON, years, args.fov)
+        same = [(p[0]["id"], p[1]) for p in slow] == [(p[0]["id"], p[1]) for p in fast]
+        rows.append({"items": n, "kept": len(fast), "loop_ms": round(loop_ms, 2), "numpy_ms": round(numpy_ms, 2),
+                     "speedup": round(loop_ms / numpy_ms, 1), "same": same})
+    print(json.dumps(rows, indent=2))
+    sys.exit(0 if all(r["same"] for r in rows) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,21 @@
 import argparse
+import numpy as np
 import requests
+import io
+import json
 import math
 import os
 import logging
-from typing import List, Dict, Tuple, Optional, Set
-from urllib.parse import urlencode
+import queue
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Any, Callable, List, Dict, Iterator, Tuple, Optional, Set
+from urllib.parse import urlencode, urlparse
 from datetime import datetime
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError, SSLError
 from PIL import Image, ImageDraw
 
@@ -45,11 +55,346 @@ def calculate_bearing(lat1: float, lon1: float, lat2: float, lon2: float) -> flo
     x = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dLon)
     return (math.degrees(math.atan2(y, x)) + 360) % 360
 
+
+def bearings(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """
+    calculate_bearing over arrays.
+    """
+    dLon = np.radians(np.subtract(lon2, lon1))
+    phi1 = np.radians(lat1); phi2 = np.radians(lat2)
+    y = np.sin(dLon) * np.cos(phi2)
+    x = np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dLon)
+    return (np.degrees(np.arctan2(y, x)) + 360) % 360
+
+# ----------------------------------------------------------------------------
+# Pooled concurrent downloads
+# ----------------------------------------------------------------------------
+
+DEFAULT_WORKERS = 16
+DEFAULT_PER_HOST = 6
+CHUNK_BYTES = 1 << 20  # read and write 1 MiB at a time
+TIMEOUT = (10, 60)  # connect, read (seconds)
+
+
+def make_session(pool_size: int = DEFAULT_WORKERS) -> requests.Session:
+    """
+    Shared keep-alive session whose per-host connection pool fits every worker.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.verify = False
+    return session
+
+
+class HostLimits:
+    """
+    One semaphore per host, so a single server never gets more than
+    `per_host` requests at once however many workers are running.
+    """
+
+    def __init__(self, per_host: int = DEFAULT_PER_HOST):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+
+    def __call__(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+
+class Throughput:
+    """
+    Files, bytes and failures of one batch of downloads, logged as a rate.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.files = 0
+        self.bytes = 0
+        self.failed = 0
+        self.start = time.perf_counter()
+
+    def summary(self) -> str:
+        secs = max(time.perf_counter() - self.start, 1e-6)
+        mb = self.bytes / 1e6
+        return (f"[{self.label}] {self.files} files, {mb:.1f} MB in {secs:.1f} s "
+                f"({mb / secs:.2f} MB/s, {self.files / secs:.1f} files/s), {self.failed} failed")
+
+
+def fetch_bytes(session: requests.Session, limits: HostLimits, url: str) -> Tuple[bytes, int]:
+    """
+    Whole response body of `url`, read in large chunks.
+    """
+    with limits(url):
+        with session.get(url, stream=True, timeout=TIMEOUT) as resp:
+            resp.raise_for_status()
+            data = b"".join(resp.iter_content(CHUNK_BYTES))
+    return data, len(data)
+
+
+def download_file(session: requests.Session, limits: HostLimits, url: str, stem: str) -> Tuple[str, int]:
+    """
+    Stream `url` to `stem`.<ext> (extension from the Content-Type); returns (path, bytes).
+    """
+    size = 0
+    with limits(url):
+        with session.get(url, stream=True, timeout=TIMEOUT) as resp:
+            resp.raise_for_status()
+            ext = resp.headers.get("Content-Type", "image/jpeg").split(";")[0].split("/")[-1]
+            path = f"{stem}.{ext}"
+            with open(path, "wb", buffering=CHUNK_BYTES) as f:
+                for c in resp.iter_content(CHUNK_BYTES):
+                    f.write(c)
+                    size += len(c)
+    return path, size
+
+
+def fetch_concurrently(
+    fetch: Callable[..., Tuple[Any, int]], jobs: List[Tuple], label: str,
+    workers: int = DEFAULT_WORKERS
+) -> Iterator[Tuple[Tuple, Any]]:
+    """
+    Run fetch(*job) for every job on a bounded thread pool and yield
+    (job, result) as each one finishes. The first item of a job is its URL.
+    Failures are logged and skipped; throughput is logged at the end.
+    """
+    stats = Throughput(label)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(fetch, *job): job for job in jobs}
+        for fut in as_completed(futures):
+            job = futures[fut]
+            try:
+                result, size = fut.result()
+            except Exception as e:
+                stats.failed += 1
+                logging.error(f"[{label}] download failed {job[0]}: {e}")
+                continue
+            stats.files += 1
+            stats.bytes += size
+            yield job, result
+    if jobs:
+        logging.info(stats.summary())
+
+# ----------------------------------------------------------------------------
+# Download -> process pipeline
+# ----------------------------------------------------------------------------
+
+DEFAULT_PROCESSES = os.cpu_count() or 1
+DEFAULT_QUEUE = 32  # downloaded images waiting for a process
+
+
+def overlay_and_save(data: bytes, path: str, x: float) -> str:
+    """
+    Decode a downloaded image, draw the red box at `x` (fraction of the
+    width, see filter_mapillary) and save it to `path`. Runs in a worker process.
+    """
+    image = Image.open(io.BytesIO(data)).convert("RGB")
+    width, height = image.size
+    x_px = int(x * width)
+    draw = ImageDraw.Draw(image)
+    box_w = int(width * 0.02)
+    draw.rectangle([(x_px-box_w, 0), (x_px+box_w, height)], outline="red", width=3)
+    image.save(path)
+    return path
+
+
+def process_downloads(
+    fetch: Callable[[str], Tuple[bytes, int]], jobs: List[Tuple[str, Tuple]],
+    process: Callable[..., Any], label: str, workers: int = DEFAULT_WORKERS,
+    processes: int = DEFAULT_PROCESSES, queue_size: int = DEFAULT_QUEUE
+) -> Iterator[Any]:
+    """
+    For each (url, args) job, fetch(url) on a download thread, then
+    process(data, *args) in a process pool, yielding results as they finish.
+
+    Downloaded bytes wait on a queue of at most `queue_size` items; a full
+    queue pauses the download threads, and at most two items per process
+    are in flight, so memory stays bounded while every core is busy and the
+    network keeps going. `process` must be a module-level function.
+    processes=0 runs it on the calling thread. Failures are logged and skipped.
+
+    Closing the generator early (or an error in the caller) stops the
+    downloads: queued jobs are skipped and blocked threads give up their item.
+    """
+    q: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+    done = object()
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch_and_queue(url: str, args: Tuple) -> Tuple[None, int]:
+        if stop.is_set():
+            return None, 0
+        data, size = fetch(url)
+        put((url, args, data))
+        return None, size
+
+    def produce():
+        try:
+            for _ in fetch_concurrently(fetch_and_queue, jobs, label, workers):
+                pass
+        finally:
+            put(done)
+
+    def results(futures):
+        for fut in futures:
+            url = pending.pop(fut)
+            try:
+                result = fut.result()
+            except Exception as e:
+                logging.error(f"[{label}] processing failed {url}: {e}")
+                continue
+            yield result
+
+    pool = ProcessPoolExecutor(processes) if processes > 0 else None
+    if pool is not None:
+        pool.submit(int).result()  # fork the processes before the download threads start
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    pending: Dict[Any, str] = {}
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            url, args, data = item
+            if pool is None:
+                try:
+                    yield process(data, *args)
+                except Exception as e:
+                    logging.error(f"[{label}] processing failed {url}: {e}")
+                continue
+            pending[pool.submit(process, data, *args)] = url
+            if len(pending) >= 2 * processes:
+                finished, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                yield from results(finished)
+        yield from results(as_completed(list(pending)))
+    finally:
+        stop.set()
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                break
+        producer.join()
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+# ----------------------------------------------------------------------------
+# Metadata cache
+# ----------------------------------------------------------------------------
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "panorama_with_bb", "metadata.sqlite")
+DEFAULT_CACHE_TTL = 7 * 24 * 3600  # seconds
+DEFAULT_CACHE_BYTES = 256 << 20
+COORD_STEP = 1e-4  # degrees (about 11 m) a cached point query is reused within
+RADIUS_STEP_FT = 10.0
+
+
+def quantize(value: float, step: float) -> float:
+    return round(round(value / step) * step, 9)
+
+
+class MetadataCache:
+    """
+    Metadata query results (JSON, zlib-compressed) in SQLite, keyed by
+    provider and normalized query. Entries older than `ttl` seconds are
+    ignored and dropped; past `max_bytes` the least recently used go first.
+    Safe to share between threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_CACHE_TTL,
+                 max_bytes: int = DEFAULT_CACHE_BYTES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, provider TEXT, "
+            "created REAL, accessed REAL, size INTEGER, body BLOB)")
+
+    @staticmethod
+    def key(provider: str, query: Dict) -> str:
+        return f"{provider}:{json.dumps(query, sort_keys=True, separators=(',', ':'))}"
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT created, body FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or row[0] < now - self.ttl:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(zlib.decompress(row[1]))
+
+    def put(self, key: str, value: Any):
+        body = zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                             (key, key.split(":", 1)[0], now, now, len(body), body))
+            self._evict(now)
+
+    def _evict(self, now: float):
+        self._db.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        drop = []
+        for key, size in self._db.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            drop.append((key,))
+            total -= size
+        self._db.executemany("DELETE FROM entries WHERE key = ?", drop)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def cached_query(cache: Optional[MetadataCache], provider: str, query: Dict, fetch: Callable[[], Any]) -> Any:
+    """
+    fetch() through `cache` (if any) under provider + query. Failures are not cached.
+    """
+    if cache is None:
+        return fetch()
+    key = MetadataCache.key(provider, query)
+    value = cache.get(key)
+    if value is None:
+        value = fetch()
+        cache.put(key, value)
+    return value
+
 # ----------------------------------------------------------------------------
 # Fetch functions (return list of dicts with id, url, date, heading)
 # ----------------------------------------------------------------------------
 
-def fetch_flickr(lat: float, lon: float, radius_ft: float, api_key: str) -> List[Dict]:
+def fetch_flickr(lat: float, lon: float, radius_ft: float, api_key: str,
+                 cache: Optional[MetadataCache] = None) -> List[Dict]:
+    if cache is not None:
+        query = {"lat": quantize(lat, COORD_STEP), "lon": quantize(lon, COORD_STEP),
+                 "radius_ft": quantize(radius_ft, RADIUS_STEP_FT)}
+        return cached_query(cache, "flickr", query, lambda: fetch_flickr(lat, lon, radius_ft, api_key))
     radius_km = feet_to_meters(radius_ft) / 1000
     params = {
         "method": "flickr.photos.search",
@@ -76,7 +421,12 @@ def fetch_flickr(lat: float, lon: float, radius_ft: float, api_key: str) -> List
     return results
 
 
-def fetch_wikimedia(lat: float, lon: float, radius_ft: float) -> List[Dict]:
+def fetch_wikimedia(lat: float, lon: float, radius_ft: float,
+                    cache: Optional[MetadataCache] = None) -> List[Dict]:
+    if cache is not None:
+        query = {"lat": quantize(lat, COORD_STEP), "lon": quantize(lon, COORD_STEP),
+                 "radius_ft": quantize(radius_ft, RADIUS_STEP_FT)}
+        return cached_query(cache, "wikimedia", query, lambda: fetch_wikimedia(lat, lon, radius_ft))
     raw_m = feet_to_meters(radius_ft)
     radius_m = max(10, min(int(raw_m), 10000))
     base = "https://commons.wikimedia.org/w/api.php"
@@ -121,97 +471,235 @@ def fetch_google_streetview(lat: float, lon: float, api_key: str) -> List[Dict]:
 # Mapillary: fetch and download filtered by view and years
 # ----------------------------------------------------------------------------
 
+MAPILLARY_ENDPOINT = "https://graph.mapillary.com/images"
+MAPILLARY_FIELDS = "id,thumb_original_url,captured_at,compass_angle,computed_compass_angle,computed_geometry"
+MAPILLARY_LIMIT = 1000  # most images one query returns
+MAPILLARY_TILE_DEG = 0.01  # largest tile side queried at once
+MAPILLARY_MAX_SPLITS = 4  # times a full tile is quartered again
+
+MIN_CAPTURED_MS = -62135596800000  # 0001-01-01, the range datetime can format
+MAX_CAPTURED_MS = 253402300800000  # 10000-01-01
+
+
+def _number(v) -> float:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _floats(values: List, width: int = 0) -> np.ndarray:
+    """
+    float array of `values` (None and unparsable entries become NaN); with
+    `width`, rows of that many numbers and anything else a row of NaN.
+    """
+    try:
+        out = np.array(values, dtype=float)
+        if out.shape == ((len(values), width) if width else (len(values),)):
+            return out
+    except (TypeError, ValueError):
+        pass
+    if not width:
+        return np.array([_number(v) for v in values], dtype=float).reshape(len(values))
+    bad = [math.nan] * width
+    return np.array([[_number(x) for x in v] if isinstance(v, (list, tuple)) and len(v) == width else bad
+                     for v in values], dtype=float).reshape(len(values), width)
+
+
+def _in_bbox(img: Dict, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> bool:
+    try:
+        cam_lon, cam_lat = img["computed_geometry"]["coordinates"]
+        return min_lat <= cam_lat <= max_lat and min_lon <= cam_lon <= max_lon
+    except (KeyError, TypeError, ValueError):
+        return False
+
+
+def tile_bbox(
+    min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+    tile_deg: float = MAPILLARY_TILE_DEG
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Split a (min_lat, max_lat, min_lon, max_lon) box into a grid of equal
+    tiles at most tile_deg on a side, in the same order of fields.
+    """
+    rows = max(1, math.ceil((max_lat - min_lat) / tile_deg - 1e-9))
+    cols = max(1, math.ceil((max_lon - min_lon) / tile_deg - 1e-9))
+    lats = np.linspace(min_lat, max_lat, rows + 1).tolist()
+    lons = np.linspace(min_lon, max_lon, cols + 1).tolist()
+    return [(lats[r], lats[r + 1], lons[c], lons[c + 1]) for r in range(rows) for c in range(cols)]
+
+
+def fetch_mapillary_tile(
+    session: requests.Session, limits: HostLimits, tile: Tuple[float, float, float, float],
+    headers: Dict[str, str], endpoint: str = MAPILLARY_ENDPOINT, limit: int = MAPILLARY_LIMIT,
+    splits: int = MAPILLARY_MAX_SPLITS
+) -> List[Dict]:
+    """
+    Images in one tile, following paging.next. When the last page is full
+    and has no next cursor, the API may have stopped short of the tile's
+    images, so its quarters are fetched the same way (up to `splits` levels
+    deep); duplicates are left to the caller.
+    """
+    min_lat, max_lat, min_lon, max_lon = tile
+    url: Optional[str] = endpoint
+    params: Optional[Dict] = {"bbox": f"{min_lon},{min_lat},{max_lon},{max_lat}",
+                              "fields": MAPILLARY_FIELDS, "limit": limit}
+    items: List[Dict] = []
+    page: List[Dict] = []
+    while url:
+        with limits(url):
+            resp = session.get(url, params=params, headers=headers, timeout=TIMEOUT)
+        resp.raise_for_status()
+        body = resp.json()
+        page = body.get("data", [])
+        items.extend(page)
+        url = (body.get("paging") or {}).get("next") if page else None
+        params = None  # the next URL carries the query
+    if len(page) >= limit and splits > 0:
+        mid_lat, mid_lon = (min_lat + max_lat) / 2, (min_lon + max_lon) / 2
+        for quarter in [(min_lat, mid_lat, min_lon, mid_lon), (min_lat, mid_lat, mid_lon, max_lon),
+                        (mid_lat, max_lat, min_lon, mid_lon), (mid_lat, max_lat, mid_lon, max_lon)]:
+            items.extend(fetch_mapillary_tile(session, limits, quarter, headers, endpoint, limit, splits - 1))
+    return items
+
+
+def mapillary_tiles(
+    lat: float, lon: float, radius_m: float, tile_deg: float = MAPILLARY_TILE_DEG
+) -> List[Tuple[float, float, float, float]]:
+    """
+    Tiles covering the bbox around (lat, lon), on a global grid of tile_deg
+    (halved while a cell is still larger than the box).
+    """
+    min_lat, max_lat, min_lon, max_lon = bbox_from_circle(lat, lon, radius_m)
+    step = tile_deg
+    while step / 2 >= max(max_lat - min_lat, max_lon - min_lon) and step > 1e-6:
+        step /= 2
+    grid = (math.floor(min_lat / step) * step, math.ceil(max_lat / step) * step,
+            math.floor(min_lon / step) * step, math.ceil(max_lon / step) * step)
+    return tile_bbox(*grid, step)
+
+
+def fetch_mapillary_items(
+    lat: float, lon: float, radius_m: float, token: str, session: requests.Session,
+    endpoint: str = MAPILLARY_ENDPOINT, workers: int = DEFAULT_WORKERS,
+    per_host: int = DEFAULT_PER_HOST, tile_deg: float = MAPILLARY_TILE_DEG,
+    limit: int = MAPILLARY_LIMIT, cache: Optional[MetadataCache] = None
+) -> List[Dict]:
+    """
+    Mapillary images in the bbox around (lat, lon). The box is tiled
+    (tile_bbox), tiles are fetched concurrently (fetch_mapillary_tile) and
+    an image found in more than one tile is kept once. A failed tile is
+    logged and skipped.
+
+    Tiles come from mapillary_tiles, so repeated and overlapping surveys ask
+    for the same tiles and can reuse them from `cache`.
+    """
+    min_lat, max_lat, min_lon, max_lon = bbox_from_circle(lat, lon, radius_m)
+    tiles = mapillary_tiles(lat, lon, radius_m, tile_deg)
+    headers = {"Authorization": f"OAuth {token}"}
+    limits = HostLimits(per_host)
+
+    def fetch(tile):
+        query = {"endpoint": endpoint, "fields": MAPILLARY_FIELDS,
+                 "bbox": [round(v, 7) for v in tile], "limit": limit}
+        try:
+            return cached_query(cache, "mapillary", query,
+                                lambda: fetch_mapillary_tile(session, limits, tile, headers, endpoint, limit))
+        except (HTTPError, SSLError) as e:
+            logging.error(f"[mapillary] Request error: {e}")
+        except Exception as e:
+            logging.error(f"[mapillary] Unexpected error: {e}")
+        return []
+
+    seen, items = set(), []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tiles)))) as pool:
+        for tile_items in pool.map(fetch, tiles):
+            for img in tile_items:
+                if _in_bbox(img, min_lat, max_lat, min_lon, max_lon) and img.get("id") not in seen:
+                    seen.add(img.get("id"))
+                    items.append(img)
+    logging.info(f"[mapillary] {len(items)} images in {len(tiles)} tiles")
+    return items
+
+
+def filter_mapillary(
+    items: List[Dict], lat: float, lon: float,
+    years: Optional[Set[str]] = None, fov_deg: float = 90.0
+) -> List[Tuple[Dict, str, float, float]]:
+    """
+    Items whose camera faces (lat, lon) within fov_deg, captured in one of
+    `years` if given, as (item, YYYYMMDD or "nodate", camera heading, x) with
+    x the target's position across the frame (0 = left edge, 1 = right edge).
+
+    Fields are gathered into arrays once; years, bearings, heading deltas and
+    frame positions are then computed for all items together and only the
+    survivors are visited again.
+    """
+    captured = _floats([img.get("captured_at") for img in items])
+    geoms = (img.get("computed_geometry") for img in items)
+    cam_lon, cam_lat = _floats([(g or {}).get("coordinates") or (None, None) for g in geoms], 2).T
+    heading = _floats([img.get("compass_angle") for img in items])
+    computed = np.isnan(heading)
+    if computed.any():
+        heading[computed] = _floats([items[i].get("computed_compass_angle") for i in np.flatnonzero(computed)])
+    named = np.array([bool(img.get("id")) and bool(img.get("thumb_original_url")) for img in items], dtype=bool)
+
+    ms = np.trunc(captured)
+    dated = (ms >= MIN_CAPTURED_MS) & (ms < MAX_CAPTURED_MS)
+    day = (np.where(dated, ms, 0) // 86_400_000).astype("datetime64[D]")
+    keep = named & ~np.isnan(heading) & ~np.isnan(cam_lat) & ~np.isnan(cam_lon)
+    if years:
+        year = day.astype("datetime64[Y]").astype(np.int64) + 1970
+        keep &= dated & np.isin(year, [int(y) for y in years if y.isdigit()])
+
+    target = bearings(cam_lat, cam_lon, lat, lon)
+    diff = np.abs((heading - target + 180) % 360 - 180)
+    keep &= diff <= fov_deg / 2.0
+    rel = (target - heading + 360) % 360
+    rel = np.where(rel > 180, rel - 360, rel)
+    x = rel / fov_deg + 0.5
+
+    idx = np.flatnonzero(keep)
+    dates = np.char.replace(np.datetime_as_string(day[idx], unit="D"), "-", "")
+    dates = np.where(dated[idx], dates, "nodate")
+    return [(items[i], str(d), float(heading[i]), float(x[i])) for i, d in zip(idx, dates)]
+
+
 def fetch_mapillary_full(
     lat: float, lon: float, radius_ft: float, token: str,
-    save_dir: str, years: Optional[Set[str]] = None, fov_deg: float = 90.0
+    save_dir: str, years: Optional[Set[str]] = None, fov_deg: float = 90.0,
+    session: Optional[requests.Session] = None, workers: int = DEFAULT_WORKERS,
+    per_host: int = DEFAULT_PER_HOST, processes: int = DEFAULT_PROCESSES,
+    queue_size: int = DEFAULT_QUEUE, endpoint: str = MAPILLARY_ENDPOINT,
+    cache: Optional[MetadataCache] = None
 ) -> List[str]:
     """
     Fetch and download Mapillary images whose frame views the target point,
     optionally filtering by capture year set. Draw red overlay at target.
+    Metadata is fetched in tiles (see fetch_mapillary_items); downloads and
+    image processing run as a pipeline (see process_downloads).
     """
+    session = session or make_session(max(workers, per_host))
     min_radius_m = max(20, feet_to_meters(radius_ft))
-    min_lat, max_lat, min_lon, max_lon = bbox_from_circle(lat, lon, min_radius_m)
-    bbox = f"{min_lon},{min_lat},{max_lon},{max_lat}"
-    endpoint = "https://graph.mapillary.com/images"
-    headers = {"Authorization": f"OAuth {token}"}
-    params = {"bbox": bbox,
-              "fields": "id,thumb_original_url,captured_at,compass_angle,computed_compass_angle,computed_geometry",
-              "limit": 1000}
-    try:
-        resp = requests.get(endpoint, params=params, headers=headers, verify=False)
-        resp.raise_for_status()
-        items = resp.json().get("data", [])
-    except (HTTPError, SSLError) as e:
-        logging.error(f"[mapillary] Request error: {e}")
-        return []
-    except Exception as e:
-        logging.error(f"[mapillary] Unexpected error: {e}")
-        return []
+    items = fetch_mapillary_items(lat, lon, min_radius_m, token, session, endpoint, workers, per_host,
+                                  cache=cache)
 
     out_dir = os.path.join(save_dir, "mapillary")
     os.makedirs(out_dir, exist_ok=True)
-    half_fov = fov_deg / 2.0
     saved_paths = []
-
-    for img in items:
-        # parse date and filter by years
-        ts = img.get("captured_at")
-        try:
-            date_str = datetime.utcfromtimestamp(int(ts)/1000).strftime("%Y%m%d")
-        except:
-            date_str = "nodate"
-        year = date_str[:4]
-        if years and year not in years:
-            continue
-        # compute camera position and filter by FOV
-        coords = img.get("computed_geometry", {}).get("coordinates")
-        if not coords:
-            continue
-        cam_lon, cam_lat = coords
-        target_bearing = calculate_bearing(cam_lat, cam_lon, lat, lon)
-        exif = img.get("compass_angle")
-        comp = img.get("computed_compass_angle")
-        cam_heading = exif if exif is not None else comp
-        if cam_heading is None:
-            continue
-        diff = abs((cam_heading - target_bearing + 180) % 360 - 180)
-        if diff > half_fov:
-            continue
-
-        img_id = img.get("id")
-        full_url = img.get("thumb_original_url")
-        if not img_id or not full_url:
-            continue
-        heading_str = f"{int(cam_heading):03d}"
-
-        # download image
-        try:
-            dl = requests.get(full_url, stream=True, verify=False)
-            dl.raise_for_status()
-            image = Image.open(dl.raw).convert("RGB")
-        except Exception as e:
-            logging.error(f"[mapillary] download failed: {e}")
-            continue
-
-        # overlay box
-        width, height = image.size
-        rel = (target_bearing - cam_heading + 360) % 360
-        if rel > 180:
-            rel -= 360
-        x_px = int((rel/fov_deg + 0.5) * width)
-        draw = ImageDraw.Draw(image)
-        box_w = int(width * 0.02)
-        draw.rectangle([(x_px-box_w, 0), (x_px+box_w, height)], outline="red", width=3)
-
-        # save filtered
-        filename = f"{img_id}_{date_str}_{heading_str}.jpg"
-        path = os.path.join(out_dir, filename)
-        try:
-            image.save(path)
-            logging.info(f"Saved [mapillary] → {path}")
-            saved_paths.append(path)
-        except Exception as e:
-            logging.error(f"[mapillary] write error {path}: {e}")
+    picks = []
+    for img, date_str, cam_heading, x in filter_mapillary(items, lat, lon, years, fov_deg):
+        path = os.path.join(out_dir, f"{img['id']}_{date_str}_{int(cam_heading):03d}.jpg")
+        picks.append((img["thumb_original_url"], (path, x)))
+
+    # download on threads; decode, overlay and save on all cores
+    limits = HostLimits(per_host)
+    for path in process_downloads(
+        lambda url: fetch_bytes(session, limits, url), picks, overlay_and_save,
+        "mapillary", workers, processes, queue_size
+    ):
+        logging.info(f"Saved [mapillary] → {path}")
+        saved_paths.append(path)
 
     return saved_paths
 
@@ -219,10 +707,18 @@ def fetch_mapillary_full(
 # Download images utility
 # ----------------------------------------------------------------------------
 
-def download_images(services: Dict[str, List[Dict]], base_dir: str, years: Optional[Set[str]] = None):
+def download_images(
+    services: Dict[str, List[Dict]], base_dir: str, years: Optional[Set[str]] = None,
+    session: Optional[requests.Session] = None, workers: int = DEFAULT_WORKERS,
+    per_host: int = DEFAULT_PER_HOST
+) -> List[str]:
     """
     Download images for services besides Mapillary, filtering by years if provided.
+    All services share one worker pool; each host gets at most `per_host` of them.
     """
+    session = session or make_session(max(workers, per_host))
+    limits = HostLimits(per_host)
+    jobs = []
     for svc, imgs in services.items():
         svc_dir = os.path.join(base_dir, svc)
         os.makedirs(svc_dir, exist_ok=True)
@@ -237,19 +733,16 @@ def download_images(services: Dict[str, List[Dict]], base_dir: str, years: Optio
             url = img.get("url") or img.get("thumb_original_url")
             if not url:
                 continue
-            try:
-                resp = requests.get(url, stream=True, verify=False)
-                resp.raise_for_status()
-            except SSLError as e:
-                logging.error(f"SSL error downloading {url}: {e}")
-                continue
-            ext = resp.headers.get("Content-Type", "image/jpeg").split("/")[-1]
-            filename = f"{img.get('id')}_{date_str}_{img.get('heading','noaz')}.{ext}"
-            path = os.path.join(svc_dir, filename)
-            with open(path, 'wb') as f:
-                for c in resp.iter_content(1024):
-                    f.write(c)
-            logging.info(f"Saved [{svc}] → {path}")
+            stem = os.path.join(svc_dir, f"{img.get('id')}_{date_str}_{img.get('heading','noaz')}")
+            jobs.append((url, stem, svc))
+
+    saved_paths = []
+    for (_, _, svc), path in fetch_concurrently(
+        lambda url, stem, svc: download_file(session, limits, url, stem), jobs, "download", workers
+    ):
+        logging.info(f"Saved [{svc}] → {path}")
+        saved_paths.append(path)
+    return saved_paths
 
 # ----------------------------------------------------------------------------
 # Main
@@ -267,7 +760,21 @@ def main():
     parser.add_argument("--mapillary_token", default=None)
     parser.add_argument("--google_key", default=None)
     parser.add_argument("--azure_key", default=None)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="Concurrent image downloads")
+    parser.add_argument("--per_host", type=int, default=DEFAULT_PER_HOST,
+                        help="Concurrent downloads per host")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES,
+                        help="Processes decoding and saving Mapillary images (0 = in the main process)")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH,
+                        help="SQLite file caching Flickr, Wikimedia and Mapillary metadata queries")
+    parser.add_argument("--cache_ttl_hours", type=float, default=DEFAULT_CACHE_TTL / 3600)
+    parser.add_argument("--cache_max_mb", type=float, default=DEFAULT_CACHE_BYTES / (1 << 20))
+    parser.add_argument("--no_cache", action="store_true", help="Always query the services")
     args = parser.parse_args()
+    session = make_session(max(args.workers, args.per_host))
+    cache = None if args.no_cache else MetadataCache(
+        args.cache, ttl=args.cache_ttl_hours * 3600, max_bytes=int(args.cache_max_mb * (1 << 20)))
 
     # parse years
     years = set(y.strip() for y in args.years.split(',')) if args.years else None
@@ -284,12 +791,12 @@ def main():
     services, errors = {}, {}
     if args.flickr_key:
         try:
-            services["flickr"] = fetch_flickr(args.lat, args.lon, args.radius, args.flickr_key)
+            services["flickr"] = fetch_flickr(args.lat, args.lon, args.radius, args.flickr_key, cache)
         except Exception as e:
             errors["flickr"] = str(e)
     if args.wikimedia:
         try:
-            services["wikimedia"] = fetch_wikimedia(args.lat, args.lon, args.radius)
+            services["wikimedia"] = fetch_wikimedia(args.lat, args.lon, args.radius, cache)
         except Exception as e:
             errors["wikimedia"] = str(e)
     if args.google_key:
@@ -299,13 +806,16 @@ def main():
             errors["google"] = str(e)
 
     # download non-Mapillary
-    download_images(services, base_dir, years)
+    download_images(services, base_dir, years, session=session,
+                    workers=args.workers, per_host=args.per_host)
 
     # Mapillary
     if args.mapillary_token:
         paths = fetch_mapillary_full(
             args.lat, args.lon, args.radius,
-            args.mapillary_token, base_dir, years=years
+            args.mapillary_token, base_dir, years=years,
+            session=session, workers=args.workers, per_host=args.per_host,
+            processes=args.processes, cache=cache
         )
         for p in paths:
             logging.info(f"[mapillary] saved → {p}")
@@ -313,6 +823,9 @@ def main():
     # report errors
     for svc, msg in errors.items():
         logging.error(f"[{svc}] {msg}")
+    if cache is not None:
+        logging.info(f"[cache] {cache.hits} hits, {cache.misses} misses ({cache.path})")
+        cache.close()
 
 if __name__ == '__main__':
     main()
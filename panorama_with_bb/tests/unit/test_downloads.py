@@ -0,0 +1,110 @@
+import io
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+from test_geo_helpers import load_script_module
+
+
+def jpeg_bytes(size=(200, 100)):
+    buf = io.BytesIO()
+    Image.new("RGB", size, "white").save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+    jpeg = jpeg_bytes()
+
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        time.sleep(0.05)
+        with cls.lock:
+            cls.active -= 1
+        if self.path.startswith("/missing"):
+            self.send_error(404)
+            return
+        if self.path.startswith("/jpeg"):
+            body, kind = cls.jpeg, "image/jpeg"
+        else:
+            body, kind = self.path.encode() * 50_000, "image/png"
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    ImageHandler.active = ImageHandler.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_images_pooled_and_limited_per_host(tmp_path, base_url):
+    mod = load_script_module()
+    imgs = [{"id": i, "url": f"{base_url}/img/{i}", "date": "20230101", "heading": "noaz"} for i in range(12)]
+    imgs.append({"id": "old", "url": f"{base_url}/img/old", "date": "20190101"})
+    imgs.append({"id": "gone", "url": f"{base_url}/missing", "date": "20230101"})
+    paths = mod.download_images({"flickr": imgs}, str(tmp_path), years={"2023"}, workers=8, per_host=3)
+    assert sorted(paths) == sorted(str(tmp_path / "flickr" / f"{i}_20230101_noaz.png") for i in range(12))
+    assert (tmp_path / "flickr" / "5_20230101_noaz.png").read_bytes() == b"/img/5" * 50_000
+    assert 1 < ImageHandler.peak <= 3
+
+
+@pytest.mark.parametrize("processes", [0, 2])
+def test_process_downloads_overlays_in_worker_processes(tmp_path, base_url, processes):
+    mod = load_script_module()
+    session, limits = mod.make_session(4), mod.HostLimits(4)
+    # Target in the middle of the frame and at its left edge.
+    jobs = [(f"{base_url}/jpeg/{i}", (str(tmp_path / f"{i}.jpg"), 0.5 - 0.5 * (i % 2))) for i in range(6)]
+    jobs.append((f"{base_url}/not-an-image", (str(tmp_path / "bad.jpg"), 0.5)))
+    jobs.append((f"{base_url}/missing", (str(tmp_path / "gone.jpg"), 0.5)))
+    paths = list(mod.process_downloads(
+        lambda url: mod.fetch_bytes(session, limits, url), jobs, mod.overlay_and_save, "test",
+        workers=4, processes=processes, queue_size=1
+    ))
+    assert sorted(paths) == sorted(str(tmp_path / f"{i}.jpg") for i in range(6))
+    for i in range(6):
+        image = Image.open(tmp_path / f"{i}.jpg")
+        x = 97 if i % 2 == 0 else 3
+        r, g, b = image.getpixel((x, 50))
+        assert r > 180 and g < 100 and b < 100
+        assert image.getpixel((150 if i % 2 == 0 else 100, 50))[1] > 200
+
+
+def test_process_downloads_stops_when_closed_early():
+    mod = load_script_module()
+    fetched = []
+
+    def fetch(url):
+        fetched.append(url)
+        return url.encode(), 1
+
+    def run():
+        gen = mod.process_downloads(fetch, [(f"u{i}", ()) for i in range(50)], lambda data: data, "test",
+                                    workers=4, processes=0, queue_size=2)
+        next(gen)
+        gen.close()
+
+    # The download threads block on the full queue; closing must still return.
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(10)
+    assert not worker.is_alive()
+    assert len(fetched) < 50
@@ -1,4 +1,7 @@
 import importlib.util
+import sys
+
+import numpy as np
 from pathlib import Path
 
 
@@ -7,6 +10,8 @@ def load_script_module():
     spec = importlib.util.spec_from_file_location("panorama_with_bb", str(path))
     mod = importlib.util.module_from_spec(spec)
     assert spec and spec.loader
+    # Registered so its functions can be pickled into worker processes.
+    sys.modules[spec.name] = mod
     spec.loader.exec_module(mod)
     return mod
 
@@ -21,3 +26,39 @@ def test_feet_to_meters_and_bbox_and_bearing():
     b = mod.calculate_bearing(47.0, -122.0, 48.0, -122.0)
     assert abs(b - 0.0) < 1.0
 
+
+def test_filter_mapillary_matches_per_item_rules():
+    mod = load_script_module()
+    rng = np.random.default_rng(3)
+    lat, lon = 47.6062, -122.3321
+    items = [
+        {"id": str(i), "thumb_original_url": f"u{i}", "captured_at": int(rng.integers(1.45e12, 1.73e12)),
+         "compass_angle": float(rng.uniform(0, 360)) if i % 3 else None, "computed_compass_angle": float(rng.uniform(0, 360)),
+         "computed_geometry": {"coordinates": [lon + rng.uniform(-0.003, 0.003), lat + rng.uniform(-0.002, 0.002)]}}
+        for i in range(400)
+    ]
+    # Each of these is dropped by one rule; "nodate" ones only when filtering by year.
+    looking_north = {"computed_compass_angle": 0.0, "computed_geometry": {"coordinates": [lon, lat - 0.001]}}
+    items += [
+        {**looking_north, "id": "no-url"},
+        {**looking_north, "id": "no-geometry", "thumb_original_url": "u", "computed_geometry": None},
+        {**looking_north, "id": "no-heading", "thumb_original_url": "u", "computed_compass_angle": None},
+        {**looking_north, "id": "facing-away", "thumb_original_url": "u", "compass_angle": 180.0},
+        {**looking_north, "id": "nodate", "thumb_original_url": "u", "captured_at": "soon"},
+    ]
+    for years in (None, {"2017", "2020"}):
+        expected = []
+        for img in items[:400]:
+            coords = img["computed_geometry"]["coordinates"]
+            bearing = mod.calculate_bearing(coords[1], coords[0], lat, lon)
+            heading = img["compass_angle"] if img["compass_angle"] is not None else img["computed_compass_angle"]
+            date = np.datetime_as_string(np.datetime64(img["captured_at"], "ms"), unit="D").replace("-", "")
+            rel = (bearing - heading + 180) % 360 - 180
+            if abs(rel) <= 45 and (not years or date[:4] in years):
+                expected.append((img["id"], date, heading, rel / 90 + 0.5))
+        if not years:
+            expected.append(("nodate", "nodate", 0.0, 0.5))
+        got = [(img["id"], date, heading, x) for img, date, heading, x in mod.filter_mapillary(items, lat, lon, years)]
+        assert [g[:3] for g in got] == [e[:3] for e in expected]
+        assert np.allclose([g[3] for g in got], [e[3] for e in expected])
+        assert 5 < len(got) < 400
@@ -0,0 +1,150 @@
+import json
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import numpy as np
+import pytest
+
+from test_downloads import jpeg_bytes
+from test_geo_helpers import load_script_module
+
+LAT, LON = 47.6062, -122.3321
+
+
+def make_points(n, seed=7):
+    mod = load_script_module()
+    rng = np.random.default_rng(seed)
+    lats = LAT + rng.uniform(-0.006, 0.006, n)
+    lons = LON + rng.uniform(-0.009, 0.009, n)
+    return [
+        {"id": str(1000 + i), "captured_at": 1_600_000_000_000 + i * 86_400_000,
+         # Every camera faces the target.
+         "computed_compass_angle": mod.calculate_bearing(lats[i], lons[i], LAT, LON),
+         "computed_geometry": {"type": "Point", "coordinates": [float(lons[i]), float(lats[i])]}}
+        for i in range(n)
+    ]
+
+
+class GraphHandler(BaseHTTPRequestHandler):
+    """Graph API stand-in: `limit` images per page behind paging.next; with `cap`, at most that many per bbox."""
+
+    cap = None
+    points = []
+    lock = threading.Lock()
+    requests = []
+    active = peak = 0
+
+    def do_GET(self):
+        cls = type(self)
+        url = urlparse(self.path)
+        if url.path.startswith("/jpeg"):
+            body, kind = jpeg_bytes((64, 32)), "image/jpeg"
+        else:
+            with cls.lock:
+                cls.active += 1
+                cls.peak = max(cls.peak, cls.active)
+                cls.requests.append(self.path)
+            try:
+                time.sleep(0.01)
+                body, kind = json.dumps(self.page(parse_qs(url.query))).encode(), "application/json"
+            finally:
+                with cls.lock:
+                    cls.active -= 1
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def page(self, query):
+        min_lon, min_lat, max_lon, max_lat = map(float, query["bbox"][0].split(","))
+        limit = int(query["limit"][0])
+        after = int(query.get("after", ["0"])[0])
+        inside = [p for p in self.points
+                  if min_lat <= p["computed_geometry"]["coordinates"][1] <= max_lat
+                  and min_lon <= p["computed_geometry"]["coordinates"][0] <= max_lon][:self.cap]
+        host = f"http://{self.headers['Host']}"
+        data = [dict(p, thumb_original_url=f"{host}/jpeg/{p['id']}") for p in inside[after:after + limit]]
+        out = {"data": data}
+        if after + limit < len(inside):
+            next_query = {"bbox": query["bbox"][0], "limit": limit, "after": after + limit}
+            out["paging"] = {"next": f"{host}/images?{urlencode(next_query)}"}
+        return out
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def graph_url():
+    GraphHandler.points = make_points(900)
+    GraphHandler.requests = []
+    GraphHandler.cap = None
+    GraphHandler.active = GraphHandler.peak = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), GraphHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/images"
+    server.shutdown()
+    server.server_close()
+
+
+def test_tile_bbox_covers_box():
+    mod = load_script_module()
+    tiles = mod.tile_bbox(47.0, 47.025, -122.0, -121.99, 0.01)
+    assert len(tiles) == 3 * 1
+    assert tiles[0][0] == 47.0 and tiles[-1][1] == 47.025
+    assert all(t[2] == -122.0 and t[3] == -121.99 and t[1] - t[0] <= 0.01 for t in tiles)
+    assert mod.tile_bbox(47.0, 47.001, -122.0, -121.999) == [(47.0, 47.001, -122.0, -121.999)]
+
+
+def points_in(min_lat, max_lat, min_lon, max_lon):
+    return [p for p in GraphHandler.points
+            if min_lat <= p["computed_geometry"]["coordinates"][1] <= max_lat
+            and min_lon <= p["computed_geometry"]["coordinates"][0] <= max_lon]
+
+
+def test_capped_tiles_split_and_dedupe(graph_url):
+    mod = load_script_module()
+    radius_m = 500.0
+    expected = {p["id"] for p in points_in(*mod.bbox_from_circle(LAT, LON, radius_m))}
+    # Each query stops at 100 images (two full pages, no cursor); dense tiles must be split to get them all.
+    GraphHandler.cap = 100
+    items = mod.fetch_mapillary_items(LAT, LON, radius_m, "token", mod.make_session(4), graph_url,
+                                      workers=4, per_host=4, tile_deg=0.008, limit=50)
+    ids = [img["id"] for img in items]
+    assert len(ids) == len(set(ids))
+    assert set(ids) == expected and len(expected) > 300
+    assert any("after=" in r for r in GraphHandler.requests)
+    assert len(GraphHandler.requests) > 2 * len(mod.mapillary_tiles(LAT, LON, radius_m, 0.008))
+    assert 1 < GraphHandler.peak <= 4
+
+
+def test_uncapped_tiles_follow_paging_without_splitting(graph_url):
+    mod = load_script_module()
+    radius_m, limit = 500.0, 47
+    counts = [len(points_in(*tile)) for tile in mod.mapillary_tiles(LAT, LON, radius_m, 0.008)]
+    assert max(counts) > 2 * limit and all(n % limit for n in counts if n)
+    items = mod.fetch_mapillary_items(LAT, LON, radius_m, "token", mod.make_session(4), graph_url,
+                                      workers=4, per_host=4, tile_deg=0.008, limit=limit)
+    assert {img["id"] for img in items} == {p["id"] for p in points_in(*mod.bbox_from_circle(LAT, LON, radius_m))}
+    # One request per page of each tile, no quarters.
+    assert len(GraphHandler.requests) == sum(max(1, math.ceil(n / limit)) for n in counts)
+
+
+def test_fetch_mapillary_full_against_stub(tmp_path, graph_url):
+    mod = load_script_module()
+    paths = mod.fetch_mapillary_full(LAT, LON, 150.0, "token", str(tmp_path), years={"2020"},
+                                     session=mod.make_session(4), workers=4, processes=0, endpoint=graph_url)
+    min_lat, max_lat, min_lon, max_lon = mod.bbox_from_circle(LAT, LON, mod.feet_to_meters(150.0))
+    expected = [p for p in GraphHandler.points
+                if min_lat <= p["computed_geometry"]["coordinates"][1] <= max_lat
+                and min_lon <= p["computed_geometry"]["coordinates"][0] <= max_lon
+                and p["captured_at"] < 1_609_459_200_000]  # 2021-01-01
+    assert expected
+    assert sorted(paths) == sorted(
+        str(tmp_path / "mapillary" / f"{p['id']}_{np.datetime_as_string(np.datetime64(p['captured_at'], 'ms'), unit='D').replace('-', '')}_{int(p['computed_compass_angle']):03d}.jpg")
+        for p in expected
+    )
@@ -0,0 +1,60 @@
+import json
+import time
+import zlib
+
+from test_geo_helpers import load_script_module
+from test_mapillary import LAT, LON, GraphHandler, graph_url  # noqa: F401
+
+
+def test_cache_roundtrip_ttl_and_lru_eviction(tmp_path):
+    mod = load_script_module()
+    cache = mod.MetadataCache(str(tmp_path / "meta.sqlite"))
+    key = cache.key("flickr", {"lon": 2.0, "lat": 1.0})
+    assert key == cache.key("flickr", {"lat": 1.0, "lon": 2.0})
+    assert cache.get(key) is None
+    cache.put(key, [{"id": "a", "url": "u"}])
+    assert cache.get(key) == [{"id": "a", "url": "u"}]
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+    # Persisted, and ignored once older than the TTL.
+    assert mod.MetadataCache(str(tmp_path / "meta.sqlite")).get(key) == [{"id": "a", "url": "u"}]
+    stale = mod.MetadataCache(str(tmp_path / "meta.sqlite"), ttl=0.01)
+    time.sleep(0.02)
+    assert stale.get(key) is None
+
+    # Room for about two entries: the least recently read one goes first.
+    blob = [str(i) * 50 for i in range(400)]
+    size = len(zlib.compress(json.dumps(blob, separators=(",", ":")).encode()))
+    small = mod.MetadataCache(":memory:", max_bytes=2 * size + 10)
+    small.put("p:a", blob)
+    small.put("p:b", blob)
+    time.sleep(0.01)
+    small.get("p:a")
+    small.put("p:c", blob)
+    assert [small.get(k) is not None for k in ("p:a", "p:b", "p:c")] == [True, False, True]
+
+
+def test_repeated_and_overlapping_surveys_reuse_tiles(tmp_path, graph_url):  # noqa: F811
+    mod = load_script_module()
+    cache = mod.MetadataCache(str(tmp_path / "meta.sqlite"))
+    session = mod.make_session(4)
+
+    def survey(lat, lon):
+        GraphHandler.requests = []
+        items = mod.fetch_mapillary_items(lat, lon, 300.0, "token", session, graph_url,
+                                          workers=4, tile_deg=0.004, limit=100, cache=cache)
+        return sorted(img["id"] for img in items), len(GraphHandler.requests)
+
+    uncached = mod.fetch_mapillary_items(LAT, LON, 300.0, "token", session, graph_url,
+                                         workers=4, tile_deg=0.004, limit=100)
+    first, first_requests = survey(LAT, LON)
+    assert first == sorted(img["id"] for img in uncached) and first_requests > 0
+    assert survey(LAT, LON) == (first, 0)
+    # A few hundred meters north: only the new row of tiles is queried.
+    shifted, shifted_requests = survey(LAT + 0.004, LON)
+    assert shifted != first and 0 < shifted_requests < first_requests
+    # Another endpoint (or field list) never reads these entries.
+    other = graph_url.replace("/images", "/v2/images")
+    GraphHandler.requests = []
+    mod.fetch_mapillary_items(LAT, LON, 300.0, "token", session, other, workers=4, tile_deg=0.004, limit=100, cache=cache)
+    assert GraphHandler.requests